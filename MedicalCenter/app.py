@@ -1,18 +1,53 @@
 
-from flask import Flask
+from flask import Flask, request
+from flask.json.provider import DefaultJSONProvider
 from flask_wtf.csrf import CSRFProtect
+from models import db
+from models.registros import Registro
+from models.metricas import metricas
+from models.cache_plantillas import configure_templates
+from controllers.compresion import configure_compression
+import os
 from controllers import (
     auth_bp, cita_bp, paciente_bp, medico_bp, 
-    exploracion_bp, expediente_bp, usuario_bp
+    exploracion_bp, expediente_bp, usuario_bp, metricas_bp, exportacion_bp,
+    dashboard_bp, esquema_bp, activos_bp
 )
 
+class MedicalCenterJSONProvider(DefaultJSONProvider):
+    """Serializa los registros de los modelos como objetos JSON"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Registro):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
 app.secret_key = 'medical12345'
+app.json = MedicalCenterJSONProvider(app)
 
 # Configuración CSRF
 csrf = CSRFProtect(app)
 app.config['WTF_CSRF_TIME_LIMIT'] = 3600
 
+# Generar reportes PDF en segundo plano (False = generación síncrona en la petición)
+app.config['REPORTES_ASINCRONOS'] = True
+# Generar los PDF descargados en memoria, sin escribir archivos en static/reports
+app.config['REPORTES_EN_MEMORIA'] = True
+# Consultas por petición a partir de las cuales se avisa de un posible N+1 (None = desactivado)
+app.config['PRESUPUESTO_CONSULTAS'] = 30
+# Guardar las tablas de los listados ya renderizadas hasta que cambien sus datos
+app.config['CACHE_FRAGMENTOS'] = True
+# Comprimir HTML, JSON y exportaciones con gzip (o brotli si está instalado) cuando el navegador lo acepta.
+# Desactivado por defecto (normalmente lo hace el proxy); se activa con MEDICALCENTER_COMPRESION=1
+app.config['COMPRESION'] = os.environ.get('MEDICALCENTER_COMPRESION', '0') == '1'
+# Tamaño mínimo en bytes de una respuesta para comprimirla (las pequeñas no ganan nada)
+app.config['COMPRESION_MIN_BYTES'] = 1024
+# Token que deben enviar los recolectores de /metrics (Authorization: Bearer <token>).
+# Sin token configurado las rutas de métricas responden 404
+app.config['METRICAS_TOKEN'] = os.environ.get('MEDICALCENTER_METRICAS_TOKEN')
+
 # Registrar blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(cita_bp)
@@ -21,6 +56,25 @@ app.register_blueprint(medico_bp)
 app.register_blueprint(exploracion_bp)
 app.register_blueprint(expediente_bp)
 app.register_blueprint(usuario_bp)
+app.register_blueprint(metricas_bp)
+app.register_blueprint(exportacion_bp)
+app.register_blueprint(dashboard_bp)
+app.register_blueprint(esquema_bp)
+app.register_blueprint(activos_bp)
+
+# Asociar las consultas de cada petición a su endpoint
+@app.before_request
+def begin_request_metrics():
+    metricas.begin_request(request.endpoint or 'desconocido')
+
+@app.teardown_request
+def end_request_metrics(exception=None):
+    metricas.end_request(app.config.get('PRESUPUESTO_CONSULTAS'))
+
+# Devolver al pool cualquier conexión que haya quedado asignada a la petición
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    db.disconnect()
 
 # Filtros personalizados para templates
 @app.template_filter('calcular_edad')
@@ -65,5 +119,11 @@ def inject_user():
         'user_privilege': session.get('user_privilege', 0)
     }
 
+# Bytecode de plantillas en disco, etiqueta {% cache %} y precompilación al iniciar
+configure_templates(app)
+
+# Compresión de respuestas HTML, JSON y de las exportaciones
+configure_compression(app)
+
 if __name__ == '__main__':
     app.run(debug=True, port=4000)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""Compara tiempo y memoria de diccionarios por fila contra registros con __slots__.
+
+Uso (desde la carpeta MedicalCenter):
+    python -m benchmarks.benchmark_registros [filas]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+from models.medico import RegistroMedico
+
+def make_rows(n):
+    """Filas sintéticas con la forma de SELECT * FROM medicos"""
+    return [(i, f"Nombre{i}", None if i % 3 else "Segundo", f"Paterno{i}", f"Materno{i}",
+             f"CED{i:07d}", "Cardiología", f"medico{i}@hospital.mx", f"RFC{i:010d}",
+             "5555555555", "Centro Norte", 1, "x" * 64)
+            for i in range(n)]
+
+def as_dicts(rows):
+    """Construcción anterior: un diccionario por fila con nombre_completo precalculado"""
+    return [{
+        'id_medico': medico_data[0],
+        'primer_nombre': medico_data[1],
+        'segundo_nombre': medico_data[2],
+        'apellido_paterno': medico_data[3],
+        'apellido_materno': medico_data[4],
+        'cedula_profesional': medico_data[5],
+        'especialidad': medico_data[6],
+        'correo': medico_data[7],
+        'rfc': medico_data[8],
+        'telefono': medico_data[9],
+        'centro_medico': medico_data[10],
+        'estatus': medico_data[11],
+        'nombre_completo': f"{medico_data[1] or ''} {medico_data[2] or ''} {medico_data[3]} {medico_data[4] or ''}".strip(),
+        'contrasena': medico_data[12]
+    } for medico_data in rows]
+
+def as_records(rows):
+    return RegistroMedico.from_rows(rows)
+
+def measure(builder, rows):
+    """Retorna (segundos, bytes asignados) de construir los objetos a partir de las filas"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    result = builder(rows)
+    segundos = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return segundos, memoria
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(n)
+    print(f"{n} filas de médicos ({date.today()})")
+    for nombre, builder in (('dict por fila', as_dicts), ('RegistroMedico', as_records)):
+        # Medir tiempo sin tracemalloc (que lo distorsiona) y memoria por separado
+        inicio = time.perf_counter()
+        builder(rows)
+        segundos = time.perf_counter() - inicio
+        _, memoria = measure(builder, rows)
+        print(f"  {nombre:<16} {segundos * 1000:8.1f} ms  {memoria / 1024 / 1024:8.1f} MiB")
+
+if __name__ == '__main__':
+    main()
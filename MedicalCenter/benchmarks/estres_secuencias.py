@@ -0,0 +1,86 @@
+"""Prueba de estrés del asignador de secuencias contra la base de datos configurada.
+
+Varios hilos piden números al mismo tiempo, cada uno con su propio asignador (como
+procesos distintos) y además compartiendo uno; ningún número debe repetirse.
+
+Uso (desde la carpeta MedicalCenter):
+    python -m benchmarks.estres_secuencias [hilos] [números por hilo] [bloque]
+"""
+import sys
+import threading
+import time
+import uuid
+from datetime import date
+
+from models.database import db
+from models.secuencias import AsignadorSecuencias
+
+def run(hilos, por_hilo, bloque, compartido):
+    """Retorna (números entregados, segundos)"""
+    nombre = f"estres-{uuid.uuid4().hex[:12]}"
+    anio = date.today().year
+    asignador = AsignadorSecuencias(bloque)
+    numeros = []
+    errores = []
+    lock = threading.Lock()
+    inicio_comun = threading.Barrier(hilos)
+
+    def worker():
+        propio = asignador if compartido else AsignadorSecuencias(bloque)
+        locales = []
+        try:
+            inicio_comun.wait()
+            for _ in range(por_hilo):
+                locales.append(propio.next(nombre, anio))
+        except Exception as e:
+            errores.append(e)
+        with lock:
+            numeros.extend(locales)
+
+    threads = [threading.Thread(target=worker) for _ in range(hilos)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+
+    # Limpiar la secuencia de prueba
+    connection = db.pool.acquire()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM secuencias WHERE nombre = %s", (nombre,))
+        connection.commit()
+        cursor.close()
+    finally:
+        db.pool.release(connection)
+
+    if errores:
+        raise errores[0]
+    return numeros, segundos
+
+def main():
+    hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    por_hilo = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    bloque = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    db.pool_max_size = max(db.pool_max_size, hilos)
+
+    fallas = 0
+    for compartido in (False, True):
+        numeros, segundos = run(hilos, por_hilo, bloque, compartido)
+        esperados = hilos * por_hilo
+        repetidos = len(numeros) - len(set(numeros))
+        modo = 'asignador compartido' if compartido else 'un asignador por hilo'
+        print(f"{modo:<22} {len(numeros)}/{esperados} números  {repetidos} repetidos  "
+              f"{esperados / segundos:8.0f} números/s")
+        if repetidos or len(numeros) != esperados:
+            fallas += 1
+        elif bloque == 1 and sorted(numeros) != list(range(1, esperados + 1)):
+            # Sin bloques la secuencia no debe tener huecos
+            print("  la secuencia tiene huecos")
+            fallas += 1
+
+    sys.exit(1 if fallas else 0)
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,11 @@ from .medico_controller import medico_bp
 from .exploracion_controller import exploracion_bp
 from .expediente_controller import expediente_bp
 from .usuario_controller import usuario_bp
+from .metricas_controller import metricas_bp
+from .exportacion_controller import exportacion_bp
+from .dashboard_controller import dashboard_bp
+from .esquema_controller import esquema_bp
+from .activos_controller import activos_bp
 
 __all__ = [
     'auth_bp',
@@ -15,6 +20,11 @@ __all__ = [
     'exploracion_bp',
     'expediente_bp',
     'usuario_bp',
+    'metricas_bp',
+    'exportacion_bp',
+    'dashboard_bp',
+    'esquema_bp',
+    'activos_bp',
     'login_required',
     'admin_required'
 ]
\ No newline at end of file
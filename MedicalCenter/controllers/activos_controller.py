@@ -0,0 +1,67 @@
+from flask import Blueprint, request, url_for, send_from_directory, abort
+import click
+import mimetypes
+import os
+from models.activos import DIST_DIR, MANIFEST, BUNDLES, COMPRESIONES, build_assets, load_manifest
+
+activos_bp = Blueprint('activos', __name__)
+
+# Los nombres llevan el hash del contenido: el navegador puede guardarlos un año sin revalidar
+UN_ANIO = 365 * 24 * 3600
+
+_manifest = {'mtime': None, 'datos': {}}
+
+def current_manifest():
+    """Manifiesto de static/dist, releído solo si el archivo cambió (p. ej. tras `flask activos construir`)"""
+    try:
+        mtime = os.path.getmtime(os.path.join(DIST_DIR, MANIFEST))
+    except OSError:
+        mtime = None
+    if mtime != _manifest['mtime']:
+        _manifest['datos'] = load_manifest() if mtime else {}
+        _manifest['mtime'] = mtime
+    return _manifest['datos']
+
+@activos_bp.app_template_global()
+def asset_url(filename):
+    """Como url_for('static', filename=...) pero con la versión con hash si ya se construyó"""
+    construido = current_manifest().get(filename)
+    if construido:
+        return url_for('activos.recurso', filename=construido)
+    return url_for('static', filename=filename)
+
+@activos_bp.app_template_global()
+def asset_urls(nombre):
+    """URLs de un grupo de BUNDLES: un solo archivo si ya se construyó, o sus partes por separado"""
+    if nombre in current_manifest() or nombre not in BUNDLES:
+        return [asset_url(nombre)]
+    return [url_for('static', filename=parte) for parte in BUNDLES[nombre]]
+
+@activos_bp.route('/activos/<path:filename>')
+def recurso(filename):
+    """Sirve un archivo construido, precomprimido si el navegador lo acepta"""
+    if filename == MANIFEST:
+        abort(404)
+
+    enviado, codificacion = filename, None
+    for extension, encoding in COMPRESIONES:
+        if encoding in request.accept_encodings and os.path.isfile(os.path.join(DIST_DIR, filename + extension)):
+            enviado, codificacion = filename + extension, encoding
+            break
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    respuesta = send_from_directory(DIST_DIR, enviado, mimetype=mimetype, max_age=UN_ANIO)
+    if codificacion:
+        respuesta.headers['Content-Encoding'] = codificacion
+    respuesta.vary.add('Accept-Encoding')
+    respuesta.cache_control.public = True
+    respuesta.cache_control.immutable = True
+    return respuesta
+
+@activos_bp.cli.command('construir')
+def construir_cli():
+    """Minifica, agrupa y precomprime los CSS/JS de static/ en static/dist"""
+    manifiesto = build_assets()
+    for nombre, construido in sorted(manifiesto.items()):
+        click.echo(f"{nombre} -> {construido}")
+    click.echo(f"{len(manifiesto)} archivos en {DIST_DIR}")
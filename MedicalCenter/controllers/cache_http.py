@@ -0,0 +1,67 @@
+from flask import request, session, make_response, current_app, Response
+from models.cache_datos import cache_datos
+from functools import wraps
+import hashlib
+import os
+import time
+
+# Políticas de Cache-Control: los datos médicos nunca se guardan en cachés compartidas
+REVALIDAR = 'private, no-cache'
+REFERENCIA = 'private, max-age=60'
+
+def _code_generation():
+    """Cambia al modificar plantillas o código: una página guardada antes de un despliegue no se reutiliza"""
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ultima = 0
+    for carpeta in ('templates', 'controllers', 'models'):
+        for raiz, _, archivos in os.walk(os.path.join(base, carpeta)):
+            for archivo in archivos:
+                ultima = max(ultima, os.path.getmtime(os.path.join(raiz, archivo)))
+    return str(int(ultima))
+
+GENERACION = _code_generation()
+
+def compute_etag(namespaces):
+    """ETag de la petición actual a partir de las versiones de datos; None si no se pudo obtener alguna"""
+    versiones = []
+    for namespace in namespaces:
+        version = cache_datos.version(namespace)
+        if version is None:
+            return None
+        versiones.append(f"{namespace}={version}")
+
+    # Las páginas llevan el token CSRF de la sesión, que vence a las WTF_CSRF_TIME_LIMIT segundos:
+    # se renueva la ETag a la mitad de ese tiempo para no devolver un formulario con el token vencido
+    vigencia = max(60, int(current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600) // 2)
+    partes = [GENERACION, getattr(cache_datos.backend, 'instancia', ''), request.endpoint, request.full_path,
+              str(session.get('user_id')), str(session.get('user_privilege', 0)), str(int(time.time() // vigencia))]
+    return hashlib.sha1('|'.join(partes + versiones).encode('utf-8')).hexdigest()
+
+def conditional(namespaces, cache_control=REVALIDAR):
+    """Decorador para vistas de solo lectura: responde 304 si el cliente ya tiene la versión vigente.
+
+    `namespaces` es la lista de espacios de nombres de cache_datos de los que depende la
+    respuesta, o una función que la calcula con los mismos argumentos de la vista. La
+    vista solo se ejecuta (y solo se conecta a la base de datos) cuando algo cambió.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Con mensajes pendientes la página es distinta a la guardada por el cliente
+            if '_flashes' in session:
+                return f(*args, **kwargs)
+
+            etag = compute_etag(namespaces(*args, **kwargs) if callable(namespaces) else namespaces)
+            if etag and request.if_none_match.contains_weak(etag):
+                respuesta = Response(status=304)
+                respuesta.set_etag(etag, weak=True)
+                respuesta.headers['Cache-Control'] = cache_control
+                return respuesta
+
+            respuesta = make_response(f(*args, **kwargs))
+            if etag and respuesta.status_code == 200:
+                respuesta.set_etag(etag, weak=True)
+                respuesta.headers['Cache-Control'] = cache_control
+            return respuesta
+        return decorated_function
+    return decorator
@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from models import Cita, Paciente, Medico, db
+from models import Cita, db
 from controllers.auth_controller import login_required
 from datetime import datetime
 
@@ -11,17 +11,14 @@ def citas():
     """Página principal de citas"""
     if not db.connect():
         flash('Error de conexión a la base de datos', 'error')
-        return render_template('citas.html', citas=[], pacientes=[], medicos=[])
+        return render_template('citas.html', citas=[])
     
     try:
-        # Obtener todas las citas
-        citas = Cita.get_all()
+        # Obtener la página solicitada de citas
+        citas, next_cursor = Cita.get_page(request.args.get('cursor'), request.args.get('limit'))
         
-        # Obtener pacientes y médicos para los formularios
-        pacientes = Paciente.get_all()
-        medicos = Medico.get_all()
-        
-        return render_template('citas.html', citas=citas, pacientes=pacientes, medicos=medicos)
+        # Pacientes y médicos se buscan desde el formulario (/api/*/sugerencias)
+        return render_template('citas.html', citas=citas, next_cursor=next_cursor)
     
     except Exception as e:
         print(f"ERROR EN CITAS: {str(e)}")
@@ -29,7 +26,7 @@ def citas():
         import traceback
         traceback.print_exc()
         flash(f'Error al cargar los datos: {str(e)}', 'error')
-        return render_template('citas.html', citas=[], pacientes=[], medicos=[])
+        return render_template('citas.html', citas=[])
     
     finally:
         db.disconnect()
@@ -100,6 +97,11 @@ def nueva_cita():
                 flash('Error de conexión a la base de datos', 'error')
                 return redirect(url_for('cita.nueva_cita'))
             
+            # Verificar que el médico no tenga otra cita en ese horario
+            if Cita.check_doctor_availability(medico_id, fecha, hora):
+                flash('El médico ya tiene una cita programada en esa fecha y hora', 'error')
+                return redirect(url_for('cita.nueva_cita'))
+            
             # Crear la cita
             success = Cita.create(
                 paciente_id=int(paciente_id),
@@ -112,6 +114,10 @@ def nueva_cita():
             if success:
                 flash('Cita creada exitosamente', 'success')
                 return redirect(url_for('cita.citas'))
+            elif Cita.check_doctor_availability(medico_id, fecha, hora):
+                # Otra petición reservó el mismo horario al mismo tiempo
+                flash('El médico ya tiene una cita programada en esa fecha y hora', 'error')
+                return redirect(url_for('cita.nueva_cita'))
             else:
                 flash('Error al crear la cita', 'error')
                 return redirect(url_for('cita.nueva_cita'))
@@ -126,13 +132,11 @@ def nueva_cita():
     # GET request - mostrar formulario
     if not db.connect():
         flash('Error de conexión a la base de datos', 'error')
-        return render_template('citas.html', citas=[], pacientes=[], medicos=[])
+        return render_template('citas.html', citas=[])
     
     try:
         citas = Cita.get_upcoming_appointments()
-        pacientes = Paciente.get_all()
-        medicos = Medico.get_all()
-        return render_template('citas.html', citas=citas, pacientes=pacientes, medicos=medicos)
+        return render_template('citas.html', citas=citas)
     
     except Exception as e:
         print(f"ERROR EN NUEVA_CITA: {str(e)}")
@@ -140,7 +144,7 @@ def nueva_cita():
         import traceback
         traceback.print_exc()
         flash(f'Error al cargar los datos: {str(e)}', 'error')
-        return render_template('citas.html', citas=[], pacientes=[], medicos=[])
+        return render_template('citas.html', citas=[])
     
     finally:
         db.disconnect()
@@ -157,7 +161,6 @@ def editar_cita(cita_id):
             fecha = request.form.get('fecha')
             hora = request.form.get('hora')
             motivo = request.form.get('motivo', '').strip()
-            estado = request.form.get('estado', 'programada')
             
             # Validaciones del servidor
             errores = {}
@@ -212,20 +215,27 @@ def editar_cita(cita_id):
                 flash('Error de conexión a la base de datos', 'error')
                 return redirect(url_for('cita.editar_cita', cita_id=cita_id))
             
+            # Verificar que el médico no tenga otra cita en ese horario
+            if Cita.check_doctor_availability(medico_id, fecha, hora, cita_id):
+                flash('El médico ya tiene una cita programada en esa fecha y hora', 'error')
+                return redirect(url_for('cita.editar_cita', cita_id=cita_id))
+            
             # Actualizar la cita
-            fecha_hora = f"{fecha} {hora}"
             success = Cita.update(
                 cita_id=cita_id,
                 paciente_id=int(paciente_id),
                 medico_id=int(medico_id),
-                fecha_hora=fecha_hora,
-                motivo=motivo,
-                estado=estado
+                fecha=fecha,
+                hora=hora,
+                motivo=motivo
             )
             
             if success:
                 flash('Cita actualizada exitosamente', 'success')
                 return redirect(url_for('cita.citas'))
+            elif Cita.check_doctor_availability(medico_id, fecha, hora, cita_id):
+                flash('El médico ya tiene una cita programada en esa fecha y hora', 'error')
+                return redirect(url_for('cita.editar_cita', cita_id=cita_id))
             else:
                 flash('Error al actualizar la cita', 'error')
                 return redirect(url_for('cita.editar_cita', cita_id=cita_id))
@@ -249,13 +259,9 @@ def editar_cita(cita_id):
             return redirect(url_for('cita.citas'))
         
         citas = Cita.get_upcoming_appointments()
-        pacientes = Paciente.get_all()
-        medicos = Medico.get_all()
         
         return render_template('citas.html', 
                              citas=citas,
-                             pacientes=pacientes, 
-                             medicos=medicos,
                              modo_edicion=True,
                              form_data=cita)
     
@@ -290,6 +296,48 @@ def eliminar_cita(cita_id):
     
     return redirect(url_for('cita.citas'))
 
+@cita_bp.route('/api/citas')
+@login_required
+def api_citas():
+    """API para obtener citas paginadas"""
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        citas, next_cursor = Cita.get_page(request.args.get('cursor'), request.args.get('limit'))
+        return jsonify({'citas': citas, 'next_cursor': next_cursor})
+    
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener las citas'}), 500
+    
+    finally:
+        db.disconnect()
+
+@cita_bp.route('/api/disponibilidad_medico/<int:medico_id>')
+@login_required
+def api_disponibilidad_medico(medico_id):
+    """API para obtener los horarios libres de un médico (por defecto, los próximos 7 días)"""
+    try:
+        fecha_inicio = datetime.strptime(request.args.get('fecha', ''), '%Y-%m-%d').date()
+    except ValueError:
+        fecha_inicio = datetime.now().date()
+    dias = max(1, min(request.args.get('dias', 7, type=int), 31))
+    
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        horarios = Cita.get_free_slots(medico_id, fecha_inicio, dias)
+        if horarios is None:
+            return jsonify({'error': 'Error al obtener la disponibilidad'}), 500
+        return jsonify({'id_medico': medico_id, 'horarios_libres': horarios})
+    
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener la disponibilidad'}), 500
+    
+    finally:
+        db.disconnect()
+
 @cita_bp.route('/api/citas_paciente/<int:paciente_id>')
 @login_required
 def api_citas_paciente(paciente_id):
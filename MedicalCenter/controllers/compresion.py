@@ -0,0 +1,102 @@
+from flask import request, current_app
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tipos que vale la pena comprimir; PDF, ZIP e imágenes ya vienen comprimidos
+TIPOS_COMPRIMIBLES = {'text/html', 'text/plain', 'text/csv', 'text/css', 'text/javascript',
+                      'application/json', 'application/javascript', 'application/xml'}
+
+def sin_compresion(f):
+    """Decorador para rutas cuya respuesta nunca se comprime (p. ej. descargas de PDF)"""
+    f.sin_compresion = True
+    return f
+
+def _compressor(encoding, nivel):
+    """Funciones (process, flush, finish) para la codificación elegida"""
+    if encoding == 'br':
+        compresor = brotli.Compressor(quality=nivel['br'])
+        return compresor.process, compresor.flush, compresor.finish
+    # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib puro
+    compresor = zlib.compressobj(nivel['gzip'], zlib.DEFLATED, 31)
+    return compresor.compress, lambda: compresor.flush(zlib.Z_SYNC_FLUSH), compresor.flush
+
+def _compress_stream(iterable, encoding, nivel):
+    """Comprime un generador pedazo por pedazo; cada pedazo se envía sin esperar al siguiente"""
+    process, flush, finish = _compressor(encoding, nivel)
+    try:
+        for pedazo in iterable:
+            if isinstance(pedazo, str):
+                pedazo = pedazo.encode('utf-8')
+            datos = process(pedazo) + flush()
+            if datos:
+                yield datos
+        yield finish()
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close:
+            close()
+
+def choose_encoding():
+    """'br' o 'gzip' según lo que acepte el navegador; None si no acepta ninguna"""
+    aceptadas = request.accept_encodings
+    if brotli and aceptadas['br']:
+        return 'br'
+    if aceptadas['gzip']:
+        return 'gzip'
+    return None
+
+def _skip(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return True
+    if 'Content-Encoding' in response.headers or response.mimetype not in TIPOS_COMPRIMIBLES:
+        return True
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return True
+    # Archivos enviados con send_file: se leen directamente del disco (los CSS/JS ya vienen de static/dist)
+    if response.direct_passthrough:
+        return True
+    vista = current_app.view_functions.get(request.endpoint)
+    return getattr(vista, 'sin_compresion', False)
+
+def compress_response(response):
+    """after_request: comprime HTML, JSON y texto si el navegador lo acepta y vale la pena"""
+    if _skip(response):
+        return response
+    # La respuesta depende de Accept-Encoding aunque esta vez no se comprima
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding()
+    if not encoding:
+        return response
+    nivel = {'gzip': current_app.config.get('COMPRESION_NIVEL_GZIP', 6),
+             'br': current_app.config.get('COMPRESION_NIVEL_BROTLI', 5)}
+
+    if response.is_streamed:
+        # El tamaño final no se conoce: los generadores (exportaciones) se comprimen siempre
+        response.response = _compress_stream(response.response, encoding, nivel)
+        response.headers.pop('Content-Length', None)
+    else:
+        datos = response.get_data()
+        if len(datos) < current_app.config.get('COMPRESION_MIN_BYTES', 1024):
+            return response
+        process, _, finish = _compressor(encoding, nivel)
+        comprimido = process(datos) + finish()
+        if len(comprimido) >= len(datos):
+            return response
+        response.set_data(comprimido)
+
+    response.headers['Content-Encoding'] = encoding
+    # Una ETag fuerte identifica bytes exactos: al comprimir pasa a ser débil (mismo contenido, otra codificación)
+    etag, debil = response.get_etag()
+    if etag and not debil:
+        response.set_etag(etag, weak=True)
+    return response
+
+def configure_compression(app):
+    """Registra la compresión de respuestas si está activada con COMPRESION"""
+    if app.config.get('COMPRESION'):
+        app.after_request(compress_response)
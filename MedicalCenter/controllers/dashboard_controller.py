@@ -0,0 +1,83 @@
+from flask import Blueprint, render_template, request, flash, jsonify
+import click
+from models import db
+from models.estadisticas import Estadisticas
+from controllers.auth_controller import login_required
+from datetime import datetime
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+def _date_range():
+    """Lee fecha_inicio y fecha_fin (AAAA-MM-DD) de la petición; usa el rango por defecto si faltan"""
+    fecha_inicio, fecha_fin = Estadisticas.default_range()
+    try:
+        if request.args.get('fecha_inicio'):
+            fecha_inicio = datetime.strptime(request.args['fecha_inicio'], '%Y-%m-%d').date()
+        if request.args.get('fecha_fin'):
+            fecha_fin = datetime.strptime(request.args['fecha_fin'], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+    if fecha_inicio > fecha_fin:
+        return None
+    return fecha_inicio, fecha_fin
+
+@dashboard_bp.route('/dashboard')
+@login_required
+def dashboard():
+    """Tablero con citas por día y por médico, cancelaciones y exploraciones por especialidad"""
+    rango = _date_range()
+    if rango is None:
+        flash('Rango de fechas inválido', 'error')
+        rango = Estadisticas.default_range()
+    
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return render_template('dashboard.html', tablero=None)
+    
+    try:
+        return render_template('dashboard.html', tablero=Estadisticas.get_dashboard(*rango))
+    
+    except Exception as e:
+        print(f"Error al cargar el tablero: {e}")
+        flash('Error al cargar el tablero', 'error')
+        return render_template('dashboard.html', tablero=None)
+    
+    finally:
+        db.disconnect()
+
+@dashboard_bp.route('/api/dashboard')
+@login_required
+def api_dashboard():
+    """API con los datos del tablero"""
+    rango = _date_range()
+    if rango is None:
+        return jsonify({'error': 'Rango de fechas inválido'}), 400
+    
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        return jsonify(Estadisticas.get_dashboard(*rango))
+    
+    except Exception as e:
+        print(f"Error al cargar el tablero: {e}")
+        return jsonify({'error': 'Error al obtener las estadísticas'}), 500
+    
+    finally:
+        db.disconnect()
+
+@dashboard_bp.cli.command('reconstruir')
+def reconstruir_cli():
+    """Recalcula los agregados diarios de citas y exploraciones: flask dashboard reconstruir"""
+    if not db.connect():
+        raise click.ClickException('Error de conexión a la base de datos')
+    
+    try:
+        resultado = Estadisticas.rebuild()
+    finally:
+        db.disconnect()
+    
+    if resultado is None:
+        raise click.ClickException('No se pudieron reconstruir las estadísticas')
+    click.echo(f"Filas de citas: {resultado[0]}")
+    click.echo(f"Filas de exploraciones: {resultado[1]}")
@@ -0,0 +1,59 @@
+from flask import Blueprint
+import click
+from models import db
+from models.migraciones import migrador
+from models.planes_consulta import check_query_plans
+from mysql.connector import Error
+
+# Solo comandos de consola: flask esquema ...
+esquema_bp = Blueprint('esquema', __name__)
+
+@esquema_bp.cli.command('estado')
+def estado_cli():
+    """Muestra las migraciones y cuáles están aplicadas"""
+    if not db.connect():
+        raise click.ClickException('Error de conexión a la base de datos')
+    
+    try:
+        for migracion, aplicada in migrador.status():
+            click.echo(f"{'[x]' if aplicada else '[ ]'} {migracion.version:04d} {migracion.nombre}")
+    finally:
+        db.disconnect()
+
+@esquema_bp.cli.command('migrar')
+@click.option('--version', 'objetivo', type=int, default=None,
+              help='Versión destino; menor a la actual revierte (por defecto la última)')
+def migrar_cli(objetivo):
+    """Aplica o revierte migraciones hasta la versión indicada"""
+    if not db.connect():
+        raise click.ClickException('Error de conexión a la base de datos')
+    
+    try:
+        pasos = migrador.migrate(objetivo)
+        for accion, migracion in pasos:
+            click.echo(f"{accion}: {migracion.version:04d} {migracion.nombre}")
+        click.echo(f"Versión actual: {migrador.current_version()}")
+    except (Error, ValueError) as e:
+        raise click.ClickException(f"Error al migrar: {e}")
+    finally:
+        db.disconnect()
+
+@esquema_bp.cli.command('verificar_indices')
+def verificar_indices_cli():
+    """Verifica con EXPLAIN que las consultas frecuentes sigan usando sus índices"""
+    if not db.connect():
+        raise click.ClickException('Error de conexión a la base de datos')
+    
+    try:
+        resultados = check_query_plans()
+    finally:
+        db.disconnect()
+    
+    fallas = 0
+    for nombre, problemas in resultados.items():
+        click.echo(f"{'OK   ' if not problemas else 'FALLA'} {nombre}")
+        for problema in problemas:
+            click.echo(f"      {problema}")
+        fallas += bool(problemas)
+    if fallas:
+        raise click.ClickException(f"{fallas} consultas frecuentes no usan su índice")
@@ -16,12 +16,14 @@ def expedientes():
         # Obtener término de búsqueda si existe
         search_term = request.args.get('search', '').strip()
         
+        next_cursor = None
         if search_term:
             expedientes = Expediente.search(search_term)
         else:
-            expedientes = Expediente.get_all()
+            expedientes, next_cursor = Expediente.get_page(request.args.get('cursor'), request.args.get('limit'))
         
-        return render_template('expedientes.html', expedientes=expedientes, search_term=search_term)
+        return render_template('expedientes.html', expedientes=expedientes, search_term=search_term,
+                               next_cursor=next_cursor)
     
     except Exception as e:
         flash('Error al cargar los expedientes', 'error')
@@ -239,6 +241,23 @@ def ver_expediente(expediente_id):
     finally:
         db.disconnect()
 
+@expediente_bp.route('/api/expedientes')
+@login_required
+def api_expedientes():
+    """API para obtener expedientes paginados"""
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        expedientes, next_cursor = Expediente.get_page(request.args.get('cursor'), request.args.get('limit'))
+        return jsonify({'expedientes': expedientes, 'next_cursor': next_cursor})
+    
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener los expedientes'}), 500
+    
+    finally:
+        db.disconnect()
+
 @expediente_bp.route('/api/expedientes_paciente/<int:paciente_id>')
 @login_required
 def api_expedientes_paciente(paciente_id):
@@ -1,119 +1,127 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, send_file
-from models import Exploracion, Paciente, Medico
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, send_file, current_app, Response
+from models import Exploracion, db
+from models.cola_reportes import cola_reportes
+from models.reportes_lote import exportador_reportes
+from models.signos_vitales import SignosVitales, VITALES
+from models.estadisticas import Estadisticas
+from models.cache_datos import cache_datos, entity_namespace
 from controllers.auth_controller import login_required
-import mysql.connector
+from controllers.cache_http import conditional
+from controllers.compresion import sin_compresion
+from datetime import date
 import tempfile
 import os
 
 exploracion_bp = Blueprint('exploracion', __name__)
 
+def pdf_response(contenido, download_name, etag=None):
+    """Respuesta de descarga para un PDF generado en memoria"""
+    respuesta = Response(contenido, mimetype='application/pdf')
+    respuesta.content_length = len(contenido)
+    respuesta.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    if etag:
+        respuesta.set_etag(etag)
+        respuesta.cache_control.no_cache = True
+    return respuesta
+
+def enviar_reporte(exploracion_id, download_name, exploracion=None, etag=None):
+    """Genera y envía el reporte médico (en memoria o desde la caché en disco); None si falla"""
+    if current_app.config.get('REPORTES_EN_MEMORIA'):
+        contenido = Exploracion.render_medical_report(exploracion_id, exploracion)
+        if contenido:
+            return pdf_response(contenido, download_name, etag)
+        return None
+    
+    pdf_path = Exploracion.generate_medical_report(exploracion_id, exploracion)
+    if pdf_path and os.path.exists(pdf_path):
+        return send_file(pdf_path, as_attachment=True, download_name=download_name, etag=etag or True, max_age=0)
+    return None
+
 @exploracion_bp.route('/exploraciones')
 @login_required
 def exploraciones():
     """Página principal de exploraciones"""
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return render_template('gestion_exploraciones.html', exploraciones=[])
+    
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='medicalcenter',
-            user='root',
-            password='admin',
-            buffered=True
-        )
-        cursor = connection.cursor(dictionary=True)
+        # Obtener la página solicitada de exploraciones (paginación por llave)
+        exploraciones, next_cursor = Exploracion.get_page(request.args.get('cursor'), request.args.get('limit'))
         
-        # Obtener todas las exploraciones
-        cursor.execute("""
-            SELECT e.id_exploracion, e.id_cita, e.fecha,
-                   CONCAT(p.nombres, ' ', p.apellidos) as nombre_paciente,
-                   CONCAT(m.primer_nombre, ' ', m.apellido_paterno) as nombre_medico
-            FROM exploracion e
-            JOIN cita c ON e.id_cita = c.id_cita
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN medicos m ON c.id_medico = m.id_medico
-            ORDER BY e.fecha DESC
-        """)
-        exploraciones = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
-        
-        return render_template('gestion_exploraciones.html', exploraciones=exploraciones)
+        return render_template('gestion_exploraciones.html', exploraciones=exploraciones,
+                               next_cursor=next_cursor)
     
     except Exception as e:
         flash('Error al cargar las exploraciones', 'error')
         return render_template('gestion_exploraciones.html', exploraciones=[])
+    
+    finally:
+        db.disconnect()
 
 @exploracion_bp.route('/exploracion/<int:cita_id>', methods=['GET'])
 def exploracion(cita_id):
     """Ruta principal para exploración - verifica si existe y redirige o muestra formulario"""
     print(f"DEBUG: Accediendo a exploracion con cita_id: {cita_id}")
     
-    # Primera conexión: verificar si existe exploración
-    try:
-        conn1 = mysql.connector.connect(
-            host='localhost',
-            database='medicalcenter',
-            user='root',
-            password='admin',
-            buffered=True
-        )
-        cursor1 = conn1.cursor(dictionary=True)
-        cursor1.execute("SELECT id_exploracion FROM exploracion WHERE id_cita = %s", (cita_id,))
-        exploracion_existente = cursor1.fetchone()
-        cursor1.close()
-        conn1.close()
-        print(f"DEBUG: Exploración existente: {exploracion_existente}")
-        
-        if exploracion_existente:
-            print(f"DEBUG: Redirigiendo a editar_exploracion con id: {exploracion_existente['id_exploracion']}")
-            return redirect(url_for('exploracion.editar_exploracion', exploracion_id=exploracion_existente['id_exploracion']))
-    except Exception as e:
-        print(f"DEBUG: Error verificando exploración existente: {str(e)}")
-        flash('Error al verificar exploración', 'error')
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
         return redirect(url_for('cita.citas'))
     
-    # Segunda conexión: obtener datos de la cita
+    # Una sola conexión para toda la petición
     try:
-        conn2 = mysql.connector.connect(
-            host='localhost',
-            database='medicalcenter',
-            user='root',
-            password='admin',
-            buffered=True
-        )
-        cursor2 = conn2.cursor(dictionary=True)
-        cursor2.execute("""
-            SELECT C.id_cita, C.id_paciente, C.id_medico, 
-                   P.nombres AS nombres_paciente, P.apellidos AS apellidos_paciente, 
-                   P.fecha_nacimiento, 
-                   CONCAT(M.primer_nombre, ' ', M.apellido_paterno) AS nombre_medico
-            FROM cita C
-            JOIN pacientes P ON C.id_paciente = P.id_paciente
-            JOIN medicos M ON C.id_medico = M.id_medico
-            WHERE C.id_cita = %s
-        """, (cita_id,))
-        cita = cursor2.fetchone()
-        cursor2.close()
-        conn2.close()
+        cursor = db.get_cursor(dictionary=True)
         
-        if not cita:
-            print("DEBUG: Cita no encontrada")
-            flash('Cita no encontrada', 'error')
+        # Verificar si existe exploración
+        try:
+            cursor.execute("SELECT id_exploracion FROM exploracion WHERE id_cita = %s AND estatus = 1", (cita_id,))
+            exploracion_existente = cursor.fetchone()
+            print(f"DEBUG: Exploración existente: {exploracion_existente}")
+            
+            if exploracion_existente:
+                print(f"DEBUG: Redirigiendo a editar_exploracion con id: {exploracion_existente['id_exploracion']}")
+                return redirect(url_for('exploracion.editar_exploracion', exploracion_id=exploracion_existente['id_exploracion']))
+        except Exception as e:
+            print(f"DEBUG: Error verificando exploración existente: {str(e)}")
+            flash('Error al verificar exploración', 'error')
             return redirect(url_for('cita.citas'))
         
-        # Calcular edad del paciente
-        from datetime import datetime
-        fecha_nacimiento = cita['fecha_nacimiento']
-        hoy = datetime.now().date()
-        edad = hoy.year - fecha_nacimiento.year - ((hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day))
-        
-        print(f"DEBUG: Renderizando template con cita: {cita['nombres_paciente']} {cita['apellidos_paciente']}")
-        return render_template('exploracion.html', cita=cita, edad=edad, fecha_actual=hoy.strftime('%d/%m/%Y'))
-        
-    except Exception as e:
-        print(f"DEBUG: Error obteniendo datos de cita: {str(e)}")
-        flash('Error al procesar la solicitud', 'error')
-        return redirect(url_for('cita.citas'))
+        # Obtener datos de la cita
+        try:
+            cursor.execute("""
+                SELECT C.id_cita, C.id_paciente, C.id_medico, 
+                       P.nombres AS nombres_paciente, P.apellidos AS apellidos_paciente, 
+                       P.fecha_nacimiento, 
+                       CONCAT(M.primer_nombre, ' ', M.apellido_paterno) AS nombre_medico
+                FROM cita C
+                JOIN pacientes P ON C.id_paciente = P.id_paciente
+                JOIN medicos M ON C.id_medico = M.id_medico
+                WHERE C.id_cita = %s
+            """, (cita_id,))
+            cita = cursor.fetchone()
+            cursor.close()
+            
+            if not cita:
+                print("DEBUG: Cita no encontrada")
+                flash('Cita no encontrada', 'error')
+                return redirect(url_for('cita.citas'))
+            
+            # Calcular edad del paciente
+            from datetime import datetime
+            fecha_nacimiento = cita['fecha_nacimiento']
+            hoy = datetime.now().date()
+            edad = hoy.year - fecha_nacimiento.year - ((hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day))
+            
+            print(f"DEBUG: Renderizando template con cita: {cita['nombres_paciente']} {cita['apellidos_paciente']}")
+            return render_template('exploracion.html', cita=cita, edad=edad, fecha_actual=hoy.strftime('%d/%m/%Y'))
+            
+        except Exception as e:
+            print(f"DEBUG: Error obteniendo datos de cita: {str(e)}")
+            flash('Error al procesar la solicitud', 'error')
+            return redirect(url_for('cita.citas'))
+    
+    finally:
+        db.disconnect()
 
 @exploracion_bp.route('/nueva_exploracion', methods=['GET', 'POST'])
 @login_required
@@ -122,22 +130,24 @@ def nueva_exploracion():
     if request.method == 'POST':
         try:
             # Obtener datos del formulario
+            cita_id = request.form.get('cita_id')
             paciente_id = request.form.get('paciente_id')
             medico_id = request.form.get('medico_id')
             fecha_exploracion = request.form.get('fecha')
             peso = request.form.get('peso')
             altura = request.form.get('altura')
-            presion_arterial = request.form.get('presion_arterial', '').strip()
-            frecuencia_cardiaca = request.form.get('frecuencia_cardiaca')
             temperatura = request.form.get('temperatura')
+            latidos_minuto = request.form.get('latidos_minuto')
+            saturacion_oxigeno = request.form.get('saturacion_oxigeno')
+            glucosa = request.form.get('glucosa')
             sintomas = request.form.get('sintomas', '').strip()
             diagnostico = request.form.get('diagnostico', '').strip()
             tratamiento = request.form.get('tratamiento', '').strip()
-            observaciones = request.form.get('observaciones', '').strip()
+            estudios = request.form.get('estudios', '').strip()
             
-            # Validar campos requeridos
-            if not all([paciente_id, medico_id, fecha_exploracion]):
-                flash('Paciente, médico y fecha de exploración son requeridos', 'error')
+            # Validar campos requeridos (la exploración siempre pertenece a una cita)
+            if not all([cita_id, paciente_id, medico_id, fecha_exploracion]):
+                flash('Cita, paciente, médico y fecha de exploración son requeridos', 'error')
                 return redirect(url_for('exploracion.nueva_exploracion'))
             
             # Conectar a la base de datos
@@ -147,18 +157,20 @@ def nueva_exploracion():
             
             # Crear la exploración
             success = Exploracion.create(
+                cita_id=int(cita_id),
                 paciente_id=int(paciente_id),
                 medico_id=int(medico_id),
                 fecha_exploracion=fecha_exploracion,
                 peso=float(peso) if peso else None,
                 altura=float(altura) if altura else None,
-                presion_arterial=presion_arterial,
-                frecuencia_cardiaca=int(frecuencia_cardiaca) if frecuencia_cardiaca else None,
                 temperatura=float(temperatura) if temperatura else None,
+                latidos_minuto=int(latidos_minuto) if latidos_minuto else None,
+                saturacion_oxigeno=int(saturacion_oxigeno) if saturacion_oxigeno else None,
+                glucosa=float(glucosa) if glucosa else None,
                 sintomas=sintomas,
                 diagnostico=diagnostico,
                 tratamiento=tratamiento,
-                observaciones=observaciones
+                estudios=estudios
             )
             
             if success:
@@ -175,37 +187,26 @@ def nueva_exploracion():
         finally:
             db.disconnect()
     
-    # GET request - mostrar formulario
-    if not db.connect():
-        flash('Error de conexión a la base de datos', 'error')
-        return render_template('exploracion.html', pacientes=[], medicos=[])
-    
-    try:
-        pacientes = Paciente.get_all()
-        medicos = Medico.get_all()
-        return render_template('exploracion.html', pacientes=pacientes, medicos=medicos)
-    
-    except Exception as e:
-        flash('Error al cargar los datos', 'error')
-        return render_template('exploracion.html', pacientes=[], medicos=[])
-    
-    finally:
-        db.disconnect()
+    # GET request - mostrar formulario (paciente y médico se buscan desde el formulario)
+    return render_template('exploracion.html')
 
 @exploracion_bp.route('/editar_exploracion/<int:exploracion_id>', methods=['GET', 'POST'])
 def editar_exploracion(exploracion_id):
     """Editar una exploración existente"""
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+    
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='medicalcenter',
-            user='root',
-            password='admin',
-            buffered=True
-        )
-        cursor = connection.cursor(dictionary=True)
+        cursor = db.get_cursor(dictionary=True)
         
         if request.method == 'POST':
+            # Una exploración eliminada ya no se puede editar
+            if not Exploracion.is_active(exploracion_id):
+                cursor.close()
+                flash('Exploración no encontrada', 'error')
+                return redirect(url_for('exploracion.exploraciones'))
+            
             # Obtener datos del formulario
             datos = {
                 'peso': request.form.get('peso'),
@@ -226,7 +227,7 @@ def editar_exploracion(exploracion_id):
                     peso = %s, altura = %s, temperatura = %s, 
                     latidos_minuto = %s, saturacion_oxigeno = %s, glucosa = %s,
                     sintomas = %s, diagnostico = %s, tratamiento = %s, estudios = %s
-                WHERE id_exploracion = %s
+                WHERE id_exploracion = %s AND estatus = 1
             """, (
                 datos['peso'], datos['altura'], datos['temperatura'], 
                 datos['latidos_minuto'], datos['saturacion_oxigeno'], datos['glucosa'],
@@ -234,20 +235,26 @@ def editar_exploracion(exploracion_id):
                 datos['estudios'], exploracion_id
             ))
             
-            connection.commit()
+            db.commit()
             cursor.close()
-            connection.close()
+            SignosVitales.refresh_exploracion(exploracion_id)
+            cache_datos.invalidate('exploraciones')
+            cache_datos.invalidate(entity_namespace('exploracion', exploracion_id))
+            
+            # Generar el PDF en segundo plano si está habilitado
+            if current_app.config.get('REPORTES_ASINCRONOS'):
+                job_id = cola_reportes.submit(exploracion_id)
+                if job_id:
+                    flash('Exploración actualizada. El reporte PDF se está generando', 'info')
+                    return redirect(url_for('exploracion.ver_exploracion', exploracion_id=exploracion_id, reporte=job_id))
             
             # Generar y descargar PDF automáticamente
             try:
-                print(f"DEBUG: Intentando generar PDF para exploración {exploracion_id}")
-                pdf_path = Exploracion.generate_medical_report(exploracion_id)
-                print(f"DEBUG: PDF path generado: {pdf_path}")
-                if pdf_path and os.path.exists(pdf_path):
-                    print(f"DEBUG: PDF existe, enviando archivo: {pdf_path}")
-                    return send_file(pdf_path, as_attachment=True, download_name=f'exploracion_{exploracion_id}.pdf')
+                respuesta = enviar_reporte(exploracion_id, f'exploracion_{exploracion_id}.pdf')
+                if respuesta:
+                    return respuesta
                 else:
-                    print(f"DEBUG: PDF no existe o path es None: {pdf_path}")
+                    print(f"Error al generar PDF de la exploración {exploracion_id}")
                     flash('Exploración actualizada pero error al generar PDF', 'warning')
                     return redirect(url_for('exploracion.ver_exploracion', exploracion_id=exploracion_id))
             except Exception as e:
@@ -266,12 +273,10 @@ def editar_exploracion(exploracion_id):
             FROM exploracion E
             JOIN pacientes P ON E.id_paciente = P.id_paciente
             JOIN medicos M ON E.id_medico = M.id_medico
-            WHERE E.id_exploracion = %s
+            WHERE E.id_exploracion = %s AND E.estatus = 1
         """, (exploracion_id,))
         exploracion = cursor.fetchone()
-        
         cursor.close()
-        connection.close()
         
         if not exploracion:
             flash('Exploración no encontrada', 'error')
@@ -291,19 +296,19 @@ def editar_exploracion(exploracion_id):
         print(f"ERROR en editar_exploracion: {str(e)}")
         flash('Error al procesar la solicitud', 'error')
         return redirect(url_for('exploracion.exploraciones'))
+    
+    finally:
+        db.disconnect()
 
 @exploracion_bp.route('/crear_exploracion/<int:cita_id>', methods=['POST'])
 def crear_exploracion(cita_id):
     """Crear nueva exploración y generar PDF automáticamente"""
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return redirect(url_for('cita.citas'))
+    
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='medicalcenter',
-            user='root',
-            password='admin',
-            buffered=True
-        )
-        cursor = connection.cursor(dictionary=True)
+        cursor = db.get_cursor(dictionary=True)
         
         datos = {
             'peso': request.form.get('peso'),
@@ -323,41 +328,57 @@ def crear_exploracion(cita_id):
         if not cita:
             flash('Cita no encontrada', 'error')
             cursor.close()
-            connection.close()
             return redirect(url_for('cita.citas'))
 
         id_paciente, id_medico = cita['id_paciente'], cita['id_medico']
+        fecha_exploracion = date.today()
 
         cursor.execute("""
             INSERT INTO exploracion (
                 id_cita, id_paciente, id_medico, fecha,
                 peso, altura, temperatura, latidos_minuto, saturacion_oxigeno, glucosa,
                 sintomas, diagnostico, tratamiento, estudios, estatus
-            ) VALUES (%s, %s, %s, CURDATE(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 1)
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 1)
         """, (
-            cita_id, id_paciente, id_medico,
+            cita_id, id_paciente, id_medico, fecha_exploracion,
             datos['peso'], datos['altura'], datos['temperatura'], datos['latidos_minuto'],
             datos['saturacion_oxigeno'], datos['glucosa'], datos['sintomas'],
             datos['diagnostico'], datos['tratamiento'], datos['estudios']
         ))
 
-        connection.commit()
+        db.commit()
         id_exploracion = cursor.lastrowid
         cursor.close()
-        connection.close()
+        
+        # Sumar los signos vitales al resumen del paciente
+        SignosVitales.record_exploracion(id_exploracion, id_paciente, fecha_exploracion,
+                                         **{campo: datos[campo] or None for campo in VITALES})
+        Estadisticas.add_exploracion(fecha_exploracion, id_medico)
+        cache_datos.invalidate('exploraciones')
+
+        # Generar el PDF en segundo plano si está habilitado
+        if current_app.config.get('REPORTES_ASINCRONOS'):
+            job_id = cola_reportes.submit(id_exploracion)
+            if job_id:
+                flash('Exploración creada. El reporte PDF se está generando', 'info')
+                return redirect(url_for('exploracion.ver_exploracion', exploracion_id=id_exploracion, reporte=job_id))
 
         # Generar PDF automáticamente
-        pdf_path = Exploracion.generate_medical_report(id_exploracion)
-        if pdf_path and os.path.exists(pdf_path):
-            return send_file(pdf_path, as_attachment=True, download_name=f'reporte_exploracion_{id_exploracion}.pdf')
+        respuesta = enviar_reporte(id_exploracion, f'reporte_exploracion_{id_exploracion}.pdf')
+        if respuesta:
+            return respuesta
         else:
             flash('Exploración creada pero error al generar PDF', 'warning')
             return redirect(url_for('exploracion.exploraciones'))
             
     except Exception as e:
         print(f"Error al crear exploración: {str(e)}")
+        db.rollback()
         flash('Error al crear la exploración', 'error')
         return redirect(url_for('cita.citas'))
+    
+    finally:
+        db.disconnect()
 
 @exploracion_bp.route('/nueva_exploracion_desde_cita/<int:cita_id>', methods=['GET', 'POST'])
 def nueva_exploracion_desde_cita(cita_id):
@@ -378,13 +399,9 @@ def nueva_exploracion_desde_cita(cita_id):
             estudios_solicitados = request.form.get('estudios_solicitados', '').strip()
             
             # Conectar a la base de datos
-            connection = mysql.connector.connect(
-                host='localhost',
-                database='medicalcenter',
-                user='root',
-                password='admin',
-                buffered=True
-            )
+            if not db.connect():
+                flash('Error de conexión a la base de datos', 'error')
+                return redirect(url_for('exploracion.nueva_exploracion_desde_cita', cita_id=cita_id))
             
             # Crear la exploración usando el método create_from_cita
             exploracion_id = Exploracion.create_from_cita(
@@ -414,20 +431,11 @@ def nueva_exploracion_desde_cita(cita_id):
             return redirect(url_for('exploracion.nueva_exploracion_desde_cita', cita_id=cita_id))
         
         finally:
-            if 'connection' in locals():
-                connection.close()
+            db.disconnect()
     
     # GET request - mostrar formulario
     from models.cita import Cita
-    try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='medicalcenter',
-            user='root',
-            password='admin',
-            buffered=True
-        )
-    except Exception as e:
+    if not db.connect():
         flash('Error de conexión a la base de datos', 'error')
         return redirect(url_for('cita.citas'))
     
@@ -488,17 +496,15 @@ def eliminar_exploracion(exploracion_id):
 
 @exploracion_bp.route('/ver_exploracion/<int:exploracion_id>')
 @login_required
+@conditional(lambda exploracion_id: [entity_namespace('exploracion', exploracion_id), 'pacientes', 'medicos'])
 def ver_exploracion(exploracion_id):
     """Ver detalles de la exploración"""
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+    
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='medicalcenter',
-            user='root',
-            password='admin',
-            buffered=True
-        )
-        cursor = connection.cursor(dictionary=True)
+        cursor = db.get_cursor(dictionary=True)
         
         # Obtener datos de la exploración con información del paciente y médico
         cursor.execute("""
@@ -509,12 +515,10 @@ def ver_exploracion(exploracion_id):
             FROM exploracion E
             JOIN pacientes P ON E.id_paciente = P.id_paciente
             JOIN medicos M ON E.id_medico = M.id_medico
-            WHERE E.id_exploracion = %s
+            WHERE E.id_exploracion = %s AND E.estatus = 1
         """, (exploracion_id,))
         exploracion = cursor.fetchone()
-        
         cursor.close()
-        connection.close()
         
         if not exploracion:
             flash('Exploración no encontrada', 'error')
@@ -528,14 +532,19 @@ def ver_exploracion(exploracion_id):
         else:
             edad = 0
         
-        return render_template('ver_exploracion.html', exploracion=exploracion, edad=edad)
+        return render_template('ver_exploracion.html', exploracion=exploracion, edad=edad,
+                               reporte_job=request.args.get('reporte'))
     
     except Exception as e:
         print(f"ERROR en ver_exploracion: {str(e)}")
         flash('Error al cargar los datos de la exploración', 'error')
         return redirect(url_for('exploracion.exploraciones'))
+    
+    finally:
+        db.disconnect()
 
 @exploracion_bp.route('/generar_pdf/<int:exploracion_id>')
+@sin_compresion
 @login_required
 def generar_pdf(exploracion_id):
     """Generar PDF de la exploración"""
@@ -544,11 +553,22 @@ def generar_pdf(exploracion_id):
         return redirect(url_for('exploracion.exploraciones'))
     
     try:
-        # Generar el PDF
-        pdf_path = Exploracion.generate_medical_report(exploracion_id)
+        exploracion = Exploracion.get_by_id(exploracion_id)
+        if not exploracion:
+            flash('Exploración no encontrada', 'error')
+            return redirect(url_for('exploracion.exploraciones'))
+        
+        # Si el cliente ya tiene esta versión del reporte no se vuelve a enviar
+        version = Exploracion.report_version(exploracion)
+        if request.if_none_match.contains(version):
+            respuesta = current_app.response_class(status=304)
+            respuesta.set_etag(version)
+            return respuesta
         
-        if pdf_path and os.path.exists(pdf_path):
-            return send_file(pdf_path, as_attachment=True, download_name=f'exploracion_{exploracion_id}.pdf')
+        # Generar el PDF (en memoria o desde la caché en disco)
+        respuesta = enviar_reporte(exploracion_id, f'exploracion_{exploracion_id}.pdf', exploracion, version)
+        if respuesta:
+            return respuesta
         else:
             flash('Error al generar el PDF', 'error')
             return redirect(url_for('exploracion.exploraciones'))
@@ -560,6 +580,116 @@ def generar_pdf(exploracion_id):
     finally:
         db.disconnect()
 
+@exploracion_bp.route('/exportar_reportes')
+@sin_compresion
+@login_required
+def exportar_reportes():
+    """Exportar los reportes de varias exploraciones en un solo PDF o en un ZIP"""
+    fecha_inicio = request.args.get('fecha_inicio') or None
+    fecha_fin = request.args.get('fecha_fin') or None
+    medico_id = request.args.get('id_medico', type=int)
+    paciente_id = request.args.get('id_paciente', type=int)
+    formato = request.args.get('formato', 'pdf')
+    
+    if not (fecha_inicio or fecha_fin or medico_id or paciente_id):
+        flash('Indique un rango de fechas, un médico o un paciente para exportar', 'warning')
+        return redirect(url_for('exploracion.exploraciones'))
+    
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+    
+    try:
+        exploraciones = Exploracion.get_for_export(fecha_inicio, fecha_fin, medico_id, paciente_id)
+    except Exception as e:
+        print(f"Error al obtener exploraciones para exportar: {e}")
+        exploraciones = None
+    finally:
+        # Los PDF se generan sin usar la base de datos
+        db.disconnect()
+    
+    if exploraciones is None:
+        flash('Error al obtener las exploraciones', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+    if not exploraciones:
+        flash('No hay exploraciones con los filtros indicados', 'info')
+        return redirect(url_for('exploracion.exploraciones'))
+    
+    try:
+        if formato == 'zip':
+            respuesta = Response(exportador_reportes.zip_stream(exploraciones), mimetype='application/zip')
+            respuesta.headers.set('Content-Disposition', 'attachment', filename='reportes_exploraciones.zip')
+            return respuesta
+        
+        contenido = exportador_reportes.merged_pdf(exploraciones)
+        return pdf_response(contenido, 'reportes_exploraciones.pdf')
+    
+    except Exception as e:
+        print(f"Error al exportar reportes: {e}")
+        flash('Error al generar los reportes', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+
+@exploracion_bp.route('/api/reporte/<job_id>')
+@login_required
+def api_estado_reporte(job_id):
+    """API para consultar el estado de un reporte generado en segundo plano"""
+    job = cola_reportes.get_status(job_id)
+    if not job:
+        return jsonify({'error': 'Reporte no encontrado'}), 404
+    
+    respuesta = {
+        'id': job['id'],
+        'exploracion_id': job['exploracion_id'],
+        'estado': job['estado'],
+        'error': job['error']
+    }
+    if job['estado'] == 'listo':
+        respuesta['descarga_url'] = url_for('exploracion.descargar_reporte', job_id=job_id)
+    return jsonify(respuesta)
+
+@exploracion_bp.route('/descargar_reporte/<job_id>')
+@sin_compresion
+@login_required
+def descargar_reporte(job_id):
+    """Descargar un reporte generado en segundo plano"""
+    job = cola_reportes.get_status(job_id)
+    if not job or job['estado'] != 'listo' or not os.path.exists(job['ruta']):
+        flash('El reporte no está disponible', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+    
+    # El reporte pudo generarse antes de que la exploración se eliminara
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+    try:
+        activa = Exploracion.is_active(job['exploracion_id'])
+    except RuntimeError:
+        activa = False
+    finally:
+        db.disconnect()
+    if not activa:
+        flash('El reporte no está disponible', 'error')
+        return redirect(url_for('exploracion.exploraciones'))
+    
+    return send_file(job['ruta'], as_attachment=True, download_name=f"exploracion_{job['exploracion_id']}.pdf")
+
+@exploracion_bp.route('/api/exploraciones')
+@login_required
+def api_exploraciones():
+    """API para obtener exploraciones paginadas"""
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        exploraciones, next_cursor = Exploracion.get_page(request.args.get('cursor'), request.args.get('limit'))
+        return jsonify({'exploraciones': exploraciones, 'next_cursor': next_cursor})
+    
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener las exploraciones'}), 500
+    
+    finally:
+        db.disconnect()
+
 @exploracion_bp.route('/api/exploraciones_paciente/<int:paciente_id>')
 @login_required
 def api_exploraciones_paciente(paciente_id):
@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify, Response, abort
+from models.exportacion import EXPORTACIONES, FORMATOS, stream_export
+from controllers.auth_controller import login_required
+from mysql.connector import Error
+from datetime import datetime
+
+exportacion_bp = Blueprint('exportacion', __name__)
+
+def _fecha_param(nombre):
+    """Lee un parámetro de fecha AAAA-MM-DD; None si falta y ValueError si es inválido"""
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+@exportacion_bp.route('/exportar/<nombre>.<formato>')
+@login_required
+def exportar(nombre, formato):
+    """Exporta citas, pacientes o exploraciones en CSV o NDJSON, enviando el archivo por partes"""
+    if nombre not in EXPORTACIONES or formato not in FORMATOS:
+        abort(404)
+    
+    try:
+        fecha_inicio, fecha_fin = _fecha_param('fecha_inicio'), _fecha_param('fecha_fin')
+    except ValueError:
+        return jsonify({'error': 'Rango de fechas inválido'}), 400
+    if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+        return jsonify({'error': 'Rango de fechas inválido'}), 400
+    
+    filtros = {
+        'fecha_inicio': fecha_inicio,
+        'fecha_fin': fecha_fin,
+        'medico_id': request.args.get('id_medico', type=int),
+        'paciente_id': request.args.get('id_paciente', type=int)
+    }
+    
+    try:
+        contenido = stream_export(nombre, formato, **filtros)
+    except Error as e:
+        print(f"Error al exportar {nombre}: {e}")
+        return jsonify({'error': 'Error al consultar la base de datos'}), 500
+    
+    respuesta = Response(contenido, mimetype=FORMATOS[formato])
+    respuesta.headers.set('Content-Disposition', 'attachment', filename=f'{nombre}.{formato}')
+    return respuesta
@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 from models import Medico, db
 from models.cita import Cita
+from models.paginacion import normalize_page_size
+from models.busqueda import suggestion_page
 from controllers.auth_controller import login_required, admin_required
+from controllers.cache_http import conditional, REFERENCIA
+from models.cache_datos import entity_namespace
 
 medico_bp = Blueprint('medico', __name__)
 
@@ -21,9 +25,9 @@ def medicos():
                 else:
                     try:
                         # Verificar si el médico tiene citas asociadas
-                        citas_medico = Cita.get_by_doctor(int(medico_id))
+                        tiene_citas = Cita.doctor_has_citas(int(medico_id))
                         
-                        if citas_medico:
+                        if tiene_citas:
                             flash('No se puede eliminar el médico porque tiene citas asociadas. Primero debe cancelar o reasignar las citas.', 'error')
                         else:
                             success = Medico.delete(int(medico_id))
@@ -96,12 +100,14 @@ def medicos():
         # Obtener término de búsqueda si existe
         search_term = request.args.get('search', '').strip()
         
+        next_cursor = None
         if search_term:
             medicos = Medico.search(search_term)
         else:
-            medicos = Medico.get_all()
+            medicos, next_cursor = Medico.get_page(request.args.get('cursor'), request.args.get('limit'))
         
-        return render_template('medicos.html', medicos=medicos, search_term=search_term)
+        return render_template('medicos.html', medicos=medicos, search_term=search_term,
+                               next_cursor=next_cursor)
     
     except Exception as e:
         flash('Error al cargar los médicos', 'error')
@@ -329,9 +335,9 @@ def eliminar_medico(medico_id):
     
     try:
         # Verificar si el médico tiene citas asociadas
-        citas_medico = Cita.get_by_doctor(medico_id)
+        tiene_citas = Cita.doctor_has_citas(medico_id)
         
-        if citas_medico:
+        if tiene_citas:
             flash('No se puede eliminar el médico porque tiene citas asociadas. Primero debe cancelar o reasignar las citas.', 'error')
             return redirect(url_for('medico.medicos'))
         
@@ -352,6 +358,7 @@ def eliminar_medico(medico_id):
 
 @medico_bp.route('/ver_medico/<int:medico_id>')
 @login_required
+@conditional(lambda medico_id: [entity_namespace('medico', medico_id)])
 def ver_medico(medico_id):
     """Ver detalles del médico"""
     if not db.connect():
@@ -378,14 +385,15 @@ def ver_medico(medico_id):
 
 @medico_bp.route('/api/medicos')
 @login_required
+@conditional(['medicos'])
 def api_medicos():
-    """API para obtener lista de médicos"""
+    """API para obtener lista paginada de médicos"""
     if not db.connect():
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
     
     try:
-        medicos = Medico.get_all()
-        return jsonify({'medicos': medicos})
+        medicos, next_cursor = Medico.get_page(request.args.get('cursor'), request.args.get('limit'))
+        return jsonify({'medicos': medicos, 'next_cursor': next_cursor})
     
     except Exception as e:
         return jsonify({'error': 'Error al obtener los médicos'}), 500
@@ -395,6 +403,7 @@ def api_medicos():
 
 @medico_bp.route('/api/medicos_disponibles')
 @login_required
+@conditional(['medicos'], cache_control=REFERENCIA)
 def api_medicos_disponibles():
     """API para obtener médicos disponibles para citas"""
     if not db.connect():
@@ -423,11 +432,38 @@ def api_buscar_medicos():
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
     
     try:
-        medicos = Medico.search(search_term)
+        limit = normalize_page_size(request.args.get('limit', 20))
+        medicos = Medico.search(search_term, limit)
         return jsonify({'medicos': medicos})
     
     except Exception as e:
         return jsonify({'error': 'Error al buscar médicos'}), 500
     
     finally:
-        db.disconnect()
\ No newline at end of file
+        db.disconnect()
+
+@medico_bp.route('/api/medicos/sugerencias')
+@login_required
+def api_sugerencias_medicos():
+    """API para el campo de búsqueda de médicos: ?q=texto&limit=10&offset=0"""
+    search_term = request.args.get('q', '').strip()
+    
+    if not search_term:
+        return jsonify({'resultados': [], 'siguiente': None})
+    
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        medicos, siguiente = suggestion_page(Medico.search, search_term,
+                                             request.args.get('limit'), request.args.get('offset'))
+        # Solo lo necesario para mostrar la opción (el registro completo incluye la contraseña)
+        return jsonify({'resultados': [{'id': m.id_medico, 'texto': m.nombre_completo, 'detalle': m.especialidad or ''}
+                                       for m in medicos],
+                        'siguiente': siguiente})
+    
+    except Exception as e:
+        return jsonify({'error': 'Error al buscar médicos'}), 500
+    
+    finally:
+        db.disconnect()
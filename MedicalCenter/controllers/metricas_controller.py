@@ -0,0 +1,36 @@
+from flask import Blueprint, request, jsonify, abort, Response, current_app
+from models.metricas import metricas
+from models import cache_plantillas
+import hmac
+
+metricas_bp = Blueprint('metricas', __name__)
+
+def token_required():
+    """Rechaza con 404 las peticiones sin el token de METRICAS_TOKEN (o todas si no está configurado)"""
+    # No se confía en remote_addr: detrás de un proxy todas las peticiones parecen locales
+    token = current_app.config.get('METRICAS_TOKEN')
+    enviado = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(enviado.encode(), f"Bearer {token}".encode()):
+        abort(404)
+
+@metricas_bp.route('/metrics')
+def metrics():
+    """Métricas de consultas por endpoint en formato de texto de Prometheus"""
+    token_required()
+    return Response(metricas.render_prometheus() + cache_plantillas.render_prometheus(current_app.jinja_env),
+                    mimetype='text/plain; version=0.0.4')
+
+@metricas_bp.route('/metrics/consultas_lentas')
+def consultas_lentas():
+    """Muestras recientes de consultas lentas"""
+    token_required()
+    return jsonify({'consultas_lentas': metricas.slow_queries()})
+
+@metricas_bp.route('/metrics/plantillas')
+def plantillas():
+    """Aciertos y fallos de la caché de fragmentos y del bytecode de las plantillas"""
+    token_required()
+    bytecode = current_app.jinja_env.bytecode_cache
+    return jsonify({'fragmentos': cache_plantillas.fragmentos.stats(),
+                    'bytecode': {'aciertos': getattr(bytecode, 'aciertos', 0),
+                                 'fallos': getattr(bytecode, 'fallos', 0)}})
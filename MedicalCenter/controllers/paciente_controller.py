@@ -1,7 +1,15 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+import click
 from models import Paciente, db
 from models.cita import Cita
+from models.signos_vitales import SignosVitales, RANGOS, SERIES, MAX_COHORTE
+from models.resumen_paciente import ResumenPaciente, parse_campos, LIMITE_RESUMEN
+from models.importacion_pacientes import importar_pacientes as importar_filas, iter_file, COLUMNAS
+from models.paginacion import normalize_page_size
+from models.busqueda import suggestion_page
 from controllers.auth_controller import login_required
+from controllers.cache_http import conditional
+from models.cache_datos import patient_namespace
 
 paciente_bp = Blueprint('paciente', __name__)
 
@@ -21,9 +29,9 @@ def pacientes():
                 else:
                     try:
                         # Verificar si el paciente tiene citas asociadas
-                        citas_paciente = Cita.get_by_patient(int(paciente_id))
+                        tiene_citas = Cita.patient_has_citas(int(paciente_id))
                         
-                        if citas_paciente:
+                        if tiene_citas:
                             flash('No se puede eliminar el paciente porque tiene citas asociadas. Primero debe cancelar o reasignar las citas.', 'error')
                         else:
                             success = Paciente.delete(int(paciente_id))
@@ -93,42 +101,7 @@ def pacientes():
             alergias = request.form.get('alergias', '').strip()
             
             # Validaciones del servidor
-            errores = {}
-            
-            if not nombres:
-                errores['nombres'] = 'Los nombres son requeridos'
-            elif len(nombres) < 2:
-                errores['nombres'] = 'Los nombres deben tener al menos 2 caracteres'
-            elif not nombres.replace(' ', '').isalpha():
-                errores['nombres'] = 'Los nombres solo pueden contener letras'
-            
-            if not apellidos:
-                errores['apellidos'] = 'Los apellidos son requeridos'
-            elif len(apellidos) < 2:
-                errores['apellidos'] = 'Los apellidos deben tener al menos 2 caracteres'
-            elif not apellidos.replace(' ', '').isalpha():
-                errores['apellidos'] = 'Los apellidos solo pueden contener letras'
-            
-            if not fecha_nacimiento:
-                errores['fecha_nacimiento'] = 'La fecha de nacimiento es requerida'
-            else:
-                from datetime import datetime
-                try:
-                    fecha_nac = datetime.strptime(fecha_nacimiento, '%Y-%m-%d')
-                    if fecha_nac.date() > datetime.now().date():
-                        errores['fecha_nacimiento'] = 'La fecha de nacimiento no puede ser en el futuro'
-                except ValueError:
-                    errores['fecha_nacimiento'] = 'Formato de fecha inválido'
-            
-            if not genero:
-                errores['genero'] = 'El género es requerido'
-            elif genero not in ['Masculino', 'Femenino']:
-                errores['genero'] = 'El género debe ser Masculino o Femenino'
-            
-            if not tipo_sangre:
-                errores['tipo_sangre'] = 'El tipo de sangre es requerido'
-            elif tipo_sangre not in ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-', 'Desconocido']:
-                errores['tipo_sangre'] = 'Tipo de sangre inválido'
+            errores = Paciente.validate_form(nombres, apellidos, fecha_nacimiento, genero, tipo_sangre)
             
             if errores:
                 for campo, mensaje in errores.items():
@@ -169,13 +142,15 @@ def pacientes():
         # Obtener término de búsqueda si existe
         search_term = request.args.get('search', '').strip()
         
+        next_cursor = None
         if search_term:
             pacientes = Paciente.search(search_term)
         else:
-            pacientes = Paciente.get_all()
+            pacientes, next_cursor = Paciente.get_page(request.args.get('cursor'), request.args.get('limit'))
         
 
-        return render_template('pacientes.html', pacientes=pacientes, search_term=search_term)
+        return render_template('pacientes.html', pacientes=pacientes, search_term=search_term,
+                               next_cursor=next_cursor)
     
     except Exception as e:
         flash('Error al cargar los pacientes', 'error')
@@ -383,9 +358,9 @@ def eliminar_paciente(paciente_id):
     
     try:
         # Verificar si el paciente tiene citas asociadas
-        citas_paciente = Cita.get_by_patient(paciente_id)
+        tiene_citas = Cita.patient_has_citas(paciente_id)
         
-        if citas_paciente:
+        if tiene_citas:
             flash('No se puede eliminar el paciente porque tiene citas asociadas. Primero debe cancelar o reasignar las citas.', 'error')
             return redirect(url_for('paciente.pacientes'))
         
@@ -406,6 +381,7 @@ def eliminar_paciente(paciente_id):
 
 @paciente_bp.route('/ver_paciente/<int:paciente_id>')
 @login_required
+@conditional(lambda paciente_id: [patient_namespace(paciente_id), 'medicos'])
 def ver_paciente(paciente_id):
     """Ver detalles del paciente"""
     if not db.connect():
@@ -413,12 +389,16 @@ def ver_paciente(paciente_id):
         return redirect(url_for('paciente.pacientes'))
     
     try:
-        paciente = Paciente.get_by_id(paciente_id)
-        if not paciente:
+        # Datos, historial reciente, resumen y tendencias de signos en una sola lectura (o desde la caché)
+        resumen = ResumenPaciente.get(paciente_id)
+        if not resumen:
             flash('Paciente no encontrado', 'error')
             return redirect(url_for('paciente.pacientes'))
         
-        return render_template('ver_paciente.html', paciente=paciente)
+        return render_template('ver_paciente.html', paciente=resumen['paciente'], resumen=resumen,
+                               signos=resumen['tendencias'],
+                               resumen_signos=resumen['signos'],
+                               series=SERIES, rangos=RANGOS)
     
     except Exception as e:
         flash('Error al cargar los datos del paciente', 'error')
@@ -429,14 +409,15 @@ def ver_paciente(paciente_id):
 
 @paciente_bp.route('/api/pacientes')
 @login_required
+@conditional(['pacientes'])
 def api_pacientes():
-    """API para obtener lista de pacientes"""
+    """API para obtener lista paginada de pacientes"""
     if not db.connect():
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
     
     try:
-        pacientes = Paciente.get_all()
-        return jsonify({'pacientes': pacientes})
+        pacientes, next_cursor = Paciente.get_page(request.args.get('cursor'), request.args.get('limit'))
+        return jsonify({'pacientes': pacientes, 'next_cursor': next_cursor})
     
     except Exception as e:
         return jsonify({'error': 'Error al obtener los pacientes'}), 500
@@ -444,6 +425,91 @@ def api_pacientes():
     finally:
         db.disconnect()
 
+@paciente_bp.route('/api/pacientes/<int:paciente_id>/resumen')
+@login_required
+@conditional(lambda paciente_id: [patient_namespace(paciente_id), 'medicos'])
+def api_resumen_paciente(paciente_id):
+    """API con la vista completa de un paciente: ?campos=citas,exploraciones&limite=5"""
+    try:
+        campos = parse_campos(request.args.get('campos'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limite = request.args.get('limite', LIMITE_RESUMEN, type=int)
+    
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        resumen = ResumenPaciente.get(paciente_id, campos, limite)
+        if not resumen:
+            return jsonify({'error': 'Paciente no encontrado'}), 404
+        return jsonify(resumen)
+    
+    except Exception as e:
+        print(f"Error al obtener el resumen del paciente: {e}")
+        return jsonify({'error': 'Error al obtener el resumen del paciente'}), 500
+    
+    finally:
+        db.disconnect()
+
+@paciente_bp.route('/api/pacientes/<int:paciente_id>/signos_vitales')
+@login_required
+def api_signos_vitales(paciente_id):
+    """API con las tendencias y el resumen de los signos vitales de un paciente"""
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        # Misma entrada de caché por paciente que ver_paciente
+        resumen = ResumenPaciente.get(paciente_id, ('signos', 'tendencias'))
+        if not resumen:
+            return jsonify({'error': 'Paciente no encontrado'}), 404
+        return jsonify({'id_paciente': paciente_id, 'tendencias': resumen['tendencias'],
+                        'resumen': resumen['signos'], 'rangos': RANGOS})
+    
+    except Exception as e:
+        print(f"Error al analizar signos vitales: {e}")
+        return jsonify({'error': 'Error al obtener los signos vitales'}), 500
+    
+    finally:
+        db.disconnect()
+
+@paciente_bp.route('/api/signos_vitales')
+@login_required
+def api_signos_vitales_cohorte():
+    """API con las tendencias de un grupo de pacientes: ?pacientes=1,2,3"""
+    try:
+        paciente_ids = sorted({int(valor) for valor in request.args.get('pacientes', '').split(',') if valor.strip()})
+    except ValueError:
+        return jsonify({'error': 'Lista de pacientes inválida'}), 400
+    
+    if not paciente_ids:
+        return jsonify({'pacientes': {}})
+    if len(paciente_ids) > MAX_COHORTE:
+        return jsonify({'error': f'Máximo {MAX_COHORTE} pacientes por consulta'}), 400
+    
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        # Una sola consulta y un solo cálculo vectorizado para todo el grupo
+        serie = SignosVitales.load_series(paciente_ids)
+        if serie is None:
+            return jsonify({'error': 'Error al obtener los signos vitales'}), 500
+        tendencias = SignosVitales.trends(serie)
+        resumenes = SignosVitales.get_summaries(paciente_ids)
+        return jsonify({'pacientes': {
+            paciente_id: {'tendencias': tendencias.get(paciente_id), 'resumen': resumenes.get(paciente_id)}
+            for paciente_id in paciente_ids
+        }, 'rangos': RANGOS})
+    
+    except Exception as e:
+        print(f"Error al analizar signos vitales: {e}")
+        return jsonify({'error': 'Error al obtener los signos vitales'}), 500
+    
+    finally:
+        db.disconnect()
+
 @paciente_bp.route('/api/buscar_pacientes')
 @login_required
 def api_buscar_pacientes():
@@ -457,11 +523,110 @@ def api_buscar_pacientes():
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
     
     try:
-        pacientes = Paciente.search(search_term)
+        limit = normalize_page_size(request.args.get('limit', 20))
+        pacientes = Paciente.search(search_term, limit)
         return jsonify({'pacientes': pacientes})
     
     except Exception as e:
         return jsonify({'error': 'Error al buscar pacientes'}), 500
     
     finally:
-        db.disconnect()
\ No newline at end of file
+        db.disconnect()
+
+@paciente_bp.route('/api/pacientes/sugerencias')
+@login_required
+def api_sugerencias_pacientes():
+    """API para el campo de búsqueda de pacientes: ?q=texto&limit=10&offset=0"""
+    search_term = request.args.get('q', '').strip()
+    
+    if not search_term:
+        return jsonify({'resultados': [], 'siguiente': None})
+    
+    if not db.connect():
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    
+    try:
+        pacientes, siguiente = suggestion_page(Paciente.search, search_term,
+                                               request.args.get('limit'), request.args.get('offset'))
+        # Solo lo necesario para mostrar la opción; la fecha de nacimiento distingue homónimos
+        return jsonify({'resultados': [{'id': p.id_paciente, 'texto': p.nombre_completo,
+                                        'detalle': p.fecha_nacimiento.isoformat() if p.fecha_nacimiento else ''}
+                                       for p in pacientes],
+                        'siguiente': siguiente})
+    
+    except Exception as e:
+        return jsonify({'error': 'Error al buscar pacientes'}), 500
+    
+    finally:
+        db.disconnect()
+
+@paciente_bp.route('/importar_pacientes', methods=['GET', 'POST'])
+@login_required
+def importar_pacientes():
+    """Importación masiva de pacientes desde un archivo CSV o Excel"""
+    if request.method == 'GET':
+        return render_template('importar_pacientes.html', columnas=COLUMNAS, resultado=None)
+    
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        flash('Seleccione un archivo para importar', 'error')
+        return redirect(url_for('paciente.importar_pacientes'))
+    
+    if not db.connect():
+        flash('Error de conexión a la base de datos', 'error')
+        return redirect(url_for('paciente.importar_pacientes'))
+    
+    try:
+        # El archivo se lee por partes desde el stream de la petición
+        resultado = importar_filas(iter_file(archivo.stream, archivo.filename))
+        flash(f'Importación terminada: {resultado.insertadas} pacientes creados, '
+              f'{resultado.con_errores} filas con errores', 'success' if not resultado.con_errores else 'warning')
+        return render_template('importar_pacientes.html', columnas=COLUMNAS, resultado=resultado.to_dict())
+    
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f'No se pudo leer el archivo: {e}', 'error')
+        return redirect(url_for('paciente.importar_pacientes'))
+    
+    except Exception as e:
+        print(f"Error al importar pacientes: {e}")
+        flash('Error al procesar la importación', 'error')
+        return redirect(url_for('paciente.importar_pacientes'))
+    
+    finally:
+        db.disconnect()
+
+@paciente_bp.cli.command('importar')
+@click.argument('ruta', type=click.Path(exists=True, dir_okay=False))
+@click.option('--lote', default=1000, show_default=True, help='Filas por transacción')
+def importar_pacientes_cli(ruta, lote):
+    """Importa pacientes desde un archivo CSV o Excel: flask paciente importar archivo.csv"""
+    if not db.connect():
+        raise click.ClickException('Error de conexión a la base de datos')
+    
+    try:
+        with open(ruta, 'rb') as archivo:
+            resultado = importar_filas(iter_file(archivo, ruta), chunk_size=lote)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        db.disconnect()
+    
+    click.echo(f"Filas procesadas: {resultado.procesadas}")
+    click.echo(f"Pacientes creados: {resultado.insertadas}")
+    click.echo(f"Filas con errores: {resultado.con_errores}")
+    for error in resultado.errores:
+        click.echo(f"  Fila {error['fila']}: {'; '.join(error['errores'])}")
+
+@paciente_bp.cli.command('resumen_signos')
+@click.option('--lote', default=1000, show_default=True, help='Exploraciones leídas por bloque')
+def resumen_signos_cli(lote):
+    """Reconstruye el resumen de signos vitales de todos los pacientes: flask paciente resumen_signos"""
+    if not db.connect():
+        raise click.ClickException('Error de conexión a la base de datos')
+    
+    try:
+        pacientes = SignosVitales.rebuild(lote)
+    finally:
+        db.disconnect()
+    
+    click.echo(f"Resumen de signos vitales actualizado para {pacientes} pacientes")
@@ -41,7 +41,8 @@ CREATE TABLE pacientes (
   tipo_sangre      VARCHAR(5) COLLATE utf8mb4_general_ci NOT NULL,
   alergias         TEXT COLLATE utf8mb4_general_ci,
   estatus          TINYINT NOT NULL DEFAULT 1,
-  PRIMARY KEY (id_paciente)
+  PRIMARY KEY (id_paciente),
+  KEY idx_pacientes_estatus_nombre (estatus, nombres, apellidos)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- MEDICOS (de medicalcenter_medicos.sql)
@@ -63,6 +64,7 @@ CREATE TABLE medicos (
   PRIMARY KEY (id_medico),
   UNIQUE KEY cedula_profesional (cedula_profesional),
   KEY rfc (rfc),
+  KEY idx_medicos_estatus_nombre (estatus, primer_nombre, apellido_paterno),
   CONSTRAINT medicos_ibfk_1 FOREIGN KEY (rfc) REFERENCES usuarios (rfc)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
@@ -81,9 +83,16 @@ CREATE TABLE cita (
   motivo      VARCHAR(255) COLLATE utf8mb4_general_ci NOT NULL,
   estatus     VARCHAR(20)  COLLATE utf8mb4_general_ci NOT NULL DEFAULT 'activa',
   estado      TINYINT(1) NOT NULL DEFAULT 1,
+  -- 1 si la cita ocupa su horario, NULL si está cancelada (NULL no choca en el índice único)
+  slot_activo TINYINT AS (IF(estado = 1, 1, NULL)) STORED,
   PRIMARY KEY (id_cita),
   KEY id_paciente (id_paciente),
   KEY id_medico (id_medico),
+  KEY idx_cita_fecha_hora (fecha, hora),
+  KEY idx_cita_estado_fecha_hora (estado, fecha, hora),
+  -- Respaldo contra dos citas activas del mismo médico a la misma hora exacta;
+  -- los cruces de DURACION_CITA los impide Cita._write_slot (bloquea al médico con FOR UPDATE)
+  UNIQUE KEY uq_cita_medico_horario (id_medico, fecha, hora, slot_activo),
   CONSTRAINT cita_ibfk_1 FOREIGN KEY (id_paciente) REFERENCES pacientes (id_paciente),
   CONSTRAINT cita_ibfk_2 FOREIGN KEY (id_medico)   REFERENCES medicos (id_medico)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -111,6 +120,8 @@ CREATE TABLE exploracion (
   KEY id_cita (id_cita),
   KEY id_paciente (id_paciente),
   KEY id_medico (id_medico),
+  KEY idx_exploracion_fecha (fecha),
+  KEY idx_exploracion_paciente_fecha (id_paciente, estatus, fecha),
   CONSTRAINT exploracion_ibfk_1 FOREIGN KEY (id_cita)     REFERENCES cita (id_cita) ON DELETE CASCADE,
   CONSTRAINT exploracion_ibfk_2 FOREIGN KEY (id_paciente) REFERENCES pacientes (id_paciente),
   CONSTRAINT exploracion_ibfk_3 FOREIGN KEY (id_medico)   REFERENCES medicos (id_medico)
@@ -126,10 +137,87 @@ CREATE TABLE expedientes (
   deleted      TINYINT(1) DEFAULT 0,
   PRIMARY KEY (id),
   KEY paciente_id (paciente_id),
+  KEY idx_expedientes_deleted_fecha (deleted, fecha),
   CONSTRAINT expedientes_ibfk_1 FOREIGN KEY (paciente_id)
     REFERENCES pacientes (id_paciente) ON DELETE RESTRICT ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
+-- SCHEMA_VERSION (migraciones aplicadas; este script ya incluye todas las de migraciones/)
+DROP TABLE IF EXISTS schema_version;
+CREATE TABLE schema_version (
+  version   INT NOT NULL,
+  nombre    VARCHAR(100) COLLATE utf8mb4_general_ci NOT NULL,
+  aplicada  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (version)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- SECUENCIAS (contador por nombre y año, p. ej. números de expediente)
+DROP TABLE IF EXISTS secuencias;
+CREATE TABLE secuencias (
+  nombre  VARCHAR(40) COLLATE utf8mb4_general_ci NOT NULL,
+  anio    SMALLINT NOT NULL,
+  valor   INT NOT NULL DEFAULT 0 COMMENT 'último número entregado',
+  PRIMARY KEY (nombre, anio)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- RESUMEN DE SIGNOS VITALES (acumulados por paciente; los mantiene la aplicación,
+-- se reconstruye con: flask paciente resumen_signos)
+DROP TABLE IF EXISTS resumen_signos_vitales;
+CREATE TABLE resumen_signos_vitales (
+  id_paciente               INT NOT NULL,
+  total_exploraciones       INT NOT NULL DEFAULT 0,
+  primera_fecha             DATE DEFAULT NULL,
+  ultima_fecha              DATE DEFAULT NULL,
+  ultima_exploracion        INT DEFAULT NULL,
+  alertas                   INT NOT NULL DEFAULT 0 COMMENT 'valores fuera de rango en todo el historial',
+  ultimo_peso               DECIMAL(5,2)  DEFAULT NULL,
+  suma_peso                 DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_peso                    INT NOT NULL DEFAULT 0,
+  ultimo_altura             DECIMAL(5,2)  DEFAULT NULL,
+  suma_altura               DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_altura                  INT NOT NULL DEFAULT 0,
+  ultimo_temperatura        DECIMAL(4,2)  DEFAULT NULL,
+  suma_temperatura          DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_temperatura             INT NOT NULL DEFAULT 0,
+  ultimo_latidos_minuto     INT           DEFAULT NULL,
+  suma_latidos_minuto       DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_latidos_minuto          INT NOT NULL DEFAULT 0,
+  ultimo_saturacion_oxigeno TINYINT UNSIGNED DEFAULT NULL,
+  suma_saturacion_oxigeno   DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_saturacion_oxigeno      INT NOT NULL DEFAULT 0,
+  ultimo_glucosa            DECIMAL(6,2)  DEFAULT NULL,
+  suma_glucosa              DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_glucosa                 INT NOT NULL DEFAULT 0,
+  ultimo_imc                DECIMAL(5,2)  DEFAULT NULL,
+  suma_imc                  DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_imc                     INT NOT NULL DEFAULT 0,
+  actualizado               TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (id_paciente),
+  CONSTRAINT resumen_signos_vitales_ibfk_1 FOREIGN KEY (id_paciente) REFERENCES pacientes (id_paciente)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- RESUMEN DIARIO DE CITAS (citas por día, médico y estatus para el tablero;
+-- se reconstruye con: flask dashboard reconstruir)
+DROP TABLE IF EXISTS resumen_citas_diario;
+CREATE TABLE resumen_citas_diario (
+  fecha      DATE NOT NULL,
+  id_medico  INT NOT NULL,
+  estatus    VARCHAR(20) COLLATE utf8mb4_general_ci NOT NULL,
+  total      INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (fecha, id_medico, estatus),
+  KEY id_medico (id_medico)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- RESUMEN DIARIO DE EXPLORACIONES (exploraciones activas por día y médico)
+DROP TABLE IF EXISTS resumen_exploraciones_diario;
+CREATE TABLE resumen_exploraciones_diario (
+  fecha      DATE NOT NULL,
+  id_medico  INT NOT NULL,
+  total      INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (fecha, id_medico),
+  KEY id_medico (id_medico)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 -- =========================================================
 -- 4) Datos (según tus inserts originales)
 --    Ordenado para respetar FKs
@@ -200,6 +288,18 @@ INSERT INTO expedientes (id,paciente_id,diagnostico,fecha,deleted) VALUES
 (5,11,'contusion leve','2025-08-09 21:15:08',0),
 (6,3,'covid','2025-08-09 23:32:01',0);
 
+-- SCHEMA_VERSION: migraciones incluidas en este script
+INSERT INTO schema_version (version, nombre) VALUES
+(1,'esquema_aplicacion'),
+(2,'indices_consultas_frecuentes');
+
+-- RESÚMENES: calculados a partir de los datos anteriores
+INSERT INTO resumen_citas_diario (fecha, id_medico, estatus, total)
+SELECT fecha, id_medico, estatus, COUNT(*) FROM cita GROUP BY fecha, id_medico, estatus;
+
+INSERT INTO resumen_exploraciones_diario (fecha, id_medico, total)
+SELECT fecha, id_medico, COUNT(*) FROM exploracion WHERE estatus = 1 GROUP BY fecha, id_medico;
+
 -- =========================================================
 -- 5) Restaurar settings
 -- =========================================================
@@ -0,0 +1,80 @@
+-- Migración 0001: cambios de esquema de la aplicación sobre el script original
+-- (horario único por médico, secuencias y tablas de resumen)
+
+-- +up
+ALTER TABLE cita
+  ADD COLUMN slot_activo TINYINT AS (IF(estado = 1, 1, NULL)) STORED,
+  ADD UNIQUE KEY uq_cita_medico_horario (id_medico, fecha, hora, slot_activo);
+
+CREATE TABLE IF NOT EXISTS secuencias (
+  nombre  VARCHAR(40) COLLATE utf8mb4_general_ci NOT NULL,
+  anio    SMALLINT NOT NULL,
+  valor   INT NOT NULL DEFAULT 0 COMMENT 'último número entregado',
+  PRIMARY KEY (nombre, anio)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS resumen_signos_vitales (
+  id_paciente               INT NOT NULL,
+  total_exploraciones       INT NOT NULL DEFAULT 0,
+  primera_fecha             DATE DEFAULT NULL,
+  ultima_fecha              DATE DEFAULT NULL,
+  ultima_exploracion        INT DEFAULT NULL,
+  alertas                   INT NOT NULL DEFAULT 0 COMMENT 'valores fuera de rango en todo el historial',
+  ultimo_peso               DECIMAL(5,2)  DEFAULT NULL,
+  suma_peso                 DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_peso                    INT NOT NULL DEFAULT 0,
+  ultimo_altura             DECIMAL(5,2)  DEFAULT NULL,
+  suma_altura               DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_altura                  INT NOT NULL DEFAULT 0,
+  ultimo_temperatura        DECIMAL(4,2)  DEFAULT NULL,
+  suma_temperatura          DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_temperatura             INT NOT NULL DEFAULT 0,
+  ultimo_latidos_minuto     INT           DEFAULT NULL,
+  suma_latidos_minuto       DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_latidos_minuto          INT NOT NULL DEFAULT 0,
+  ultimo_saturacion_oxigeno TINYINT UNSIGNED DEFAULT NULL,
+  suma_saturacion_oxigeno   DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_saturacion_oxigeno      INT NOT NULL DEFAULT 0,
+  ultimo_glucosa            DECIMAL(6,2)  DEFAULT NULL,
+  suma_glucosa              DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_glucosa                 INT NOT NULL DEFAULT 0,
+  ultimo_imc                DECIMAL(5,2)  DEFAULT NULL,
+  suma_imc                  DECIMAL(12,2) NOT NULL DEFAULT 0,
+  n_imc                     INT NOT NULL DEFAULT 0,
+  actualizado               TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (id_paciente),
+  CONSTRAINT resumen_signos_vitales_ibfk_1 FOREIGN KEY (id_paciente) REFERENCES pacientes (id_paciente)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS resumen_citas_diario (
+  fecha      DATE NOT NULL,
+  id_medico  INT NOT NULL,
+  estatus    VARCHAR(20) COLLATE utf8mb4_general_ci NOT NULL,
+  total      INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (fecha, id_medico, estatus),
+  KEY id_medico (id_medico)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS resumen_exploraciones_diario (
+  fecha      DATE NOT NULL,
+  id_medico  INT NOT NULL,
+  total      INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (fecha, id_medico),
+  KEY id_medico (id_medico)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO resumen_citas_diario (fecha, id_medico, estatus, total)
+SELECT fecha, id_medico, estatus, COUNT(*) FROM cita GROUP BY fecha, id_medico, estatus;
+
+INSERT INTO resumen_exploraciones_diario (fecha, id_medico, total)
+SELECT fecha, id_medico, COUNT(*) FROM exploracion WHERE estatus = 1 GROUP BY fecha, id_medico;
+
+-- +down
+DROP TABLE IF EXISTS resumen_exploraciones_diario;
+DROP TABLE IF EXISTS resumen_citas_diario;
+DROP TABLE IF EXISTS resumen_signos_vitales;
+DROP TABLE IF EXISTS secuencias;
+
+ALTER TABLE cita
+  DROP INDEX uq_cita_medico_horario,
+  DROP COLUMN slot_activo;
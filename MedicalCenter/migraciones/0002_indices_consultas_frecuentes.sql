@@ -0,0 +1,33 @@
+-- Migración 0002: índices compuestos para las consultas frecuentes
+-- (evitan el filesort de los listados ordenados y el recorrido completo de las tablas)
+
+-- +up
+-- Cita.get_all / get_page: ORDER BY fecha DESC, hora DESC, id_cita DESC
+ALTER TABLE cita ADD KEY idx_cita_fecha_hora (fecha, hora);
+
+-- Cita.get_upcoming_appointments: WHERE estado = 1 AND fecha >= CURDATE() ORDER BY fecha, hora
+ALTER TABLE cita ADD KEY idx_cita_estado_fecha_hora (estado, fecha, hora);
+
+-- Paciente.get_all / get_page: WHERE estatus = 1 ORDER BY nombres, apellidos, id_paciente
+ALTER TABLE pacientes ADD KEY idx_pacientes_estatus_nombre (estatus, nombres, apellidos);
+
+-- Medico.get_all: WHERE estatus = 1 ORDER BY primer_nombre, apellido_paterno
+ALTER TABLE medicos ADD KEY idx_medicos_estatus_nombre (estatus, primer_nombre, apellido_paterno);
+
+-- Expediente.get_all / get_page: WHERE deleted = 0 ORDER BY fecha DESC, id DESC
+ALTER TABLE expedientes ADD KEY idx_expedientes_deleted_fecha (deleted, fecha);
+
+-- Listado de exploraciones: ORDER BY fecha DESC, id_exploracion DESC
+ALTER TABLE exploracion ADD KEY idx_exploracion_fecha (fecha);
+
+-- Signos vitales: WHERE id_paciente IN (...) AND estatus = 1 ORDER BY id_paciente, fecha
+ALTER TABLE exploracion ADD KEY idx_exploracion_paciente_fecha (id_paciente, estatus, fecha);
+
+-- +down
+ALTER TABLE exploracion DROP INDEX idx_exploracion_paciente_fecha;
+ALTER TABLE exploracion DROP INDEX idx_exploracion_fecha;
+ALTER TABLE expedientes DROP INDEX idx_expedientes_deleted_fecha;
+ALTER TABLE medicos DROP INDEX idx_medicos_estatus_nombre;
+ALTER TABLE pacientes DROP INDEX idx_pacientes_estatus_nombre;
+ALTER TABLE cita DROP INDEX idx_cita_estado_fecha_hora;
+ALTER TABLE cita DROP INDEX idx_cita_fecha_hora;
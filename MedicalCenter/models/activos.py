@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+# Carpeta con los archivos generados por `flask activos construir`
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST = 'manifest.json'
+
+# Carpetas de static/ que se procesan
+CARPETAS = ('css', 'js')
+
+# Archivos que una misma página carga juntos: se sirven como uno solo
+BUNDLES = {
+    'bundles/ver_exploracion.css': ('css/citas.css', 'css/ver_exploracion.css'),
+}
+
+# Variantes precomprimidas que se generan: (extensión, Content-Encoding)
+COMPRESIONES = (('.br', 'br'), ('.gz', 'gzip'))
+
+_CADENA_O_COMENTARIO = re.compile(r'("(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')|/\*.*?\*/', re.S)
+_CADENA = re.compile(r'("(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')')
+
+def _compact_css(codigo):
+    codigo = re.sub(r'\s+', ' ', codigo)
+    codigo = re.sub(r' ?([{};,>]) ?', r'\1', codigo)
+    # Solo el espacio después de ':' (antes puede ser un selector como 'a :hover')
+    return codigo.replace(': ', ':').replace(';}', '}')
+
+def minify_css(css):
+    """Quita comentarios y espacios sobrantes de una hoja de estilos (respeta las cadenas)"""
+    if rcssmin:
+        return rcssmin.cssmin(css)
+    sin_comentarios = _CADENA_O_COMENTARIO.sub(lambda m: m.group(1) or '', css)
+    partes = _CADENA.split(sin_comentarios)
+    # En las posiciones impares quedan las cadenas, que no se tocan
+    return ''.join(parte if i % 2 else _compact_css(parte) for i, parte in enumerate(partes)).strip()
+
+def minify_js(js):
+    """Reducción conservadora de JavaScript: quita sangría, líneas vacías y comentarios de línea completa.
+
+    Conserva los saltos de línea (el punto y coma automático depende de ellos) y las
+    líneas dentro de plantillas `...` de varias líneas.
+    """
+    if rjsmin:
+        return rjsmin.jsmin(js)
+    lineas = []
+    en_plantilla = False
+    for linea in js.splitlines():
+        if en_plantilla:
+            lineas.append(linea)
+        else:
+            recortada = linea.strip()
+            if recortada and not recortada.startswith('//'):
+                lineas.append(recortada)
+        if (linea.count('`') - linea.count('\\`')) % 2:
+            en_plantilla = not en_plantilla
+    return '\n'.join(lineas) + '\n'
+
+def _read(nombre, static_dir):
+    with open(os.path.join(static_dir, nombre), encoding='utf-8') as archivo:
+        return archivo.read()
+
+def _write(path, contenido):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as archivo:
+        archivo.write(contenido)
+
+def fingerprint(nombre, contenido):
+    """'css/citas.css' -> 'css/citas.<hash>.css' según el contenido"""
+    base, extension = os.path.splitext(nombre)
+    return f"{base}.{hashlib.sha256(contenido).hexdigest()[:12]}{extension}"
+
+def compress(contenido):
+    """Variantes comprimidas {extensión: bytes}; solo las que resultan más chicas"""
+    variantes = {'.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+    if brotli:
+        variantes['.br'] = brotli.compress(contenido, quality=11)
+    return {extension: datos for extension, datos in variantes.items() if len(datos) < len(contenido)}
+
+def source_files(static_dir=STATIC_DIR):
+    """Archivos CSS/JS de static/ como nombres relativos ('css/citas.css')"""
+    nombres = []
+    for carpeta in CARPETAS:
+        for raiz, _, archivos in os.walk(os.path.join(static_dir, carpeta)):
+            for archivo in archivos:
+                if archivo.endswith(('.css', '.js')):
+                    nombres.append(os.path.relpath(os.path.join(raiz, archivo), static_dir).replace(os.sep, '/'))
+    return sorted(nombres)
+
+def load_manifest(dist_dir=DIST_DIR):
+    """{nombre lógico: nombre con hash}; vacío si aún no se construyeron los archivos"""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Minifica, agrupa, renombra con hash y precomprime los CSS/JS; retorna el manifiesto nuevo"""
+    fuentes = {nombre: [nombre] for nombre in source_files(static_dir)}
+    fuentes.update(BUNDLES)
+
+    anterior = load_manifest(dist_dir)
+    manifiesto = {}
+    for nombre, partes in sorted(fuentes.items()):
+        minify = minify_css if nombre.endswith('.css') else minify_js
+        contenido = '\n'.join(minify(_read(parte, static_dir)) for parte in partes).encode('utf-8')
+        destino = fingerprint(nombre, contenido)
+        _write(os.path.join(dist_dir, destino), contenido)
+        for extension, datos in compress(contenido).items():
+            _write(os.path.join(dist_dir, destino + extension), datos)
+        manifiesto[nombre] = destino
+
+    _write(os.path.join(dist_dir, MANIFEST),
+           json.dumps(manifiesto, indent=2, sort_keys=True).encode('utf-8'))
+    remove_stale(dist_dir, set(manifiesto.values()) | set(anterior.values()))
+    return manifiesto
+
+def remove_stale(dist_dir, vigentes):
+    """Borra los archivos generados que no están en el manifiesto actual ni en el anterior.
+
+    Se conserva la versión anterior para las páginas que ya se sirvieron con esos nombres.
+    """
+    for raiz, _, archivos in os.walk(dist_dir):
+        for archivo in archivos:
+            path = os.path.join(raiz, archivo)
+            nombre = os.path.relpath(path, dist_dir).replace(os.sep, '/')
+            base = nombre
+            for extension, _ in COMPRESIONES:
+                if nombre.endswith(extension):
+                    base = nombre[:-len(extension)]
+            if nombre != MANIFEST and base not in vigentes:
+                os.remove(path)
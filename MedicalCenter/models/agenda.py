@@ -0,0 +1,182 @@
+from .database import db
+from datetime import date, datetime, timedelta
+import threading
+import time
+
+# Duración de cada cita y horario de atención (en minutos desde medianoche)
+DURACION_CITA = 30
+INICIO_JORNADA = 8 * 60
+FIN_JORNADA = 22 * 60
+MINUTOS_DIA = 24 * 60
+
+def to_minutes(hora):
+    """Convierte una hora ('HH:MM', time o timedelta de MySQL) a minutos desde medianoche"""
+    if isinstance(hora, timedelta):
+        return int(hora.total_seconds()) // 60
+    if isinstance(hora, str):
+        hora = datetime.strptime(hora[:5], '%H:%M').time()
+    return hora.hour * 60 + hora.minute
+
+def to_date(fecha):
+    """Convierte una fecha ('YYYY-MM-DD', date o datetime) a date"""
+    if isinstance(fecha, datetime):
+        return fecha.date()
+    if isinstance(fecha, str):
+        return datetime.strptime(fecha, '%Y-%m-%d').date()
+    return fecha
+
+def interval_mask(inicio, duracion=DURACION_CITA):
+    """Máscara de bits de los minutos [inicio, inicio + duracion) del día"""
+    fin = min(inicio + duracion, MINUTOS_DIA)
+    return ((1 << (fin - inicio)) - 1) << inicio
+
+def overlaps(inicio, ocupados):
+    """Indica si una cita que empieza en el minuto `inicio` se cruza con alguna de las que empiezan en `ocupados`"""
+    mascara = interval_mask(inicio)
+    return any(interval_mask(otro) & mascara for otro in ocupados)
+
+class _DiaAgenda:
+    """Citas activas de un médico en un día: {id_cita: minuto de inicio} y su mapa de bits"""
+
+    __slots__ = ('citas', 'ocupado', 'cargado')
+
+    def __init__(self):
+        self.citas = {}
+        self.ocupado = 0
+        self.cargado = time.monotonic()
+
+    def add(self, cita_id, inicio):
+        self.citas[cita_id] = inicio
+        self.ocupado |= interval_mask(inicio)
+
+    def remove(self, cita_id):
+        if self.citas.pop(cita_id, None) is not None:
+            # Recalcular: otra cita podría compartir minutos con la eliminada
+            self.ocupado = 0
+            for inicio in self.citas.values():
+                self.ocupado |= interval_mask(inicio)
+
+    def mask_without(self, exclude_cita_id):
+        """Mapa de bits del día ignorando una cita (al editarla)"""
+        if exclude_cita_id not in self.citas:
+            return self.ocupado
+        ocupado = 0
+        for cita_id, inicio in self.citas.items():
+            if cita_id != exclude_cita_id:
+                ocupado |= interval_mask(inicio)
+        return ocupado
+
+class Agenda:
+    """Índice en memoria de los horarios ocupados por médico y día"""
+
+    def __init__(self, max_age=300):
+        # Los días cargados se vuelven a leer tras max_age segundos (cambios de otros procesos)
+        self.max_age = max_age
+        self._dias = {}
+        # Día en que está registrada cada cita: {id_cita: (id_medico, fecha)}
+        self._ubicacion = {}
+        self._purgado = date.today()
+        self._lock = threading.RLock()
+
+    def _load(self, medico_id, fechas):
+        """Carga desde la base de datos los días que faltan o vencieron (requiere el lock)"""
+        if self._purgado != date.today():
+            self._purge_past()
+        now = time.monotonic()
+        faltantes = [fecha for fecha in fechas
+                     if (medico_id, fecha) not in self._dias
+                     or now - self._dias[(medico_id, fecha)].cargado > self.max_age]
+        if not faltantes:
+            return True
+
+        query = """SELECT id_cita, fecha, hora FROM cita
+                   WHERE id_medico = %s AND fecha BETWEEN %s AND %s AND estado = 1"""
+        result = db.execute_query(query, (medico_id, min(faltantes), max(faltantes)))
+        if result is None:
+            return False
+
+        for fecha in faltantes:
+            self._dias[(medico_id, fecha)] = _DiaAgenda()
+        for cita_id, fecha, hora in result:
+            dia = self._dias.get((medico_id, fecha))
+            if dia is not None and fecha in faltantes:
+                dia.add(cita_id, to_minutes(hora))
+                self._ubicacion[cita_id] = (medico_id, fecha)
+        return True
+
+    def is_booked(self, medico_id, fecha, hora, exclude_cita_id=None):
+        """Indica si el horario se cruza con otra cita activa del médico; None si no se pudo consultar"""
+        fecha = to_date(fecha)
+        inicio = to_minutes(hora)
+        with self._lock:
+            if not self._load(medico_id, [fecha]):
+                return None
+            ocupado = self._dias[(medico_id, fecha)].mask_without(exclude_cita_id)
+        return bool(ocupado & interval_mask(inicio))
+
+    def free_slots(self, medico_id, fecha_inicio, dias=7):
+        """Horarios libres del médico por día: {fecha: ['HH:MM', ...]}"""
+        fecha_inicio = to_date(fecha_inicio)
+        fechas = [fecha_inicio + timedelta(days=i) for i in range(dias)]
+        with self._lock:
+            if not self._load(medico_id, fechas):
+                return None
+            ocupados = {fecha: self._dias[(medico_id, fecha)].ocupado for fecha in fechas}
+
+        ahora = datetime.now()
+        libres = {}
+        for fecha in fechas:
+            if fecha < ahora.date():
+                libres[fecha.isoformat()] = []
+                continue
+            desde = INICIO_JORNADA
+            if fecha == ahora.date():
+                desde = max(desde, ahora.hour * 60 + ahora.minute)
+            horarios = []
+            for inicio in range(INICIO_JORNADA, FIN_JORNADA - DURACION_CITA + 1, DURACION_CITA):
+                if inicio >= desde and not ocupados[fecha] & interval_mask(inicio):
+                    horarios.append(f"{inicio // 60:02d}:{inicio % 60:02d}")
+            libres[fecha.isoformat()] = horarios
+        return libres
+
+    def add(self, cita_id, medico_id, fecha, hora):
+        """Registra una cita activa en los días ya cargados"""
+        fecha = to_date(fecha)
+        with self._lock:
+            self.remove(cita_id)
+            dia = self._dias.get((medico_id, fecha))
+            if dia is not None:
+                dia.add(cita_id, to_minutes(hora))
+                self._ubicacion[cita_id] = (medico_id, fecha)
+
+    def remove(self, cita_id):
+        """Quita una cita del índice (cancelada, eliminada o movida)"""
+        with self._lock:
+            key = self._ubicacion.pop(cita_id, None)
+            dia = self._dias.get(key) if key else None
+            if dia is not None:
+                dia.remove(cita_id)
+
+    def invalidate(self, medico_id=None, fecha=None):
+        """Fuerza la recarga de un día, de un médico o de todo el índice"""
+        with self._lock:
+            if medico_id is None:
+                self._dias.clear()
+                self._ubicacion.clear()
+            elif fecha is None:
+                for key in [key for key in self._dias if key[0] == medico_id]:
+                    del self._dias[key]
+            else:
+                self._dias.pop((medico_id, to_date(fecha)), None)
+
+    def _purge_past(self):
+        """Olvida los días anteriores a hoy (requiere el lock)"""
+        hoy = date.today()
+        for key in [key for key in self._dias if key[1] < hoy]:
+            del self._dias[key]
+        for cita_id in [cita_id for cita_id, key in self._ubicacion.items() if key[1] < hoy]:
+            del self._ubicacion[cita_id]
+        self._purgado = hoy
+
+# Instancia global de la agenda de médicos
+agenda = Agenda()
@@ -0,0 +1,236 @@
+from .database import db
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+def normalize_text(text):
+    """Normaliza texto para búsqueda: minúsculas, sin acentos y sin signos"""
+    if not text:
+        return ''
+    # NFKD separa la letra de su acento ('é' -> 'e' + acento, 'ñ' -> 'n' + tilde) y el acento se descarta
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', text.lower()).split())
+
+def word_trigrams(word):
+    """Trigramas de una palabra con relleno al inicio y al final (estilo pg_trgm)"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _index_into(documents, postings, doc_id, text):
+    """Agrega un documento a las listas invertidas indicadas"""
+    normalized = normalize_text(text)
+    documents[doc_id] = normalized
+    for word in normalized.split():
+        for gram in word_trigrams(word):
+            postings.setdefault(gram, set()).add(doc_id)
+
+def _unindex_from(documents, postings, doc_id):
+    """Quita un documento de las listas invertidas indicadas"""
+    normalized = documents.pop(doc_id, None)
+    if normalized is None:
+        return
+    for word in normalized.split():
+        for gram in word_trigrams(word):
+            ids = postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del postings[gram]
+
+# Términos más cortos producen demasiados candidatos para ser útiles
+MIN_TERM_LENGTH = 2
+
+class IndiceTrigramas:
+    """Índice invertido de trigramas en memoria para búsquedas por nombre"""
+
+    def __init__(self, loader, max_age=300, fuzzy_threshold=0.5, background=True):
+        # loader() debe retornar pares (id, texto) con todos los documentos a indexar
+        self.loader = loader
+        self.max_age = max_age
+        self.fuzzy_threshold = fuzzy_threshold
+        # Renovar el índice vencido en un hilo aparte (False: dentro de la misma búsqueda)
+        self.background = background
+
+        self._documents = {}
+        self._postings = {}
+        self._loaded_at = None
+        # Cambios recibidos mientras se reconstruye el índice [(id, texto o None)]; None si no se reconstruye
+        self._pending = None
+        # Aumenta con cada invalidate(): una reconstrucción iniciada antes no deja el índice como vigente
+        self._generation = 0
+        self._lock = threading.RLock()
+
+    def _build(self):
+        """Lee todos los documentos y arma un índice nuevo sin tomar el lock; None si falló la carga"""
+        rows = self.loader()
+        if rows is None:
+            return None
+        documents, postings = {}, {}
+        for doc_id, text in rows:
+            _index_into(documents, postings, doc_id, text)
+        return documents, postings
+
+    def _swap(self, built, generation):
+        """Reemplaza el índice por el construido y le aplica los cambios pendientes (requiere el lock)"""
+        pending, self._pending = self._pending or [], None
+        if built is None:
+            # Error de base de datos: conservar el índice actual (se reintenta en la siguiente búsqueda)
+            return
+        documents, postings = built
+        # Repetir un cambio que la carga ya incluía no altera el resultado
+        for doc_id, text in pending:
+            _unindex_from(documents, postings, doc_id)
+            if text is not None:
+                _index_into(documents, postings, doc_id, text)
+        self._documents, self._postings = documents, postings
+        self._loaded_at = time.monotonic() if generation == self._generation else float('-inf')
+
+    def _refresh(self, generation):
+        """Reconstruye el índice en segundo plano mientras las búsquedas usan el anterior"""
+        try:
+            built = self._build()
+        except Exception as e:
+            print(f"Error reconstruyendo el índice de búsqueda: {e}")
+            built = None
+        finally:
+            # El hilo tomó una conexión del pool al consultar: se devuelve
+            db.disconnect()
+        with self._lock:
+            self._swap(built, generation)
+
+    def _ensure_loaded(self):
+        """Construye el índice la primera vez; si venció max_age lo renueva sin detener las búsquedas (requiere el lock)"""
+        if self._loaded_at is None:
+            # No hay índice que servir mientras tanto: la primera carga se espera
+            self._pending = []
+            self._swap(self._build(), self._generation)
+            return
+        if self._pending is not None or time.monotonic() - self._loaded_at < self.max_age:
+            return
+        self._pending = []
+        if self.background:
+            threading.Thread(target=self._refresh, args=(self._generation,),
+                             name='indice-busqueda', daemon=True).start()
+        else:
+            self._swap(self._build(), self._generation)
+
+    def _record(self, doc_id, text):
+        """Anota un cambio para repetirlo en el índice que se está reconstruyendo (requiere el lock)"""
+        if self._pending is not None:
+            self._pending.append((doc_id, text))
+
+    def add(self, doc_id, text):
+        """Agrega o reemplaza un documento en el índice"""
+        with self._lock:
+            if self._loaded_at is None:
+                # Aún no se construye: se indexará completo en la primera búsqueda
+                return
+            _unindex_from(self._documents, self._postings, doc_id)
+            _index_into(self._documents, self._postings, doc_id, text)
+            self._record(doc_id, text)
+
+    def remove(self, doc_id):
+        """Elimina un documento del índice"""
+        with self._lock:
+            _unindex_from(self._documents, self._postings, doc_id)
+            self._record(doc_id, None)
+
+    def invalidate(self):
+        """Marca el índice como vencido: la siguiente búsqueda lo renueva"""
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is not None:
+                self._loaded_at = float('-inf')
+
+    def _candidates(self, words):
+        """Documentos que contienen todos los trigramas requeridos de cada palabra"""
+        required = set()
+        for word in words:
+            if len(word) >= 3:
+                # Trigramas internos: permiten coincidencias en medio de la palabra
+                required.update(word[i:i + 3] for i in range(len(word) - 2))
+            else:
+                # Palabras cortas solo pueden coincidir como prefijo
+                padded = f"  {word}"
+                required.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+        postings = []
+        for gram in required:
+            ids = self._postings.get(gram)
+            if not ids:
+                return set()
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return candidates
+
+    def _fuzzy_candidates(self, words):
+        """Documentos similares por proporción de trigramas compartidos (tolera errores)"""
+        grams = set()
+        for word in words:
+            grams |= word_trigrams(word)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+        minimum = len(grams) * self.fuzzy_threshold
+        return {doc_id: count / len(grams) for doc_id, count in counts.items() if count >= minimum}
+
+    def search(self, term, limit=20):
+        """Retorna los ids que coinciden con el término, ordenados por relevancia"""
+        words = normalize_text(term).split()
+        if len(''.join(words)) < MIN_TERM_LENGTH:
+            return []
+
+        with self._lock:
+            self._ensure_loaded()
+
+            ranked = []
+            for doc_id in self._candidates(words):
+                text = self._documents[doc_id]
+                if not all(word in text for word in words):
+                    continue
+                doc_words = text.split()
+                # Coincidencia exacta de palabra > prefijo de palabra > subcadena
+                score = 0
+                for word in words:
+                    if word in doc_words:
+                        score += 3
+                    elif any(w.startswith(word) for w in doc_words):
+                        score += 2
+                    else:
+                        score += 1
+                ranked.append((-score, text, doc_id))
+
+            if not ranked:
+                for doc_id, similarity in self._fuzzy_candidates(words).items():
+                    ranked.append((-similarity, self._documents[doc_id], doc_id))
+
+        return [doc_id for _, _, doc_id in heapq.nsmallest(limit, ranked)]
+
+# Sugerencias por página en los campos de búsqueda de los formularios
+SUGERENCIAS_POR_PAGINA = 10
+MAX_SUGERENCIAS_POR_PAGINA = 25
+
+def suggestion_page(search, term, limit=None, offset=None):
+    """Una página de resultados de search(term, limit, offset): (registros, siguiente offset o None)"""
+    try:
+        limit = max(1, min(int(limit), MAX_SUGERENCIAS_POR_PAGINA))
+    except (TypeError, ValueError):
+        limit = SUGERENCIAS_POR_PAGINA
+    try:
+        offset = max(0, int(offset))
+    except (TypeError, ValueError):
+        offset = 0
+
+    # Se pide uno de más para saber si hay otra página
+    registros = search(term, limit + 1, offset)
+    siguiente = offset + limit if len(registros) > limit else None
+    return registros[:limit], siguiente
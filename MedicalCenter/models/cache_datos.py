@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+class BackendLocal:
+    """Versiones de invalidación en memoria (un solo proceso)"""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+        # Las versiones vuelven a 0 al reiniciar: este id distingue una ejecución de otra
+        self.instancia = uuid.uuid4().hex
+
+    def get_version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+class BackendSQLite:
+    """Versiones de invalidación en una tabla SQLite compartida por los procesos de la máquina"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS cache_versiones (
+                                      namespace TEXT PRIMARY KEY,
+                                      version INTEGER NOT NULL)""")
+
+    def _connection(self):
+        """Conexión SQLite del hilo actual"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def get_version(self, namespace):
+        row = self._connection().execute(
+            "SELECT version FROM cache_versiones WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, namespace):
+        with self._connection() as connection:
+            connection.execute("""INSERT INTO cache_versiones (namespace, version) VALUES (?, 1)
+                                  ON CONFLICT(namespace) DO UPDATE SET version = version + 1""",
+                               (namespace,))
+        return self.get_version(namespace)
+
+class BackendRedis:
+    """Versiones de invalidación en Redis (o un servidor compatible) para varios servidores"""
+
+    PREFIX = 'medicalcenter:cache:'
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get_version(self, namespace):
+        value = self._client.get(self.PREFIX + namespace)
+        return int(value) if value else 0
+
+    def bump(self, namespace):
+        return self._client.incr(self.PREFIX + namespace)
+
+def create_backend(url):
+    """Crea el backend de invalidación: 'local', 'sqlite:///ruta.db' o 'redis://host:puerto/0'"""
+    try:
+        if url.startswith('sqlite:///'):
+            return BackendSQLite(url[len('sqlite:///'):])
+        if url.startswith(('redis://', 'rediss://', 'unix://')):
+            return BackendRedis(url)
+    except ImportError:
+        print("El paquete redis no está instalado: se usa la caché local")
+    except Exception as e:
+        print(f"Error iniciando el backend de caché '{url}': {e}")
+    return BackendLocal()
+
+class CacheDatos:
+    """Caché de datos de referencia por proceso, con TTL e invalidación compartida por versiones"""
+
+    def __init__(self, backend, ttl=300, check_interval=1.0, max_entries=5000):
+        self.backend = backend
+        self.ttl = ttl
+        # Límite de entradas en memoria (hay espacios de nombres por paciente)
+        self.max_entries = max_entries
+        # Tiempo mínimo entre consultas de versión al backend por espacio de nombres
+        self.check_interval = check_interval
+
+        # {(namespace, key): (valor, versión, momento de carga)}
+        self._entries = {}
+        # {namespace: (versión, momento de la última consulta)}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _current_version(self, namespace):
+        """Versión vigente del espacio de nombres, consultando el backend como máximo cada check_interval"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._versions.get(namespace)
+            if cached and now - cached[1] < self.check_interval:
+                return cached[0]
+        try:
+            version = self.backend.get_version(namespace)
+        except Exception as e:
+            print(f"Error consultando la versión de caché '{namespace}': {e}")
+            # Sin backend no se puede saber si hubo cambios: no usar la caché
+            return None
+        with self._lock:
+            self._versions[namespace] = (version, now)
+        return version
+
+    def version(self, namespace):
+        """Versión de datos del espacio de nombres (cambia con cada invalidación); None si no se pudo consultar"""
+        return self._current_version(namespace)
+
+    def get(self, namespace, key, loader):
+        """Retorna el valor en caché o lo carga con loader(); los None no se guardan"""
+        version = self._current_version(namespace)
+        now = time.monotonic()
+        if version is not None:
+            with self._lock:
+                entry = self._entries.get((namespace, key))
+            if entry and entry[1] == version and now - entry[2] < self.ttl:
+                return entry[0]
+
+        value = loader()
+        if value is not None and version is not None:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._evict(now)
+                self._entries[(namespace, key)] = (value, version, now)
+        return value
+    
+    def _evict(self, now):
+        """Quita las entradas vencidas y, si no alcanza, las más antiguas (se llama con el candado tomado)"""
+        for entry_key in [entry_key for entry_key, entry in self._entries.items() if now - entry[2] >= self.ttl]:
+            del self._entries[entry_key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+        for namespace in [namespace for namespace, cached in self._versions.items() if now - cached[1] >= self.ttl]:
+            del self._versions[namespace]
+
+    def invalidate(self, namespace):
+        """Invalida el espacio de nombres en este proceso y en los demás (vía backend)"""
+        with self._lock:
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+                del self._entries[entry_key]
+            self._versions.pop(namespace, None)
+        try:
+            self.backend.bump(namespace)
+        except Exception as e:
+            print(f"Error invalidando la caché '{namespace}': {e}")
+
+    def clear(self):
+        """Vacía la caché local"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+def entity_namespace(entidad, entidad_id):
+    """Espacio de nombres de la caché con los datos de un registro, p. ej. 'medico:3'"""
+    return f"{entidad}:{entidad_id}"
+
+def patient_namespace(paciente_id):
+    """Espacio de nombres de la caché con los datos de un paciente"""
+    return entity_namespace('paciente', paciente_id)
+
+# Instancia global configurada por variables de entorno
+cache_datos = CacheDatos(
+    create_backend(os.environ.get('MEDICALCENTER_CACHE_BACKEND', 'local')),
+    ttl=float(os.environ.get('MEDICALCENTER_CACHE_TTL', 300))
+)
@@ -0,0 +1,175 @@
+from .cache_datos import cache_datos
+from collections import OrderedDict
+from datetime import date
+from jinja2 import nodes, FileSystemBytecodeCache, TemplateSyntaxError
+from jinja2.ext import Extension
+from markupsafe import Markup
+import os
+import tempfile
+import threading
+import time
+
+# Carpeta del bytecode compilado de las plantillas (compartida por los procesos de la máquina)
+BYTECODE_DIR = os.environ.get('MEDICALCENTER_BYTECODE_PLANTILLAS',
+                              os.path.join(tempfile.gettempdir(), 'medicalcenter_plantillas'))
+
+# Reemplaza el token CSRF de la petición dentro de los fragmentos guardados
+MARCA_CSRF = '\x00csrf_token\x00'
+
+class CacheFragmentos:
+    """Fragmentos de plantilla ya renderizados, por versión de los datos que muestran.
+
+    La llave incluye la versión de cada espacio de nombres de cache_datos (cambia con
+    cada escritura en la tabla), el día actual (edades, fechas relativas) y los valores
+    extra que indique la plantilla, como la URL con el cursor de la página.
+    """
+
+    def __init__(self, max_entries=500, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = True
+        # Si retorna False el fragmento se renderiza pero no se guarda (p. ej. listas vacías por un error)
+        self.can_store = lambda: True
+
+        # {llave: (html, momento de render)} en orden de uso
+        self._entries = OrderedDict()
+        # {nombre del fragmento: [aciertos, fallos]}
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def _count(self, nombre, acierto):
+        with self._lock:
+            contadores = self._contadores.setdefault(nombre, [0, 0])
+            contadores[0 if acierto else 1] += 1
+
+    def render(self, nombre, namespaces, vary, caller, csrf_token=None):
+        """Retorna el fragmento guardado o lo renderiza con caller() y lo guarda"""
+        versiones = []
+        for namespace in namespaces if self.enabled else ():
+            version = cache_datos.version(namespace)
+            if version is None:
+                break
+            versiones.append(version)
+        if not self.enabled or len(versiones) != len(namespaces):
+            # Sin versiones no se sabe si los datos cambiaron: renderizar siempre
+            self._count(nombre, False)
+            return caller()
+
+        key = (nombre, tuple(versiones), date.today(), repr(vary))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+        if entry:
+            self._count(nombre, True)
+            html = entry[0]
+            if csrf_token and MARCA_CSRF in html:
+                html = html.replace(MARCA_CSRF, csrf_token())
+            return Markup(html)
+
+        self._count(nombre, False)
+        html = str(caller())
+        if not self.can_store():
+            return Markup(html)
+        # El token CSRF cambia en cada petición: se guarda la marca y se repone al leer
+        guardado = html.replace(csrf_token(), MARCA_CSRF) if csrf_token else html
+        with self._lock:
+            self._entries[key] = (guardado, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return Markup(html)
+
+    def stats(self):
+        """{fragmento: {'aciertos': n, 'fallos': n}}"""
+        with self._lock:
+            return {nombre: {'aciertos': aciertos, 'fallos': fallos}
+                    for nombre, (aciertos, fallos) in sorted(self._contadores.items())}
+
+    def clear(self):
+        """Vacía los fragmentos guardados (los contadores se conservan)"""
+        with self._lock:
+            self._entries.clear()
+
+class BytecodeCacheContado(FileSystemBytecodeCache):
+    """Bytecode de las plantillas en disco, contando cuántas se cargaron sin recompilar"""
+
+    def __init__(self, directory, *args, **kwargs):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory, *args, **kwargs)
+        self.aciertos = 0
+        self.fallos = 0
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+
+class FragmentosExtension(Extension):
+    """Etiqueta {% cache 'nombre', ['tabla', ...], extra... %} ... {% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        if len(args) < 2:
+            raise TemplateSyntaxError("cache requiere el nombre del fragmento y la lista de tablas", lineno)
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        nombre, namespaces, *vary = args
+        return fragmentos.render(nombre, list(namespaces), vary, caller,
+                                 self.environment.globals.get('csrf_token'))
+
+def precompile_templates(env):
+    """Compila todas las plantillas al iniciar (desde el bytecode en disco si ya existe); retorna cuántas"""
+    compiladas = 0
+    for nombre in env.list_templates(extensions=['html']):
+        try:
+            env.get_template(nombre)
+            compiladas += 1
+        except TemplateSyntaxError as e:
+            print(f"Error compilando la plantilla {nombre}: {e}")
+    return compiladas
+
+def _sin_errores_pendientes():
+    """False si la petición tiene un mensaje de error pendiente: la página se armó con datos incompletos"""
+    from flask import get_flashed_messages
+    # get_flashed_messages guarda los mensajes en la petición: la plantilla los sigue viendo
+    return not get_flashed_messages(category_filter=['error'])
+
+def configure_templates(app):
+    """Activa el bytecode en disco y la etiqueta {% cache %}, y precompila las plantillas"""
+    app.jinja_env.bytecode_cache = BytecodeCacheContado(app.config.get('BYTECODE_PLANTILLAS', BYTECODE_DIR))
+    app.jinja_env.add_extension(FragmentosExtension)
+    fragmentos.enabled = app.config.get('CACHE_FRAGMENTOS', True)
+    fragmentos.can_store = _sin_errores_pendientes
+    return precompile_templates(app.jinja_env)
+
+def render_prometheus(env):
+    """Contadores de la caché de fragmentos y del bytecode en formato de texto de Prometheus"""
+    lineas = ["# HELP medicalcenter_template_fragment_cache_total Fragmentos de plantilla servidos desde la caché o renderizados",
+              "# TYPE medicalcenter_template_fragment_cache_total counter"]
+    for nombre, contadores in fragmentos.stats().items():
+        lineas.append(f'medicalcenter_template_fragment_cache_total{{fragmento="{nombre}",resultado="acierto"}} {contadores["aciertos"]}')
+        lineas.append(f'medicalcenter_template_fragment_cache_total{{fragmento="{nombre}",resultado="fallo"}} {contadores["fallos"]}')
+
+    bytecode = env.bytecode_cache
+    if isinstance(bytecode, BytecodeCacheContado):
+        lineas.append("# HELP medicalcenter_template_bytecode_total Plantillas cargadas del bytecode en disco o compiladas")
+        lineas.append("# TYPE medicalcenter_template_bytecode_total counter")
+        lineas.append(f'medicalcenter_template_bytecode_total{{resultado="acierto"}} {bytecode.aciertos}')
+        lineas.append(f'medicalcenter_template_bytecode_total{{resultado="fallo"}} {bytecode.fallos}')
+    return '\n'.join(lineas) + '\n'
+
+# Instancia global usada por la etiqueta {% cache %}
+fragmentos = CacheFragmentos(ttl=float(os.environ.get('MEDICALCENTER_CACHE_TTL', 300)))
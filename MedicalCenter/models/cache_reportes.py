@@ -0,0 +1,84 @@
+import glob
+import os
+import threading
+import time
+import uuid
+
+class CacheReportes:
+    """Caché en disco de reportes PDF direccionada por exploración y versión de contenido"""
+
+    def __init__(self, directory='static/reports', max_bytes=200 * 1024 * 1024, max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def path_for(self, exploracion_id, version):
+        """Ruta del archivo para una exploración y versión"""
+        return os.path.join(self.directory, f"reporte_medico_{exploracion_id}_{version}.pdf")
+
+    def lookup(self, exploracion_id, version):
+        """Retorna la ruta del reporte en caché o None si no existe"""
+        path = self.path_for(exploracion_id, version)
+        try:
+            # Actualizar la fecha de acceso para la política de expulsión
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def store(self, exploracion_id, version, writer):
+        """Genera el reporte con writer(ruta_temporal) y lo publica de forma atómica"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(exploracion_id, version)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            writer(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.invalidate(exploracion_id, keep=path)
+        self.evict()
+        return path
+
+    def invalidate(self, exploracion_id, keep=None):
+        """Elimina las versiones anteriores de los reportes de una exploración"""
+        pattern = os.path.join(self.directory, f"reporte_medico_{exploracion_id}_*.pdf")
+        for path in glob.glob(pattern):
+            if path != keep:
+                self._remove(path)
+
+    def evict(self):
+        """Aplica los límites de antigüedad y de tamaño total del directorio"""
+        with self._lock:
+            entries = []
+            now = time.time()
+            for path in glob.glob(os.path.join(self.directory, 'reporte_medico_*.pdf')):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    self._remove(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            # Expulsar primero los usados hace más tiempo
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def _remove(self, path):
+        """Elimina un archivo ignorando si ya no existe"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# Instancia global de la caché de reportes
+cache_reportes = CacheReportes()
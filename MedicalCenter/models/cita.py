@@ -1,54 +1,81 @@
 from .database import db
-from datetime import datetime, date, time, timedelta
+from .paginacion import normalize_page_size, decode_cursor, keyset_condition, split_page
+from .agenda import agenda, overlaps, to_minutes
+from .estadisticas import Estadisticas
+from .cache_datos import cache_datos, patient_namespace
+from .registros import definir_registro
+from .relaciones import exists, count_related, load_related
+from datetime import datetime, date, timedelta
+from mysql.connector import Error
+
+def _formatear_hora(hora):
+    """Convierte el timedelta de una columna TIME a 'HH:MM'"""
+    if isinstance(hora, timedelta):
+        total_seconds = int(hora.total_seconds())
+        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}"
+    return str(hora) if hora else ''
+
+# Registro de una fila de Cita.LIST_QUERY
+RegistroCita = definir_registro(
+    'RegistroCita',
+    ('id_cita', 'id_paciente', 'id_medico', 'fecha_cita', '_hora', 'motivo_consulta', 'estatus', 'estado',
+     '_paciente_nombres', '_paciente_apellidos', '_medico_primer_nombre', '_medico_segundo_nombre',
+     '_medico_apellido_paterno', '_medico_apellido_materno', 'especialidad'),
+    hora_cita=lambda c: _formatear_hora(c._hora),
+    paciente_nombre_completo=lambda c: f"{c._paciente_nombres} {c._paciente_apellidos}".strip(),
+    medico_nombre_completo=lambda c: f"{c._medico_primer_nombre or ''} {c._medico_segundo_nombre or ''} "
+                                     f"{c._medico_apellido_paterno} {c._medico_apellido_materno or ''}".strip()
+)
 
 class Cita:
     def __init__(self):
         pass
     
-    @staticmethod
-    def get_all():
-        query = """SELECT c.id_cita, c.id_paciente, c.id_medico, c.fecha, c.hora, c.motivo, c.estatus, c.estado,
+    # Consulta base de los listados de citas (sin ORDER BY ni LIMIT)
+    LIST_QUERY = """SELECT c.id_cita, c.id_paciente, c.id_medico, c.fecha, c.hora, c.motivo, c.estatus, c.estado,
                           p.nombres as paciente_nombres, p.apellidos as paciente_apellidos,
                           m.primer_nombre as medico_primer_nombre, m.segundo_nombre as medico_segundo_nombre,
                           m.apellido_paterno as medico_apellido_paterno, m.apellido_materno as medico_apellido_materno, 
                           m.especialidad
                    FROM cita c
                    JOIN pacientes p ON c.id_paciente = p.id_paciente AND p.estatus = 1
-                   JOIN medicos m ON c.id_medico = m.id_medico AND m.estatus = 1
-                   ORDER BY c.fecha DESC, c.hora DESC"""
+                   JOIN medicos m ON c.id_medico = m.id_medico AND m.estatus = 1"""
+    
+    @staticmethod
+    def _from_row(cita_data):
+        """Convierte una fila del listado de citas en registro"""
+        return RegistroCita(cita_data)
+    
+    @staticmethod
+    def get_all():
+        query = Cita.LIST_QUERY + " ORDER BY c.fecha DESC, c.hora DESC"
         
         result = db.execute_query(query)
+        return RegistroCita.from_rows(result)
+    
+    @staticmethod
+    def get_page(cursor=None, limit=None):
+        """Obtiene una página de citas, de la más reciente a la más antigua (paginación por llave)"""
+        limit = normalize_page_size(limit)
+        columns = ('c.fecha', 'c.hora', 'c.id_cita')
+        after = decode_cursor(cursor, len(columns))
         
-        citas = []
-        if result:
-            for cita_data in result:
-                # Convertir timedelta a formato de hora legible
-                hora_formateada = str(cita_data[4]) if cita_data[4] else ''
-                if isinstance(cita_data[4], timedelta):
-                    total_seconds = int(cita_data[4].total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    hora_formateada = f"{hours:02d}:{minutes:02d}"
-                
-                citas.append({
-                    'id_cita': cita_data[0],
-                    'id_paciente': cita_data[1],
-                    'id_medico': cita_data[2],
-                    'fecha_cita': cita_data[3],
-                    'hora_cita': hora_formateada,
-                    'motivo_consulta': cita_data[5],
-                    'estatus': cita_data[6],
-                    'estado': cita_data[7],
-                    'paciente_nombre_completo': f"{cita_data[8]} {cita_data[9]}".strip(),
-                    'medico_nombre_completo': f"{cita_data[10] or ''} {cita_data[11] or ''} {cita_data[12]} {cita_data[13] or ''}".strip(),
-                    'especialidad': cita_data[14]
-                })
-        return citas
+        query = Cita.LIST_QUERY
+        params = []
+        if after:
+            query += " WHERE " + keyset_condition(columns, descending=True)
+            params.extend(after)
+        query += " ORDER BY c.fecha DESC, c.hora DESC, c.id_cita DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, tuple(params))
+        rows, next_cursor = split_page(result, limit, lambda r: (r[3], r[4], r[0]))
+        return RegistroCita.from_rows(rows), next_cursor
     
     @staticmethod
     def get_by_id(cita_id):
         """BUGG FATAL"""
-        query = """SELECT c.*, 
+        query = """SELECT c.id_cita, c.id_paciente, c.id_medico, c.fecha, c.hora, c.motivo, c.estatus, c.estado,
                           p.nombres as paciente_nombres, p.apellidos as paciente_apellidos, p.fecha_nacimiento,
                           m.primer_nombre as medico_primer_nombre, m.segundo_nombre as medico_segundo_nombre,
                           m.apellido_paterno as medico_apellido_paterno, m.apellido_materno as medico_apellido_materno, 
@@ -78,6 +105,43 @@ class Cita:
             }
         return None
     
+    @staticmethod
+    def _slot_taken(cursor, medico_id, fecha, hora, exclude_cita_id=None):
+        """Dentro de una transacción: bloquea la agenda del médico y revisa si el horario se cruza con otra cita activa"""
+        # El bloqueo de la fila del médico serializa las reservas de ese médico hasta el commit
+        cursor.execute("SELECT id_medico FROM medicos WHERE id_medico = %s FOR UPDATE", (medico_id,))
+        cursor.fetchall()
+        # Lectura con bloqueo: ve las citas confirmadas por otras transacciones, no una foto anterior
+        cursor.execute("""SELECT id_cita, hora FROM cita
+                          WHERE id_medico = %s AND fecha = %s AND estado = 1 FOR UPDATE""", (medico_id, fecha))
+        ocupados = [to_minutes(hora_cita) for cita_id, hora_cita in cursor.fetchall() if cita_id != exclude_cita_id]
+        return overlaps(to_minutes(hora), ocupados)
+    
+    @staticmethod
+    def _write_slot(query, params, medico_id, fecha, hora, exclude_cita_id=None):
+        """Ejecuta el INSERT/UPDATE de una cita solo si el horario sigue libre, en una sola transacción.
+        
+        Retorna (filas afectadas, último id insertado) o None si el horario estaba
+        ocupado o hubo un error.
+        """
+        cursor = db.get_cursor()
+        if cursor is None:
+            return None
+        try:
+            if Cita._slot_taken(cursor, medico_id, fecha, hora, exclude_cita_id):
+                db.rollback()
+                return None
+            cursor.execute(query, params)
+            resultado = (cursor.rowcount, cursor.lastrowid)
+            db.commit()
+            return resultado
+        except Error as e:
+            print(f"Error guardando cita: {e}")
+            db.rollback()
+            return None
+        finally:
+            cursor.close()
+    
     @staticmethod
     def create(paciente_id, medico_id, fecha, hora, motivo):
         """Crea una nueva cita"""
@@ -87,98 +151,187 @@ class Cita:
         estatus = 'activa'
         estado = 1
         
-        result = db.execute_update(query, (paciente_id, medico_id, fecha, hora, 
-                                         motivo, estatus, estado))
+        result = Cita._write_slot(query, (paciente_id, medico_id, fecha, hora, motivo, estatus, estado),
+                                  medico_id, fecha, hora)
         
-        if result > 0:
-            return db.get_last_insert_id()
+        if result and result[0] > 0:
+            cita_id = result[1]
+            agenda.add(cita_id, medico_id, fecha, hora)
+            Estadisticas.move_cita(despues=(fecha, medico_id, estatus))
+            cache_datos.invalidate('citas')
+            cache_datos.invalidate(patient_namespace(paciente_id))
+            return cita_id
+        # Horario tomado por otra petición (o error): recargar ese día
+        agenda.invalidate(medico_id, fecha)
         return None
     
+    @staticmethod
+    def _snapshot(cita_id):
+        """(fecha, id_medico, estatus) actual de una cita para las estadísticas; None si no existe"""
+        result = db.execute_query("SELECT fecha, id_medico, estatus FROM cita WHERE id_cita = %s", (cita_id,))
+        return tuple(result[0]) if result else None
+    
+    @staticmethod
+    def _patient_id(cita_id):
+        """Paciente de una cita (para invalidar su resumen en caché); None si no existe"""
+        result = db.execute_query("SELECT id_paciente FROM cita WHERE id_cita = %s", (cita_id,))
+        return result[0][0] if result else None
+    
     @staticmethod
     def update(cita_id, paciente_id, medico_id, fecha, hora, motivo):
         """Actualiza una cita existente"""
         query = """UPDATE cita SET id_paciente = %s, id_medico = %s, fecha = %s, 
                    hora = %s, motivo = %s WHERE id_cita = %s"""
         
-        return db.execute_update(query, (paciente_id, medico_id, fecha, hora, 
-                                       motivo, cita_id)) > 0
+        antes = Cita._snapshot(cita_id)
+        paciente_anterior = Cita._patient_id(cita_id)
+        result = Cita._write_slot(query, (paciente_id, medico_id, fecha, hora, motivo, cita_id),
+                                  medico_id, fecha, hora, exclude_cita_id=cita_id)
+        success = bool(result) and result[0] > 0
+        if success:
+            cache_datos.invalidate('citas')
+            # La cita pudo cambiar de paciente: se invalidan los dos
+            for paciente in {paciente_anterior, int(paciente_id)} - {None}:
+                cache_datos.invalidate(patient_namespace(paciente))
+        if success and antes:
+            Estadisticas.move_cita(antes, Cita._snapshot(cita_id))
+        # La cita pudo cambiar de día o de médico: quitarla y recargar el día destino
+        agenda.remove(cita_id)
+        agenda.invalidate(medico_id, fecha)
+        return success
+    
+    @staticmethod
+    def _change_status(cita_id, query):
+        """Aplica un cambio de estatus solo si la cita no cambió desde que se leyó (para no contarla dos veces)"""
+        antes = Cita._snapshot(cita_id)
+        if not antes or db.execute_update(query + " AND estatus = %s", (cita_id, antes[2])) <= 0:
+            return None
+        despues = Cita._snapshot(cita_id)
+        Estadisticas.move_cita(antes, despues)
+        cache_datos.invalidate('citas')
+        cache_datos.invalidate(patient_namespace(Cita._patient_id(cita_id)))
+        return despues
     
     @staticmethod
     def cancel(cita_id):
         """Cancela una cita"""
-        query = "UPDATE cita SET estado = 'cancelada' WHERE id_cita = %s"
-        return db.execute_update(query, (cita_id,)) > 0
+        query = "UPDATE cita SET estatus = 'cancelada', estado = 0 WHERE id_cita = %s"
+        if Cita._change_status(cita_id, query):
+            agenda.remove(cita_id)
+            return True
+        return False
     
     @staticmethod
     def complete(cita_id):
         """Marca una cita como completada"""
-        query = "UPDATE cita SET estado = 'completada' WHERE id_cita = %s"
-        return db.execute_update(query, (cita_id,)) > 0
+        query = "UPDATE cita SET estatus = 'completada' WHERE id_cita = %s"
+        return Cita._change_status(cita_id, query) is not None
     
     @staticmethod
     def delete(cita_id):
         """Elimina una cita"""
         query = "DELETE FROM cita WHERE id_cita = %s"
-        return db.execute_update(query, (cita_id,)) > 0
+        antes = Cita._snapshot(cita_id)
+        paciente_id = Cita._patient_id(cita_id)
+        if db.execute_update(query, (cita_id,)) > 0:
+            agenda.remove(cita_id)
+            Estadisticas.move_cita(antes=antes)
+            cache_datos.invalidate('citas')
+            cache_datos.invalidate(patient_namespace(paciente_id))
+            return True
+        return False
+    
+    @staticmethod
+    def _patient_cita_from_row(cita_data):
+        """Convierte una fila de PATIENT_CITAS_QUERY en diccionario"""
+        return {
+            'id_cita': cita_data[0],
+            'id_paciente': cita_data[1],
+            'id_medico': cita_data[2],
+            'fecha_cita': cita_data[3],
+            'hora_cita': cita_data[4],
+            'motivo_consulta': cita_data[5],
+            'estado': cita_data[6],
+            'fecha_creacion': cita_data[7],
+            'medico_nombre_completo': f"{cita_data[8] or ''} {cita_data[9] or ''} {cita_data[10]} {cita_data[11] or ''}".strip(),
+            'especialidad': cita_data[12]
+        }
+    
+    @staticmethod
+    def _doctor_cita_from_row(cita_data):
+        """Convierte una fila de DOCTOR_CITAS_QUERY en diccionario"""
+        return {
+            'id_cita': cita_data[0],
+            'id_paciente': cita_data[1],
+            'id_medico': cita_data[2],
+            'fecha_cita': cita_data[3],
+            'hora_cita': cita_data[4],
+            'motivo_consulta': cita_data[5],
+            'estado': cita_data[6],
+            'fecha_creacion': cita_data[7],
+            'paciente_nombre_completo': f"{cita_data[8]} {cita_data[9]}".strip()
+        }
+    
+    # Citas de varios pacientes o médicos ('{ids}' se reemplaza por la lista IN)
+    PATIENT_CITAS_QUERY = """SELECT c.id_cita, c.id_paciente, c.id_medico, c.fecha, c.hora, c.motivo, c.estatus, c.estado,
+                                    m.primer_nombre as medico_primer_nombre, m.segundo_nombre as medico_segundo_nombre,
+                                    m.apellido_paterno as medico_apellido_paterno, m.apellido_materno as medico_apellido_materno, 
+                                    m.especialidad
+                             FROM cita c
+                             JOIN medicos m ON c.id_medico = m.id_medico
+                             WHERE c.id_paciente IN ({ids})
+                             ORDER BY c.fecha DESC, c.hora DESC"""
+    
+    DOCTOR_CITAS_QUERY = """SELECT c.id_cita, c.id_paciente, c.id_medico, c.fecha, c.hora, c.motivo, c.estatus, c.estado,
+                                   p.nombres as paciente_nombres, p.apellidos as paciente_apellidos
+                            FROM cita c
+                            JOIN pacientes p ON c.id_paciente = p.id_paciente AND p.estatus = 1
+                            WHERE c.id_medico IN ({ids})
+                            ORDER BY c.fecha DESC, c.hora DESC"""
     
     @staticmethod
     def get_by_patient(paciente_id):
         """Obtiene todas las citas de un paciente"""
-        query = """SELECT c.*, 
-                          m.primer_nombre as medico_primer_nombre, m.segundo_nombre as medico_segundo_nombre,
-                          m.apellido_paterno as medico_apellido_paterno, m.apellido_materno as medico_apellido_materno, 
-                          m.especialidad
-                   FROM cita c
-                   JOIN medicos m ON c.id_medico = m.id_medico
-                   WHERE c.id_paciente = %s
-                   ORDER BY c.fecha DESC, c.hora DESC"""
-        
-        result = db.execute_query(query, (paciente_id,))
-        
-        citas = []
-        if result:
-            for cita_data in result:
-                citas.append({
-                    'id_cita': cita_data[0],
-                    'id_paciente': cita_data[1],
-                    'id_medico': cita_data[2],
-                    'fecha_cita': cita_data[3],
-                    'hora_cita': cita_data[4],
-                    'motivo_consulta': cita_data[5],
-                    'estado': cita_data[6],
-                    'fecha_creacion': cita_data[7],
-                    'medico_nombre_completo': f"{cita_data[8] or ''} {cita_data[9] or ''} {cita_data[10]} {cita_data[11] or ''}".strip(),
-                    'especialidad': cita_data[12]
-                })
-        return citas
+        return Cita.get_by_patients([paciente_id])[paciente_id]
+    
+    @staticmethod
+    def get_by_patients(paciente_ids):
+        """Citas de varios pacientes en una sola consulta por lote: {id_paciente: [citas]}"""
+        return load_related(Cita.PATIENT_CITAS_QUERY, paciente_ids, 1, Cita._patient_cita_from_row)
     
     @staticmethod
     def get_by_doctor(medico_id):
         """Obtiene todas las citas de un médico"""
-        query = """SELECT c.*, 
-                          p.nombres as paciente_nombres, p.apellidos as paciente_apellidos
-                   FROM cita c
-                   JOIN pacientes p ON c.id_paciente = p.id_paciente AND p.estatus = 1
-                   WHERE c.id_medico = %s
-                   ORDER BY c.fecha DESC, c.hora DESC"""
-        
-        result = db.execute_query(query, (medico_id,))
-        
-        citas = []
-        if result:
-            for cita_data in result:
-                citas.append({
-                    'id_cita': cita_data[0],
-                    'id_paciente': cita_data[1],
-                    'id_medico': cita_data[2],
-                    'fecha_cita': cita_data[3],
-                    'hora_cita': cita_data[4],
-                    'motivo_consulta': cita_data[5],
-                    'estado': cita_data[6],
-                    'fecha_creacion': cita_data[7],
-                    'paciente_nombre_completo': f"{cita_data[8]} {cita_data[9]}".strip()
-                })
-        return citas
+        return Cita.get_by_doctors([medico_id])[medico_id]
+    
+    @staticmethod
+    def get_by_doctors(medico_ids):
+        """Citas de varios médicos en una sola consulta por lote: {id_medico: [citas]}"""
+        return load_related(Cita.DOCTOR_CITAS_QUERY, medico_ids, 2, Cita._doctor_cita_from_row)
+    
+    @staticmethod
+    def patient_has_citas(paciente_id):
+        """Indica si el paciente tiene al menos una cita (sin cargarlas)"""
+        return exists("SELECT 1 FROM cita WHERE id_paciente = %s", (paciente_id,))
+    
+    @staticmethod
+    def doctor_has_citas(medico_id):
+        """Indica si el médico tiene al menos una cita de un paciente activo (sin cargarlas)"""
+        return exists("""SELECT 1 FROM cita c
+                         JOIN pacientes p ON c.id_paciente = p.id_paciente AND p.estatus = 1
+                         WHERE c.id_medico = %s""", (medico_id,))
+    
+    @staticmethod
+    def count_by_patients(paciente_ids):
+        """Número de citas de cada paciente: {id_paciente: total}"""
+        return count_related("""SELECT id_paciente, COUNT(*) FROM cita
+                                WHERE id_paciente IN ({ids}) GROUP BY id_paciente""", paciente_ids)
+    
+    @staticmethod
+    def count_by_doctors(medico_ids):
+        """Número de citas de cada médico: {id_medico: total}"""
+        return count_related("""SELECT id_medico, COUNT(*) FROM cita
+                                WHERE id_medico IN ({ids}) GROUP BY id_medico""", medico_ids)
     
     @staticmethod
     def validate_data(paciente_id, medico_id, fecha_cita, hora_cita, motivo_consulta, cita_id=None):
@@ -224,22 +377,17 @@ class Cita:
     
     @staticmethod
     def check_doctor_availability(medico_id, fecha_cita, hora_cita, exclude_cita_id=None):
-        """Verifica si el médico está disponible en la fecha y hora especificada"""
-        if exclude_cita_id:
-            query = """SELECT COUNT(*) FROM cita WHERE id_medico = %s AND fecha_cita = %s AND hora_cita = %s 
-                       AND estado != 'cancelada' AND id_cita != %s"""
-            result = db.execute_query(query, (medico_id, fecha_cita, hora_cita, exclude_cita_id))
-        else:
-            query = """SELECT COUNT(*) FROM cita WHERE id_medico = %s AND fecha_cita = %s AND hora_cita = %s 
-                       AND estado != 'cancelada'"""
-            result = db.execute_query(query, (medico_id, fecha_cita, hora_cita))
-        
-        return result and result[0][0] > 0
+        """Indica si el médico ya tiene una cita que se cruza con la fecha y hora especificada"""
+        # Si no se pudo consultar la agenda (None) el horario se da por ocupado
+        return agenda.is_booked(medico_id, fecha_cita, hora_cita, exclude_cita_id) is not False
     
     @staticmethod
-    def get_upcoming_appointments(limit=10):
-        """Obtiene las próximas citas programadas"""
-        query = """SELECT c.*, 
+    def get_free_slots(medico_id, fecha_inicio, dias=7):
+        """Obtiene los horarios libres del médico a partir de una fecha"""
+        return agenda.free_slots(medico_id, fecha_inicio, dias)
+    
+    # Próximas citas activas (la usa también la verificación de planes de consulta)
+    UPCOMING_QUERY = """SELECT c.id_cita, c.id_paciente, c.id_medico, c.fecha, c.hora, c.motivo, c.estatus, c.estado,
                           p.nombres as paciente_nombres, p.apellidos as paciente_apellidos,
                           m.primer_nombre as medico_primer_nombre, m.segundo_nombre as medico_segundo_nombre,
                           m.apellido_paterno as medico_apellido_paterno, m.apellido_materno as medico_apellido_materno
@@ -249,8 +397,11 @@ class Cita:
                    WHERE c.estado = 1 AND c.fecha >= CURDATE()
                    ORDER BY c.fecha ASC, c.hora ASC
                    LIMIT %s"""
-        
-        result = db.execute_query(query, (limit,))
+    
+    @staticmethod
+    def get_upcoming_appointments(limit=10):
+        """Obtiene las próximas citas programadas"""
+        result = db.execute_query(Cita.UPCOMING_QUERY, (limit,))
         
         citas = []
         if result:
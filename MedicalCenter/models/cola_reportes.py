@@ -0,0 +1,184 @@
+from .database import db
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Columnas del estado de un trabajo
+CAMPOS_TRABAJO = ('id', 'exploracion_id', 'estado', 'ruta', 'error', 'actualizado')
+
+class EstadosLocal:
+    """Estado de los trabajos en memoria (un solo proceso)"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def insert(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def update(self, job_id, fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def count_pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['estado'] in ('pendiente', 'procesando'))
+
+    def purge(self, before, abandoned_before):
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job['actualizado'] < (abandoned_before if job['estado'] in ('pendiente', 'procesando')
+                                                    else before)]:
+                del self._jobs[job_id]
+
+class EstadosSQLite:
+    """Estado de los trabajos en una tabla SQLite compartida por los procesos de la máquina.
+
+    Los PDF se guardan en el disco local, así que cualquier proceso de la misma
+    máquina puede responder la consulta de estado y la descarga.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS reportes_trabajos (
+                                      id TEXT PRIMARY KEY,
+                                      exploracion_id INTEGER NOT NULL,
+                                      estado TEXT NOT NULL,
+                                      ruta TEXT,
+                                      error TEXT,
+                                      actualizado REAL NOT NULL)""")
+
+    def _connection(self):
+        """Conexión SQLite del hilo actual"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def insert(self, job):
+        with self._connection() as connection:
+            connection.execute(f"INSERT INTO reportes_trabajos ({', '.join(CAMPOS_TRABAJO)}) VALUES (?, ?, ?, ?, ?, ?)",
+                               tuple(job[campo] for campo in CAMPOS_TRABAJO))
+
+    def update(self, job_id, fields):
+        columnas = ', '.join(f"{campo} = ?" for campo in fields)
+        with self._connection() as connection:
+            connection.execute(f"UPDATE reportes_trabajos SET {columnas} WHERE id = ?",
+                               (*fields.values(), job_id))
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            f"SELECT {', '.join(CAMPOS_TRABAJO)} FROM reportes_trabajos WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(CAMPOS_TRABAJO, row)) if row else None
+
+    def count_pending(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM reportes_trabajos WHERE estado IN ('pendiente', 'procesando')").fetchone()[0]
+
+    def purge(self, before, abandoned_before):
+        with self._connection() as connection:
+            connection.execute("""DELETE FROM reportes_trabajos
+                                  WHERE (estado IN ('listo', 'error') AND actualizado < ?)
+                                     OR (estado IN ('pendiente', 'procesando') AND actualizado < ?)""",
+                               (before, abandoned_before))
+
+def create_store(url):
+    """Almacén del estado de los trabajos: 'sqlite:///ruta.db' (compartido) o en memoria"""
+    if url.startswith('sqlite:///'):
+        try:
+            return EstadosSQLite(url[len('sqlite:///'):])
+        except Exception as e:
+            print(f"Error iniciando el estado de reportes '{url}': {e}")
+    return EstadosLocal()
+
+class ColaReportes:
+    """Cola de generación de reportes PDF fuera del ciclo de la petición"""
+
+    def __init__(self, max_workers=2, max_pending=20, job_ttl=3600, abandoned_ttl=24 * 3600, store=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        # Un trabajo pendiente o en proceso sin cambios en este tiempo quedó de un proceso que terminó a medias
+        self.abandoned_ttl = abandoned_ttl
+        # Con EstadosLocal la consulta de estado y la descarga deben llegar al mismo proceso
+        self.store = store or EstadosLocal()
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Crea el pool de hilos de trabajo de forma perezosa"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='reportes')
+        return self._executor
+
+    def submit(self, exploracion_id):
+        """Encola la generación del reporte; retorna el id del trabajo o None si la cola está llena"""
+        with self._lock:
+            # Olvida los trabajos terminados hace más de job_ttl y los abandonados hace más de abandoned_ttl
+            now = time.time()
+            self.store.purge(now - self.job_ttl, now - self.abandoned_ttl)
+            if self.store.count_pending() >= self.max_pending:
+                return None
+
+            job_id = uuid.uuid4().hex
+            self.store.insert({
+                'id': job_id,
+                'exploracion_id': exploracion_id,
+                'estado': 'pendiente',
+                'ruta': None,
+                'error': None,
+                'actualizado': time.time()
+            })
+            executor = self._get_executor()
+
+        executor.submit(self._run, job_id, exploracion_id)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        """Actualiza el estado de un trabajo"""
+        fields['actualizado'] = time.time()
+        self.store.update(job_id, fields)
+
+    def _run(self, job_id, exploracion_id):
+        """Genera el reporte en un hilo de trabajo"""
+        from .exploracion import Exploracion
+
+        self._update(job_id, estado='procesando')
+        try:
+            ruta = Exploracion.generate_medical_report(exploracion_id)
+            if ruta:
+                self._update(job_id, estado='listo', ruta=ruta)
+            else:
+                self._update(job_id, estado='error', error='No se encontró la exploración')
+        except Exception as e:
+            print(f"Error generando reporte en segundo plano: {e}")
+            self._update(job_id, estado='error', error=str(e))
+        finally:
+            # Devolver al pool la conexión que usó este hilo
+            db.disconnect()
+
+    def get_status(self, job_id):
+        """Retorna una copia del estado del trabajo o None si no existe"""
+        return self.store.get(job_id)
+
+# Instancia global; con varios procesos (gunicorn -w N) use un estado SQLite compartido:
+# MEDICALCENTER_REPORTES_ESTADO=sqlite:///ruta.db (por defecto, el de MEDICALCENTER_CACHE_BACKEND si es SQLite)
+cola_reportes = ColaReportes(store=create_store(
+    os.environ.get('MEDICALCENTER_REPORTES_ESTADO', os.environ.get('MEDICALCENTER_CACHE_BACKEND', 'local'))))
@@ -1,72 +1,310 @@
 import mysql.connector
 from mysql.connector import Error
+from .metricas import metricas, CursorInstrumentado
 import hashlib
+import os
+import threading
+import time
+from collections import deque
+
+class PoolTimeoutError(Error):
+    """Se agotó el tiempo de espera para obtener una conexión del pool"""
+    pass
+
+class ConnectionPool:
+    """Pool de conexiones MySQL seguro para múltiples hilos"""
+
+    def __init__(self, connect_args, min_size=2, max_size=10, checkout_timeout=5,
+                 idle_timeout=300, health_check_interval=30):
+        self.connect_args = connect_args
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        # Conexiones libres como (conexion, momento en que se devolvió)
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition(threading.Lock())
+
+    def _create_connection(self):
+        """Abre una conexión física nueva"""
+        return mysql.connector.connect(**self.connect_args)
+
+    def _close_connection(self, connection):
+        """Cierra una conexión física ignorando errores"""
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _is_healthy(self, connection, idle_since):
+        """Verifica la conexión antes de prestarla"""
+        # Una conexión usada hace poco se considera sana sin hacer ping
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def _reap_idle(self):
+        """Cierra las conexiones ociosas que exceden el mínimo del pool (requiere el lock)"""
+        now = time.monotonic()
+        expired = []
+        while self._size > self.min_size and self._idle and now - self._idle[0][1] > self.idle_timeout:
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            expired.append(connection)
+        return expired
+
+    def warm(self):
+        """Abre conexiones hasta tener min_size para que las primeras peticiones no esperen a MySQL"""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._create_connection()
+            except Error as e:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                print(f"Error al precalentar el pool de conexiones: {e}")
+                return
+            with self._condition:
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+
+    def acquire(self):
+        """Obtiene una conexión del pool, esperando como máximo checkout_timeout segundos"""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._condition:
+                expired = self._reap_idle()
+                candidate = None
+                create = False
+                while candidate is None and not create:
+                    if self._idle:
+                        # Las más recientes están al final: se reutilizan primero
+                        candidate = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise PoolTimeoutError(msg="No hay conexiones disponibles en el pool")
+                        self._condition.wait(remaining)
+
+            for connection in expired:
+                self._close_connection(connection)
+
+            if create:
+                try:
+                    return self._create_connection()
+                except Error:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+
+            connection, idle_since = candidate
+            if self._is_healthy(connection, idle_since):
+                return connection
+
+            # Conexión caída: se descarta y se intenta de nuevo
+            self._close_connection(connection)
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+
+    def release(self, connection):
+        """Devuelve una conexión al pool"""
+        try:
+            # Terminar cualquier transacción abierta para no arrastrar snapshots
+            connection.rollback()
+            healthy = connection.is_connected()
+        except Error:
+            healthy = False
+
+        with self._condition:
+            if healthy:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._size -= 1
+            self._condition.notify()
+
+        if not healthy:
+            self._close_connection(connection)
+
+    def close_all(self):
+        """Cierra todas las conexiones ociosas del pool"""
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        for connection in idle:
+            self._close_connection(connection)
 
 class Database:
     def __init__(self):
-        self.host = 'localhost'
-        self.database = 'medicalcenter'
-        self.user = 'root'
-        self.password = 'admin'
-        self.connection = None
-        self.cursor = None
-    
+        # Toda la configuración de conexión se toma de aquí (variables de entorno opcionales)
+        self.host = os.environ.get('MEDICALCENTER_DB_HOST', 'localhost')
+        self.port = int(os.environ.get('MEDICALCENTER_DB_PORT', 3306))
+        self.database = os.environ.get('MEDICALCENTER_DB_NAME', 'medicalcenter')
+        self.user = os.environ.get('MEDICALCENTER_DB_USER', 'root')
+        self.password = os.environ.get('MEDICALCENTER_DB_PASSWORD', 'admin')
+        self.connect_timeout = int(os.environ.get('MEDICALCENTER_DB_CONNECT_TIMEOUT', 10))
+
+        # Configuración del pool de conexiones
+        self.pool_min_size = int(os.environ.get('MEDICALCENTER_DB_POOL_MIN', 2))
+        self.pool_max_size = int(os.environ.get('MEDICALCENTER_DB_POOL_MAX', 10))
+        self.pool_checkout_timeout = float(os.environ.get('MEDICALCENTER_DB_POOL_TIMEOUT', 5))
+        self.pool_idle_timeout = float(os.environ.get('MEDICALCENTER_DB_POOL_IDLE', 300))
+        # Segundos sin uso tras los cuales se hace ping a una conexión antes de prestarla
+        self.pool_health_check_interval = float(os.environ.get('MEDICALCENTER_DB_POOL_HEALTH_CHECK', 30))
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Cada hilo (petición) tiene su propia conexión y cursor
+        self._local = threading.local()
+
+    @property
+    def pool(self):
+        """Crea el pool de forma perezosa con la configuración actual"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        connect_args={
+                            'host': self.host,
+                            'port': self.port,
+                            'database': self.database,
+                            'user': self.user,
+                            'password': self.password,
+                            'connection_timeout': self.connect_timeout
+                        },
+                        min_size=self.pool_min_size,
+                        max_size=self.pool_max_size,
+                        checkout_timeout=self.pool_checkout_timeout,
+                        idle_timeout=self.pool_idle_timeout,
+                        health_check_interval=self.pool_health_check_interval
+                    )
+                    self._pool.warm()
+        return self._pool
+
+    @property
+    def connection(self):
+        """Conexión asignada al hilo actual"""
+        return getattr(self._local, 'connection', None)
+
+    @property
+    def cursor(self):
+        """Cursor asignado al hilo actual"""
+        return getattr(self._local, 'cursor', None)
+
     def connect(self):
-        """Establece conexión con la base de datos"""
+        """Obtiene una conexión del pool para el hilo actual"""
+        if self.connection is not None:
+            # El hilo ya tiene una conexión: se reutiliza
+            return True
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
-            if self.connection.is_connected():
-                self.cursor = self.connection.cursor()
-                return True
+            connection = self.pool.acquire()
+            self._local.connection = connection
+            self._local.cursor = CursorInstrumentado(connection.cursor(), metricas)
+            return True
         except Error as e:
             print(f"Error al conectar a MySQL: {e}")
             return False
-        return False
-    
+
     def disconnect(self):
-        """Cierra la conexión con la base de datos"""
-        if self.connection and self.connection.is_connected():
+        """Devuelve la conexión del hilo actual al pool"""
+        connection = self.connection
+        if connection is None:
+            return
+        try:
             self.cursor.close()
-            self.connection.close()
-    
+        except Error:
+            pass
+        self._local.connection = None
+        self._local.cursor = None
+        self.pool.release(connection)
+
+    def get_cursor(self, dictionary=False):
+        """Retorna un cursor adicional sobre la conexión del hilo actual"""
+        if not self.connection and not self.connect():
+            return None
+        cursor = self.connection.cursor(dictionary=dictionary, buffered=True)
+        return CursorInstrumentado(cursor, metricas)
+
+    def commit(self):
+        """Confirma la transacción de la conexión del hilo actual"""
+        if self.connection:
+            self.connection.commit()
+
+    def rollback(self):
+        """Revierte la transacción de la conexión del hilo actual"""
+        if self.connection:
+            self.connection.rollback()
+
     def execute_query(self, query, params=None):
         """Ejecuta una consulta SELECT y retorna los resultados"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            
+            if not self.connection and not self.connect():
+                return None
+
             if params:
                 self.cursor.execute(query, params)
             else:
                 self.cursor.execute(query)
-            
+
             return self.cursor.fetchall()
         except Error as e:
             print(f"Error ejecutando consulta: {e}")
             return None
-    
+
     def execute_update(self, query, params=None):
         """Ejecuta una consulta INSERT, UPDATE o DELETE"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            
+            if not self.connection and not self.connect():
+                return 0
+
             if params:
                 self.cursor.execute(query, params)
             else:
                 self.cursor.execute(query)
-            
+
             self.connection.commit()
             return self.cursor.rowcount
         except Error as e:
             print(f"Error ejecutando actualización: {e}")
-            self.connection.rollback()
+            if self.connection:
+                self.connection.rollback()
             return 0
+
+    def stream_query(self, query, params=None, size=1000):
+        """Generador que lee una consulta SELECT por bloques de filas con un cursor sin buffer.
+        
+        Usa una conexión propia del pool (no la del hilo), que se devuelve al terminar o al
+        cerrar el generador, para que la respuesta pueda enviarse después de la petición.
+        """
+        connection = self.pool.acquire()
+        try:
+            cursor = CursorInstrumentado(connection.cursor(buffered=False), metricas)
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+        finally:
+            # Si quedaron filas sin leer el pool descarta la conexión
+            self.pool.release(connection)
     
     def get_last_insert_id(self):
         """Retorna el último ID insertado"""
@@ -78,4 +316,4 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 # Instancia global de la base de datos
-db = Database()
\ No newline at end of file
+db = Database()
@@ -0,0 +1,163 @@
+from .database import db
+from mysql.connector import Error
+from datetime import date, timedelta
+
+# Días que muestra el tablero si no se indica un rango
+DIAS_TABLERO = 30
+
+UPSERT_CITAS = """INSERT INTO resumen_citas_diario (fecha, id_medico, estatus, total)
+                  VALUES (%s, %s, %s, %s)
+                  ON DUPLICATE KEY UPDATE total = total + VALUES(total)"""
+
+UPSERT_EXPLORACIONES = """INSERT INTO resumen_exploraciones_diario (fecha, id_medico, total)
+                          VALUES (%s, %s, %s)
+                          ON DUPLICATE KEY UPDATE total = total + VALUES(total)"""
+
+class Estadisticas:
+    """Agregados diarios de citas y exploraciones que alimentan el tablero"""
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def _apply(query, filas):
+        """Suma los incrementos (positivos o negativos) en una sola transacción"""
+        if not filas:
+            return True
+        cursor = db.get_cursor()
+        try:
+            cursor.executemany(query, filas)
+            db.commit()
+            return True
+        except Error as e:
+            print(f"Error actualizando estadísticas: {e}")
+            db.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def move_cita(antes=None, despues=None):
+        """Pasa una cita de (fecha, id_medico, estatus) `antes` a `despues`; None si no existía o ya no existe"""
+        if antes == despues:
+            return True
+        filas = []
+        if antes:
+            filas.append((*antes, -1))
+        if despues:
+            filas.append((*despues, 1))
+        return Estadisticas._apply(UPSERT_CITAS, filas)
+
+    @staticmethod
+    def add_exploracion(fecha, medico_id, cantidad=1):
+        """Suma (o resta con cantidad negativa) exploraciones al día y médico indicados"""
+        return Estadisticas._apply(UPSERT_EXPLORACIONES, [(fecha, medico_id, cantidad)])
+
+    @staticmethod
+    def rebuild():
+        """Recalcula los agregados a partir de cita y exploracion en una sola transacción"""
+        cursor = db.get_cursor()
+        try:
+            cursor.execute("DELETE FROM resumen_citas_diario")
+            cursor.execute("""INSERT INTO resumen_citas_diario (fecha, id_medico, estatus, total)
+                              SELECT fecha, id_medico, estatus, COUNT(*) FROM cita
+                              GROUP BY fecha, id_medico, estatus""")
+            citas = cursor.rowcount
+            cursor.execute("DELETE FROM resumen_exploraciones_diario")
+            cursor.execute("""INSERT INTO resumen_exploraciones_diario (fecha, id_medico, total)
+                              SELECT fecha, id_medico, COUNT(*) FROM exploracion
+                              WHERE estatus = 1
+                              GROUP BY fecha, id_medico""")
+            exploraciones = cursor.rowcount
+            db.commit()
+            return citas, exploraciones
+        except Error as e:
+            print(f"Error reconstruyendo estadísticas: {e}")
+            db.rollback()
+            return None
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def default_range():
+        """Rango por defecto del tablero: los últimos DIAS_TABLERO días"""
+        hoy = date.today()
+        return hoy - timedelta(days=DIAS_TABLERO - 1), hoy
+
+    @staticmethod
+    def citas_por_dia(fecha_inicio, fecha_fin):
+        """Citas por día: total, canceladas y completadas"""
+        query = """SELECT fecha, SUM(total),
+                          SUM(IF(estatus = 'cancelada', total, 0)),
+                          SUM(IF(estatus = 'completada', total, 0))
+                   FROM resumen_citas_diario
+                   WHERE fecha BETWEEN %s AND %s
+                   GROUP BY fecha
+                   ORDER BY fecha"""
+        result = db.execute_query(query, (fecha_inicio, fecha_fin))
+        return [{
+            'fecha': row[0],
+            'total': int(row[1]),
+            'canceladas': int(row[2]),
+            'completadas': int(row[3])
+        } for row in result or []]
+
+    @staticmethod
+    def citas_por_medico(fecha_inicio, fecha_fin):
+        """Citas por médico en el rango con su tasa de cancelación"""
+        query = """SELECT r.id_medico, m.primer_nombre, m.apellido_paterno, m.especialidad,
+                          SUM(r.total), SUM(IF(r.estatus = 'cancelada', r.total, 0)),
+                          COUNT(DISTINCT r.fecha)
+                   FROM resumen_citas_diario r
+                   JOIN medicos m ON r.id_medico = m.id_medico
+                   WHERE r.fecha BETWEEN %s AND %s
+                   GROUP BY r.id_medico, m.primer_nombre, m.apellido_paterno, m.especialidad
+                   ORDER BY SUM(r.total) DESC"""
+        result = db.execute_query(query, (fecha_inicio, fecha_fin))
+        medicos = []
+        for row in result or []:
+            total, canceladas = int(row[4]), int(row[5])
+            medicos.append({
+                'id_medico': row[0],
+                'medico_nombre_completo': f"{row[1] or ''} {row[2] or ''}".strip(),
+                'especialidad': row[3],
+                'total': total,
+                'canceladas': canceladas,
+                'tasa_cancelacion': round(canceladas * 100 / total, 1) if total else 0.0,
+                'promedio_diario': round(total / row[6], 1) if row[6] else 0.0
+            })
+        return medicos
+
+    @staticmethod
+    def exploraciones_por_especialidad(fecha_inicio, fecha_fin):
+        """Exploraciones por especialidad del médico en el rango"""
+        query = """SELECT m.especialidad, SUM(r.total)
+                   FROM resumen_exploraciones_diario r
+                   JOIN medicos m ON r.id_medico = m.id_medico
+                   WHERE r.fecha BETWEEN %s AND %s
+                   GROUP BY m.especialidad
+                   ORDER BY SUM(r.total) DESC"""
+        result = db.execute_query(query, (fecha_inicio, fecha_fin))
+        return [{'especialidad': row[0], 'total': int(row[1])} for row in result or []]
+
+    @staticmethod
+    def get_dashboard(fecha_inicio, fecha_fin):
+        """Datos completos del tablero para un rango de fechas"""
+        por_dia = Estadisticas.citas_por_dia(fecha_inicio, fecha_fin)
+        total = sum(dia['total'] for dia in por_dia)
+        canceladas = sum(dia['canceladas'] for dia in por_dia)
+        alertas = db.execute_query("SELECT COUNT(*) FROM resumen_signos_vitales WHERE alertas > 0")
+        return {
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'totales': {
+                'citas': total,
+                'canceladas': canceladas,
+                'completadas': sum(dia['completadas'] for dia in por_dia),
+                'tasa_cancelacion': round(canceladas * 100 / total, 1) if total else 0.0,
+                'pacientes_con_alertas': int(alertas[0][0]) if alertas else 0
+            },
+            'citas_por_dia': por_dia,
+            'citas_por_medico': Estadisticas.citas_por_medico(fecha_inicio, fecha_fin),
+            'exploraciones_por_especialidad': Estadisticas.exploraciones_por_especialidad(fecha_inicio, fecha_fin)
+        }
@@ -1,35 +1,65 @@
 from .database import db
+from .paginacion import normalize_page_size, decode_cursor, nullable_keyset_condition, split_page
+from .secuencias import secuencias
+from .cache_datos import cache_datos, patient_namespace
 from datetime import datetime
 
 class Expediente:
     def __init__(self):
         pass
     
-    @staticmethod
-    def get_all():
-        """Obtiene todos los expedientes con información de paciente y médico"""
-        query = """SELECT exp.id, exp.paciente_id, exp.diagnostico, exp.fecha, exp.deleted,
+    # Consulta base de los listados de expedientes (sin ORDER BY ni LIMIT)
+    LIST_QUERY = """SELECT exp.id, exp.paciente_id, exp.diagnostico, exp.fecha, exp.deleted,
                           p.nombres as paciente_nombres, p.apellidos as paciente_apellidos
                    FROM expedientes exp
                    JOIN pacientes p ON exp.paciente_id = p.id_paciente AND p.estatus = 1
-                   WHERE exp.deleted = 0
-                   ORDER BY exp.fecha DESC"""
+                   WHERE exp.deleted = 0"""
+    
+    @staticmethod
+    def _from_row(exp_data):
+        """Convierte una fila del listado de expedientes en diccionario"""
+        return {
+            'id': exp_data[0],
+            'paciente_id': exp_data[1],
+            'diagnostico': exp_data[2],
+            'fecha': exp_data[3],
+            'deleted': exp_data[4],
+            'paciente_nombre_completo': f"{exp_data[5]} {exp_data[6]}".strip()
+        }
+    
+    @staticmethod
+    def get_all():
+        """Obtiene todos los expedientes con información de paciente y médico"""
+        query = Expediente.LIST_QUERY + " ORDER BY exp.fecha DESC"
         
         result = db.execute_query(query)
         
         expedientes = []
         if result:
             for exp_data in result:
-                expedientes.append({
-                    'id': exp_data[0],
-                    'paciente_id': exp_data[1],
-                    'diagnostico': exp_data[2],
-                    'fecha': exp_data[3],
-                    'deleted': exp_data[4],
-                    'paciente_nombre_completo': f"{exp_data[5]} {exp_data[6]}".strip()
-                })
+                expedientes.append(Expediente._from_row(exp_data))
         return expedientes
     
+    @staticmethod
+    def get_page(cursor=None, limit=None):
+        """Obtiene una página de expedientes, del más reciente al más antiguo (paginación por llave)"""
+        limit = normalize_page_size(limit)
+        after = decode_cursor(cursor, 2)
+        
+        query = Expediente.LIST_QUERY
+        params = []
+        if after:
+            # exp.fecha admite NULL: esos expedientes van al final y se recorren por id
+            condition, after_params = nullable_keyset_condition('exp.fecha', 'exp.id', after, descending=True)
+            query += " AND " + condition
+            params.extend(after_params)
+        query += " ORDER BY exp.fecha DESC, exp.id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, tuple(params))
+        rows, next_cursor = split_page(result, limit, lambda r: (r[3], r[0]))
+        return [Expediente._from_row(exp_data) for exp_data in rows], next_cursor
+    
     @staticmethod
     def get_by_id(expediente_id):
         """Obtiene un expediente por su ID con información completa"""
@@ -86,6 +116,7 @@ class Expediente:
                                          fecha_creacion))
         
         if result > 0:
+            cache_datos.invalidate(patient_namespace(exploracion['paciente_id']))
             return db.get_last_insert_id()
         return None
     
@@ -104,20 +135,34 @@ class Expediente:
                                          diagnostico_principal, fecha_creacion))
         
         if result > 0:
+            cache_datos.invalidate(patient_namespace(paciente_id))
             return db.get_last_insert_id()
         return None
     
+    @staticmethod
+    def _patient_id(expediente_id):
+        """Paciente de un expediente (para invalidar su resumen en caché); None si no existe"""
+        result = db.execute_query("SELECT paciente_id FROM expedientes WHERE id = %s", (expediente_id,))
+        return result[0][0] if result else None
+    
     @staticmethod
     def update(expediente_id, diagnostico_principal):
         """Actualiza un expediente existente"""
         query = "UPDATE expedientes SET diagnostico_principal = %s WHERE id = %s"
-        return db.execute_update(query, (diagnostico_principal, expediente_id)) > 0
+        if db.execute_update(query, (diagnostico_principal, expediente_id)) > 0:
+            cache_datos.invalidate(patient_namespace(Expediente._patient_id(expediente_id)))
+            return True
+        return False
     
     @staticmethod
     def delete(expediente_id):
         """Elimina un expediente"""
         query = "DELETE FROM expedientes WHERE id = %s"
-        return db.execute_update(query, (expediente_id,)) > 0
+        paciente_id = Expediente._patient_id(expediente_id)
+        if db.execute_update(query, (expediente_id,)) > 0:
+            cache_datos.invalidate(patient_namespace(paciente_id))
+            return True
+        return False
     
     @staticmethod
     def get_by_patient(paciente_id):
@@ -227,23 +272,8 @@ class Expediente:
         # Obtener el año actual
         year = datetime.now().year
         
-        # Buscar el último número de expediente del año
-        query = """SELECT numero_expediente FROM expedientes 
-                   WHERE numero_expediente LIKE %s 
-                   ORDER BY numero_expediente DESC LIMIT 1"""
-        
-        pattern = f"{year}-%"
-        result = db.execute_query(query, (pattern,))
-        
-        if result and result[0][0]:
-            # Extraer el número secuencial del último expediente
-            last_number = result[0][0]
-            try:
-                sequence = int(last_number.split('-')[1]) + 1
-            except (IndexError, ValueError):
-                sequence = 1
-        else:
-            sequence = 1
+        # Siguiente número de la secuencia del año (reserva atómica, sin buscar el último expediente)
+        sequence = secuencias.next('expediente', year)
         
         # Formatear el número con ceros a la izquierda
         return f"{year}-{sequence:04d}"
@@ -1,21 +1,68 @@
 from .database import db
+from .paginacion import normalize_page_size, decode_cursor, keyset_condition, split_page
+from .cache_reportes import cache_reportes
+from .signos_vitales import SignosVitales
+from .estadisticas import Estadisticas
+from .cache_datos import cache_datos, entity_namespace
+from .relaciones import exists
 from datetime import datetime
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
-import os
+from functools import lru_cache
+import hashlib
+import io
+import json
+
+# Incrementar al cambiar el diseño del reporte para invalidar la caché
+REPORT_LAYOUT_VERSION = 1
+
+# Máximo de exploraciones por exportación masiva
+MAX_EXPORT_SIZE = 500
+
+@lru_cache(maxsize=1)
+def report_styles():
+    """Estilos del reporte médico, construidos una sola vez por proceso"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            spaceAfter=30,
+            alignment=TA_CENTER
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            textColor=colors.darkblue
+        ),
+        'normal': styles['Normal']
+    }
+
+@lru_cache(maxsize=1)
+def report_table_style():
+    """Estilo compartido de las tablas del reporte"""
+    return TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ])
 
 class Exploracion:
     def __init__(self):
         pass
     
-    @staticmethod
-    def get_all():
-        """Obtiene todas las exploraciones con información de paciente y médico"""
-        query = """SELECT e.*, 
+    # Consulta base de los listados de exploraciones (sin ORDER BY ni LIMIT)
+    LIST_QUERY = """SELECT e.id_exploracion, e.id_cita, e.id_paciente, e.id_medico, e.fecha,
+                          e.peso, e.altura, e.temperatura, e.latidos_minuto, e.saturacion_oxigeno,
+                          e.glucosa, e.sintomas, e.diagnostico, e.tratamiento, e.estudios,
                           p.nombres as paciente_nombres, p.apellidos as paciente_apellidos,
                           m.primer_nombre as medico_primer_nombre, m.segundo_nombre as medico_segundo_nombre,
                           m.apellido_paterno as medico_apellido_paterno, m.apellido_materno as medico_apellido_materno, 
@@ -23,39 +70,67 @@ class Exploracion:
                    FROM exploracion e
                    JOIN pacientes p ON e.id_paciente = p.id_paciente AND p.estatus = 1
                    JOIN medicos m ON e.id_medico = m.id_medico AND m.estatus = 1
-                   WHERE e.estatus = 1
-                   ORDER BY e.fecha DESC"""
+                   WHERE e.estatus = 1"""
+    
+    @staticmethod
+    def _from_row(exp_data):
+        """Convierte una fila del listado de exploraciones en diccionario"""
+        return {
+            'id_exploracion': exp_data[0],
+            'id_cita': exp_data[1],
+            'id_paciente': exp_data[2],
+            'id_medico': exp_data[3],
+            'fecha': exp_data[4],
+            'peso': exp_data[5],
+            'altura': exp_data[6],
+            'temperatura': exp_data[7],
+            'latidos_minuto': exp_data[8],
+            'saturacion_oxigeno': exp_data[9],
+            'glucosa': exp_data[10],
+            'sintomas': exp_data[11],
+            'diagnostico': exp_data[12],
+            'tratamiento': exp_data[13],
+            'estudios': exp_data[14],
+            'paciente_nombre_completo': f"{exp_data[15]} {exp_data[16]}".strip(),
+            'medico_nombre_completo': f"{exp_data[17]} {exp_data[18] or ''} {exp_data[19]} {exp_data[20] or ''}".strip(),
+            'especialidad': exp_data[21]
+        }
+    
+    @staticmethod
+    def get_all():
+        """Obtiene todas las exploraciones con información de paciente y médico"""
+        query = Exploracion.LIST_QUERY + " ORDER BY e.fecha DESC"
         
         result = db.execute_query(query)
         
         exploraciones = []
         if result:
             for exp_data in result:
-                exploraciones.append({
-                    'id_exploracion': exp_data[0],
-                    'id_paciente': exp_data[1],
-                    'id_medico': exp_data[2],
-                    'fecha': exp_data[3],
-                    'peso': exp_data[4],
-                    'altura': exp_data[5],
-                    'temperatura': exp_data[6],
-                    'latidos_minuto': exp_data[7],
-                    'saturacion_oxigeno': exp_data[8],
-                    'sintomas': exp_data[9],
-                    'diagnostico': exp_data[10],
-                    'tratamiento': exp_data[11],
-                    'observaciones': exp_data[12],
-                    'eliminado': exp_data[13],
-                    'paciente_nombre_completo': exp_data[14],
-                    'medico_nombre_completo': f"{exp_data[15]} {exp_data[16] or ''} {exp_data[17]} {exp_data[18] or ''}".strip(),
-                    'especialidad': exp_data[19]
-                })
+                exploraciones.append(Exploracion._from_row(exp_data))
         return exploraciones
     
     @staticmethod
-    def get_by_id(exploracion_id):
-        """Obtiene una exploración por su ID con información completa"""
-        query = """SELECT e.id_exploracion, e.id_cita, e.id_paciente, e.id_medico, e.fecha, 
+    def get_page(cursor=None, limit=None):
+        """Obtiene una página de exploraciones, de la más reciente a la más antigua (paginación por llave)"""
+        limit = normalize_page_size(limit)
+        columns = ('e.fecha', 'e.id_exploracion')
+        after = decode_cursor(cursor, len(columns))
+        
+        query = Exploracion.LIST_QUERY
+        params = []
+        if after:
+            query += " AND " + keyset_condition(columns, descending=True)
+            params.extend(after)
+        query += " ORDER BY e.fecha DESC, e.id_exploracion DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, tuple(params))
+        # e.fecha es la quinta columna de LIST_QUERY
+        rows, next_cursor = split_page(result, limit, lambda r: (r[4], r[0]))
+        return [Exploracion._from_row(exp_data) for exp_data in rows], next_cursor
+    
+    # Consulta con la información completa que usa el reporte médico (sin ORDER BY ni LIMIT)
+    DETAIL_QUERY = """SELECT e.id_exploracion, e.id_cita, e.id_paciente, e.id_medico, e.fecha, 
                           e.peso, e.altura, e.temperatura, e.latidos_minuto, e.saturacion_oxigeno, 
                           e.glucosa, e.sintomas, e.diagnostico, e.tratamiento, e.estudios, e.estatus,
                           p.nombres as paciente_nombres, p.apellidos as paciente_apellidos, 
@@ -66,53 +141,95 @@ class Exploracion:
                    FROM exploracion e
                    JOIN pacientes p ON e.id_paciente = p.id_paciente AND p.estatus = 1
                    JOIN medicos m ON e.id_medico = m.id_medico AND m.estatus = 1
-                   WHERE e.id_exploracion = %s AND e.estatus = 1"""
+                   WHERE e.estatus = 1"""
+    
+    @staticmethod
+    def _detail_from_row(exp_data):
+        """Convierte una fila de DETAIL_QUERY en diccionario"""
+        return {
+            'id_exploracion': exp_data[0],
+            'id_cita': exp_data[1],
+            'id_paciente': exp_data[2],
+            'id_medico': exp_data[3],
+            'fecha': exp_data[4],
+            'peso': exp_data[5],
+            'altura': exp_data[6],
+            'temperatura': exp_data[7],
+            'latidos_minuto': exp_data[8],
+            'saturacion_oxigeno': exp_data[9],
+            'glucosa': exp_data[10],
+            'sintomas': exp_data[11],
+            'diagnostico': exp_data[12],
+            'tratamiento': exp_data[13],
+            'estudios': exp_data[14],
+            'estatus': exp_data[15],
+            'paciente_nombre_completo': f"{exp_data[16]} {exp_data[17]}".strip(),
+            'paciente_fecha_nacimiento': exp_data[18],
+            'paciente_genero': exp_data[19],
+            'medico_nombre_completo': f"{exp_data[20]} {exp_data[21] or ''} {exp_data[22]} {exp_data[23] or ''}".strip(),
+            'especialidad': exp_data[24],
+            'cedula_profesional': exp_data[25]
+        }
+    
+    @staticmethod
+    def get_by_id(exploracion_id):
+        """Obtiene una exploración por su ID con información completa"""
+        query = Exploracion.DETAIL_QUERY + " AND e.id_exploracion = %s"
         
         result = db.execute_query(query, (exploracion_id,))
         
         if result:
-            exp_data = result[0]
-            return {
-                'id_exploracion': exp_data[0],
-                'id_cita': exp_data[1],
-                'id_paciente': exp_data[2],
-                'id_medico': exp_data[3],
-                'fecha': exp_data[4],
-                'peso': exp_data[5],
-                'altura': exp_data[6],
-                'temperatura': exp_data[7],
-                'latidos_minuto': exp_data[8],
-                'saturacion_oxigeno': exp_data[9],
-                'glucosa': exp_data[10],
-                'sintomas': exp_data[11],
-                'diagnostico': exp_data[12],
-                'tratamiento': exp_data[13],
-                'estudios': exp_data[14],
-                'estatus': exp_data[15],
-                'paciente_nombre_completo': f"{exp_data[16]} {exp_data[17]}".strip(),
-                'paciente_fecha_nacimiento': exp_data[18],
-                'paciente_genero': exp_data[19],
-                'medico_nombre_completo': f"{exp_data[20]} {exp_data[21] or ''} {exp_data[22]} {exp_data[23] or ''}".strip(),
-                'especialidad': exp_data[24],
-                'cedula_profesional': exp_data[25]
-            }
+            return Exploracion._detail_from_row(result[0])
         return None
     
     @staticmethod
-    def create(paciente_id, medico_id, fecha_exploracion, peso, altura, temperatura, 
+    def is_active(exploracion_id):
+        """Indica si la exploración existe y no fue eliminada"""
+        return exists("SELECT 1 FROM exploracion WHERE id_exploracion = %s AND estatus = 1", (exploracion_id,))
+    
+    @staticmethod
+    def get_for_export(fecha_inicio=None, fecha_fin=None, medico_id=None, paciente_id=None, limit=MAX_EXPORT_SIZE):
+        """Obtiene en una sola consulta las exploraciones a exportar según los filtros"""
+        query = Exploracion.DETAIL_QUERY
+        params = []
+        if fecha_inicio:
+            query += " AND e.fecha >= %s"
+            params.append(fecha_inicio)
+        if fecha_fin:
+            query += " AND e.fecha <= %s"
+            params.append(fecha_fin)
+        if medico_id:
+            query += " AND e.id_medico = %s"
+            params.append(medico_id)
+        if paciente_id:
+            query += " AND e.id_paciente = %s"
+            params.append(paciente_id)
+        query += " ORDER BY e.fecha, e.id_exploracion LIMIT %s"
+        params.append(limit)
+        
+        result = db.execute_query(query, tuple(params))
+        return [Exploracion._detail_from_row(exp_data) for exp_data in result or []]
+    
+    @staticmethod
+    def create(cita_id, paciente_id, medico_id, fecha_exploracion, peso, altura, temperatura, 
                latidos_minuto, saturacion_oxigeno, glucosa, sintomas, diagnostico, tratamiento, estudios):
-        """Crea una nueva exploración"""
-        query = """INSERT INTO exploracion (id_paciente, id_medico, fecha, peso, altura, 
+        """Crea una nueva exploración ligada a la cita en la que se realizó"""
+        query = """INSERT INTO exploracion (id_cita, id_paciente, id_medico, fecha, peso, altura, 
                     temperatura, latidos_minuto, saturacion_oxigeno, glucosa, sintomas, diagnostico, 
                     tratamiento, estudios, estatus)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
         
-        result = db.execute_update(query, (paciente_id, medico_id, fecha_exploracion, peso, altura,
+        result = db.execute_update(query, (cita_id, paciente_id, medico_id, fecha_exploracion, peso, altura,
                                          temperatura, latidos_minuto, saturacion_oxigeno, glucosa, sintomas,
                                          diagnostico, tratamiento, estudios, 1))
         
         if result > 0:
-            return db.get_last_insert_id()
+            exploracion_id = db.get_last_insert_id()
+            SignosVitales.record_exploracion(exploracion_id, paciente_id, fecha_exploracion, peso, altura,
+                                             temperatura, latidos_minuto, saturacion_oxigeno, glucosa)
+            Estadisticas.add_exploracion(fecha_exploracion, medico_id)
+            cache_datos.invalidate('exploraciones')
+            return exploracion_id
         return None
     
     @staticmethod
@@ -124,15 +241,37 @@ class Exploracion:
                    saturacion_oxigeno = %s, glucosa = %s, sintomas = %s, diagnostico = %s, 
                    tratamiento = %s, estudios = %s WHERE id_exploracion = %s"""
         
-        return db.execute_update(query, (paciente_id, medico_id, fecha_exploracion, peso, altura,
-                                       temperatura, latidos_minuto, saturacion_oxigeno, glucosa, sintomas,
-                                       diagnostico, tratamiento, estudios, exploracion_id)) > 0
+        # El paciente, día y médico anteriores también se actualizan por si cambiaron
+        anterior = db.execute_query("""SELECT id_paciente, fecha, id_medico, estatus FROM exploracion
+                                       WHERE id_exploracion = %s""", (exploracion_id,))
+        if db.execute_update(query, (paciente_id, medico_id, fecha_exploracion, peso, altura,
+                                     temperatura, latidos_minuto, saturacion_oxigeno, glucosa, sintomas,
+                                     diagnostico, tratamiento, estudios, exploracion_id)) > 0:
+            if anterior and anterior[0][0] != int(paciente_id):
+                SignosVitales.refresh_patient(anterior[0][0])
+            SignosVitales.refresh_patient(paciente_id)
+            if anterior and anterior[0][3] == 1:
+                Estadisticas.add_exploracion(anterior[0][1], anterior[0][2], -1)
+                Estadisticas.add_exploracion(fecha_exploracion, medico_id)
+            cache_datos.invalidate('exploraciones')
+            cache_datos.invalidate(entity_namespace('exploracion', exploracion_id))
+            return True
+        return False
     
     @staticmethod
     def soft_delete(exploracion_id):
         """Marca una exploración como eliminada (soft delete)"""
-        query = "UPDATE exploracion SET eliminado = 1 WHERE id_exploracion = %s"
-        return db.execute_update(query, (exploracion_id,)) > 0
+        query = "UPDATE exploracion SET estatus = 0 WHERE id_exploracion = %s AND estatus = 1"
+        anterior = db.execute_query("SELECT fecha, id_medico FROM exploracion WHERE id_exploracion = %s",
+                                    (exploracion_id,))
+        if db.execute_update(query, (exploracion_id,)) > 0:
+            cache_reportes.invalidate(exploracion_id)
+            SignosVitales.refresh_exploracion(exploracion_id)
+            Estadisticas.add_exploracion(anterior[0][0], anterior[0][1], -1)
+            cache_datos.invalidate('exploraciones')
+            cache_datos.invalidate(entity_namespace('exploracion', exploracion_id))
+            return True
+        return False
     
     @staticmethod
     def get_by_patient(paciente_id):
@@ -258,45 +397,73 @@ class Exploracion:
         return errors
     
     @staticmethod
-    def generate_medical_report(exploracion_id):
-        """Genera un reporte médico en PDF"""
+    def report_version(exploracion):
+        """Calcula la versión (hash del contenido) del reporte de una exploración"""
+        content = json.dumps(exploracion, sort_keys=True, default=str)
+        digest = hashlib.sha256(f"{REPORT_LAYOUT_VERSION}:{content}".encode()).hexdigest()
+        return digest[:16]
+    
+    @staticmethod
+    def generate_medical_report(exploracion_id, exploracion=None):
+        """Genera un reporte médico en PDF (o lo toma de la caché si no ha cambiado)"""
         print(f"DEBUG: Iniciando generación de PDF para exploración {exploracion_id}")
-        exploracion = Exploracion.get_by_id(exploracion_id)
+        if exploracion is None:
+            exploracion = Exploracion.get_by_id(exploracion_id)
         print(f"DEBUG: Datos de exploración obtenidos: {exploracion is not None}")
         if not exploracion:
             print("DEBUG: No se encontró la exploración")
             return None
         
-        # Crear directorio de reportes si no existe
-        reports_dir = 'static/reports'
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
+        version = Exploracion.report_version(exploracion)
+        filepath = cache_reportes.lookup(exploracion_id, version)
+        if filepath:
+            return filepath
         
-        # Nombre del archivo
-        filename = f"reporte_medico_{exploracion_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        filepath = os.path.join(reports_dir, filename)
+        filepath = cache_reportes.store(exploracion_id, version,
+                                        lambda destino: Exploracion.build_medical_report(exploracion, destino))
+        print(f"DEBUG: PDF generado en: {filepath}")
         
-        # Crear el documento PDF
-        doc = SimpleDocTemplate(filepath, pagesize=letter)
-        story = []
+        return filepath
+    
+    @staticmethod
+    def render_medical_report(exploracion_id, exploracion=None):
+        """Genera el reporte médico en memoria y retorna los bytes del PDF"""
+        if exploracion is None:
+            exploracion = Exploracion.get_by_id(exploracion_id)
+        if not exploracion:
+            return None
         
-        # Estilos
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
+        buffer = io.BytesIO()
+        Exploracion.build_medical_report(exploracion, buffer)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def build_medical_report(exploracion, destino):
+        """Construye el PDF del reporte médico en destino (ruta o archivo)"""
+        doc = SimpleDocTemplate(destino, pagesize=letter)
+        doc.build(Exploracion.build_report_story(exploracion))
+    
+    @staticmethod
+    def build_merged_report(exploraciones, destino):
+        """Construye un solo PDF con el reporte de varias exploraciones, una por página"""
+        story = []
+        for exploracion in exploraciones:
+            if story:
+                story.append(PageBreak())
+            story.extend(Exploracion.build_report_story(exploracion))
+        doc = SimpleDocTemplate(destino, pagesize=letter)
+        doc.build(story)
+    
+    @staticmethod
+    def build_report_story(exploracion):
+        """Construye los elementos (flowables) del reporte médico de una exploración"""
+        story = []
         
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            textColor=colors.darkblue
-        )
+        # Estilos compartidos
+        styles = report_styles()
+        title_style = styles['title']
+        heading_style = styles['heading']
+        table_style = report_table_style()
         
         # Título
         story.append(Paragraph("RECETA MÉDICA", title_style))
@@ -312,12 +479,7 @@ class Exploracion:
         ]
         
         patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-        patient_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        patient_table.setStyle(table_style)
         story.append(patient_table)
         story.append(Spacer(1, 20))
         
@@ -330,12 +492,7 @@ class Exploracion:
         ]
         
         doctor_table = Table(doctor_data, colWidths=[2*inch, 4*inch])
-        doctor_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        doctor_table.setStyle(table_style)
         story.append(doctor_table)
         story.append(Spacer(1, 20))
         
@@ -351,38 +508,29 @@ class Exploracion:
         ]
         
         vitals_table = Table(vitals_data, colWidths=[2*inch, 4*inch])
-        vitals_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        vitals_table.setStyle(table_style)
         story.append(vitals_table)
         story.append(Spacer(1, 20))
         
         # Síntomas
         story.append(Paragraph("SÍNTOMAS", heading_style))
-        story.append(Paragraph(exploracion['sintomas'], styles['Normal']))
+        story.append(Paragraph(exploracion['sintomas'], styles['normal']))
         story.append(Spacer(1, 15))
         
         # Diagnóstico
         story.append(Paragraph("DIAGNÓSTICO", heading_style))
-        story.append(Paragraph(exploracion['diagnostico'], styles['Normal']))
+        story.append(Paragraph(exploracion['diagnostico'], styles['normal']))
         story.append(Spacer(1, 15))
         
         # Tratamiento
         story.append(Paragraph("TRATAMIENTO", heading_style))
-        story.append(Paragraph(exploracion['tratamiento'], styles['Normal']))
+        story.append(Paragraph(exploracion['tratamiento'], styles['normal']))
         story.append(Spacer(1, 15))
         
         # Estudios solicitados
         if exploracion['estudios']:
             story.append(Paragraph("ESTUDIOS SOLICITADOS", heading_style))
-            story.append(Paragraph(exploracion['estudios'], styles['Normal']))
+            story.append(Paragraph(exploracion['estudios'], styles['normal']))
             story.append(Spacer(1, 15))
         
-        # Generar el PDF
-        doc.build(story)
-        print(f"DEBUG: PDF generado en: {filepath}")
-        
-        return filepath
\ No newline at end of file
+        return story
\ No newline at end of file
@@ -0,0 +1,126 @@
+from .database import db
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import chain
+import csv
+import io
+import json
+
+# Filas leídas de la base de datos por bloque
+FETCH_SIZE = 1000
+
+# Definición de cada exportación: consulta, columnas y columnas usadas por los filtros
+EXPORTACIONES = {
+    'citas': {
+        'query': """SELECT c.id_cita, c.fecha, c.hora, c.id_paciente,
+                           CONCAT(p.nombres, ' ', p.apellidos),
+                           c.id_medico, CONCAT(m.primer_nombre, ' ', m.apellido_paterno),
+                           c.motivo, c.estatus
+                    FROM cita c
+                    JOIN pacientes p ON c.id_paciente = p.id_paciente
+                    JOIN medicos m ON c.id_medico = m.id_medico
+                    WHERE 1 = 1""",
+        'columnas': ('id_cita', 'fecha', 'hora', 'id_paciente', 'paciente', 'id_medico', 'medico',
+                     'motivo', 'estatus'),
+        'filtros': {'fecha': 'c.fecha', 'medico': 'c.id_medico', 'paciente': 'c.id_paciente'},
+        'orden': 'c.fecha, c.hora, c.id_cita'
+    },
+    'pacientes': {
+        'query': """SELECT id_paciente, nombres, apellidos, fecha_nacimiento, genero, tipo_sangre, alergias
+                    FROM pacientes
+                    WHERE estatus = 1""",
+        'columnas': ('id_paciente', 'nombres', 'apellidos', 'fecha_nacimiento', 'genero', 'tipo_sangre',
+                     'alergias'),
+        'filtros': {},
+        'orden': 'id_paciente'
+    },
+    'exploraciones': {
+        'query': """SELECT e.id_exploracion, e.fecha, e.id_cita, e.id_paciente,
+                           CONCAT(p.nombres, ' ', p.apellidos),
+                           e.id_medico, CONCAT(m.primer_nombre, ' ', m.apellido_paterno),
+                           e.peso, e.altura, e.temperatura, e.latidos_minuto, e.saturacion_oxigeno, e.glucosa,
+                           e.sintomas, e.diagnostico, e.tratamiento, e.estudios
+                    FROM exploracion e
+                    JOIN pacientes p ON e.id_paciente = p.id_paciente
+                    JOIN medicos m ON e.id_medico = m.id_medico
+                    WHERE e.estatus = 1""",
+        'columnas': ('id_exploracion', 'fecha', 'id_cita', 'id_paciente', 'paciente', 'id_medico', 'medico',
+                     'peso', 'altura', 'temperatura', 'latidos_minuto', 'saturacion_oxigeno', 'glucosa',
+                     'sintomas', 'diagnostico', 'tratamiento', 'estudios'),
+        'filtros': {'fecha': 'e.fecha', 'medico': 'e.id_medico', 'paciente': 'e.id_paciente'},
+        'orden': 'e.fecha, e.id_exploracion'
+    }
+}
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+
+def build_query(nombre, fecha_inicio=None, fecha_fin=None, medico_id=None, paciente_id=None):
+    """Arma la consulta de una exportación con los filtros que aplican; retorna (query, params)"""
+    definicion = EXPORTACIONES[nombre]
+    filtros = definicion['filtros']
+    query = definicion['query']
+    params = []
+
+    if fecha_inicio and 'fecha' in filtros:
+        query += f" AND {filtros['fecha']} >= %s"
+        params.append(fecha_inicio)
+    if fecha_fin and 'fecha' in filtros:
+        query += f" AND {filtros['fecha']} <= %s"
+        params.append(fecha_fin)
+    if medico_id and 'medico' in filtros:
+        query += f" AND {filtros['medico']} = %s"
+        params.append(medico_id)
+    if paciente_id and 'paciente' in filtros:
+        query += f" AND {filtros['paciente']} = %s"
+        params.append(paciente_id)
+
+    query += f" ORDER BY {definicion['orden']}"
+    return query, tuple(params)
+
+def _to_text(value):
+    """Convierte un valor de MySQL a texto para CSV/JSON"""
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        total_seconds = int(value.total_seconds())
+        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def csv_chunks(columnas, bloques):
+    """Genera el CSV por partes: encabezado y luego un fragmento por bloque de filas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columnas)
+    yield buffer.getvalue()
+
+    for rows in bloques:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_to_text(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+def ndjson_chunks(columnas, bloques):
+    """Genera JSON delimitado por saltos de línea: un objeto por fila"""
+    for rows in bloques:
+        yield ''.join(json.dumps(dict(zip(columnas, map(_to_text, row))), ensure_ascii=False) + '\n'
+                      for row in rows)
+
+def stream_export(nombre, formato, **filtros):
+    """Generador con el contenido de la exportación en el formato pedido"""
+    query, params = build_query(nombre, **filtros)
+    columnas = EXPORTACIONES[nombre]['columnas']
+    bloques = db.stream_query(query, params, FETCH_SIZE)
+    # Ejecutar la consulta antes de enviar la respuesta para poder reportar errores
+    primero = next(bloques, None)
+    if primero is not None:
+        bloques = chain([primero], bloques)
+    if formato == 'ndjson':
+        return ndjson_chunks(columnas, bloques)
+    return csv_chunks(columnas, bloques)
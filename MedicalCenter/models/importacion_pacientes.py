@@ -0,0 +1,163 @@
+from .database import db
+from .paciente import Paciente, search_index
+from .cache_datos import cache_datos
+from mysql.connector import Error
+from datetime import date, datetime
+import csv
+import io
+
+# Columnas esperadas en el archivo (la primera fila debe traer los encabezados)
+COLUMNAS = ('nombres', 'apellidos', 'fecha_nacimiento', 'genero', 'tipo_sangre', 'alergias')
+
+# Filas por transacción y máximo de errores que se guardan para el reporte
+CHUNK_SIZE = 1000
+MAX_ERRORES_REPORTE = 500
+
+INSERT_QUERY = """INSERT INTO pacientes (nombres, apellidos, fecha_nacimiento, genero, tipo_sangre, alergias, estatus)
+                  VALUES (%s, %s, %s, %s, %s, %s, 1)"""
+
+def normalize_header(header):
+    """Normaliza un encabezado: 'Fecha de Nacimiento' -> 'fecha_de_nacimiento'"""
+    return '_'.join(str(header or '').strip().lower().split())
+
+# Encabezados alternativos aceptados
+SINONIMOS = {
+    'nombre': 'nombres',
+    'apellido': 'apellidos',
+    'fecha_de_nacimiento': 'fecha_nacimiento',
+    'sexo': 'genero',
+    'género': 'genero',
+    'tipo_de_sangre': 'tipo_sangre',
+}
+
+def _map_headers(headers):
+    """Retorna los nombres de columna normalizados del archivo"""
+    mapped = []
+    for header in headers:
+        name = normalize_header(header)
+        mapped.append(SINONIMOS.get(name, name))
+    return mapped
+
+def iter_csv(stream, encoding='utf-8-sig'):
+    """Lee un CSV fila por fila desde un archivo binario; produce (número de fila, dict)"""
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    reader = csv.reader(text)
+    headers = _map_headers(next(reader, []))
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        yield reader.line_num, dict(zip(headers, row))
+
+def iter_excel(stream):
+    """Lee la primera hoja de un .xlsx fila por fila; produce (número de fila, dict)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Para importar archivos Excel se requiere el paquete openpyxl')
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = _map_headers(next(rows, ()))
+        for numero, row in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in row):
+                continue
+            yield numero, dict(zip(headers, row))
+    finally:
+        workbook.close()
+
+def iter_file(stream, filename):
+    """Elige el lector según la extensión del archivo"""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return iter_excel(stream)
+    if filename.lower().endswith(('.csv', '.txt')):
+        return iter_csv(stream)
+    raise ValueError('Formato no soportado: use un archivo .csv o .xlsx')
+
+def _clean(value):
+    """Convierte el valor de una celda a texto sin espacios sobrantes"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value).strip()
+
+class ResultadoImportacion:
+    """Resumen de una importación: contadores y errores por fila"""
+
+    def __init__(self):
+        self.procesadas = 0
+        self.insertadas = 0
+        self.con_errores = 0
+        self.errores = []
+
+    def add_error(self, fila, mensajes):
+        self.con_errores += 1
+        if len(self.errores) < MAX_ERRORES_REPORTE:
+            self.errores.append({'fila': fila, 'errores': mensajes})
+
+    def to_dict(self):
+        return {
+            'procesadas': self.procesadas,
+            'insertadas': self.insertadas,
+            'con_errores': self.con_errores,
+            'errores': self.errores,
+            'errores_omitidos': self.con_errores - len(self.errores)
+        }
+
+def _insert_chunk(batch, resultado):
+    """Inserta un lote de filas válidas en una sola transacción"""
+    cursor = db.get_cursor()
+    try:
+        cursor.executemany(INSERT_QUERY, [values for _, values in batch])
+        db.commit()
+        resultado.insertadas += len(batch)
+    except Error as e:
+        print(f"Error insertando lote de pacientes: {e}")
+        db.rollback()
+        for fila, _ in batch:
+            resultado.add_error(fila, [f'Error de base de datos al insertar el lote: {e.msg}'])
+    finally:
+        cursor.close()
+
+def _read_rows(filas, resultado):
+    """Produce las filas del archivo; si se corta por una codificación inválida lo reporta como error"""
+    fila = 1
+    try:
+        for fila, datos in filas:
+            yield fila, datos
+    except UnicodeDecodeError as e:
+        # Los lotes anteriores ya se guardaron: se reporta dónde se detuvo la lectura en lugar de perderlos
+        resultado.add_error(fila + 1, [f'No se pudo leer el resto del archivo después de la fila {fila}: '
+                                       f'no es UTF-8 válido ({e.reason})'])
+
+def importar_pacientes(filas, chunk_size=CHUNK_SIZE):
+    """Valida e inserta pacientes a partir de pares (número de fila, dict) en lotes"""
+    resultado = ResultadoImportacion()
+    batch = []
+
+    for fila, datos in _read_rows(filas, resultado):
+        resultado.procesadas += 1
+        valores = {columna: _clean(datos.get(columna)) for columna in COLUMNAS}
+        errores = Paciente.validate_form(valores['nombres'], valores['apellidos'], valores['fecha_nacimiento'],
+                                         valores['genero'], valores['tipo_sangre'])
+        if errores:
+            resultado.add_error(fila, list(errores.values()))
+            continue
+
+        batch.append((fila, (valores['nombres'], valores['apellidos'], valores['fecha_nacimiento'],
+                             valores['genero'], valores['tipo_sangre'], valores['alergias'] or None)))
+        if len(batch) >= chunk_size:
+            _insert_chunk(batch, resultado)
+            batch = []
+
+    if batch:
+        _insert_chunk(batch, resultado)
+
+    if resultado.insertadas:
+        # Las listas y el índice de búsqueda se reconstruyen en la siguiente lectura
+        search_index.invalidate()
+        cache_datos.invalidate('pacientes')
+    return resultado
@@ -1,37 +1,82 @@
 from .database import db
+from .paginacion import normalize_page_size, decode_cursor, keyset_condition, split_page
+from .busqueda import IndiceTrigramas
+from .cache_datos import cache_datos, entity_namespace
+from .registros import definir_registro
 from datetime import datetime
 import re
 
+def _load_search_documents():
+    """Documentos del índice de búsqueda: nombre completo y especialidad de cada médico activo"""
+    result = db.execute_query("""SELECT id_medico, primer_nombre, segundo_nombre, apellido_paterno,
+                                        apellido_materno, especialidad FROM medicos WHERE estatus = 1""")
+    if result is None:
+        return None
+    return [(row[0], ' '.join(value for value in row[1:] if value)) for row in result]
+
+# Índice de trigramas para búsquedas tipo "type-ahead"
+search_index = IndiceTrigramas(_load_search_documents)
+
+def _nombre_completo(m):
+    return f"{m.primer_nombre or ''} {m.segundo_nombre or ''} {m.apellido_paterno} {m.apellido_materno or ''}".strip()
+
+# Registro de una fila de SELECT * FROM medicos
+RegistroMedico = definir_registro(
+    'RegistroMedico',
+    ('id_medico', 'primer_nombre', 'segundo_nombre', 'apellido_paterno', 'apellido_materno',
+     'cedula_profesional', 'especialidad', 'correo', 'rfc', 'telefono', 'centro_medico', 'estatus', 'contrasena'),
+    nombre_completo=_nombre_completo
+)
+
+# Registro de la lista de médicos disponibles para citas
+RegistroMedicoDisponible = definir_registro(
+    'RegistroMedicoDisponible',
+    ('id_medico', '_primer_nombre', '_segundo_nombre', '_apellido_paterno', '_apellido_materno', 'especialidad'),
+    nombre_completo=lambda m: f"{m._primer_nombre} {m._segundo_nombre or ''} {m._apellido_paterno} {m._apellido_materno or ''}".strip()
+)
+
 class Medico:
     def __init__(self):
         pass
     
+    @staticmethod
+    def _from_row(medico_data):
+        """Convierte una fila de la tabla medicos en registro"""
+        return RegistroMedico(medico_data)
+    
     @staticmethod
     def get_all():
-        """Obtiene todos los médicos activos"""
+        """Obtiene todos los médicos activos (desde la caché de datos de referencia)"""
+        medicos = cache_datos.get('medicos', 'activos', Medico._load_all)
+        return list(medicos) if medicos else []
+    
+    @staticmethod
+    def _load_all():
+        """Lee todos los médicos activos de la base de datos; None si hubo error"""
         query = "SELECT * FROM medicos WHERE estatus = 1 ORDER BY primer_nombre, apellido_paterno"
         result = db.execute_query(query)
-        
-        medicos = []
-        if result:
-            for medico_data in result:
-                medicos.append({
-                    'id_medico': medico_data[0],
-                    'primer_nombre': medico_data[1],
-                    'segundo_nombre': medico_data[2],
-                    'apellido_paterno': medico_data[3],
-                    'apellido_materno': medico_data[4],
-                    'cedula_profesional': medico_data[5],
-                    'especialidad': medico_data[6],
-                    'correo': medico_data[7],
-                    'rfc': medico_data[8],
-                    'telefono': medico_data[9],
-                    'centro_medico': medico_data[10],
-                    'estatus': medico_data[11],
-                    'nombre_completo': f"{medico_data[1] or ''} {medico_data[2] or ''} {medico_data[3]} {medico_data[4] or ''}".strip(),
-                    'contrasena': medico_data[12]
-                })
-        return medicos
+        if result is None:
+            return None
+        return RegistroMedico.from_rows(result)
+    
+    @staticmethod
+    def get_page(cursor=None, limit=None):
+        """Obtiene una página de médicos activos (paginación por llave)"""
+        limit = normalize_page_size(limit)
+        columns = ('primer_nombre', 'apellido_paterno', 'id_medico')
+        after = decode_cursor(cursor, len(columns))
+        
+        query = "SELECT * FROM medicos WHERE estatus = 1"
+        params = []
+        if after:
+            query += " AND " + keyset_condition(columns)
+            params.extend(after)
+        query += " ORDER BY primer_nombre, apellido_paterno, id_medico LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, tuple(params))
+        rows, next_cursor = split_page(result, limit, lambda r: (r[1], r[3], r[0]))
+        return RegistroMedico.from_rows(rows), next_cursor
     
     @staticmethod
     def get_by_id(medico_id):
@@ -40,22 +85,7 @@ class Medico:
         result = db.execute_query(query, (medico_id,))
         
         if result:
-            medico_data = result[0]
-            return {
-                'id_medico': medico_data[0],
-                'primer_nombre': medico_data[1],
-                'segundo_nombre': medico_data[2],
-                'apellido_paterno': medico_data[3],
-                'apellido_materno': medico_data[4],
-                'cedula_profesional': medico_data[5],
-                'especialidad': medico_data[6],
-                'correo': medico_data[7],
-                'rfc': medico_data[8],
-                'telefono': medico_data[9],
-                'centro_medico': medico_data[10],
-                'estatus': medico_data[11],
-                'contrasena': medico_data[12]
-            }
+            return RegistroMedico(result[0])
         return None
     
     @staticmethod
@@ -83,7 +113,11 @@ class Medico:
                                                  centro_medico, 1, contrasena_hash))
                 
                 if medico_result > 0:
-                    return db.get_last_insert_id()
+                    medico_id = db.get_last_insert_id()
+                    search_index.add(medico_id, ' '.join(value for value in (
+                        primer_nombre, segundo_nombre, apellido_paterno, apellido_materno, especialidad) if value))
+                    cache_datos.invalidate('medicos')
+                    return medico_id
             
             return None
         except Exception as e:
@@ -98,46 +132,42 @@ class Medico:
                    apellido_materno = %s, especialidad = %s, cedula_profesional = %s, correo = %s,
                    rfc = %s, telefono = %s, centro_medico = %s WHERE id_medico = %s"""
         
-        return db.execute_update(query, (primer_nombre, segundo_nombre, apellido_paterno, apellido_materno,
-                                       especialidad, cedula_profesional, correo, rfc, telefono,
-                                       centro_medico, medico_id)) > 0
+        updated = db.execute_update(query, (primer_nombre, segundo_nombre, apellido_paterno, apellido_materno,
+                                          especialidad, cedula_profesional, correo, rfc, telefono,
+                                          centro_medico, medico_id)) > 0
+        if updated:
+            search_index.add(medico_id, ' '.join(value for value in (
+                primer_nombre, segundo_nombre, apellido_paterno, apellido_materno, especialidad) if value))
+            cache_datos.invalidate('medicos')
+            cache_datos.invalidate(entity_namespace('medico', medico_id))
+        return updated
     
     @staticmethod
     def delete(medico_id):
         """Elimina un médico"""
         query = "DELETE FROM medicos WHERE id_medico = %s"
-        return db.execute_update(query, (medico_id,)) > 0
+        deleted = db.execute_update(query, (medico_id,)) > 0
+        if deleted:
+            search_index.remove(medico_id)
+            cache_datos.invalidate('medicos')
+            cache_datos.invalidate(entity_namespace('medico', medico_id))
+        return deleted
     
     @staticmethod
-    def search(search_term):
-        """Busca médicos por nombre, apellido o especialidad"""
-        query = """SELECT * FROM medicos WHERE 
-                   primer_nombre LIKE %s OR segundo_nombre LIKE %s OR apellido_paterno LIKE %s OR 
-                   apellido_materno LIKE %s OR especialidad LIKE %s
-                   ORDER BY primer_nombre, apellido_paterno"""
-        
-        search_pattern = f"%{search_term}%"
-        result = db.execute_query(query, (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
-        
-        medicos = []
-        if result:
-            for medico_data in result:
-                medicos.append({
-                    'id_medico': medico_data[0],
-                    'primer_nombre': medico_data[1],
-                    'segundo_nombre': medico_data[2],
-                    'apellido_paterno': medico_data[3],
-                    'apellido_materno': medico_data[4],
-                    'cedula_profesional': medico_data[5],
-                    'especialidad': medico_data[6],
-                    'correo': medico_data[7],
-                    'rfc': medico_data[8],
-                    'telefono': medico_data[9],
-                    'centro_medico': medico_data[10],
-                    'estatus': medico_data[11],
-                    'contrasena': medico_data[12]
-                })
-        return medicos
+    def search(search_term, limit=50, offset=0):
+        """Busca médicos por nombre, apellido o especialidad (sin distinguir acentos ni mayúsculas)"""
+        ids = search_index.search(search_term, offset + limit)[offset:]
+        if not ids:
+            return []
+        
+        placeholders = ', '.join(['%s'] * len(ids))
+        # El índice puede tener médicos desactivados después de cargarse: se filtran aquí
+        query = f"SELECT * FROM medicos WHERE id_medico IN ({placeholders}) AND estatus = 1"
+        result = db.execute_query(query, tuple(ids))
+        
+        # Conservar el orden de relevancia del índice
+        rank = {medico_id: position for position, medico_id in enumerate(ids)}
+        return RegistroMedico.from_rows(sorted(result or (), key=lambda row: rank[row[0]]))
     
     @staticmethod
     def validate_data(nombre, apellido_paterno, apellido_materno, especialidad, cedula_profesional,
@@ -210,17 +240,15 @@ class Medico:
     
     @staticmethod
     def get_available_doctors():
-        """Obtiene médicos disponibles para citas"""
+        """Obtiene médicos disponibles para citas (desde la caché de datos de referencia)"""
+        medicos = cache_datos.get('medicos', 'disponibles', Medico._load_available_doctors)
+        return list(medicos) if medicos else []
+    
+    @staticmethod
+    def _load_available_doctors():
+        """Lee los médicos disponibles para citas; None si hubo error"""
         query = "SELECT id_medico, primer_nombre, segundo_nombre, apellido_paterno, apellido_materno, especialidad FROM medicos ORDER BY primer_nombre"
         result = db.execute_query(query)
-        
-        medicos = []
-        if result:
-            for medico_data in result:
-                nombre_completo = f"{medico_data[1]} {medico_data[2] or ''} {medico_data[3]} {medico_data[4] or ''}".strip()
-                medicos.append({
-                    'id_medico': medico_data[0],
-                    'nombre_completo': nombre_completo,
-                    'especialidad': medico_data[5]
-                })
-        return medicos
\ No newline at end of file
+        if result is None:
+            return None
+        return RegistroMedicoDisponible.from_rows(result)
\ No newline at end of file
@@ -0,0 +1,189 @@
+from collections import deque
+import threading
+import time
+
+# Límites (en segundos) de los buckets del histograma de latencia de consultas
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Endpoint asignado a las consultas hechas fuera de una petición (hilos de trabajo, CLI)
+SIN_PETICION = 'sin_peticion'
+
+class _MetricasEndpoint:
+    """Contadores acumulados de un endpoint"""
+
+    __slots__ = ('peticiones', 'consultas', 'errores', 'filas', 'segundos', 'buckets')
+
+    def __init__(self):
+        self.peticiones = 0
+        self.consultas = 0
+        self.errores = 0
+        self.filas = 0
+        self.segundos = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+class Metricas:
+    """Registro en memoria de consultas a la base de datos por endpoint de Flask"""
+
+    def __init__(self, slow_query_seconds=0.2, max_slow_samples=50):
+        self.slow_query_seconds = slow_query_seconds
+        self._endpoints = {}
+        self._slow = deque(maxlen=max_slow_samples)
+        self._lock = threading.Lock()
+        # Endpoint y número de consultas de la petición en curso en cada hilo
+        self._local = threading.local()
+
+    def _get(self, endpoint):
+        """Contadores del endpoint, creándolos si no existen (requiere el lock)"""
+        metricas = self._endpoints.get(endpoint)
+        if metricas is None:
+            metricas = self._endpoints[endpoint] = _MetricasEndpoint()
+        return metricas
+
+    def current_endpoint(self):
+        """Endpoint de la petición que atiende el hilo actual"""
+        return getattr(self._local, 'endpoint', None) or SIN_PETICION
+
+    def begin_request(self, endpoint):
+        """Marca el inicio de una petición en el hilo actual"""
+        self._local.endpoint = endpoint
+        self._local.consultas = 0
+
+    def end_request(self, budget=None):
+        """Cierra la petición del hilo actual; avisa si excedió el presupuesto de consultas"""
+        endpoint = getattr(self._local, 'endpoint', None)
+        consultas = getattr(self._local, 'consultas', 0)
+        self._local.endpoint = None
+        self._local.consultas = 0
+        if endpoint is None:
+            return consultas
+
+        with self._lock:
+            self._get(endpoint).peticiones += 1
+
+        if budget and consultas > budget:
+            print(f"ADVERTENCIA: posible N+1 en {endpoint}: {consultas} consultas "
+                  f"(presupuesto {budget})")
+        return consultas
+
+    def record_query(self, sql, seconds, error=False):
+        """Registra la ejecución de una consulta"""
+        endpoint = self.current_endpoint()
+        self._local.consultas = getattr(self._local, 'consultas', 0) + 1
+
+        with self._lock:
+            metricas = self._get(endpoint)
+            metricas.consultas += 1
+            metricas.segundos += seconds
+            if error:
+                metricas.errores += 1
+            for i, limite in enumerate(LATENCY_BUCKETS):
+                if seconds <= limite:
+                    metricas.buckets[i] += 1
+                    break
+
+            if seconds >= self.slow_query_seconds:
+                self._slow.append({
+                    'endpoint': endpoint,
+                    'segundos': round(seconds, 4),
+                    'consulta': ' '.join(str(sql).split())[:500],
+                    'momento': time.time()
+                })
+
+    def record_rows(self, rows):
+        """Suma las filas leídas por la petición actual"""
+        if rows <= 0:
+            return
+        with self._lock:
+            self._get(self.current_endpoint()).filas += rows
+
+    def slow_queries(self):
+        """Muestras más recientes de consultas lentas"""
+        with self._lock:
+            return list(self._slow)
+
+    def render_prometheus(self):
+        """Exporta las métricas en el formato de texto de Prometheus"""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lineas = []
+
+            def familia(nombre, tipo, ayuda):
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+
+            familia('medicalcenter_http_requests_total', 'counter', 'Peticiones atendidas por endpoint')
+            for endpoint, m in endpoints:
+                lineas.append(f'medicalcenter_http_requests_total{{endpoint="{endpoint}"}} {m.peticiones}')
+
+            familia('medicalcenter_db_queries_total', 'counter', 'Consultas ejecutadas por endpoint')
+            for endpoint, m in endpoints:
+                lineas.append(f'medicalcenter_db_queries_total{{endpoint="{endpoint}"}} {m.consultas}')
+
+            familia('medicalcenter_db_query_errors_total', 'counter', 'Consultas con error por endpoint')
+            for endpoint, m in endpoints:
+                lineas.append(f'medicalcenter_db_query_errors_total{{endpoint="{endpoint}"}} {m.errores}')
+
+            familia('medicalcenter_db_rows_total', 'counter', 'Filas leídas por endpoint')
+            for endpoint, m in endpoints:
+                lineas.append(f'medicalcenter_db_rows_total{{endpoint="{endpoint}"}} {m.filas}')
+
+            familia('medicalcenter_db_query_seconds', 'histogram', 'Latencia de las consultas por endpoint')
+            for endpoint, m in endpoints:
+                acumulado = 0
+                for limite, cantidad in zip(LATENCY_BUCKETS, m.buckets):
+                    acumulado += cantidad
+                    lineas.append(f'medicalcenter_db_query_seconds_bucket{{endpoint="{endpoint}",le="{limite}"}} {acumulado}')
+                lineas.append(f'medicalcenter_db_query_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {m.consultas}')
+                lineas.append(f'medicalcenter_db_query_seconds_sum{{endpoint="{endpoint}"}} {m.segundos:.6f}')
+                lineas.append(f'medicalcenter_db_query_seconds_count{{endpoint="{endpoint}"}} {m.consultas}')
+
+        return '\n'.join(lineas) + '\n'
+
+class CursorInstrumentado:
+    """Envoltura de un cursor de MySQL que registra tiempos y filas en las métricas"""
+
+    def __init__(self, cursor, metricas):
+        self._cursor = cursor
+        self._metricas = metricas
+
+    def _timed(self, method, sql, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resultado = method(sql, *args, **kwargs)
+        except Exception:
+            self._metricas.record_query(sql, time.perf_counter() - inicio, error=True)
+            raise
+        self._metricas.record_query(sql, time.perf_counter() - inicio)
+        return resultado
+
+    def execute(self, sql, *args, **kwargs):
+        return self._timed(self._cursor.execute, sql, *args, **kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._timed(self._cursor.executemany, sql, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._metricas.record_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._metricas.record_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._metricas.record_rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        # rowcount, lastrowid, description, close, etc.
+        return getattr(self._cursor, name)
+
+# Instancia global de las métricas
+metricas = Metricas()
@@ -0,0 +1,129 @@
+from .database import db
+from mysql.connector import Error
+import os
+import re
+
+# Carpeta con los archivos de migración NNNN_nombre.sql
+MIGRACIONES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migraciones')
+
+_ARCHIVO_MIGRACION = re.compile(r'^(\d{4})_(\w+)\.sql$')
+_FIN_SENTENCIA = re.compile(r';[ \t]*$', re.MULTILINE)
+_SECCION = re.compile(r'^--\s*\+(up|down)\s*$', re.MULTILINE)
+
+def split_statements(sql):
+    """Separa un script en sentencias (terminadas en ';' al final de la línea), sin comentarios"""
+    sentencias = []
+    for parte in _FIN_SENTENCIA.split(sql):
+        codigo = '\n'.join(linea for linea in parte.splitlines() if not linea.strip().startswith('--')).strip()
+        if codigo:
+            sentencias.append(codigo)
+    return sentencias
+
+class Migracion:
+    """Una migración: versión, nombre y sentencias para aplicarla (up) y revertirla (down)"""
+
+    def __init__(self, version, nombre, up, down):
+        self.version = version
+        self.nombre = nombre
+        self.up = up
+        self.down = down
+
+    @classmethod
+    def from_file(cls, path):
+        """Lee un archivo con secciones '-- +up' y '-- +down'"""
+        match = _ARCHIVO_MIGRACION.match(os.path.basename(path))
+        if not match:
+            raise ValueError(f"Nombre de migración inválido: {os.path.basename(path)}")
+        with open(path, encoding='utf-8') as archivo:
+            partes = _SECCION.split(archivo.read())
+
+        secciones = dict(zip(partes[1::2], partes[2::2]))
+        if 'up' not in secciones:
+            raise ValueError(f"La migración {os.path.basename(path)} no tiene sección '-- +up'")
+        return cls(int(match.group(1)), match.group(2), split_statements(secciones['up']),
+                   split_statements(secciones.get('down', '')))
+
+    def __repr__(self):
+        return f"Migracion({self.version:04d}_{self.nombre})"
+
+def load_migrations(directorio=MIGRACIONES_DIR):
+    """Migraciones de la carpeta ordenadas por versión"""
+    migraciones = [Migracion.from_file(os.path.join(directorio, archivo))
+                   for archivo in sorted(os.listdir(directorio)) if archivo.endswith('.sql')]
+    versiones = [migracion.version for migracion in migraciones]
+    if len(versiones) != len(set(versiones)):
+        raise ValueError("Hay dos migraciones con la misma versión")
+    return migraciones
+
+class Migrador:
+    """Aplica y revierte migraciones registrando las versiones en la tabla schema_version.
+
+    MySQL confirma cada sentencia DDL por separado: si una migración falla a la mitad
+    se detiene el proceso y la versión no se registra, para corregirla a mano.
+    """
+
+    def __init__(self, directorio=MIGRACIONES_DIR):
+        self.directorio = directorio
+
+    def _ensure_table(self):
+        db.execute_update("""CREATE TABLE IF NOT EXISTS schema_version (
+                               version   INT NOT NULL,
+                               nombre    VARCHAR(100) COLLATE utf8mb4_general_ci NOT NULL,
+                               aplicada  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                               PRIMARY KEY (version)
+                             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci""")
+
+    def applied_versions(self):
+        """Versiones ya aplicadas en la base de datos"""
+        self._ensure_table()
+        result = db.execute_query("SELECT version FROM schema_version")
+        if result is None:
+            raise Error(msg="No se pudo leer la tabla schema_version")
+        return {row[0] for row in result}
+
+    def current_version(self):
+        """Versión más alta aplicada (0 si ninguna)"""
+        return max(self.applied_versions(), default=0)
+
+    def status(self):
+        """Lista de (migración, aplicada) en orden de versión"""
+        aplicadas = self.applied_versions()
+        return [(migracion, migracion.version in aplicadas) for migracion in load_migrations(self.directorio)]
+
+    def _run(self, sentencias, registro, params):
+        """Ejecuta las sentencias de una migración y registra el cambio de versión"""
+        cursor = db.get_cursor()
+        try:
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+            cursor.execute(registro, params)
+            db.commit()
+        except Error:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def migrate(self, objetivo=None):
+        """Lleva el esquema a la versión `objetivo` (la última si es None); retorna [(acción, migración)]"""
+        migraciones = load_migrations(self.directorio)
+        aplicadas = self.applied_versions()
+        if objetivo is None:
+            objetivo = max((migracion.version for migracion in migraciones), default=0)
+
+        pasos = []
+        # Primero se revierten las posteriores al objetivo, de la más nueva a la más vieja
+        for migracion in reversed(migraciones):
+            if migracion.version > objetivo and migracion.version in aplicadas:
+                self._run(migracion.down, "DELETE FROM schema_version WHERE version = %s",
+                          (migracion.version,))
+                pasos.append(('revertida', migracion))
+        for migracion in migraciones:
+            if migracion.version <= objetivo and migracion.version not in aplicadas:
+                self._run(migracion.up, "INSERT INTO schema_version (version, nombre) VALUES (%s, %s)",
+                          (migracion.version, migracion.nombre))
+                pasos.append(('aplicada', migracion))
+        return pasos
+
+# Instancia global sobre la carpeta migraciones/
+migrador = Migrador()
@@ -1,32 +1,70 @@
 from .database import db
+from .paginacion import normalize_page_size, decode_cursor, keyset_condition, split_page
+from .busqueda import IndiceTrigramas
+from .cache_datos import cache_datos, patient_namespace
+from .registros import definir_registro
 from datetime import datetime, date
 import re
 
+def _load_search_documents():
+    """Documentos del índice de búsqueda: pacientes activos por nombre completo"""
+    result = db.execute_query("SELECT id_paciente, nombres, apellidos FROM pacientes WHERE estatus = 1")
+    if result is None:
+        return None
+    return [(row[0], f"{row[1]} {row[2]}") for row in result]
+
+# Índice de trigramas para búsquedas tipo "type-ahead"
+search_index = IndiceTrigramas(_load_search_documents)
+
+# Registro de una fila de SELECT * FROM pacientes
+RegistroPaciente = definir_registro(
+    'RegistroPaciente',
+    ('id_paciente', 'nombres', 'apellidos', 'fecha_nacimiento', 'genero', 'tipo_sangre', 'alergias', 'estatus'),
+    nombre_completo=lambda p: f"{p.nombres} {p.apellidos}".strip()
+)
+
 class Paciente:
     def __init__(self):
         pass
     
+    @staticmethod
+    def _from_row(paciente_data):
+        """Convierte una fila de la tabla pacientes en registro"""
+        return RegistroPaciente(paciente_data)
+    
     @staticmethod
     def get_all():
-        """Obtiene todos los pacientes activos"""
+        """Obtiene todos los pacientes activos (desde la caché de datos de referencia)"""
+        pacientes = cache_datos.get('pacientes', 'activos', Paciente._load_all)
+        return list(pacientes) if pacientes else []
+    
+    @staticmethod
+    def _load_all():
+        """Lee todos los pacientes activos de la base de datos; None si hubo error"""
         query = "SELECT * FROM pacientes WHERE estatus = 1 ORDER BY nombres, apellidos"
         result = db.execute_query(query)
-        
-        pacientes = []
-        if result:
-            for paciente_data in result:
-                pacientes.append({
-                    'id_paciente': paciente_data[0],
-                    'nombres': paciente_data[1],
-                    'apellidos': paciente_data[2],
-                    'fecha_nacimiento': paciente_data[3],
-                    'genero': paciente_data[4],
-                    'tipo_sangre': paciente_data[5],
-                    'alergias': paciente_data[6],
-                    'estatus': paciente_data[7],
-                    'nombre_completo': f"{paciente_data[1]} {paciente_data[2]}".strip()
-                })
-        return pacientes
+        if result is None:
+            return None
+        return RegistroPaciente.from_rows(result)
+    
+    @staticmethod
+    def get_page(cursor=None, limit=None):
+        """Obtiene una página de pacientes activos (paginación por llave)"""
+        limit = normalize_page_size(limit)
+        columns = ('nombres', 'apellidos', 'id_paciente')
+        after = decode_cursor(cursor, len(columns))
+        
+        query = "SELECT * FROM pacientes WHERE estatus = 1"
+        params = []
+        if after:
+            query += " AND " + keyset_condition(columns)
+            params.extend(after)
+        query += " ORDER BY nombres, apellidos, id_paciente LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, tuple(params))
+        rows, next_cursor = split_page(result, limit, lambda r: (r[1], r[2], r[0]))
+        return RegistroPaciente.from_rows(rows), next_cursor
     
     @staticmethod
     def get_by_id(paciente_id):
@@ -35,17 +73,7 @@ class Paciente:
         result = db.execute_query(query, (paciente_id,))
         
         if result:
-            paciente_data = result[0]
-            return {
-                'id_paciente': paciente_data[0],
-                'nombres': paciente_data[1],
-                'apellidos': paciente_data[2],
-                'fecha_nacimiento': paciente_data[3],
-                'genero': paciente_data[4],
-                'tipo_sangre': paciente_data[5],
-                'alergias': paciente_data[6],
-                'estatus': paciente_data[7]
-            }
+            return RegistroPaciente(result[0])
         return None
     
     @staticmethod
@@ -57,7 +85,10 @@ class Paciente:
         result = db.execute_update(query, (nombres, apellidos, fecha_nacimiento, genero, tipo_sangre, alergias, 1))
         
         if result > 0:
-            return db.get_last_insert_id()
+            paciente_id = db.get_last_insert_id()
+            search_index.add(paciente_id, f"{nombres} {apellidos}")
+            cache_datos.invalidate('pacientes')
+            return paciente_id
         return None
     
     @staticmethod
@@ -66,38 +97,83 @@ class Paciente:
         query = """UPDATE pacientes SET nombres = %s, apellidos = %s, fecha_nacimiento = %s,
                    genero = %s, tipo_sangre = %s, alergias = %s WHERE id_paciente = %s"""
         
-        return db.execute_update(query, (nombres, apellidos, fecha_nacimiento, genero, tipo_sangre, alergias, paciente_id)) > 0
+        updated = db.execute_update(query, (nombres, apellidos, fecha_nacimiento, genero, tipo_sangre, alergias, paciente_id)) > 0
+        if updated:
+            search_index.add(paciente_id, f"{nombres} {apellidos}")
+            cache_datos.invalidate('pacientes')
+            cache_datos.invalidate(patient_namespace(paciente_id))
+        return updated
     
     @staticmethod
     def delete(paciente_id):
         """Elimina un paciente (soft delete)"""
         query = "UPDATE pacientes SET estatus = 0 WHERE id_paciente = %s"
-        return db.execute_update(query, (paciente_id,)) > 0
+        deleted = db.execute_update(query, (paciente_id,)) > 0
+        if deleted:
+            search_index.remove(paciente_id)
+            cache_datos.invalidate('pacientes')
+            cache_datos.invalidate(patient_namespace(paciente_id))
+        return deleted
+    
+    @staticmethod
+    def search(search_term, limit=50, offset=0):
+        """Busca pacientes por nombre o apellido (sin distinguir acentos ni mayúsculas)"""
+        ids = search_index.search(search_term, offset + limit)[offset:]
+        if not ids:
+            return []
+        
+        placeholders = ', '.join(['%s'] * len(ids))
+        query = f"SELECT * FROM pacientes WHERE estatus = 1 AND id_paciente IN ({placeholders})"
+        result = db.execute_query(query, tuple(ids))
+        
+        # Conservar el orden de relevancia del índice
+        rank = {paciente_id: position for position, paciente_id in enumerate(ids)}
+        return RegistroPaciente.from_rows(sorted(result or (), key=lambda row: rank[row[0]]))
+    
+    # Valores aceptados por el formulario de pacientes
+    GENEROS = ('Masculino', 'Femenino')
+    TIPOS_SANGRE = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-', 'Desconocido')
     
     @staticmethod
-    def search(search_term):
-        """Busca pacientes por nombre o apellido"""
-        query = """SELECT * FROM pacientes WHERE estatus = 1 AND
-                   (nombres LIKE %s OR apellidos LIKE %s)
-                   ORDER BY nombres, apellidos"""
+    def validate_form(nombres, apellidos, fecha_nacimiento, genero, tipo_sangre):
+        """Valida los datos de alta de un paciente; retorna {campo: mensaje} con los errores"""
+        errores = {}
+        
+        if not nombres:
+            errores['nombres'] = 'Los nombres son requeridos'
+        elif len(nombres) < 2:
+            errores['nombres'] = 'Los nombres deben tener al menos 2 caracteres'
+        elif not nombres.replace(' ', '').isalpha():
+            errores['nombres'] = 'Los nombres solo pueden contener letras'
+        
+        if not apellidos:
+            errores['apellidos'] = 'Los apellidos son requeridos'
+        elif len(apellidos) < 2:
+            errores['apellidos'] = 'Los apellidos deben tener al menos 2 caracteres'
+        elif not apellidos.replace(' ', '').isalpha():
+            errores['apellidos'] = 'Los apellidos solo pueden contener letras'
         
-        search_pattern = f"%{search_term}%"
-        result = db.execute_query(query, (search_pattern, search_pattern))
+        if not fecha_nacimiento:
+            errores['fecha_nacimiento'] = 'La fecha de nacimiento es requerida'
+        else:
+            try:
+                fecha_nac = datetime.strptime(fecha_nacimiento, '%Y-%m-%d')
+                if fecha_nac.date() > datetime.now().date():
+                    errores['fecha_nacimiento'] = 'La fecha de nacimiento no puede ser en el futuro'
+            except ValueError:
+                errores['fecha_nacimiento'] = 'Formato de fecha inválido'
         
-        pacientes = []
-        if result:
-            for paciente_data in result:
-                pacientes.append({
-                    'id_paciente': paciente_data[0],
-                    'nombres': paciente_data[1],
-                    'apellidos': paciente_data[2],
-                    'fecha_nacimiento': paciente_data[3],
-                    'genero': paciente_data[4],
-                    'tipo_sangre': paciente_data[5],
-                    'alergias': paciente_data[6],
-                    'estatus': paciente_data[7]
-                })
-        return pacientes
+        if not genero:
+            errores['genero'] = 'El género es requerido'
+        elif genero not in Paciente.GENEROS:
+            errores['genero'] = 'El género debe ser Masculino o Femenino'
+        
+        if not tipo_sangre:
+            errores['tipo_sangre'] = 'El tipo de sangre es requerido'
+        elif tipo_sangre not in Paciente.TIPOS_SANGRE:
+            errores['tipo_sangre'] = 'Tipo de sangre inválido'
+        
+        return errores
     
     @staticmethod
     def validate_data(nombre, apellido_paterno, apellido_materno, fecha_nacimiento, genero,
@@ -0,0 +1,65 @@
+import base64
+import json
+
+# Límites de tamaño de página para listas y endpoints /api/*
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def normalize_page_size(limit):
+    """Convierte el tamaño de página solicitado a un entero dentro de los límites"""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(values):
+    """Codifica los valores de la llave de orden de la última fila en un token opaco"""
+    raw = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token, size):
+    """Decodifica un token de cursor; retorna None si es inválido"""
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(token + padding).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+def keyset_condition(columns, descending=False):
+    """Genera la condición de búsqueda por llave, p. ej. (a, b, c) < (%s, %s, %s)"""
+    operator = '<' if descending else '>'
+    placeholders = ', '.join(['%s'] * len(columns))
+    return f"({', '.join(columns)}) {operator} ({placeholders})"
+
+def nullable_keyset_condition(column, tiebreaker, after, descending=False):
+    """Condición de búsqueda por llave (column, tiebreaker) cuando column admite NULL.
+
+    MySQL ordena NULL como el menor valor (al final en orden descendente), y una
+    comparación de filas con NULL nunca es verdadera, así que se separa el caso.
+    Retorna (condición, parámetros).
+    """
+    value, last_id = after
+    operator = '<' if descending else '>'
+    if value is None:
+        condition = f"({column} IS NULL AND {tiebreaker} {operator} %s)"
+        if not descending:
+            condition = f"({condition} OR {column} IS NOT NULL)"
+        return condition, [last_id]
+    condition = f"({column}, {tiebreaker}) {operator} (%s, %s)"
+    if descending:
+        condition = f"({condition} OR {column} IS NULL)"
+    return condition, [value, last_id]
+
+def split_page(rows, limit, key):
+    """Separa la fila extra de control y calcula el cursor de la siguiente página"""
+    rows = rows or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1]))
+    return rows, None
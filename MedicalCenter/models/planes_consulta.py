@@ -0,0 +1,77 @@
+from .database import db
+from .cita import Cita
+from .expediente import Expediente
+from .signos_vitales import SERIES_QUERY
+
+# Con menos filas estimadas MySQL puede preferir leer la tabla completa aunque exista el
+# índice; en ese caso solo se verifica que el índice exista
+MIN_FILAS_PLAN = 1000
+
+class ConsultaFrecuente:
+    """Consulta de una ruta frecuente y el índice que debe usar sobre su tabla principal"""
+
+    def __init__(self, nombre, query, params, tabla, alias, indice):
+        self.nombre = nombre
+        self.query = query
+        self.params = params
+        self.tabla = tabla
+        self.alias = alias
+        self.indice = indice
+
+# Consultas verificadas por `flask esquema verificar_indices`
+CONSULTAS_FRECUENTES = [
+    ConsultaFrecuente('citas_recientes',
+                      Cita.LIST_QUERY + " ORDER BY c.fecha DESC, c.hora DESC, c.id_cita DESC LIMIT 20",
+                      (), 'cita', 'c', 'idx_cita_fecha_hora'),
+    ConsultaFrecuente('citas_proximas', Cita.UPCOMING_QUERY, (10,), 'cita', 'c', 'idx_cita_estado_fecha_hora'),
+    ConsultaFrecuente('pacientes_activos',
+                      "SELECT * FROM pacientes WHERE estatus = 1 ORDER BY nombres, apellidos, id_paciente LIMIT 20",
+                      (), 'pacientes', 'pacientes', 'idx_pacientes_estatus_nombre'),
+    ConsultaFrecuente('medicos_activos',
+                      "SELECT * FROM medicos WHERE estatus = 1 ORDER BY primer_nombre, apellido_paterno",
+                      (), 'medicos', 'medicos', 'idx_medicos_estatus_nombre'),
+    ConsultaFrecuente('expedientes_recientes',
+                      Expediente.LIST_QUERY + " ORDER BY exp.fecha DESC, exp.id DESC LIMIT 20",
+                      (), 'expedientes', 'exp', 'idx_expedientes_deleted_fecha'),
+    ConsultaFrecuente('signos_vitales_paciente',
+                      SERIES_QUERY + " AND id_paciente IN (%s) ORDER BY id_paciente, fecha, id_exploracion",
+                      (1,), 'exploracion', 'exploracion', 'idx_exploracion_paciente_fecha'),
+]
+
+def _table_rows(tabla):
+    """Filas estimadas de una tabla según information_schema"""
+    result = db.execute_query("""SELECT TABLE_ROWS FROM information_schema.TABLES
+                                 WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s""", (tabla,))
+    return int(result[0][0] or 0) if result else 0
+
+def _index_exists(tabla, indice):
+    result = db.execute_query(f"SHOW INDEX FROM {tabla} WHERE Key_name = %s", (indice,))
+    return bool(result)
+
+def check_query_plan(consulta):
+    """Revisa el EXPLAIN de una consulta; retorna la lista de problemas (vacía si está bien)"""
+    if not _index_exists(consulta.tabla, consulta.indice):
+        return [f"no existe el índice {consulta.indice} en {consulta.tabla}"]
+    if _table_rows(consulta.tabla) < MIN_FILAS_PLAN:
+        return []
+
+    cursor = db.get_cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + consulta.query, consulta.params)
+        plan = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    filas = [fila for fila in plan if fila['table'] == consulta.alias]
+    if not filas:
+        return [f"la tabla {consulta.alias} no aparece en el plan"]
+    problemas = [f"{consulta.alias} no usa índice (type={fila['type']}, rows={fila['rows']})"
+                 for fila in filas if not fila['key']]
+    # El orden lo resuelve la primera tabla del plan: si ahí hay filesort el índice no sirvió para ORDER BY
+    if 'Using filesort' in (plan[0].get('Extra') or ''):
+        problemas.append(f"el plan ordena con filesort sobre {plan[0]['table']}")
+    return problemas
+
+def check_query_plans(consultas=CONSULTAS_FRECUENTES):
+    """Revisa todas las consultas frecuentes; retorna {nombre: problemas}"""
+    return {consulta.nombre: check_query_plan(consulta) for consulta in consultas}
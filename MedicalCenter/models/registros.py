@@ -0,0 +1,117 @@
+import keyword
+
+class CampoDerivado:
+    """Campo calculado la primera vez que se lee y guardado en el propio registro"""
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+        # Descriptor del slot donde se guarda el valor (lo asigna definir_registro)
+        self.slot = None
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        try:
+            return self.slot.__get__(obj, objtype)
+        except AttributeError:
+            value = self.func(obj)
+            self.slot.__set__(obj, value)
+            return value
+
+class Registro:
+    """Base de los registros compactos: acceso por atributo y por clave, convertible a dict"""
+
+    __slots__ = ()
+
+    # Los definen las clases generadas por definir_registro
+    campos = ()
+    _keys = ()
+    _key_set = frozenset()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Convierte una lista de filas en registros"""
+        return list(map(cls, rows or ()))
+
+    def __getitem__(self, key):
+        if key not in self._key_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._key_set or key not in self.campos:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._key_set
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, key, default=None):
+        if key not in self._key_set:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return self._keys
+
+    def values(self):
+        return [getattr(self, key) for key in self._keys]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self._keys]
+
+    def to_dict(self):
+        """Diccionario con los campos públicos y derivados (para JSON)"""
+        return {key: getattr(self, key) for key in self._keys}
+
+    def __eq__(self, other):
+        if isinstance(other, (Registro, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        campos = ', '.join(f"{key}={getattr(self, key)!r}" for key in self.campos if not key.startswith('_'))
+        return f"{type(self).__name__}({campos})"
+
+def definir_registro(nombre, campos, **derivados):
+    """Crea una clase de registro con __slots__ a partir del orden de columnas de una consulta.
+
+    Los campos que empiezan con '_' se guardan pero no se exponen como claves; los
+    derivados son funciones del registro que se calculan al leerlos por primera vez.
+    """
+    campos = tuple(campos)
+    for campo in campos + tuple(derivados):
+        if not campo.isidentifier() or keyword.iskeyword(campo):
+            raise ValueError(f"Nombre de campo inválido: {campo!r}")
+
+    # Un solo desempaquetado por fila es bastante más rápido que asignar campo por campo
+    destinos = ', '.join(f"self.{campo}" for campo in campos)
+    source = (f"def __init__(self, row):\n"
+              f"    {destinos}, = row[:{len(campos)}]\n")
+    namespace = {}
+    exec(source, {}, namespace)
+
+    cache_slots = tuple(f"_cache_{name}" for name in derivados)
+    attrs = {
+        '__slots__': campos + cache_slots,
+        '__init__': namespace['__init__'],
+        'campos': campos,
+        '_keys': tuple(campo for campo in campos if not campo.startswith('_')) + tuple(derivados),
+    }
+    attrs['_key_set'] = frozenset(attrs['_keys'])
+    for name, func in derivados.items():
+        attrs[name] = CampoDerivado(name, func)
+
+    cls = type(nombre, (Registro,), attrs)
+    for name in derivados:
+        cls.__dict__[name].slot = cls.__dict__[f"_cache_{name}"]
+    return cls
@@ -0,0 +1,54 @@
+from .database import db
+
+# Máximo de ids por consulta IN (...) al cargar relaciones en lote
+BATCH_SIZE = 500
+
+def exists(query, params=None):
+    """True si la consulta devuelve al menos una fila; MySQL se detiene en la primera"""
+    result = db.execute_query(f"SELECT EXISTS({query})", params)
+    if result is None:
+        raise RuntimeError("Error al verificar registros relacionados")
+    return bool(result[0][0])
+
+def count(query, params=None):
+    """Número de filas que devuelve la consulta"""
+    result = db.execute_query(f"SELECT COUNT(*) FROM ({query}) AS relacionados", params)
+    if result is None:
+        raise RuntimeError("Error al contar registros relacionados")
+    return result[0][0]
+
+def _chunks(ids, size):
+    ids = list(dict.fromkeys(ids))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def count_related(query, ids, batch_size=BATCH_SIZE):
+    """Cuenta filas relacionadas por id con GROUP BY: {id: total}.
+
+    `query` debe devolver (id, COUNT(*)) y contener '{ids}' donde va la lista IN,
+    p. ej. "SELECT id_paciente, COUNT(*) FROM cita WHERE id_paciente IN ({ids}) GROUP BY id_paciente".
+    """
+    totales = {id_: 0 for id_ in ids}
+    for chunk in _chunks(ids, batch_size):
+        result = db.execute_query(query.format(ids=', '.join(['%s'] * len(chunk))), tuple(chunk))
+        if result is None:
+            raise RuntimeError("Error al contar registros relacionados")
+        for id_, total in result:
+            totales[id_] = total
+    return totales
+
+def load_related(query, ids, key, factory=None, batch_size=BATCH_SIZE):
+    """Carga las filas relacionadas de varios ids en pocas consultas: {id: [filas]}.
+
+    `query` debe contener '{ids}' donde va la lista IN; `key` es el índice de la
+    columna con el id del padre y `factory` convierte cada fila (por defecto la deja igual).
+    Cada id pedido aparece en el resultado, con lista vacía si no tiene filas.
+    """
+    relacionados = {id_: [] for id_ in ids}
+    for chunk in _chunks(ids, batch_size):
+        result = db.execute_query(query.format(ids=', '.join(['%s'] * len(chunk))), tuple(chunk))
+        if result is None:
+            raise RuntimeError("Error al cargar registros relacionados")
+        for row in result:
+            relacionados[row[key]].append(factory(row) if factory else row)
+    return relacionados
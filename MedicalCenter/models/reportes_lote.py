@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+
+def render_report(exploracion):
+    """Genera en un proceso de trabajo el PDF de una exploración; retorna (id, bytes)"""
+    from .exploracion import Exploracion
+
+    buffer = io.BytesIO()
+    Exploracion.build_medical_report(exploracion, buffer)
+    return exploracion['id_exploracion'], buffer.getvalue()
+
+class _ZipStream:
+    """Archivo de solo escritura que acumula lo que escribe zipfile para enviarlo por partes"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Retorna y descarta lo escrito hasta ahora"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+class ExportadorReportes:
+    """Exportación masiva de reportes médicos usando un pool de procesos"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 1) - 1))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Crea el pool de procesos de forma perezosa"""
+        with self._lock:
+            if self._executor is None:
+                # 'spawn' evita heredar los hilos y sockets del servidor en los procesos hijos
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def render_all(self, exploraciones):
+        """Genera los PDF de las exploraciones en paralelo, en el mismo orden recibido"""
+        if len(exploraciones) < 2:
+            # Para un solo reporte no vale la pena enviar el trabajo a otro proceso
+            return map(render_report, exploraciones)
+        return self._get_executor().map(render_report, exploraciones, chunksize=4)
+
+    def merged_pdf(self, exploraciones):
+        """Retorna los bytes de un solo PDF con todas las exploraciones"""
+        from .exploracion import Exploracion
+
+        buffer = io.BytesIO()
+        Exploracion.build_merged_report(exploraciones, buffer)
+        return buffer.getvalue()
+
+    def zip_stream(self, exploraciones):
+        """Generador que produce un ZIP con un PDF por exploración conforme se van generando"""
+        stream = _ZipStream()
+        # Los PDF ya vienen comprimidos: se guardan sin volver a comprimir
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archivo:
+            for exploracion_id, contenido in self.render_all(exploraciones):
+                archivo.writestr(f"exploracion_{exploracion_id}.pdf", contenido)
+                yield stream.drain()
+        yield stream.drain()
+
+    def shutdown(self):
+        """Detiene el pool de procesos"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+# Instancia global del exportador de reportes
+exportador_reportes = ExportadorReportes()
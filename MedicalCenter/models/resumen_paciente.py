@@ -0,0 +1,126 @@
+from .database import db
+from .cache_datos import cache_datos, patient_namespace
+from .paciente import RegistroPaciente
+from .cita import _formatear_hora
+from .signos_vitales import SignosVitales
+from .registros import definir_registro
+from mysql.connector import Error
+
+# Secciones que puede pedir el cliente; 'paciente' siempre se incluye
+CAMPOS_RESUMEN = ('citas', 'exploraciones', 'expedientes', 'totales', 'signos', 'tendencias')
+
+# Elementos por lista (citas, exploraciones, expedientes)
+LIMITE_RESUMEN = 10
+MAX_LIMITE_RESUMEN = 50
+
+RegistroCitaPaciente = definir_registro(
+    'RegistroCitaPaciente',
+    ('id_cita', 'id_medico', 'fecha', '_hora', 'motivo', 'estatus',
+     '_medico_primer_nombre', '_medico_apellido_paterno', 'especialidad'),
+    hora=lambda c: _formatear_hora(c._hora),
+    medico_nombre_completo=lambda c: f"{c._medico_primer_nombre or ''} {c._medico_apellido_paterno}".strip()
+)
+
+RegistroExploracionPaciente = definir_registro(
+    'RegistroExploracionPaciente',
+    ('id_exploracion', 'id_cita', 'fecha', 'diagnostico', 'tratamiento',
+     '_medico_primer_nombre', '_medico_apellido_paterno', 'especialidad'),
+    medico_nombre_completo=lambda e: f"{e._medico_primer_nombre or ''} {e._medico_apellido_paterno}".strip()
+)
+
+RegistroExpedientePaciente = definir_registro(
+    'RegistroExpedientePaciente',
+    ('id', 'diagnostico', 'fecha')
+)
+
+PACIENTE_QUERY = "SELECT * FROM pacientes WHERE id_paciente = %s AND estatus = 1"
+
+CITAS_QUERY = """SELECT c.id_cita, c.id_medico, c.fecha, c.hora, c.motivo, c.estatus,
+                        m.primer_nombre, m.apellido_paterno, m.especialidad
+                 FROM cita c
+                 JOIN medicos m ON c.id_medico = m.id_medico
+                 WHERE c.id_paciente = %s
+                 ORDER BY c.fecha DESC, c.hora DESC, c.id_cita DESC LIMIT %s"""
+
+EXPLORACIONES_QUERY = """SELECT e.id_exploracion, e.id_cita, e.fecha, e.diagnostico, e.tratamiento,
+                                m.primer_nombre, m.apellido_paterno, m.especialidad
+                         FROM exploracion e
+                         JOIN medicos m ON e.id_medico = m.id_medico
+                         WHERE e.id_paciente = %s AND e.estatus = 1
+                         ORDER BY e.fecha DESC, e.id_exploracion DESC LIMIT %s"""
+
+EXPEDIENTES_QUERY = """SELECT id, diagnostico, fecha FROM expedientes
+                       WHERE paciente_id = %s AND deleted = 0
+                       ORDER BY fecha DESC, id DESC LIMIT %s"""
+
+# Los tres conteos en una sola consulta
+TOTALES_QUERY = """SELECT (SELECT COUNT(*) FROM cita WHERE id_paciente = %s),
+                          (SELECT COUNT(*) FROM exploracion WHERE id_paciente = %s AND estatus = 1),
+                          (SELECT COUNT(*) FROM expedientes WHERE paciente_id = %s AND deleted = 0)"""
+
+def parse_campos(valor):
+    """Convierte 'citas,totales' en la tupla de secciones; None o vacío pide todas"""
+    if not valor:
+        return CAMPOS_RESUMEN
+    pedidos = {campo.strip() for campo in valor.split(',') if campo.strip()}
+    invalidos = pedidos - set(CAMPOS_RESUMEN)
+    if invalidos:
+        raise ValueError(f"Campos inválidos: {', '.join(sorted(invalidos))}")
+    # Orden fijo para que la misma selección use la misma entrada de la caché
+    return tuple(campo for campo in CAMPOS_RESUMEN if campo in pedidos)
+
+class ResumenPaciente:
+    """Vista completa de un paciente (datos, citas, exploraciones, expedientes, signos y tendencias) en una visita"""
+
+    @staticmethod
+    def get(paciente_id, campos=CAMPOS_RESUMEN, limite=LIMITE_RESUMEN):
+        """Resumen del paciente desde la caché; None si no existe (Error si falla la base de datos).
+
+        Se guarda por paciente y se invalida cuando cambian sus citas, exploraciones,
+        expedientes o datos. Las secciones no pedidas no se consultan.
+        """
+        limite = max(1, min(int(limite), MAX_LIMITE_RESUMEN))
+        campos = tuple(campo for campo in CAMPOS_RESUMEN if campo in campos)
+        return cache_datos.get(patient_namespace(paciente_id), (campos, limite),
+                               lambda: ResumenPaciente.load(paciente_id, campos, limite))
+
+    @staticmethod
+    def load(paciente_id, campos=CAMPOS_RESUMEN, limite=LIMITE_RESUMEN):
+        """Lee el resumen de la base de datos con un cursor sobre la misma conexión.
+
+        Retorna None solo si el paciente no existe; un error de la base de datos se
+        propaga como Error para no mostrarlo como "paciente no encontrado".
+        """
+        cursor = db.get_cursor()
+        if cursor is None:
+            raise Error(msg="Sin conexión a la base de datos")
+        try:
+            cursor.execute(PACIENTE_QUERY, (paciente_id,))
+            fila = cursor.fetchone()
+            if not fila:
+                return None
+            resumen = {'paciente': RegistroPaciente(fila)}
+            if 'citas' in campos:
+                cursor.execute(CITAS_QUERY, (paciente_id, limite))
+                resumen['citas'] = RegistroCitaPaciente.from_rows(cursor.fetchall())
+            if 'exploraciones' in campos:
+                cursor.execute(EXPLORACIONES_QUERY, (paciente_id, limite))
+                resumen['exploraciones'] = RegistroExploracionPaciente.from_rows(cursor.fetchall())
+            if 'expedientes' in campos:
+                cursor.execute(EXPEDIENTES_QUERY, (paciente_id, limite))
+                resumen['expedientes'] = RegistroExpedientePaciente.from_rows(cursor.fetchall())
+            if 'totales' in campos:
+                cursor.execute(TOTALES_QUERY, (paciente_id,) * 3)
+                citas, exploraciones, expedientes = cursor.fetchone()
+                resumen['totales'] = {'citas': citas, 'exploraciones': exploraciones, 'expedientes': expedientes}
+        finally:
+            cursor.close()
+
+        if 'signos' in campos:
+            resumen['signos'] = SignosVitales.get_summary(paciente_id)
+        if 'tendencias' in campos:
+            resumen['tendencias'] = SignosVitales.patient_trends(paciente_id)
+            if resumen['tendencias'] is None:
+                # No se guarda en la caché un resumen incompleto
+                raise Error(msg=f"No se pudieron cargar las tendencias del paciente {paciente_id}")
+        return resumen
@@ -0,0 +1,61 @@
+from .database import db
+import os
+import threading
+
+# Reserva atómica de un bloque: LAST_INSERT_ID(valor) deja el último número del bloque en la sesión
+RESERVE_QUERY = """INSERT INTO secuencias (nombre, anio, valor) VALUES (%s, %s, LAST_INSERT_ID(%s))
+                   ON DUPLICATE KEY UPDATE valor = LAST_INSERT_ID(valor + %s)"""
+
+class AsignadorSecuencias:
+    """Entrega números consecutivos por nombre y año desde la tabla secuencias.
+
+    Cada reserva es un solo UPDATE atómico sobre una fila, sin importar cuántos
+    registros existan. Con bloque > 1 el proceso reserva varios números a la vez y
+    los entrega desde memoria; los que no alcance a usar quedan como huecos.
+    """
+
+    def __init__(self, bloque=1):
+        self.bloque = max(1, int(bloque))
+        # (nombre, año) -> [siguiente número, último número reservado]
+        self._rangos = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, nombre, anio, cantidad):
+        """Reserva `cantidad` números en la base de datos; retorna (primero, último)"""
+        # Conexión propia para no confirmar la transacción de la petición en curso
+        connection = db.pool.acquire()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(RESERVE_QUERY, (nombre, anio, cantidad, cantidad))
+                cursor.execute("SELECT LAST_INSERT_ID()")
+                ultimo = cursor.fetchone()[0]
+                connection.commit()
+            finally:
+                cursor.close()
+        finally:
+            db.pool.release(connection)
+        return ultimo - cantidad + 1, ultimo
+
+    def next(self, nombre, anio):
+        """Siguiente número de la secuencia (nombre, año)"""
+        clave = (nombre, anio)
+        with self._lock:
+            rango = self._rangos.get(clave)
+            if rango and rango[0] <= rango[1]:
+                numero = rango[0]
+                rango[0] += 1
+                return numero
+
+            # Se reserva dentro del candado para que dos hilos no pidan bloque a la vez
+            primero, ultimo = self.reserve(nombre, anio, self.bloque)
+            self._rangos[clave] = [primero + 1, ultimo]
+            return primero
+
+    def discard(self):
+        """Olvida los números reservados en memoria (quedan como huecos en la secuencia)"""
+        with self._lock:
+            self._rangos.clear()
+
+# Instancia global; MEDICALCENTER_BLOQUE_SECUENCIA > 1 reserva bloques por proceso
+secuencias = AsignadorSecuencias(bloque=int(os.environ.get('MEDICALCENTER_BLOQUE_SECUENCIA', 1)))
@@ -0,0 +1,312 @@
+from .database import db
+from .registros import definir_registro
+from .cache_datos import cache_datos, patient_namespace
+from mysql.connector import Error
+import numpy as np
+
+# Signos vitales guardados en cada exploración (en el orden de la tabla)
+VITALES = ('peso', 'altura', 'temperatura', 'latidos_minuto', 'saturacion_oxigeno', 'glucosa')
+
+# Series analizadas: los signos vitales más el IMC calculado a partir de peso y altura
+SERIES = VITALES + ('imc',)
+
+# Rangos normales en adultos (mínimo, máximo); las series sin rango no se marcan
+RANGOS = {
+    'temperatura': (36.0, 37.5),
+    'latidos_minuto': (60, 100),
+    'saturacion_oxigeno': (95, 100),
+    'glucosa': (70, 140),
+    'imc': (18.5, 24.9),
+}
+
+# Exploraciones que entran en el promedio móvil
+VENTANA_PROMEDIO = 3
+
+# Máximo de pacientes por consulta de cohorte
+MAX_COHORTE = 50
+
+SERIES_QUERY = """SELECT id_exploracion, id_paciente, fecha, peso, altura, temperatura,
+                         latidos_minuto, saturacion_oxigeno, glucosa
+                  FROM exploracion
+                  WHERE estatus = 1"""
+
+COLUMNAS_RESUMEN = (('id_paciente', 'total_exploraciones', 'primera_fecha', 'ultima_fecha',
+                     'ultima_exploracion', 'alertas')
+                    + tuple(f"{prefijo}_{serie}" for serie in SERIES for prefijo in ('ultimo', 'suma', 'n')))
+
+_INSERT_RESUMEN = (f"INSERT INTO resumen_signos_vitales ({', '.join(COLUMNAS_RESUMEN)}) "
+                   f"VALUES ({', '.join(['%s'] * len(COLUMNAS_RESUMEN))})")
+
+# Suma una exploración nueva al resumen existente; los últimos valores solo cambian si es la más reciente
+UPSERT_INCREMENTAL = _INSERT_RESUMEN + " ON DUPLICATE KEY UPDATE " + ', '.join(
+    [f"ultimo_{serie} = IF(VALUES(ultima_fecha) >= ultima_fecha, VALUES(ultimo_{serie}), ultimo_{serie})"
+     for serie in SERIES]
+    + ["ultima_exploracion = IF(VALUES(ultima_fecha) >= ultima_fecha, VALUES(ultima_exploracion), ultima_exploracion)",
+       "ultima_fecha = GREATEST(ultima_fecha, VALUES(ultima_fecha))",
+       "primera_fecha = LEAST(primera_fecha, VALUES(primera_fecha))",
+       "total_exploraciones = total_exploraciones + VALUES(total_exploraciones)",
+       "alertas = alertas + VALUES(alertas)"]
+    + [f"{prefijo}_{serie} = {prefijo}_{serie} + VALUES({prefijo}_{serie})"
+       for serie in SERIES for prefijo in ('suma', 'n')]
+)
+
+# Reemplaza el resumen completo de un paciente
+UPSERT_COMPLETO = _INSERT_RESUMEN + " ON DUPLICATE KEY UPDATE " + ', '.join(
+    f"{columna} = VALUES({columna})" for columna in COLUMNAS_RESUMEN[1:]
+)
+
+def _promedios(r):
+    promedios = {}
+    for serie in SERIES:
+        n = getattr(r, f"n_{serie}")
+        promedios[serie] = round(float(getattr(r, f"suma_{serie}")) / n, 2) if n else None
+    return promedios
+
+# Registro de una fila de resumen_signos_vitales
+RegistroResumenSignos = definir_registro(
+    'RegistroResumenSignos',
+    COLUMNAS_RESUMEN + ('actualizado',),
+    ultimos=lambda r: {serie: getattr(r, f"ultimo_{serie}") for serie in SERIES},
+    promedios=_promedios
+)
+
+def height_in_cm(altura):
+    """Altura en centímetros; los valores menores a 3 se capturaron en metros"""
+    return np.where(altura < 3, altura * 100, altura)
+
+def body_mass_index(peso, altura):
+    """IMC = kg / m²; acepta la altura en centímetros o en metros (valores menores a 3)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metros = height_in_cm(altura) / 100
+        imc = peso / (metros * metros)
+    imc[~np.isfinite(imc) | (metros <= 0)] = np.nan
+    return imc
+
+def rolling_mean(valores, inicio_grupo, ventana=VENTANA_PROMEDIO):
+    """Promedio de las últimas `ventana` exploraciones de cada paciente, ignorando valores faltantes"""
+    n = len(valores)
+    presentes = ~np.isnan(valores)
+    sumas = np.vstack([np.zeros((1, valores.shape[1])), np.cumsum(np.where(presentes, valores, 0), axis=0)])
+    cuentas = np.vstack([np.zeros((1, valores.shape[1])), np.cumsum(presentes, axis=0)])
+    indices = np.arange(n)
+    # La ventana no cruza al paciente anterior
+    desde = np.maximum(indices - ventana + 1, inicio_grupo)
+    total = cuentas[indices + 1] - cuentas[desde]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, (sumas[indices + 1] - sumas[desde]) / total, np.nan)
+
+def deltas(valores, es_inicio):
+    """Cambio respecto a la exploración anterior del mismo paciente"""
+    cambio = np.full_like(valores, np.nan)
+    cambio[1:] = valores[1:] - valores[:-1]
+    cambio[es_inicio] = np.nan
+    return cambio
+
+def out_of_range(valores, series=SERIES):
+    """-1 si el valor está por debajo del rango normal, 1 si está por encima y 0 si es normal o falta"""
+    minimos = np.array([RANGOS.get(serie, (np.nan, np.nan))[0] for serie in series], dtype=float)
+    maximos = np.array([RANGOS.get(serie, (np.nan, np.nan))[1] for serie in series], dtype=float)
+    return np.where(valores < minimos, -1, np.where(valores > maximos, 1, 0)).astype(np.int8)
+
+def _as_list(valores):
+    """Convierte un arreglo a lista para JSON, con None en lugar de NaN"""
+    lista = np.round(valores, 2).astype(object)
+    lista[np.isnan(valores)] = None
+    return lista.tolist()
+
+def _db_value(valor):
+    return None if np.isnan(valor) else round(float(valor), 2)
+
+class SerieSignos:
+    """Exploraciones de uno o varios pacientes como arreglos de NumPy, ordenadas por paciente y fecha"""
+
+    def __init__(self, rows):
+        rows = list(rows)
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.pacientes = np.array([row[1] for row in rows], dtype=np.int64)
+        self.fechas = [row[2] for row in rows]
+        vitales = np.array([row[3:9] for row in rows], dtype=float).reshape(len(rows), len(VITALES))
+        # Una sola unidad para que sumas, promedios y tendencias de la altura sean comparables
+        vitales[:, 1] = height_in_cm(vitales[:, 1])
+        self.valores = np.column_stack([vitales, body_mass_index(vitales[:, 0], vitales[:, 1])])
+
+        self.es_inicio = np.ones(len(rows), dtype=bool)
+        self.es_inicio[1:] = self.pacientes[1:] != self.pacientes[:-1]
+        self.inicios = np.flatnonzero(self.es_inicio)
+        # Índice de la primera exploración del paciente de cada fila
+        self.inicio_grupo = np.maximum.accumulate(np.where(self.es_inicio, np.arange(len(rows)), 0))
+
+    def __len__(self):
+        return len(self.ids)
+
+class SignosVitales:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def load_series(paciente_ids):
+        """Carga las exploraciones activas de los pacientes indicados"""
+        paciente_ids = list(paciente_ids)
+        if not paciente_ids:
+            return SerieSignos([])
+        query = (SERIES_QUERY + f" AND id_paciente IN ({', '.join(['%s'] * len(paciente_ids))})"
+                 + " ORDER BY id_paciente, fecha, id_exploracion")
+        result = db.execute_query(query, tuple(paciente_ids))
+        if result is None:
+            return None
+        return SerieSignos(result)
+
+    @staticmethod
+    def analyze(serie):
+        """Calcula promedio móvil, cambio entre visitas y valores fuera de rango de toda la serie"""
+        return {
+            'valores': serie.valores,
+            'promedio_movil': rolling_mean(serie.valores, serie.inicio_grupo),
+            'delta': deltas(serie.valores, serie.es_inicio),
+            'fuera_de_rango': out_of_range(serie.valores)
+        }
+
+    @staticmethod
+    def trends(serie):
+        """Análisis de cada paciente de la serie en forma de columnas para JSON: {id_paciente: datos}"""
+        analisis = SignosVitales.analyze(serie)
+        finales = np.append(serie.inicios[1:], len(serie))
+        tendencias = {}
+        for inicio, fin in zip(serie.inicios, finales):
+            tendencias[int(serie.pacientes[inicio])] = {
+                'ids': serie.ids[inicio:fin].tolist(),
+                'fechas': [fecha.isoformat() for fecha in serie.fechas[inicio:fin]],
+                'series': {
+                    nombre: {
+                        'valores': _as_list(analisis['valores'][inicio:fin, i]),
+                        'promedio_movil': _as_list(analisis['promedio_movil'][inicio:fin, i]),
+                        'delta': _as_list(analisis['delta'][inicio:fin, i]),
+                        'fuera_de_rango': analisis['fuera_de_rango'][inicio:fin, i].tolist()
+                    } for i, nombre in enumerate(SERIES)
+                }
+            }
+        return tendencias
+
+    @staticmethod
+    def patient_trends(paciente_id):
+        """Tendencias de los signos vitales de un paciente; None si hubo error"""
+        serie = SignosVitales.load_series([paciente_id])
+        if serie is None:
+            return None
+        tendencias = SignosVitales.trends(serie).get(paciente_id)
+        return tendencias or {'ids': [], 'fechas': [], 'series': {}}
+
+    @staticmethod
+    def summarize(serie):
+        """Filas de resumen (en el orden de COLUMNAS_RESUMEN) de cada paciente de la serie"""
+        if not len(serie):
+            return []
+        inicios = serie.inicios
+        ultimos = np.append(inicios[1:], len(serie)) - 1
+        presentes = ~np.isnan(serie.valores)
+        sumas = np.add.reduceat(np.where(presentes, serie.valores, 0), inicios, axis=0)
+        cuentas = np.add.reduceat(presentes.astype(np.int64), inicios, axis=0)
+        alertas = np.add.reduceat((out_of_range(serie.valores) != 0).sum(axis=1), inicios)
+        totales = ultimos - inicios + 1
+
+        filas = []
+        for k, (inicio, ultimo) in enumerate(zip(inicios, ultimos)):
+            fila = [int(serie.pacientes[inicio]), int(totales[k]), serie.fechas[inicio], serie.fechas[ultimo],
+                    int(serie.ids[ultimo]), int(alertas[k])]
+            for i in range(len(SERIES)):
+                fila += [_db_value(serie.valores[ultimo, i]), round(float(sumas[k, i]), 2), int(cuentas[k, i])]
+            filas.append(tuple(fila))
+        return filas
+
+    @staticmethod
+    def _write_summary(query, filas):
+        """Guarda filas de resumen en una sola transacción"""
+        if not filas:
+            return True
+        cursor = db.get_cursor()
+        try:
+            cursor.executemany(query, filas)
+            db.commit()
+            return True
+        except Error as e:
+            print(f"Error actualizando resumen de signos vitales: {e}")
+            db.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def record_exploracion(exploracion_id, paciente_id, fecha, peso=None, altura=None, temperatura=None,
+                           latidos_minuto=None, saturacion_oxigeno=None, glucosa=None):
+        """Suma una exploración nueva al resumen del paciente sin releer su historial"""
+        cache_datos.invalidate(patient_namespace(paciente_id))
+        try:
+            serie = SerieSignos([(exploracion_id, paciente_id, fecha, peso, altura, temperatura,
+                                  latidos_minuto, saturacion_oxigeno, glucosa)])
+        except (TypeError, ValueError) as e:
+            print(f"Signos vitales inválidos en la exploración {exploracion_id}: {e}")
+            return False
+        return SignosVitales._write_summary(UPSERT_INCREMENTAL, SignosVitales.summarize(serie))
+
+    @staticmethod
+    def refresh_patient(paciente_id):
+        """Recalcula el resumen de un paciente (tras editar o eliminar una exploración)"""
+        cache_datos.invalidate(patient_namespace(paciente_id))
+        serie = SignosVitales.load_series([paciente_id])
+        if serie is None:
+            return False
+        if not len(serie):
+            return db.execute_update("DELETE FROM resumen_signos_vitales WHERE id_paciente = %s",
+                                     (paciente_id,)) >= 0
+        return SignosVitales._write_summary(UPSERT_COMPLETO, SignosVitales.summarize(serie))
+
+    @staticmethod
+    def refresh_exploracion(exploracion_id):
+        """Recalcula el resumen del paciente al que pertenece una exploración"""
+        result = db.execute_query("SELECT id_paciente FROM exploracion WHERE id_exploracion = %s", (exploracion_id,))
+        if not result:
+            return False
+        return SignosVitales.refresh_patient(result[0][0])
+
+    @staticmethod
+    def rebuild(lote=1000):
+        """Reconstruye el resumen de todos los pacientes leyendo las exploraciones por bloques; retorna cuántos"""
+        db.execute_update("DELETE FROM resumen_signos_vitales")
+        query = SERIES_QUERY + " ORDER BY id_paciente, fecha, id_exploracion"
+        pacientes = 0
+        pendientes = []
+        for rows in db.stream_query(query, size=lote):
+            pendientes.extend(rows)
+            # El último paciente del bloque puede continuar en el siguiente
+            corte = len(pendientes)
+            while corte > 0 and pendientes[corte - 1][1] == pendientes[-1][1]:
+                corte -= 1
+            if corte:
+                filas = SignosVitales.summarize(SerieSignos(pendientes[:corte]))
+                SignosVitales._write_summary(UPSERT_COMPLETO, filas)
+                pacientes += len(filas)
+                pendientes = pendientes[corte:]
+        if pendientes:
+            filas = SignosVitales.summarize(SerieSignos(pendientes))
+            SignosVitales._write_summary(UPSERT_COMPLETO, filas)
+            pacientes += len(filas)
+        return pacientes
+
+    @staticmethod
+    def get_summaries(paciente_ids):
+        """Resúmenes guardados de varios pacientes: {id_paciente: registro}"""
+        paciente_ids = list(paciente_ids)
+        if not paciente_ids:
+            return {}
+        query = (f"SELECT {', '.join(COLUMNAS_RESUMEN)}, actualizado FROM resumen_signos_vitales "
+                 f"WHERE id_paciente IN ({', '.join(['%s'] * len(paciente_ids))})")
+        result = db.execute_query(query, tuple(paciente_ids))
+        return {resumen.id_paciente: resumen for resumen in RegistroResumenSignos.from_rows(result)}
+
+    @staticmethod
+    def get_summary(paciente_id):
+        """Resumen de un paciente; si aún no existe se calcula a partir de su historial"""
+        resumen = SignosVitales.get_summaries([paciente_id]).get(paciente_id)
+        if resumen is None and SignosVitales.refresh_patient(paciente_id):
+            resumen = SignosVitales.get_summaries([paciente_id]).get(paciente_id)
+        return resumen
@@ -13,8 +13,9 @@ function updateClock() {
         day: 'numeric'
     });
     
-    document.getElementById('live-clock').innerHTML = 
-        `<i class="fas fa-clock me-1"></i>${dateString} - ${timeString}`;
+    const clock = document.getElementById('live-clock');
+    if (!clock) return;
+    clock.innerHTML = `<i class="fas fa-clock me-1"></i>${dateString} - ${timeString}`;
 }
 
 // Actualizar el reloj cada segundo
@@ -44,4 +45,136 @@ document.addEventListener('DOMContentLoaded', function() {
             console.log('Editando cita ID:', citaId);
         });
     });
-});
\ No newline at end of file
+});
+
+// Campos de búsqueda de paciente y médico: consultan /api/*/sugerencias mientras se escribe
+const TYPEAHEAD_ESPERA_MS = 250;
+const TYPEAHEAD_MIN_CARACTERES = 2;
+
+function initTypeahead(container) {
+    const input = container.querySelector('.typeahead-input');
+    const hidden = container.querySelector('input[type="hidden"]');
+    const menu = container.querySelector('.typeahead-menu');
+    let timer = null;
+    let controller = null;
+    let activo = -1;
+
+    function cerrar() {
+        menu.classList.add('d-none');
+        menu.innerHTML = '';
+        activo = -1;
+    }
+
+    function elegir(item) {
+        hidden.value = item.id;
+        input.value = item.texto;
+        input.classList.remove('is-invalid');
+        cerrar();
+    }
+
+    function opcion(item) {
+        const boton = document.createElement('button');
+        boton.type = 'button';
+        boton.className = 'list-group-item list-group-item-action typeahead-opcion';
+        boton.textContent = item.texto;
+        if (item.detalle) {
+            const detalle = document.createElement('small');
+            detalle.className = 'text-muted ms-2';
+            detalle.textContent = item.detalle;
+            boton.appendChild(detalle);
+        }
+        // mousedown para elegir antes de que el blur cierre el menú
+        boton.addEventListener('mousedown', e => {
+            e.preventDefault();
+            elegir(item);
+        });
+        return boton;
+    }
+
+    function mostrar(datos, agregar) {
+        if (!agregar) {
+            menu.innerHTML = '';
+            activo = -1;
+        }
+        menu.querySelector('.typeahead-mas')?.remove();
+        datos.resultados.forEach(item => menu.appendChild(opcion(item)));
+        if (!menu.children.length) {
+            const vacio = document.createElement('div');
+            vacio.className = 'list-group-item text-muted';
+            vacio.textContent = 'Sin resultados';
+            menu.appendChild(vacio);
+        }
+        if (datos.siguiente !== null) {
+            const mas = document.createElement('button');
+            mas.type = 'button';
+            mas.className = 'list-group-item list-group-item-action text-center text-primary typeahead-mas';
+            mas.textContent = 'Ver más resultados';
+            mas.addEventListener('mousedown', e => {
+                e.preventDefault();
+                buscar(datos.siguiente);
+            });
+            menu.appendChild(mas);
+        }
+        menu.classList.remove('d-none');
+    }
+
+    function buscar(offset = 0) {
+        const termino = input.value.trim();
+        if (termino.length < TYPEAHEAD_MIN_CARACTERES) {
+            cerrar();
+            return;
+        }
+        // Cancelar la búsqueda anterior para que una respuesta vieja no reemplace a la nueva
+        if (controller) controller.abort();
+        controller = new AbortController();
+        const params = new URLSearchParams({q: termino, offset: offset});
+        fetch(`${container.dataset.url}?${params}`, {signal: controller.signal})
+            .then(response => response.json())
+            .then(datos => {
+                if (datos.error) throw new Error(datos.error);
+                mostrar(datos, offset > 0);
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Error al buscar:', error);
+                    cerrar();
+                }
+            });
+    }
+
+    function resaltar(indice) {
+        const opciones = menu.querySelectorAll('.typeahead-opcion');
+        if (!opciones.length) return;
+        activo = (indice + opciones.length) % opciones.length;
+        opciones.forEach((o, i) => o.classList.toggle('active', i === activo));
+        opciones[activo].scrollIntoView({block: 'nearest'});
+    }
+
+    input.addEventListener('input', () => {
+        // El texto cambió: la selección anterior ya no vale
+        hidden.value = '';
+        clearTimeout(timer);
+        timer = setTimeout(() => buscar(), TYPEAHEAD_ESPERA_MS);
+    });
+
+    input.addEventListener('keydown', e => {
+        if (menu.classList.contains('d-none')) return;
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            resaltar(activo + (e.key === 'ArrowDown' ? 1 : -1));
+        } else if (e.key === 'Enter' && activo >= 0) {
+            e.preventDefault();
+            menu.querySelectorAll('.typeahead-opcion')[activo]
+                .dispatchEvent(new MouseEvent('mousedown', {cancelable: true}));
+        } else if (e.key === 'Escape') {
+            cerrar();
+        }
+    });
+
+    input.addEventListener('blur', cerrar);
+    menu.style.zIndex = 1000;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.typeahead').forEach(initTypeahead);
+});
@@ -0,0 +1,21 @@
+"""Configuración común de las pruebas (se ejecutan desde la carpeta MedicalCenter: python -m pytest)"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# Los módulos de la aplicación se importan como paquetes de primer nivel (models, controllers)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def exploracion():
+    """Exploración completa, con las columnas de Exploracion.get_by_id, para generar reportes"""
+    return {
+        'id_exploracion': 8, 'id_cita': 3, 'id_paciente': 2, 'id_medico': 1, 'fecha': date(2024, 5, 2),
+        'peso': 72.5, 'altura': 170, 'temperatura': 36.6, 'latidos_minuto': 70, 'saturacion_oxigeno': 98,
+        'glucosa': 90, 'sintomas': 'Tos', 'diagnostico': 'Resfriado común', 'tratamiento': 'Reposo',
+        'estudios': 'Ninguno', 'estatus': 1, 'paciente_nombre_completo': 'Ana López',
+        'paciente_fecha_nacimiento': date(1990, 1, 1), 'paciente_genero': 'F',
+        'medico_nombre_completo': 'Luis Díaz', 'especialidad': 'General', 'cedula_profesional': '123456',
+    }
@@ -0,0 +1,91 @@
+"""Pruebas de la construcción y entrega de archivos estáticos (models/activos.py, controllers/activos_controller.py)"""
+import gzip
+
+import pytest
+from flask import Flask, render_template_string
+
+from controllers.activos_controller import activos_bp
+from models.activos import build_assets, fingerprint, load_manifest, minify_css, minify_js
+import controllers.activos_controller
+import models.activos
+
+@pytest.mark.skipif(models.activos.rcssmin is not None, reason='prueba del minificador incluido')
+def test_minify_css_keeps_strings():
+    css = '/* encabezado */\n.a  >  .b :hover {\n  content: "a  /* no */  b";\n  color : red;\n}\n'
+    assert minify_css(css) == '.a>.b :hover{content:"a  /* no */  b";color :red}'
+
+@pytest.mark.skipif(models.activos.rjsmin is not None, reason='prueba del minificador incluido')
+def test_minify_js_keeps_line_breaks_and_template_literals():
+    js = "// comentario\nfunction f() {\n    const t = `\n  dos\n`;\n    return t\n}\n"
+    assert minify_js(js) == "function f() {\nconst t = `\n  dos\n`;\nreturn t\n}\n"
+
+def escribir(static_dir, nombre, contenido):
+    path = static_dir / nombre
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(contenido, encoding='utf-8')
+
+@pytest.fixture
+def static_dir(tmp_path):
+    static_dir = tmp_path / 'static'
+    escribir(static_dir, 'css/citas.css', '.citas { color: red; }\n' * 20)
+    escribir(static_dir, 'css/ver_exploracion.css', '.exploracion { color: blue; }\n')
+    escribir(static_dir, 'js/citas.js', 'const a = 1;\n')
+    return static_dir
+
+def test_build_writes_fingerprinted_files_bundles_and_manifest(static_dir):
+    dist_dir = static_dir / 'dist'
+    manifiesto = build_assets(str(static_dir), str(dist_dir))
+    assert set(manifiesto) == {'css/citas.css', 'css/ver_exploracion.css', 'js/citas.js', 'bundles/ver_exploracion.css'}
+    assert load_manifest(str(dist_dir)) == manifiesto
+
+    construido = manifiesto['css/citas.css']
+    contenido = (dist_dir / construido).read_bytes()
+    assert construido == fingerprint('css/citas.css', contenido)
+    # Solo se guardan las variantes comprimidas que resultan más chicas
+    assert gzip.decompress((dist_dir / (construido + '.gz')).read_bytes()) == contenido
+    assert not (dist_dir / (manifiesto['js/citas.js'] + '.gz')).exists()
+    assert b'.exploracion' in (dist_dir / manifiesto['bundles/ver_exploracion.css']).read_bytes()
+
+def test_rebuild_keeps_previous_version_only(static_dir):
+    dist_dir = static_dir / 'dist'
+    primero = build_assets(str(static_dir), str(dist_dir))['js/citas.js']
+    escribir(static_dir, 'js/citas.js', 'const a = 2;\n')
+    segundo = build_assets(str(static_dir), str(dist_dir))['js/citas.js']
+    assert (dist_dir / primero).exists() and (dist_dir / segundo).exists()
+    escribir(static_dir, 'js/citas.js', 'const a = 3;\n')
+    build_assets(str(static_dir), str(dist_dir))
+    assert not (dist_dir / primero).exists() and (dist_dir / segundo).exists()
+
+@pytest.fixture
+def app(monkeypatch, static_dir):
+    dist_dir = static_dir / 'dist'
+    monkeypatch.setattr(controllers.activos_controller, 'DIST_DIR', str(dist_dir))
+    monkeypatch.setattr(controllers.activos_controller, 'load_manifest', lambda: load_manifest(str(dist_dir)))
+    monkeypatch.setattr(controllers.activos_controller, '_manifest', {'mtime': None, 'datos': {}})
+    app = Flask(__name__)
+    app.register_blueprint(activos_bp)
+    app.config['dist'] = dist_dir
+    return app
+
+def test_asset_url_falls_back_to_static_until_built(app, static_dir):
+    plantilla = "{{ asset_url('js/citas.js') }} {{ asset_urls('bundles/ver_exploracion.css')|join(' ') }}"
+    with app.test_request_context():
+        assert render_template_string(plantilla) == \
+            '/static/js/citas.js /static/css/citas.css /static/css/ver_exploracion.css'
+    manifiesto = build_assets(str(static_dir), str(app.config['dist']))
+    with app.test_request_context():
+        assert render_template_string(plantilla) == \
+            f"/activos/{manifiesto['js/citas.js']} /activos/{manifiesto['bundles/ver_exploracion.css']}"
+
+def test_recurso_serves_precompressed_variant(app, static_dir):
+    construido = build_assets(str(static_dir), str(app.config['dist']))['css/citas.css']
+    cliente = app.test_client()
+    respuesta = cliente.get(f'/activos/{construido}', headers={'Accept-Encoding': 'gzip'})
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert respuesta.mimetype == 'text/css'
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+    assert 'immutable' in respuesta.headers['Cache-Control'] and 'max-age=31536000' in respuesta.headers['Cache-Control']
+    assert gzip.decompress(respuesta.get_data()) == (app.config['dist'] / construido).read_bytes()
+    sin_comprimir = cliente.get(f'/activos/{construido}')
+    assert 'Content-Encoding' not in sin_comprimir.headers
+    assert cliente.get('/activos/manifest.json').status_code == 404
@@ -0,0 +1,140 @@
+"""Pruebas de la agenda de médicos y de la reserva de horarios (models/agenda.py, models/cita.py)"""
+from datetime import date, timedelta
+
+import pytest
+
+from models.agenda import Agenda, DURACION_CITA, INICIO_JORNADA, FIN_JORNADA, interval_mask, overlaps, to_minutes
+from models.cita import Cita
+from models.database import db
+import models.cita
+
+MANANA = date.today() + timedelta(days=1)
+
+def test_to_minutes_accepts_text_time_and_timedelta():
+    assert to_minutes('09:30') == 570
+    assert to_minutes('09:30:00') == 570
+    assert to_minutes(timedelta(hours=9, minutes=30)) == 570
+
+def test_overlaps_uses_appointment_length():
+    assert overlaps(to_minutes('10:00'), [to_minutes('10:00')])
+    assert overlaps(to_minutes('10:15'), [to_minutes('10:00')])
+    assert overlaps(to_minutes('09:45'), [to_minutes('10:00')])
+    assert not overlaps(to_minutes('10:30'), [to_minutes('10:00')])
+    assert not overlaps(to_minutes('09:30'), [to_minutes('10:00')])
+    assert not overlaps(to_minutes('10:00'), [])
+
+def test_interval_mask_length():
+    assert bin(interval_mask(600)).count('1') == DURACION_CITA
+
+@pytest.fixture
+def citas_en_bd(monkeypatch):
+    """Citas activas que 'devuelve' la base de datos: [(id_cita, fecha, hora)]"""
+    filas = []
+    monkeypatch.setattr(db, 'execute_query', lambda query, params=None: list(filas))
+    return filas
+
+def test_is_booked_detects_overlap(citas_en_bd):
+    citas_en_bd.append((1, MANANA, timedelta(hours=10)))
+    agenda = Agenda()
+    assert agenda.is_booked(5, MANANA, '10:00') is True
+    assert agenda.is_booked(5, MANANA, '10:20') is True
+    assert agenda.is_booked(5, MANANA, '10:30') is False
+    # Al editar la misma cita no choca consigo misma
+    assert agenda.is_booked(5, MANANA, '10:00', exclude_cita_id=1) is False
+
+def test_free_slots_skip_booked_times(citas_en_bd):
+    citas_en_bd.extend([(1, MANANA, timedelta(hours=10)), (2, MANANA, timedelta(hours=11, minutes=15))])
+    libres = Agenda().free_slots(5, MANANA, dias=1)[MANANA.isoformat()]
+    assert '10:00' not in libres
+    assert '11:00' not in libres and '11:30' not in libres
+    assert '10:30' in libres and '12:00' in libres
+    assert libres[0] == f"{INICIO_JORNADA // 60:02d}:00"
+    assert to_minutes(libres[-1]) + DURACION_CITA <= FIN_JORNADA
+
+def test_agenda_add_and_remove_keep_loaded_days_in_sync(citas_en_bd):
+    agenda = Agenda()
+    assert agenda.is_booked(5, MANANA, '09:00') is False
+    agenda.add(10, 5, MANANA, '09:00')
+    assert agenda.is_booked(5, MANANA, '09:00') is True
+    agenda.remove(10)
+    assert agenda.is_booked(5, MANANA, '09:00') is False
+
+def test_check_doctor_availability_uses_agenda(citas_en_bd, monkeypatch):
+    citas_en_bd.append((1, MANANA, timedelta(hours=10)))
+    monkeypatch.setattr(models.cita, 'agenda', Agenda())
+    assert Cita.check_doctor_availability(5, MANANA.isoformat(), '10:15') is True
+    assert Cita.check_doctor_availability(5, MANANA.isoformat(), '10:30') is False
+    assert Cita.check_doctor_availability(5, MANANA.isoformat(), '10:00', exclude_cita_id=1) is False
+
+def test_unreadable_day_counts_as_booked(monkeypatch):
+    monkeypatch.setattr(db, 'execute_query', lambda query, params=None: None)
+    monkeypatch.setattr(models.cita, 'agenda', Agenda())
+    assert models.cita.agenda.is_booked(5, MANANA, '10:00') is None
+    assert Cita.check_doctor_availability(5, MANANA.isoformat(), '10:00') is True
+
+class CursorFalso:
+    """Cursor que registra las sentencias y devuelve las citas del día indicadas"""
+
+    def __init__(self, citas_del_dia):
+        self.citas_del_dia = citas_del_dia
+        self.sentencias = []
+        self.rowcount = 0
+        self.lastrowid = None
+        self._resultado = []
+
+    def execute(self, query, params=None):
+        self.sentencias.append(' '.join(query.split()))
+        if 'FROM medicos' in query:
+            self._resultado = [(params[0],)]
+        elif 'FROM cita' in query:
+            self._resultado = list(self.citas_del_dia)
+        else:
+            self.rowcount, self.lastrowid = 1, 99
+
+    def fetchall(self):
+        return self._resultado
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def transaccion(monkeypatch):
+    """Sustituye el cursor y el commit/rollback de la conexión de la petición"""
+    estado = {'cursor': None, 'commits': 0, 'rollbacks': 0}
+
+    def usar(citas_del_dia):
+        estado['cursor'] = CursorFalso(citas_del_dia)
+        monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: estado['cursor'])
+        monkeypatch.setattr(db, 'commit', lambda: estado.__setitem__('commits', estado['commits'] + 1))
+        monkeypatch.setattr(db, 'rollback', lambda: estado.__setitem__('rollbacks', estado['rollbacks'] + 1))
+        return estado
+    return usar
+
+def test_write_slot_locks_doctor_and_rechecks_day(transaccion):
+    estado = transaccion([(1, timedelta(hours=10))])
+    resultado = Cita._write_slot("INSERT INTO cita VALUES (%s)", (1,), 5, MANANA, '10:30')
+    assert resultado == (1, 99)
+    sentencias = estado['cursor'].sentencias
+    assert sentencias[0].startswith('SELECT id_medico FROM medicos') and sentencias[0].endswith('FOR UPDATE')
+    assert 'FROM cita' in sentencias[1] and sentencias[1].endswith('FOR UPDATE')
+    assert sentencias[2].startswith('INSERT INTO cita')
+    assert estado['commits'] == 1 and estado['rollbacks'] == 0
+
+def test_write_slot_rolls_back_on_overlap(transaccion):
+    estado = transaccion([(1, timedelta(hours=10))])
+    assert Cita._write_slot("INSERT INTO cita VALUES (%s)", (1,), 5, MANANA, '10:15') is None
+    assert not any(s.startswith('INSERT') for s in estado['cursor'].sentencias)
+    assert estado['commits'] == 0 and estado['rollbacks'] == 1
+
+def test_write_slot_ignores_the_appointment_being_edited(transaccion):
+    transaccion([(1, timedelta(hours=10))])
+    assert Cita._write_slot("UPDATE cita SET hora = %s", ('10:15',), 5, MANANA, '10:15',
+                            exclude_cita_id=1) == (1, 99)
+
+def test_create_rejects_overlapping_appointment(transaccion, monkeypatch):
+    transaccion([(1, timedelta(hours=10))])
+    invalidados = []
+    monkeypatch.setattr(models.cita.agenda, 'invalidate', lambda medico_id, fecha: invalidados.append((medico_id, fecha)))
+    assert Cita.create(3, 5, MANANA, '10:00', 'Consulta de control general') is None
+    # El día se recarga para que la siguiente verificación vea la cita que ganó el horario
+    assert invalidados == [(5, MANANA)]
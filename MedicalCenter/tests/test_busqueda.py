@@ -0,0 +1,98 @@
+"""Pruebas del índice de trigramas (models/busqueda.py)"""
+import threading
+
+from models.busqueda import IndiceTrigramas, normalize_text, suggestion_page
+
+DOCUMENTOS = {
+    1: 'Juan Pérez López',
+    2: 'Perla Ramírez',
+    3: 'Esperanza Gómez',
+    4: 'María Peña Ortiz',
+}
+
+def make_index(documentos=DOCUMENTOS, **kwargs):
+    kwargs.setdefault('background', False)
+    return IndiceTrigramas(lambda: list(documentos.items()), **kwargs)
+
+def test_normalize_text_folds_case_accents_and_signs():
+    assert normalize_text('  PÉREZ-López, Ñandú ') == 'perez lopez nandu'
+    assert normalize_text(None) == ''
+
+def test_ranking_exact_word_then_prefix_then_substring():
+    # 'per': prefijo de 'perez' y 'perla', subcadena de 'esperanza'
+    resultados = make_index().search('per')
+    assert set(resultados[:2]) == {1, 2}
+    assert resultados[2] == 3
+
+    indice = make_index({1: 'Ana Perales', 2: 'Ana Per', 3: 'Ana Superman'})
+    assert indice.search('per') == [2, 1, 3]
+
+def test_search_ignores_accents_and_case():
+    indice = make_index()
+    assert indice.search('PEREZ') == [1]
+    assert indice.search('pena') == [4]
+    assert indice.search('maría ortiz') == [4]
+
+def test_fuzzy_fallback_tolerates_typos():
+    assert make_index().search('ramirex') == [2]
+
+def test_short_terms_and_limit():
+    indice = make_index()
+    assert indice.search('p') == []
+    assert len(indice.search('per', limit=1)) == 1
+
+def test_add_and_remove_update_the_index():
+    indice = make_index()
+    indice.search('juan')
+    indice.add(5, 'Juana de Arco')
+    assert 5 in indice.search('juana')
+    indice.add(5, 'Carla Núñez')
+    assert 5 not in indice.search('juana')
+    indice.remove(1)
+    assert 1 not in indice.search('juan')
+
+def test_expired_index_is_served_while_it_rebuilds():
+    documentos = dict(DOCUMENTOS)
+    liberar = threading.Event()
+    cargas = []
+
+    def loader():
+        cargas.append(1)
+        if len(cargas) > 1:
+            # La reconstrucción espera hasta que la prueba la libere
+            assert liberar.wait(5)
+        return list(documentos.items())
+
+    indice = IndiceTrigramas(loader, max_age=300)
+    assert indice.search('perez') == [1]
+
+    documentos[6] = 'Pedro Pérez'
+    indice.invalidate()
+    # Se responde con el índice anterior sin esperar a la carga
+    assert indice.search('perez') == [1]
+    # Un cambio recibido durante la reconstrucción no se pierde al reemplazar el índice
+    indice.add(7, 'Pérez Nuevo')
+    liberar.set()
+    for hilo in threading.enumerate():
+        if hilo.name == 'indice-busqueda':
+            hilo.join(5)
+
+    assert sorted(indice.search('perez')) == [1, 6, 7]
+    assert len(cargas) == 2
+
+def test_failed_load_keeps_current_index():
+    documentos = {1: 'Juan Pérez'}
+    respuestas = [list(documentos.items()), None]
+    indice = IndiceTrigramas(lambda: respuestas.pop(0), background=False)
+    assert indice.search('juan') == [1]
+    indice.invalidate()
+    assert indice.search('juan') == [1]
+
+def test_suggestion_page_reports_next_offset():
+    resultados = list(range(30))
+    search = lambda term, limit, offset: resultados[offset:offset + limit]
+    assert suggestion_page(search, 'x', 10, 0) == (list(range(10)), 10)
+    assert suggestion_page(search, 'x', 10, 25) == (list(range(25, 30)), None)
+    # Valores inválidos usan los límites por defecto
+    registros, siguiente = suggestion_page(search, 'x', 'abc', -5)
+    assert registros == list(range(10)) and siguiente == 10
@@ -0,0 +1,143 @@
+"""Pruebas de la caché de datos de referencia (models/cache_datos.py)"""
+import pytest
+
+from models.cache_datos import BackendLocal, BackendSQLite, CacheDatos, create_backend
+from models.database import db
+from models.paciente import Paciente
+import models.cache_datos
+import models.paciente
+
+class Reloj:
+    """Sustituye time.monotonic para avanzar el tiempo a mano"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(models.cache_datos.time, 'monotonic', reloj)
+    return reloj
+
+class Cargador:
+    """Loader que cuenta sus llamadas y devuelve los valores indicados en orden"""
+
+    def __init__(self, *valores):
+        self.valores = list(valores)
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        return self.valores[min(self.llamadas, len(self.valores)) - 1]
+
+def test_value_is_cached_until_ttl_expires(reloj):
+    cache = CacheDatos(BackendLocal(), ttl=60, check_interval=0)
+    cargar = Cargador(['a'], ['b'])
+    assert cache.get('medicos', 'activos', cargar) == ['a']
+    reloj.ahora += 59
+    assert cache.get('medicos', 'activos', cargar) == ['a']
+    assert cargar.llamadas == 1
+    reloj.ahora += 2
+    assert cache.get('medicos', 'activos', cargar) == ['b']
+    assert cargar.llamadas == 2
+
+def test_invalidate_bumps_version_and_forces_reload(reloj):
+    backend = BackendLocal()
+    cache = CacheDatos(backend, ttl=60, check_interval=0)
+    cargar = Cargador(['a'], ['b'])
+    cache.get('medicos', 'activos', cargar)
+    cache.invalidate('medicos')
+    assert backend.get_version('medicos') == 1
+    assert cache.get('medicos', 'activos', cargar) == ['b']
+    assert cargar.llamadas == 2
+    # Otros espacios de nombres no se ven afectados
+    assert backend.get_version('pacientes') == 0
+
+def test_failed_loads_are_never_cached(reloj):
+    cache = CacheDatos(BackendLocal(), ttl=60, check_interval=0)
+    cargar = Cargador(None, ['a'])
+    assert cache.get('medicos', 'activos', cargar) is None
+    assert cache.get('medicos', 'activos', cargar) == ['a']
+    assert cache.get('medicos', 'activos', cargar) == ['a']
+    assert cargar.llamadas == 2
+
+class BackendCaido:
+    def get_version(self, namespace):
+        raise ConnectionError('sin servidor')
+
+    def bump(self, namespace):
+        raise ConnectionError('sin servidor')
+
+def test_max_entries_evicts_expired_then_oldest(reloj):
+    cache = CacheDatos(BackendLocal(), ttl=60, check_interval=0, max_entries=3)
+    cache.get('paciente:1', 'resumen', Cargador('a'))
+    reloj.ahora += 30
+    cache.get('paciente:2', 'resumen', Cargador('b'))
+    cache.get('paciente:3', 'resumen', Cargador('c'))
+    reloj.ahora += 31
+    # La primera entrada ya venció: se quita solo esa
+    cache.get('paciente:4', 'resumen', Cargador('d'))
+    assert sorted(namespace for namespace, _ in cache._entries) == ['paciente:2', 'paciente:3', 'paciente:4']
+    # Sin entradas vencidas se quita la más antigua
+    cache.get('paciente:5', 'resumen', Cargador('e'))
+    assert sorted(namespace for namespace, _ in cache._entries) == ['paciente:3', 'paciente:4', 'paciente:5']
+
+def test_unreachable_backend_disables_caching(reloj, capsys):
+    cache = CacheDatos(BackendCaido(), ttl=60, check_interval=0)
+    cargar = Cargador(['a'])
+    cache.get('medicos', 'activos', cargar)
+    cache.get('medicos', 'activos', cargar)
+    assert cargar.llamadas == 2
+    cache.invalidate('medicos')
+    assert 'Error' in capsys.readouterr().out
+
+def test_sqlite_versions_are_shared_between_instances(tmp_path, reloj):
+    ruta = str(tmp_path / 'versiones.db')
+    # Dos "procesos", cada uno con su caché local sobre el mismo archivo
+    proceso_a = CacheDatos(BackendSQLite(ruta), ttl=60, check_interval=0)
+    proceso_b = CacheDatos(BackendSQLite(ruta), ttl=60, check_interval=0)
+    cargar_b = Cargador(['viejo'], ['nuevo'])
+    assert proceso_b.get('pacientes', 'activos', cargar_b) == ['viejo']
+
+    proceso_a.invalidate('pacientes')
+    assert proceso_b.get('pacientes', 'activos', cargar_b) == ['nuevo']
+    assert cargar_b.llamadas == 2
+    assert BackendSQLite(ruta).get_version('pacientes') == 1
+
+def test_check_interval_limits_backend_queries(tmp_path, reloj):
+    ruta = str(tmp_path / 'versiones.db')
+    proceso_a = CacheDatos(BackendSQLite(ruta), ttl=60, check_interval=5)
+    proceso_b = CacheDatos(BackendSQLite(ruta), ttl=60, check_interval=5)
+    cargar_b = Cargador(['viejo'], ['nuevo'])
+    proceso_b.get('pacientes', 'activos', cargar_b)
+    proceso_a.invalidate('pacientes')
+    # La invalidación remota se ve como mucho check_interval segundos después
+    assert proceso_b.get('pacientes', 'activos', cargar_b) == ['viejo']
+    reloj.ahora += 5
+    assert proceso_b.get('pacientes', 'activos', cargar_b) == ['nuevo']
+
+def test_create_backend_by_url(tmp_path):
+    assert isinstance(create_backend('local'), BackendLocal)
+    assert isinstance(create_backend(f"sqlite:///{tmp_path / 'versiones.db'}"), BackendSQLite)
+    # Una ruta SQLite inválida cae a la caché local
+    assert isinstance(create_backend(f"sqlite:///{tmp_path / 'no' / 'existe.db'}"), BackendLocal)
+
+def test_patient_list_is_cached_and_invalidated_on_write(monkeypatch):
+    monkeypatch.setattr(models.paciente, 'cache_datos', CacheDatos(BackendLocal(), check_interval=0))
+    consultas = []
+
+    def execute_query(query, params=None):
+        consultas.append(query)
+        return [(1, 'Ana', 'López', None, 'F', 'O+', '', 1)]
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+    monkeypatch.setattr(db, 'execute_update', lambda query, params=None: 1)
+
+    assert Paciente.get_all()[0]['nombre_completo'] == 'Ana López'
+    Paciente.get_all()
+    assert len(consultas) == 1
+    Paciente.delete(1)
+    Paciente.get_all()
+    assert len(consultas) == 2
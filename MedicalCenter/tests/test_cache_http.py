@@ -0,0 +1,73 @@
+"""Pruebas de las respuestas condicionales con ETag (controllers/cache_http.py)"""
+import pytest
+from flask import Flask, flash
+
+from controllers.cache_http import REFERENCIA, conditional
+from models.cache_datos import cache_datos
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.llamadas = 0
+
+    @app.route('/listado')
+    @conditional(['pruebas_http'])
+    def listado():
+        app.llamadas += 1
+        return 'listado'
+
+    @app.route('/detalle/<int:registro_id>')
+    @conditional(lambda registro_id: [f'pruebas_http:{registro_id}'], cache_control=REFERENCIA)
+    def detalle(registro_id):
+        app.llamadas += 1
+        return f'detalle {registro_id}'
+
+    @app.route('/avisar')
+    def avisar():
+        flash('Guardado')
+        return 'ok'
+
+    return app
+
+def test_first_request_sends_weak_etag(app):
+    respuesta = app.test_client().get('/listado')
+    etag, debil = respuesta.get_etag()
+    assert respuesta.status_code == 200 and etag and debil
+    assert respuesta.headers['Cache-Control'] == 'private, no-cache'
+
+def test_matching_etag_returns_304_without_running_view(app):
+    cliente = app.test_client()
+    etag = cliente.get('/listado').headers['ETag']
+    respuesta = cliente.get('/listado', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 304
+    assert respuesta.headers['ETag'] == etag
+    assert respuesta.get_data() == b''
+    assert app.llamadas == 1
+
+def test_invalidated_namespace_changes_etag(app):
+    cliente = app.test_client()
+    etag = cliente.get('/listado').headers['ETag']
+    cache_datos.invalidate('pruebas_http')
+    respuesta = cliente.get('/listado', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers['ETag'] != etag
+    assert app.llamadas == 2
+
+def test_namespaces_computed_from_view_arguments(app):
+    cliente = app.test_client()
+    etag = cliente.get('/detalle/1').headers['ETag']
+    assert cliente.get('/detalle/1').headers['Cache-Control'] == REFERENCIA
+    # Invalidar otro registro no afecta la ETag de este
+    cache_datos.invalidate('pruebas_http:2')
+    assert cliente.get('/detalle/1', headers={'If-None-Match': etag}).status_code == 304
+    cache_datos.invalidate('pruebas_http:1')
+    assert cliente.get('/detalle/1', headers={'If-None-Match': etag}).status_code == 200
+
+def test_pending_flash_skips_conditional(app):
+    cliente = app.test_client()
+    etag = cliente.get('/listado').headers['ETag']
+    cliente.get('/avisar')
+    respuesta = cliente.get('/listado', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200
+    assert 'ETag' not in respuesta.headers
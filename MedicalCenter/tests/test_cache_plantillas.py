@@ -0,0 +1,107 @@
+"""Pruebas de la caché de fragmentos de plantilla (models/cache_plantillas.py)"""
+import pytest
+from flask import Flask, flash, render_template_string
+from jinja2 import DictLoader, Environment
+
+from models.cache_datos import BackendLocal, CacheDatos
+from models.cache_plantillas import (MARCA_CSRF, BytecodeCacheContado, CacheFragmentos, FragmentosExtension,
+                                     configure_templates)
+import models.cache_plantillas
+
+@pytest.fixture
+def datos(monkeypatch):
+    """Caché de datos propia para que las versiones empiecen en cero"""
+    cache = CacheDatos(BackendLocal(), check_interval=0)
+    monkeypatch.setattr(models.cache_plantillas, 'cache_datos', cache)
+    return cache
+
+class Render:
+    """caller() de la etiqueta: cuenta cuántas veces se renderizó el bloque"""
+
+    def __init__(self, html):
+        self.html = html
+        self.veces = 0
+
+    def __call__(self):
+        self.veces += 1
+        return self.html
+
+def test_fragment_is_reused_until_namespace_version_changes(datos):
+    cache = CacheFragmentos()
+    render = Render('<tr>Ana</tr>')
+    assert cache.render('pacientes', ['pacientes'], ['/pacientes'], render) == '<tr>Ana</tr>'
+    cache.render('pacientes', ['pacientes'], ['/pacientes'], render)
+    assert render.veces == 1
+    # Otra página (extra distinto) es otra entrada
+    cache.render('pacientes', ['pacientes'], ['/pacientes?cursor=x'], render)
+    assert render.veces == 2
+    datos.invalidate('pacientes')
+    cache.render('pacientes', ['pacientes'], ['/pacientes'], render)
+    assert render.veces == 3
+    # Invalidar otra tabla no afecta al fragmento
+    datos.invalidate('medicos')
+    cache.render('pacientes', ['pacientes'], ['/pacientes'], render)
+    assert render.veces == 3
+    assert cache.stats() == {'pacientes': {'aciertos': 2, 'fallos': 3}}
+
+def test_csrf_token_is_swapped_for_placeholder(datos):
+    cache = CacheFragmentos()
+    render = Render('<input name="csrf_token" value="token-1">')
+    cache.render('citas', ['citas'], [], render, csrf_token=lambda: 'token-1')
+    assert all(MARCA_CSRF in html for html, _ in cache._entries.values())
+    html = cache.render('citas', ['citas'], [], render, csrf_token=lambda: 'token-2')
+    assert html == '<input name="csrf_token" value="token-2">'
+    assert render.veces == 1
+
+def test_can_store_veto_renders_without_storing(datos):
+    cache = CacheFragmentos()
+    cache.can_store = lambda: False
+    render = Render('<tr></tr>')
+    cache.render('citas', ['citas'], [], render)
+    cache.render('citas', ['citas'], [], render)
+    assert render.veces == 2 and not cache._entries
+
+class BackendCaido:
+    def get_version(self, namespace):
+        raise ConnectionError('sin servidor')
+
+def test_unknown_version_always_renders(monkeypatch):
+    monkeypatch.setattr(models.cache_plantillas, 'cache_datos', CacheDatos(BackendCaido(), check_interval=0))
+    cache = CacheFragmentos()
+    render = Render('<tr></tr>')
+    cache.render('citas', ['citas'], [], render)
+    cache.render('citas', ['citas'], [], render)
+    assert render.veces == 2
+
+def test_oldest_fragments_are_evicted(datos):
+    cache = CacheFragmentos(max_entries=2)
+    for pagina in ('a', 'b', 'c'):
+        cache.render('citas', ['citas'], [pagina], Render(pagina))
+    assert [key[3] for key in cache._entries] == [repr(['b']), repr(['c'])]
+
+def test_cache_tag_in_template(datos, monkeypatch):
+    monkeypatch.setattr(models.cache_plantillas, 'fragmentos', CacheFragmentos())
+    filas = ['Ana']
+    env = Environment(loader=DictLoader({'lista.html': "{% cache 'lista', ['pacientes'] %}{{ filas|join(',') }}{% endcache %}"}),
+                      extensions=[FragmentosExtension])
+    plantilla = env.get_template('lista.html')
+    assert plantilla.render(filas=filas) == 'Ana'
+    assert plantilla.render(filas=['Ana', 'Luis']) == 'Ana'
+    datos.invalidate('pacientes')
+    assert plantilla.render(filas=['Ana', 'Luis']) == 'Ana,Luis'
+
+def test_error_flash_prevents_storing(datos, monkeypatch, tmp_path):
+    monkeypatch.setattr(models.cache_plantillas, 'fragmentos', CacheFragmentos())
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.config['BYTECODE_PLANTILLAS'] = str(tmp_path)
+    configure_templates(app)
+    plantilla = "{% cache 'citas', ['citas'] %}{{ filas|length }}{% endcache %}"
+    with app.test_request_context():
+        flash('Error de conexión a la base de datos', 'error')
+        assert render_template_string(plantilla, filas=[]) == '0'
+    with app.test_request_context():
+        assert render_template_string(plantilla, filas=[1, 2]) == '2'
+    with app.test_request_context():
+        assert render_template_string(plantilla, filas=[]) == '2'
+    assert isinstance(app.jinja_env.bytecode_cache, BytecodeCacheContado)
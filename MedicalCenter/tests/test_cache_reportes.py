@@ -0,0 +1,86 @@
+"""Pruebas de la caché de reportes PDF (models/cache_reportes.py)"""
+import os
+import time
+
+import pytest
+
+from models.cache_reportes import CacheReportes
+from models.exploracion import Exploracion
+import models.exploracion
+
+def escribir(contenido):
+    def writer(destino):
+        with open(destino, 'wb') as archivo:
+            archivo.write(contenido)
+    return writer
+
+def test_lookup_hits_only_the_stored_version(tmp_path):
+    cache = CacheReportes(str(tmp_path))
+    assert cache.lookup(1, 'v1') is None
+    ruta = cache.store(1, 'v1', escribir(b'%PDF-1'))
+    assert cache.lookup(1, 'v1') == ruta
+    assert cache.lookup(1, 'v2') is None
+
+def test_new_version_replaces_old_files(tmp_path):
+    cache = CacheReportes(str(tmp_path))
+    anterior = cache.store(1, 'v1', escribir(b'%PDF-1'))
+    otra_exploracion = cache.store(2, 'v1', escribir(b'%PDF-2'))
+    nueva = cache.store(1, 'v2', escribir(b'%PDF-3'))
+    assert not os.path.exists(anterior)
+    assert os.path.exists(nueva) and os.path.exists(otra_exploracion)
+
+def test_failed_writer_leaves_no_files(tmp_path):
+    cache = CacheReportes(str(tmp_path))
+
+    def writer(destino):
+        with open(destino, 'wb') as archivo:
+            archivo.write(b'%PDF a medias')
+        raise RuntimeError('error de ReportLab')
+
+    with pytest.raises(RuntimeError):
+        cache.store(1, 'v1', writer)
+    assert os.listdir(tmp_path) == []
+
+def test_eviction_removes_least_recently_used_beyond_size(tmp_path):
+    cache = CacheReportes(str(tmp_path), max_bytes=25)
+    rutas = [cache.store(i, 'v1', escribir(b'x' * 10)) for i in range(1, 3)]
+    for ruta, segundos in zip(rutas, (60, 30)):
+        antiguo = time.time() - segundos
+        os.utime(ruta, (antiguo, antiguo))
+    # Leer el primero lo vuelve el más reciente
+    cache.lookup(1, 'v1')
+    cache.store(3, 'v1', escribir(b'x' * 10))
+    assert os.path.exists(rutas[0])
+    assert not os.path.exists(rutas[1])
+
+def test_eviction_removes_expired_files(tmp_path):
+    cache = CacheReportes(str(tmp_path), max_age=30)
+    ruta = cache.store(1, 'v1', escribir(b'%PDF'))
+    antiguo = time.time() - 60
+    os.utime(ruta, (antiguo, antiguo))
+    cache.evict()
+    assert not os.path.exists(ruta)
+
+def test_report_version_follows_content():
+    exploracion = {'id_exploracion': 1, 'peso': 70, 'diagnostico': 'Gripe'}
+    version = Exploracion.report_version(exploracion)
+    assert version == Exploracion.report_version(dict(exploracion))
+    assert version != Exploracion.report_version(dict(exploracion, peso=71))
+
+def test_unchanged_exploration_is_not_rendered_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(models.exploracion, 'cache_reportes', CacheReportes(str(tmp_path)))
+    construidos = []
+
+    def build_medical_report(exploracion, destino):
+        construidos.append(exploracion['id_exploracion'])
+        escribir(b'%PDF')(destino)
+
+    monkeypatch.setattr(Exploracion, 'build_medical_report', staticmethod(build_medical_report))
+    exploracion = {'id_exploracion': 1, 'peso': 70}
+    primera = Exploracion.generate_medical_report(1, exploracion)
+    assert Exploracion.generate_medical_report(1, exploracion) == primera
+    assert construidos == [1]
+    # Al editar la exploración cambia la versión y se genera otro archivo
+    segunda = Exploracion.generate_medical_report(1, dict(exploracion, peso=71))
+    assert segunda != primera and construidos == [1, 1]
+    assert not os.path.exists(primera)
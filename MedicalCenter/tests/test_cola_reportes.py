@@ -0,0 +1,136 @@
+"""Pruebas de la cola de reportes en segundo plano (models/cola_reportes.py)"""
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from models.cola_reportes import ColaReportes, EstadosLocal, EstadosSQLite, create_store
+from models.database import db
+from models.exploracion import Exploracion
+import controllers.exploracion_controller as exploracion_controller
+
+@pytest.fixture
+def generar(monkeypatch):
+    """Sustituye la generación del PDF; `resultados` decide qué retorna cada exploración"""
+    estado = {'resultados': {}, 'desconexiones': 0}
+
+    def generate_medical_report(exploracion_id):
+        resultado = estado['resultados'].get(exploracion_id)
+        if isinstance(resultado, Exception):
+            raise resultado
+        if isinstance(resultado, threading.Event):
+            assert resultado.wait(5)
+            return f"/tmp/reporte_{exploracion_id}.pdf"
+        return resultado
+
+    monkeypatch.setattr(Exploracion, 'generate_medical_report', staticmethod(generate_medical_report))
+    monkeypatch.setattr(db, 'disconnect', lambda: estado.__setitem__('desconexiones', estado['desconexiones'] + 1))
+    return estado
+
+def terminar(cola):
+    """Espera a que los hilos de trabajo terminen los trabajos encolados"""
+    cola._executor.shutdown(wait=True)
+    cola._executor = None
+
+def test_job_is_generated_in_background(generar):
+    generar['resultados'][3] = '/tmp/reporte_3.pdf'
+    cola = ColaReportes(max_workers=1)
+    job_id = cola.submit(3)
+    terminar(cola)
+    job = cola.get_status(job_id)
+    assert job['estado'] == 'listo' and job['ruta'] == '/tmp/reporte_3.pdf'
+    assert job['exploracion_id'] == 3
+    # El hilo de trabajo devuelve su conexión al pool
+    assert generar['desconexiones'] == 1
+
+def test_failed_generation_is_reported(generar):
+    generar['resultados'][4] = RuntimeError('sin fuente')
+    cola = ColaReportes(max_workers=1)
+    sin_exploracion, con_error = cola.submit(5), cola.submit(4)
+    terminar(cola)
+    assert cola.get_status(sin_exploracion)['error'] == 'No se encontró la exploración'
+    assert cola.get_status(con_error)['estado'] == 'error'
+    assert cola.get_status(con_error)['error'] == 'sin fuente'
+    assert generar['desconexiones'] == 2
+
+def test_full_queue_rejects_new_jobs(generar):
+    liberar = threading.Event()
+    generar['resultados'][1] = liberar
+    cola = ColaReportes(max_workers=1, max_pending=1)
+    assert cola.submit(1)
+    # Con la cola llena el controlador genera el PDF en la petición
+    assert cola.submit(2) is None
+    liberar.set()
+    terminar(cola)
+    assert cola.submit(2)
+    terminar(cola)
+
+def test_unknown_job_has_no_status():
+    assert ColaReportes().get_status('no-existe') is None
+
+def test_status_endpoint(generar, monkeypatch):
+    generar['resultados'][3] = '/tmp/reporte_3.pdf'
+    cola = ColaReportes(max_workers=1)
+    monkeypatch.setattr(exploracion_controller, 'cola_reportes', cola)
+    job_id = cola.submit(3)
+    terminar(cola)
+
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(exploracion_controller.exploracion_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+
+    datos = cliente.get(f'/api/reporte/{job_id}').get_json()
+    assert datos['estado'] == 'listo'
+    assert datos['descarga_url'].endswith(f'/descargar_reporte/{job_id}')
+    assert cliente.get('/api/reporte/no-existe').status_code == 404
+
+def trabajo(job_id, estado, actualizado):
+    return {'id': job_id, 'exploracion_id': 1, 'estado': estado, 'ruta': None, 'error': None,
+            'actualizado': actualizado}
+
+@pytest.fixture(params=['local', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'local':
+        return EstadosLocal()
+    return EstadosSQLite(str(tmp_path / 'reportes.db'))
+
+def test_purge_keeps_running_jobs_until_abandoned(store):
+    ahora = time.time()
+    store.insert(trabajo('listo-viejo', 'listo', ahora - 100))
+    store.insert(trabajo('error-viejo', 'error', ahora - 100))
+    store.insert(trabajo('listo-nuevo', 'listo', ahora - 10))
+    store.insert(trabajo('procesando', 'procesando', ahora - 100))
+    store.insert(trabajo('pendiente-abandonado', 'pendiente', ahora - 1000))
+    store.purge(ahora - 50, ahora - 500)
+    restantes = [job_id for job_id in ('listo-viejo', 'error-viejo', 'listo-nuevo', 'procesando',
+                                       'pendiente-abandonado') if store.get(job_id)]
+    assert restantes == ['listo-nuevo', 'procesando']
+    assert store.count_pending() == 1
+
+def test_long_running_job_survives_job_ttl(generar):
+    liberar = threading.Event()
+    generar['resultados'][1] = liberar
+    cola = ColaReportes(max_workers=1, job_ttl=0)
+    job_id = cola.submit(1)
+    # Otro envío purga los trabajos terminados, pero no el que sigue en proceso
+    cola.submit(2)
+    assert cola.get_status(job_id)['estado'] in ('pendiente', 'procesando')
+    liberar.set()
+    terminar(cola)
+    assert cola.get_status(job_id)['estado'] == 'listo'
+
+def test_sqlite_state_is_shared_between_processes(generar, tmp_path):
+    generar['resultados'][3] = '/tmp/reporte_3.pdf'
+    url = f"sqlite:///{tmp_path / 'reportes.db'}"
+    # Dos "procesos": uno genera el reporte y otro responde la consulta de estado
+    proceso_a = ColaReportes(max_workers=1, store=create_store(url))
+    proceso_b = ColaReportes(store=create_store(url))
+    job_id = proceso_a.submit(3)
+    terminar(proceso_a)
+    job = proceso_b.get_status(job_id)
+    assert job['estado'] == 'listo' and job['ruta'] == '/tmp/reporte_3.pdf'
+    assert isinstance(create_store('local'), EstadosLocal)
@@ -0,0 +1,97 @@
+"""Pruebas de la compresión de respuestas (controllers/compresion.py)"""
+import gzip
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from controllers.compresion import configure_compression, sin_compresion
+
+GRANDE = 'x' * 4096
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(COMPRESION=True, COMPRESION_MIN_BYTES=1024)
+
+    @app.route('/pequeno')
+    def pequeno():
+        return jsonify(mensaje='hola')
+
+    @app.route('/grande')
+    def grande():
+        return jsonify(datos=GRANDE)
+
+    @app.route('/etag')
+    def con_etag():
+        respuesta = Response(GRANDE, mimetype='text/plain')
+        respuesta.set_etag('abc')
+        return respuesta
+
+    @app.route('/exportar')
+    def exportar():
+        return Response((f"fila {i}\n" for i in range(3)), mimetype='text/csv')
+
+    @app.route('/pdf')
+    @sin_compresion
+    def pdf():
+        return Response(GRANDE, mimetype='text/plain')
+
+    @app.route('/codificado')
+    def codificado():
+        return Response(GRANDE, mimetype='text/plain', headers={'Content-Encoding': 'identity'})
+
+    configure_compression(app)
+    return app
+
+def get(app, ruta, encoding='gzip'):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    return app.test_client().get(ruta, headers=headers)
+
+def test_small_response_is_not_compressed(app):
+    respuesta = get(app, '/pequeno')
+    assert 'Content-Encoding' not in respuesta.headers
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+
+def test_large_json_is_gzipped(app):
+    respuesta = get(app, '/grande')
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+    assert int(respuesta.headers['Content-Length']) == len(respuesta.get_data())
+    assert GRANDE in gzip.decompress(respuesta.get_data()).decode('utf-8')
+
+def test_threshold_is_configurable(app):
+    app.config['COMPRESION_MIN_BYTES'] = 10 ** 6
+    assert 'Content-Encoding' not in get(app, '/grande').headers
+
+def test_strong_etag_becomes_weak(app):
+    etag, debil = get(app, '/etag').get_etag()
+    assert etag == 'abc' and debil
+    etag, debil = get(app, '/etag', encoding=None).get_etag()
+    assert etag == 'abc' and not debil
+
+def test_streamed_response_is_compressed_without_length(app):
+    respuesta = get(app, '/exportar')
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in respuesta.headers
+    assert gzip.decompress(respuesta.get_data()) == b"fila 0\nfila 1\nfila 2\n"
+
+def test_opted_out_and_encoded_responses_are_untouched(app):
+    respuesta = get(app, '/pdf')
+    assert 'Content-Encoding' not in respuesta.headers
+    assert respuesta.get_data(as_text=True) == GRANDE
+    respuesta = get(app, '/codificado')
+    assert respuesta.headers['Content-Encoding'] == 'identity'
+    assert respuesta.get_data(as_text=True) == GRANDE
+
+def test_client_without_accept_encoding_gets_plain_body(app):
+    respuesta = get(app, '/grande', encoding=None)
+    assert 'Content-Encoding' not in respuesta.headers
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+
+def test_compression_is_off_unless_enabled():
+    app = Flask(__name__)
+    app.route('/grande')(lambda: Response(GRANDE, mimetype='text/plain'))
+    configure_compression(app)
+    assert not app.after_request_funcs
+    respuesta = get(app, '/grande')
+    assert 'Content-Encoding' not in respuesta.headers and 'Vary' not in respuesta.headers
@@ -0,0 +1,204 @@
+"""Pruebas del pool de conexiones (models/database.py)"""
+import threading
+import time
+
+import pytest
+from mysql.connector import Error
+
+from models.database import ConnectionPool, Database, PoolTimeoutError
+
+class CursorFalso:
+    def close(self):
+        pass
+
+class ConexionFalsa:
+    """Conexión que registra su ciclo de vida sin hablar con MySQL"""
+
+    def __init__(self, numero):
+        self.numero = numero
+        self.sana = True
+        self.cerrada = False
+        self.pings = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.sana:
+            raise Error(msg="conexión perdida")
+
+    def is_connected(self):
+        return self.sana
+
+    def rollback(self):
+        if not self.sana:
+            raise Error(msg="conexión perdida")
+
+    def cursor(self, **kwargs):
+        return CursorFalso()
+
+    def close(self):
+        self.cerrada = True
+
+class PoolFalso(ConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__(connect_args={}, **kwargs)
+        self.creadas = []
+
+    def _create_connection(self):
+        conexion = ConexionFalsa(len(self.creadas) + 1)
+        self.creadas.append(conexion)
+        return conexion
+
+def test_released_connection_is_reused():
+    pool = PoolFalso()
+    primera = pool.acquire()
+    pool.release(primera)
+    assert pool.acquire() is primera
+    assert len(pool.creadas) == 1
+
+def test_most_recently_released_is_lent_first():
+    pool = PoolFalso()
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire() is b
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    pool = PoolFalso(max_size=1, checkout_timeout=0.05)
+    pool.acquire()
+    inicio = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert time.monotonic() - inicio >= 0.05
+
+def test_waiting_thread_gets_released_connection():
+    pool = PoolFalso(max_size=1, checkout_timeout=5)
+    conexion = pool.acquire()
+    obtenida = []
+    hilo = threading.Thread(target=lambda: obtenida.append(pool.acquire()))
+    hilo.start()
+    time.sleep(0.05)
+    pool.release(conexion)
+    hilo.join(1)
+    assert obtenida == [conexion]
+
+def test_idle_connections_above_minimum_are_reaped():
+    pool = PoolFalso(min_size=1, idle_timeout=0.01)
+    conexiones = [pool.acquire() for _ in range(3)]
+    for conexion in conexiones:
+        pool.release(conexion)
+    time.sleep(0.02)
+    restante = pool.acquire()
+    # Solo se conserva el mínimo; las demás ociosas se cerraron
+    assert sum(c.cerrada for c in conexiones) == 2
+    assert not restante.cerrada
+
+def test_unhealthy_idle_connection_is_replaced():
+    pool = PoolFalso(health_check_interval=0)
+    caida = pool.acquire()
+    pool.release(caida)
+    caida.sana = False
+    nueva = pool.acquire()
+    assert nueva is not caida
+    assert caida.cerrada and caida.pings == 1
+    assert pool._size == 1
+
+class CondicionContada(threading.Condition):
+    """Condición que cuenta los avisos a los hilos en espera"""
+
+    def __init__(self):
+        super().__init__(threading.Lock())
+        self.avisos = 0
+
+    def notify(self, n=1):
+        self.avisos += 1
+        super().notify(n)
+
+def test_discarding_unhealthy_connection_wakes_a_waiter():
+    pool = PoolFalso(health_check_interval=0)
+    caida = pool.acquire()
+    pool.release(caida)
+    caida.sana = False
+    pool._condition = CondicionContada()
+    pool.acquire()
+    # El lugar liberado al descartarla se anuncia aunque el mismo hilo lo vuelva a ocupar
+    assert pool._condition.avisos == 1
+
+def test_warm_opens_minimum_connections():
+    pool = PoolFalso(min_size=2)
+    pool.warm()
+    assert len(pool.creadas) == 2 and len(pool._idle) == 2 and pool._size == 2
+    pool.acquire()
+    pool.warm()
+    # Las conexiones prestadas cuentan para el mínimo
+    assert len(pool.creadas) == 2
+
+def test_warm_failure_leaves_pool_usable():
+    class PoolSinServidor(PoolFalso):
+        def _create_connection(self):
+            raise Error(msg="servidor no disponible")
+
+    pool = PoolSinServidor(min_size=2)
+    pool.warm()
+    assert pool._size == 0 and not pool._idle
+
+def test_database_pool_is_warmed_on_creation(monkeypatch):
+    creadas = []
+    monkeypatch.setattr(ConnectionPool, '_create_connection',
+                        lambda self: creadas.append(ConexionFalsa(len(creadas) + 1)) or creadas[-1])
+    database = Database()
+    database.pool_min_size = 3
+    assert len(database.pool._idle) == 3 and len(creadas) == 3
+
+def test_recently_used_connection_skips_ping():
+    pool = PoolFalso(health_check_interval=60)
+    conexion = pool.acquire()
+    pool.release(conexion)
+    assert pool.acquire() is conexion
+    assert conexion.pings == 0
+
+def test_broken_connection_is_not_returned_to_idle():
+    pool = PoolFalso(max_size=1)
+    conexion = pool.acquire()
+    conexion.sana = False
+    pool.release(conexion)
+    assert conexion.cerrada
+    assert pool.acquire() is not conexion
+
+def test_failed_connect_frees_its_slot():
+    class PoolSinServidor(PoolFalso):
+        def _create_connection(self):
+            raise Error(msg="servidor no disponible")
+
+    pool = PoolSinServidor(max_size=1, checkout_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(Error) as error:
+            pool.acquire()
+        assert not isinstance(error.value, PoolTimeoutError)
+    assert pool._size == 0
+
+def test_each_thread_gets_its_own_connection():
+    database = Database()
+    database._pool = PoolFalso()
+    # Ambos hilos tienen su conexión al mismo tiempo antes de devolverla
+    barrera = threading.Barrier(2, timeout=1)
+    propias = {}
+
+    def trabajar(nombre):
+        database.connect()
+        propias[nombre] = database.connection
+        # Conectar de nuevo en el mismo hilo reutiliza la conexión
+        database.connect()
+        propias[nombre + '_otra_vez'] = database.connection
+        barrera.wait()
+        database.disconnect()
+        propias[nombre + '_final'] = database.connection
+
+    hilos = [threading.Thread(target=trabajar, args=(nombre,)) for nombre in ('a', 'b')]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(1)
+    assert propias['a'] is not propias['b']
+    assert propias['a_otra_vez'] is propias['a'] and propias['b_otra_vez'] is propias['b']
+    assert propias['a_final'] is None and propias['b_final'] is None
+    assert len(database.pool._idle) == 2
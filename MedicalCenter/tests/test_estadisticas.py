@@ -0,0 +1,96 @@
+"""Pruebas de los agregados diarios y del tablero (models/estadisticas.py, controllers/dashboard_controller.py)"""
+from datetime import date
+
+import pytest
+from flask import Flask
+
+from controllers.dashboard_controller import dashboard_bp
+from models.cita import Cita
+from models.database import db
+from models.estadisticas import UPSERT_CITAS, UPSERT_EXPLORACIONES, Estadisticas
+
+class CursorFalso:
+    def __init__(self, escrituras):
+        self.escrituras = escrituras
+
+    def executemany(self, query, filas):
+        self.escrituras.append((query, list(filas)))
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def escrituras(monkeypatch):
+    escrituras = []
+    monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: CursorFalso(escrituras))
+    monkeypatch.setattr(db, 'commit', lambda: None)
+    monkeypatch.setattr(db, 'rollback', lambda: None)
+    return escrituras
+
+HOY = date(2024, 3, 1)
+
+def test_move_cita_subtracts_old_and_adds_new_state(escrituras):
+    assert Estadisticas.move_cita((HOY, 5, 'programada'), (HOY, 5, 'cancelada')) is True
+    assert escrituras == [(UPSERT_CITAS, [(HOY, 5, 'programada', -1), (HOY, 5, 'cancelada', 1)])]
+
+def test_move_cita_without_changes_writes_nothing(escrituras):
+    assert Estadisticas.move_cita((HOY, 5, 'programada'), (HOY, 5, 'programada')) is True
+    assert Estadisticas.move_cita() is True
+    assert escrituras == []
+
+def test_add_exploracion(escrituras):
+    Estadisticas.add_exploracion(HOY, 5, -1)
+    assert escrituras == [(UPSERT_EXPLORACIONES, [(HOY, 5, -1)])]
+
+def test_concurrent_cancel_is_counted_once(escrituras, monkeypatch):
+    # Otra petición canceló la cita entre la lectura y la escritura
+    monkeypatch.setattr(db, 'execute_query', lambda query, params=None: [(HOY, 5, 'programada')])
+    actualizaciones = []
+
+    def execute_update(query, params=None):
+        actualizaciones.append((query, params))
+        return 1 if params[-1] == 'cancelada' else 0
+    monkeypatch.setattr(db, 'execute_update', execute_update)
+
+    assert Cita.cancel(1) is False
+    assert actualizaciones[0][0].endswith('AND estatus = %s') and actualizaciones[0][1] == (1, 'programada')
+    assert escrituras == []
+
+def test_get_dashboard_totals(monkeypatch):
+    def execute_query(query, params=None):
+        if 'resumen_signos_vitales' in query:
+            return [(2,)]
+        if 'resumen_exploraciones_diario' in query:
+            return [('Cardiología', 4)]
+        if 'JOIN medicos' in query:
+            return [(5, 'Luis', 'Pérez', 'Cardiología', 10, 2, 4)]
+        return [(HOY, 6, 1, 3), (date(2024, 3, 2), 4, 1, 0)]
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+    tablero = Estadisticas.get_dashboard(HOY, date(2024, 3, 2))
+    assert tablero['totales'] == {'citas': 10, 'canceladas': 2, 'completadas': 3, 'tasa_cancelacion': 20.0,
+                                  'pacientes_con_alertas': 2}
+    assert tablero['citas_por_medico'][0]['medico_nombre_completo'] == 'Luis Pérez'
+    assert tablero['citas_por_medico'][0]['promedio_diario'] == 2.5
+    assert tablero['exploraciones_por_especialidad'] == [{'especialidad': 'Cardiología', 'total': 4}]
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(db, 'connect', lambda: True)
+    monkeypatch.setattr(db, 'disconnect', lambda: None)
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(dashboard_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    return cliente
+
+def test_api_dashboard_uses_requested_range(cliente, monkeypatch):
+    rangos = []
+    monkeypatch.setattr(Estadisticas, 'get_dashboard', lambda inicio, fin: rangos.append((inicio, fin)) or {})
+    assert cliente.get('/api/dashboard?fecha_inicio=2024-03-01&fecha_fin=2024-03-31').status_code == 200
+    assert rangos == [(HOY, date(2024, 3, 31))]
+
+def test_api_dashboard_rejects_invalid_range(cliente):
+    assert cliente.get('/api/dashboard?fecha_inicio=2024-13-01').status_code == 400
+    assert cliente.get('/api/dashboard?fecha_inicio=2024-03-31&fecha_fin=2024-03-01').status_code == 400
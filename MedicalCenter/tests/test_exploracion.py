@@ -0,0 +1,51 @@
+"""Pruebas del alta de exploraciones (models/exploracion.py)"""
+import re
+from datetime import date
+
+import pytest
+
+from models.database import db
+from models.exploracion import Exploracion
+import models.exploracion
+
+@pytest.fixture
+def alta(monkeypatch):
+    """Registra el INSERT y los ganchos que se ejecutan tras crear la exploración"""
+    registro = {'insert': None, 'signos': [], 'estadisticas': [], 'invalidados': [], 'afectadas': 1}
+
+    def execute_update(query, params=None):
+        registro['insert'] = (' '.join(query.split()), params)
+        return registro['afectadas']
+
+    monkeypatch.setattr(db, 'execute_update', execute_update)
+    monkeypatch.setattr(db, 'get_last_insert_id', lambda: 42)
+    monkeypatch.setattr(models.exploracion.SignosVitales, 'record_exploracion',
+                        staticmethod(lambda *args, **kwargs: registro['signos'].append(args)))
+    monkeypatch.setattr(models.exploracion.Estadisticas, 'add_exploracion',
+                        staticmethod(lambda fecha, medico_id: registro['estadisticas'].append((fecha, medico_id))))
+    monkeypatch.setattr(models.exploracion.cache_datos, 'invalidate', registro['invalidados'].append)
+    return registro
+
+def crear():
+    return Exploracion.create(9, 3, 5, date(2024, 1, 10), 70.5, 170, 36.5, 80, 98, 90,
+                              'Tos', 'Resfriado', 'Reposo', 'Ninguno')
+
+def test_create_insert_has_one_placeholder_per_column(alta):
+    assert crear() == 42
+    query, params = alta['insert']
+    columnas = re.search(r'INSERT INTO exploracion \((.*?)\)', query).group(1).split(', ')
+    marcadores = re.search(r'VALUES \((.*?)\)', query).group(1).split(', ')
+    assert columnas[0] == 'id_cita' and columnas[-1] == 'estatus'
+    assert len(columnas) == len(marcadores) == len(params)
+    assert params[:3] == (9, 3, 5) and params[-1] == 1
+
+def test_create_updates_summaries_and_cache(alta):
+    crear()
+    assert alta['signos'] == [(42, 3, date(2024, 1, 10), 70.5, 170, 36.5, 80, 98, 90)]
+    assert alta['estadisticas'] == [(date(2024, 1, 10), 5)]
+    assert 'exploraciones' in alta['invalidados']
+
+def test_failed_insert_skips_hooks(alta):
+    alta['afectadas'] = -1
+    assert crear() is None
+    assert alta['signos'] == [] and alta['estadisticas'] == [] and alta['invalidados'] == []
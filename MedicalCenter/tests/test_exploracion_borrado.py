@@ -0,0 +1,95 @@
+"""Pruebas de la visibilidad de exploraciones eliminadas (borrado lógico con estatus = 0)"""
+import pytest
+from flask import Flask
+
+from controllers.exploracion_controller import exploracion_bp
+from models.database import db
+from models.exploracion import Exploracion
+import models.exploracion
+
+def normalize(query):
+    return ' '.join(query.split())
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """Registra las consultas enviadas a la base de datos; `filas` es lo que devuelven las lecturas"""
+    registro = {'lecturas': [], 'escrituras': [], 'filas': [], 'afectadas': 1}
+
+    def execute_query(query, params=None):
+        registro['lecturas'].append(normalize(query))
+        return list(registro['filas'])
+
+    def execute_update(query, params=None):
+        registro['escrituras'].append(normalize(query))
+        return registro['afectadas']
+
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+    monkeypatch.setattr(db, 'execute_update', execute_update)
+    return registro
+
+@pytest.fixture
+def sin_efectos(monkeypatch):
+    """Evita las actualizaciones de cachés y estadísticas que acompañan al borrado"""
+    efectos = []
+    monkeypatch.setattr(models.exploracion.cache_reportes, 'invalidate', lambda *a: efectos.append('reporte'))
+    monkeypatch.setattr(models.exploracion.SignosVitales, 'refresh_exploracion', lambda *a: efectos.append('signos'))
+    monkeypatch.setattr(models.exploracion.Estadisticas, 'add_exploracion', lambda *a: efectos.append('estadisticas'))
+    return efectos
+
+def test_soft_delete_marks_status_zero(consultas, sin_efectos):
+    consultas['filas'] = [('2026-01-10', 4)]
+    assert Exploracion.soft_delete(7) is True
+    assert consultas['escrituras'] == [
+        'UPDATE exploracion SET estatus = 0 WHERE id_exploracion = %s AND estatus = 1']
+    assert sin_efectos == ['reporte', 'signos', 'estadisticas']
+
+def test_soft_delete_of_deleted_record_changes_nothing(consultas, sin_efectos):
+    consultas['filas'] = [('2026-01-10', 4)]
+    consultas['afectadas'] = 0
+    assert Exploracion.soft_delete(7) is False
+    assert sin_efectos == []
+
+def test_reads_only_see_active_records(consultas):
+    assert Exploracion.get_by_id(7) is None
+    assert 'WHERE e.estatus = 1 AND e.id_exploracion = %s' in consultas['lecturas'][-1]
+    Exploracion.get_by_patient(3)
+    assert 'e.estatus = 1' in consultas['lecturas'][-1]
+
+def test_is_active_filters_status(consultas):
+    consultas['filas'] = [(0,)]
+    assert Exploracion.is_active(7) is False
+    assert 'WHERE id_exploracion = %s AND estatus = 1' in consultas['lecturas'][-1]
+    consultas['filas'] = [(1,)]
+    assert Exploracion.is_active(7) is True
+
+class CursorFalso:
+    def __init__(self, sentencias):
+        self.sentencias = sentencias
+
+    def execute(self, query, params=None):
+        self.sentencias.append(normalize(query))
+
+    def fetchone(self):
+        # La exploración fue eliminada: la consulta filtrada no devuelve nada
+        return None
+
+    def close(self):
+        pass
+
+def test_deleted_exploration_page_redirects(monkeypatch):
+    sentencias = []
+    monkeypatch.setattr(db, 'connect', lambda: True)
+    monkeypatch.setattr(db, 'disconnect', lambda: None)
+    monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: CursorFalso(sentencias))
+
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(exploracion_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+
+    respuesta = cliente.get('/ver_exploracion/7')
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/exploraciones')
+    assert 'WHERE E.id_exploracion = %s AND E.estatus = 1' in sentencias[0]
@@ -0,0 +1,99 @@
+"""Pruebas del acceso a datos de las rutas de exploración (controllers/exploracion_controller.py)"""
+import pytest
+from flask import Flask
+
+from controllers.exploracion_controller import exploracion_bp
+from models.database import Database, db
+
+class CursorFalso:
+    def __init__(self, conexion, dictionary=False):
+        self.conexion = conexion
+        self.dictionary = dictionary
+
+    def execute(self, query, params=None):
+        self.conexion.sentencias.append((' '.join(query.split()), params))
+
+    def fetchone(self):
+        return self.conexion.filas.pop(0) if self.conexion.filas else None
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+class ConexionFalsa:
+    def __init__(self, filas):
+        self.filas = filas
+        self.sentencias = []
+        self.cursores = []
+
+    def cursor(self, dictionary=False, buffered=False):
+        cursor = CursorFalso(self, dictionary)
+        self.cursores.append((dictionary, buffered))
+        return cursor
+
+class PoolFalso:
+    """Presta siempre la misma conexión y cuenta préstamos y devoluciones"""
+
+    def __init__(self, filas):
+        self.conexion = ConexionFalsa(filas)
+        self.prestadas = 0
+        self.devueltas = 0
+
+    def acquire(self):
+        self.prestadas += 1
+        return self.conexion
+
+    def release(self, conexion):
+        self.devueltas += 1
+
+@pytest.fixture
+def cliente():
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(exploracion_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    return cliente
+
+@pytest.fixture
+def pool(monkeypatch):
+    def usar(*filas):
+        pool = PoolFalso(list(filas))
+        monkeypatch.setattr(db, '_pool', pool)
+        return pool
+    return usar
+
+def test_existing_exploration_redirects_with_one_connection(cliente, pool):
+    pool = pool({'id_exploracion': 9})
+    respuesta = cliente.get('/exploracion/5')
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/editar_exploracion/9')
+    # Antes se abrían dos conexiones nuevas por petición
+    assert pool.prestadas == 1 and pool.devueltas == 1
+    assert (True, True) in pool.conexion.cursores
+    assert pool.conexion.sentencias[0][1] == (5,)
+
+def test_missing_exploration_view_returns_its_connection(cliente, pool):
+    pool = pool()
+    respuesta = cliente.get('/ver_exploracion/7')
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/exploraciones')
+    assert pool.prestadas == 1 and pool.devueltas == 1
+
+def test_connection_error_redirects_without_query(cliente, monkeypatch):
+    monkeypatch.setattr(db, 'connect', lambda: False)
+    respuesta = cliente.get('/ver_exploracion/7')
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/exploraciones')
+
+def test_connection_settings_come_from_environment(monkeypatch):
+    monkeypatch.setenv('MEDICALCENTER_DB_HOST', 'bd.interna')
+    monkeypatch.setenv('MEDICALCENTER_DB_PORT', '3307')
+    monkeypatch.setenv('MEDICALCENTER_DB_POOL_MAX', '4')
+    database = Database()
+    assert database.pool.connect_args['host'] == 'bd.interna'
+    assert database.pool.connect_args['port'] == 3307
+    assert database.pool.max_size == 4
@@ -0,0 +1,135 @@
+"""Pruebas de las exportaciones por partes (models/exportacion.py, controllers/exportacion_controller.py)"""
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from mysql.connector import Error
+
+from controllers.exportacion_controller import exportacion_bp
+from models.database import db
+from models.exportacion import build_query, csv_chunks, ndjson_chunks, stream_export
+
+def test_build_query_applies_only_supported_filters():
+    query, params = build_query('citas', fecha_inicio=date(2024, 1, 1), medico_id=3)
+    assert 'c.fecha >= %s' in query and 'c.id_medico = %s' in query
+    assert query.endswith('ORDER BY c.fecha, c.hora, c.id_cita')
+    assert params == (date(2024, 1, 1), 3)
+    # Pacientes no tiene columna de fecha ni de médico
+    query, params = build_query('pacientes', fecha_inicio=date(2024, 1, 1), medico_id=3)
+    assert params == () and '%s' not in query
+
+def test_csv_and_ndjson_convert_mysql_values():
+    columnas = ('id', 'fecha', 'hora', 'peso', 'notas')
+    bloques = [[(1, date(2024, 5, 1), timedelta(hours=9, minutes=30), Decimal('70.5'), None)], [(2, None, None, None, 'ñ')]]
+    partes = list(csv_chunks(columnas, bloques))
+    assert partes == ['id,fecha,hora,peso,notas\r\n', '1,2024-05-01,09:30:00,70.5,\r\n', '2,,,,ñ\r\n']
+    lineas = ''.join(ndjson_chunks(columnas, bloques)).splitlines()
+    assert json.loads(lineas[0]) == {'id': 1, 'fecha': '2024-05-01', 'hora': '09:30:00', 'peso': '70.5', 'notas': None}
+    assert json.loads(lineas[1])['notas'] == 'ñ'
+
+class CursorFalso:
+    def __init__(self, filas):
+        self.filas = list(filas)
+        self.cerrado = False
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchmany(self, size):
+        bloque, self.filas = self.filas[:size], self.filas[size:]
+        return bloque
+
+    def close(self):
+        self.cerrado = True
+
+class PoolFalso:
+    def __init__(self, filas):
+        self.filas = filas
+        self.buffered = []
+        self.prestadas = 0
+        self.devueltas = 0
+
+    def acquire(self):
+        self.prestadas += 1
+        return self
+
+    def cursor(self, buffered=True):
+        self.buffered.append(buffered)
+        return CursorFalso(self.filas)
+
+    def release(self, conexion):
+        self.devueltas += 1
+
+def test_stream_query_reads_blocks_and_releases_connection(monkeypatch):
+    pool = PoolFalso([(n,) for n in range(5)])
+    monkeypatch.setattr(db, '_pool', pool)
+    assert list(db.stream_query('SELECT n', size=2)) == [[(0,), (1,)], [(2,), (3,)], [(4,)]]
+    assert pool.buffered == [False]
+    assert pool.prestadas == pool.devueltas == 1
+
+def test_stream_query_releases_connection_when_closed_early(monkeypatch):
+    pool = PoolFalso([(n,) for n in range(5)])
+    monkeypatch.setattr(db, '_pool', pool)
+    bloques = db.stream_query('SELECT n', size=2)
+    next(bloques)
+    assert pool.devueltas == 0
+    bloques.close()
+    assert pool.devueltas == 1
+
+def test_stream_export_runs_query_before_response(monkeypatch):
+    consultas = []
+
+    def stream_query(query, params, size):
+        consultas.append(params)
+        yield [(1, 'Ana', 'López', None, 'Femenino', 'O+', None)]
+    monkeypatch.setattr(db, 'stream_query', stream_query)
+    contenido = stream_export('pacientes', 'csv')
+    # La consulta ya se ejecutó aunque aún no se haya leído el contenido
+    assert consultas == [()]
+    assert ''.join(contenido).splitlines()[1] == '1,Ana,López,,Femenino,O+,'
+
+@pytest.fixture
+def cliente():
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(exportacion_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    return cliente
+
+def test_export_route_streams_attachment(cliente, monkeypatch):
+    filtros = {}
+
+    def stream_export(nombre, formato, **kwargs):
+        filtros.update(kwargs)
+        return iter(['a\n', 'b\n'])
+    monkeypatch.setattr('controllers.exportacion_controller.stream_export', stream_export)
+    respuesta = cliente.get('/exportar/citas.csv?fecha_inicio=2024-01-01&id_medico=3')
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'text/csv'
+    assert respuesta.headers['Content-Disposition'] == 'attachment; filename=citas.csv'
+    assert respuesta.get_data(as_text=True) == 'a\nb\n'
+    assert filtros == {'fecha_inicio': date(2024, 1, 1), 'fecha_fin': None, 'medico_id': 3, 'paciente_id': None}
+
+def test_export_route_rejects_unknown_export(cliente):
+    assert cliente.get('/exportar/usuarios.csv').status_code == 404
+    assert cliente.get('/exportar/citas.xml').status_code == 404
+
+def test_export_route_reports_database_errors(cliente, monkeypatch):
+    def stream_export(nombre, formato, **kwargs):
+        raise Error(msg='sin conexión')
+    monkeypatch.setattr('controllers.exportacion_controller.stream_export', stream_export)
+    respuesta = cliente.get('/exportar/citas.ndjson')
+    assert respuesta.status_code == 500
+    assert respuesta.get_json() == {'error': 'Error al consultar la base de datos'}
+
+def test_export_route_rejects_malformed_dates(cliente, monkeypatch):
+    monkeypatch.setattr('controllers.exportacion_controller.stream_export',
+                        lambda *args, **kwargs: pytest.fail('no debe exportar sin filtrar'))
+    for consulta in ('fecha_inicio=2024-13-01', 'fecha_fin=ayer', 'fecha_inicio=2024-02-01&fecha_fin=2024-01-01'):
+        respuesta = cliente.get(f'/exportar/citas.csv?{consulta}')
+        assert respuesta.status_code == 400
+        assert respuesta.get_json() == {'error': 'Rango de fechas inválido'}
@@ -0,0 +1,105 @@
+"""Pruebas de la importación masiva de pacientes (models/importacion_pacientes.py)"""
+import io
+
+import pytest
+from mysql.connector import Error
+
+from models.database import db
+from models.importacion_pacientes import importar_pacientes, iter_csv, iter_file
+import models.importacion_pacientes
+
+class CursorFalso:
+    """Cursor que guarda los lotes insertados; falla en el lote indicado"""
+
+    def __init__(self, estado):
+        self.estado = estado
+
+    def executemany(self, query, filas):
+        self.estado['lotes'] += 1
+        if self.estado['lotes'] == self.estado['falla_lote']:
+            raise Error(msg='Duplicate entry')
+        self.estado['insertadas'].extend(filas)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def bd(monkeypatch):
+    """Sustituye el cursor y el commit/rollback de la conexión"""
+    estado = {'lotes': 0, 'falla_lote': None, 'insertadas': [], 'commits': 0, 'rollbacks': 0, 'invalidadas': []}
+    monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: CursorFalso(estado))
+    monkeypatch.setattr(db, 'commit', lambda: estado.__setitem__('commits', estado['commits'] + 1))
+    monkeypatch.setattr(db, 'rollback', lambda: estado.__setitem__('rollbacks', estado['rollbacks'] + 1))
+    monkeypatch.setattr(models.importacion_pacientes.cache_datos, 'invalidate',
+                        lambda namespace: estado['invalidadas'].append(namespace))
+    monkeypatch.setattr(models.importacion_pacientes.search_index, 'invalidate', lambda: None)
+    return estado
+
+def csv_bytes(texto):
+    return io.BytesIO(texto.encode('utf-8'))
+
+def fila_valida(numero):
+    nombre = 'Ana' + 'a' * (numero % 5)
+    return f"{nombre},López,1990-01-0{numero % 9 + 1},Femenino,O+,\n"
+
+def test_header_synonyms_are_mapped():
+    archivo = csv_bytes("Nombre,Apellido,Fecha de Nacimiento,Sexo,Tipo de Sangre,Alergias\n"
+                        "Ana,López,1990-01-01,Femenino,O+,Polen\n")
+    filas = list(iter_csv(archivo))
+    assert filas == [(2, {'nombres': 'Ana', 'apellidos': 'López', 'fecha_nacimiento': '1990-01-01',
+                          'genero': 'Femenino', 'tipo_sangre': 'O+', 'alergias': 'Polen'})]
+
+def test_blank_rows_are_skipped_and_line_numbers_kept():
+    archivo = csv_bytes("nombres,apellidos\n\n , \nAna,López\n")
+    assert [numero for numero, _ in iter_csv(archivo)] == [4]
+
+def test_unsupported_extension_is_rejected():
+    with pytest.raises(ValueError):
+        iter_file(csv_bytes(''), 'pacientes.pdf')
+
+def test_invalid_rows_are_reported_and_valid_rows_inserted(bd):
+    archivo = csv_bytes("nombres,apellidos,fecha_nacimiento,genero,tipo_sangre,alergias\n"
+                        "Ana,López,1990-01-01,Femenino,O+,\n"
+                        "X,López,1990-01-01,Otro,O+,\n"
+                        "Luis,Pérez,fecha,Masculino,Z+,Polen\n")
+    resultado = importar_pacientes(iter_file(archivo, 'pacientes.csv')).to_dict()
+    assert resultado['procesadas'] == 3 and resultado['insertadas'] == 1 and resultado['con_errores'] == 2
+    assert [error['fila'] for error in resultado['errores']] == [3, 4]
+    assert len(resultado['errores'][0]['errores']) == 2
+    assert 'Formato de fecha inválido' in resultado['errores'][1]['errores']
+    assert bd['insertadas'] == [('Ana', 'López', '1990-01-01', 'Femenino', 'O+', None)]
+    assert bd['invalidadas'] == ['pacientes']
+
+def test_error_report_is_capped(bd, monkeypatch):
+    monkeypatch.setattr(models.importacion_pacientes, 'MAX_ERRORES_REPORTE', 3)
+    filas = [(numero, {'nombres': ''}) for numero in range(2, 12)]
+    resultado = importar_pacientes(filas).to_dict()
+    assert resultado['con_errores'] == 10
+    assert len(resultado['errores']) == 3
+    assert resultado['errores_omitidos'] == 7
+    assert bd['lotes'] == 0 and bd['invalidadas'] == []
+
+def test_failed_chunk_is_rolled_back_and_others_committed(bd):
+    bd['falla_lote'] = 2
+    archivo = csv_bytes("nombres,apellidos,fecha_nacimiento,genero,tipo_sangre\n"
+                        + ''.join(fila_valida(numero) for numero in range(5)))
+    resultado = importar_pacientes(iter_csv(archivo), chunk_size=2).to_dict()
+    assert bd['lotes'] == 3
+    assert bd['commits'] == 2 and bd['rollbacks'] == 1
+    assert resultado['insertadas'] == 3 and resultado['con_errores'] == 2
+    # El lote fallido reporta cada una de sus filas
+    assert [error['fila'] for error in resultado['errores']] == [4, 5]
+    assert 'Duplicate entry' in resultado['errores'][0]['errores'][0]
+
+def test_invalid_encoding_mid_file_keeps_committed_rows(bd):
+    filas_validas = ''.join(fila_valida(numero) for numero in range(3000))
+    archivo = io.BytesIO(("nombres,apellidos,fecha_nacimiento,genero,tipo_sangre\n" + filas_validas).encode('utf-8')
+                         + b"Jos\xe9,P\xe9rez,1990-01-01,Masculino,O+\n")
+    resultado = importar_pacientes(iter_csv(archivo), chunk_size=1000).to_dict()
+    # Lo leído antes del byte inválido se inserta; el corte queda como un error de fila
+    assert resultado['insertadas'] == resultado['procesadas'] > 0
+    assert bd['commits'] == bd['lotes'] and bd['rollbacks'] == 0
+    assert resultado['con_errores'] == 1
+    error = resultado['errores'][0]
+    assert error['fila'] == resultado['procesadas'] + 2
+    assert 'UTF-8' in error['errores'][0]
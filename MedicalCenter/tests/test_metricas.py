@@ -0,0 +1,100 @@
+"""Pruebas de la instrumentación de consultas (models/metricas.py)"""
+import pytest
+
+from models.metricas import SIN_PETICION, CursorInstrumentado, Metricas
+
+class CursorFalso:
+    def __init__(self, filas):
+        self.filas = filas
+        self.rowcount = len(filas)
+
+    def execute(self, sql, params=None):
+        if 'ROTA' in sql:
+            raise RuntimeError('tabla inexistente')
+
+    def fetchall(self):
+        return list(self.filas)
+
+    def fetchone(self):
+        return self.filas.pop(0) if self.filas else None
+
+def lineas(texto, prefijo):
+    return [linea for linea in texto.splitlines() if linea.startswith(prefijo)]
+
+def test_queries_are_counted_per_endpoint():
+    metricas = Metricas()
+    metricas.begin_request('paciente.pacientes')
+    cursor = CursorInstrumentado(CursorFalso([(1,), (2,), (3,)]), metricas)
+    cursor.execute("SELECT id FROM pacientes")
+    cursor.fetchall()
+    assert metricas.end_request() == 1
+    # Fuera de una petición (hilos de trabajo, CLI)
+    CursorInstrumentado(CursorFalso([]), metricas).execute("SELECT 1")
+
+    texto = metricas.render_prometheus()
+    assert 'medicalcenter_http_requests_total{endpoint="paciente.pacientes"} 1' in texto
+    assert 'medicalcenter_db_queries_total{endpoint="paciente.pacientes"} 1' in texto
+    assert 'medicalcenter_db_rows_total{endpoint="paciente.pacientes"} 3' in texto
+    assert f'medicalcenter_db_queries_total{{endpoint="{SIN_PETICION}"}} 1' in texto
+
+def test_failed_query_is_counted_and_raised():
+    metricas = Metricas()
+    cursor = CursorInstrumentado(CursorFalso([]), metricas)
+    with pytest.raises(RuntimeError):
+        cursor.execute("SELECT * FROM ROTA")
+    assert f'medicalcenter_db_query_errors_total{{endpoint="{SIN_PETICION}"}} 1' in metricas.render_prometheus()
+
+def test_latency_histogram_is_cumulative():
+    metricas = Metricas()
+    metricas.begin_request('inicio')
+    for segundos in (0.0005, 0.003, 0.3):
+        metricas.record_query("SELECT 1", segundos)
+    texto = metricas.render_prometheus()
+    assert 'medicalcenter_db_query_seconds_bucket{endpoint="inicio",le="0.001"} 1' in texto
+    assert 'medicalcenter_db_query_seconds_bucket{endpoint="inicio",le="0.005"} 2' in texto
+    assert 'medicalcenter_db_query_seconds_bucket{endpoint="inicio",le="0.25"} 2' in texto
+    assert 'medicalcenter_db_query_seconds_bucket{endpoint="inicio",le="+Inf"} 3' in texto
+    assert 'medicalcenter_db_query_seconds_count{endpoint="inicio"} 3' in texto
+    # Cada familia declara su tipo una sola vez
+    assert len(lineas(texto, '# TYPE medicalcenter_db_query_seconds histogram')) == 1
+
+def test_slow_queries_are_sampled():
+    metricas = Metricas(slow_query_seconds=0.1, max_slow_samples=2)
+    metricas.begin_request('cita.citas')
+    metricas.record_query("SELECT   *\n FROM cita", 0.05)
+    for i in range(3):
+        metricas.record_query(f"SELECT * FROM cita WHERE id_cita = {i}", 0.5)
+    muestras = metricas.slow_queries()
+    assert [m['consulta'] for m in muestras] == ["SELECT * FROM cita WHERE id_cita = 1",
+                                                 "SELECT * FROM cita WHERE id_cita = 2"]
+    assert muestras[0]['endpoint'] == 'cita.citas'
+
+def test_query_budget_warns_about_n_plus_one(capsys):
+    metricas = Metricas()
+    metricas.begin_request('medico.medicos')
+    for _ in range(4):
+        metricas.record_query("SELECT 1", 0.001)
+    assert metricas.end_request(budget=3) == 4
+    assert 'posible N+1 en medico.medicos: 4 consultas' in capsys.readouterr().out
+    metricas.begin_request('medico.medicos')
+    metricas.record_query("SELECT 1", 0.001)
+    metricas.end_request(budget=3)
+    assert capsys.readouterr().out == ''
+
+@pytest.fixture
+def app_metricas():
+    from flask import Flask
+    from controllers.metricas_controller import metricas_bp
+    app = Flask(__name__)
+    app.register_blueprint(metricas_bp)
+    return app
+
+def test_metrics_routes_require_configured_token(app_metricas):
+    cliente = app_metricas.test_client()
+    # Sin token configurado ni siquiera las peticiones locales ven las métricas
+    assert cliente.get('/metrics').status_code == 404
+    app_metricas.config['METRICAS_TOKEN'] = 'secreto'
+    for ruta in ('/metrics', '/metrics/consultas_lentas', '/metrics/plantillas'):
+        assert cliente.get(ruta).status_code == 404
+        assert cliente.get(ruta, headers={'Authorization': 'Bearer otro'}).status_code == 404
+        assert cliente.get(ruta, headers={'Authorization': 'Bearer secreto'}).status_code == 200
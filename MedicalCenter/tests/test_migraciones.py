@@ -0,0 +1,135 @@
+"""Pruebas de las migraciones de esquema y de la verificación de índices (models/migraciones.py, models/planes_consulta.py)"""
+import pytest
+from mysql.connector import Error
+
+from models.database import db
+from models.migraciones import Migracion, Migrador, load_migrations, split_statements
+from models.planes_consulta import ConsultaFrecuente, check_query_plan
+import models.planes_consulta
+
+def test_split_statements_drops_comments_and_blank_parts():
+    sql = "-- comentario\nCREATE TABLE a (x INT);\n\n  -- otro\nALTER TABLE a\n  ADD y INT;\n"
+    assert split_statements(sql) == ['CREATE TABLE a (x INT)', 'ALTER TABLE a\n  ADD y INT']
+
+def escribir(directorio, nombre, contenido):
+    ruta = directorio / nombre
+    ruta.write_text(contenido, encoding='utf-8')
+    return str(ruta)
+
+def test_migration_file_sections(tmp_path):
+    ruta = escribir(tmp_path, '0003_columna.sql', "-- +up\nALTER TABLE a ADD y INT;\n-- +down\nALTER TABLE a DROP y;\n")
+    migracion = Migracion.from_file(ruta)
+    assert (migracion.version, migracion.nombre) == (3, 'columna')
+    assert migracion.up == ['ALTER TABLE a ADD y INT'] and migracion.down == ['ALTER TABLE a DROP y']
+
+def test_invalid_migration_files_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Migracion.from_file(escribir(tmp_path, 'columna.sql', "-- +up\nSELECT 1;\n"))
+    with pytest.raises(ValueError):
+        Migracion.from_file(escribir(tmp_path, '0001_sin_up.sql', "-- +down\nSELECT 1;\n"))
+    escribir(tmp_path, '0001_otra.sql', "-- +up\nSELECT 1;\n")
+    escribir(tmp_path, '0001_repetida.sql', "-- +up\nSELECT 1;\n")
+    with pytest.raises(ValueError):
+        load_migrations(str(tmp_path))
+
+def test_shipped_migrations_can_be_reverted():
+    migraciones = load_migrations()
+    assert [migracion.version for migracion in migraciones] == list(range(1, len(migraciones) + 1))
+    assert all(migracion.up and migracion.down for migracion in migraciones)
+
+class CursorFalso:
+    def __init__(self, bd):
+        self.bd = bd
+
+    def execute(self, query, params=None):
+        if query == self.bd['falla']:
+            raise Error(msg='sintaxis')
+        self.bd['sentencias'].append(query)
+        if query.startswith('INSERT INTO schema_version'):
+            self.bd['aplicadas'].add(params[0])
+        elif query.startswith('DELETE FROM schema_version'):
+            self.bd['aplicadas'].discard(params[0])
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def bd(monkeypatch, tmp_path):
+    """Base de datos falsa con la tabla schema_version y tres migraciones en una carpeta temporal"""
+    bd = {'aplicadas': set(), 'sentencias': [], 'falla': None, 'commits': 0, 'rollbacks': 0}
+    for version in (1, 2, 3):
+        escribir(tmp_path, f"000{version}_m{version}.sql", f"-- +up\nUP {version};\n-- +down\nDOWN {version};\n")
+    monkeypatch.setattr(db, 'execute_update', lambda query, params=None: 0)
+    monkeypatch.setattr(db, 'execute_query', lambda query, params=None: [(v,) for v in bd['aplicadas']])
+    monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: CursorFalso(bd))
+    monkeypatch.setattr(db, 'commit', lambda: bd.__setitem__('commits', bd['commits'] + 1))
+    monkeypatch.setattr(db, 'rollback', lambda: bd.__setitem__('rollbacks', bd['rollbacks'] + 1))
+    bd['migrador'] = Migrador(str(tmp_path))
+    return bd
+
+def test_migrate_applies_pending_in_order(bd):
+    bd['aplicadas'].add(1)
+    pasos = bd['migrador'].migrate()
+    assert [(accion, migracion.version) for accion, migracion in pasos] == [('aplicada', 2), ('aplicada', 3)]
+    assert [s for s in bd['sentencias'] if not s.startswith(('INSERT', 'DELETE'))] == ['UP 2', 'UP 3']
+    assert bd['migrador'].current_version() == 3
+    assert bd['migrador'].migrate() == []
+
+def test_migrate_to_lower_version_reverts_newest_first(bd):
+    bd['aplicadas'].update({1, 2, 3})
+    pasos = bd['migrador'].migrate(1)
+    assert [(accion, migracion.version) for accion, migracion in pasos] == [('revertida', 3), ('revertida', 2)]
+    assert [s for s in bd['sentencias'] if not s.startswith(('INSERT', 'DELETE'))] == ['DOWN 3', 'DOWN 2']
+    assert [(migracion.version, aplicada) for migracion, aplicada in bd['migrador'].status()] == \
+        [(1, True), (2, False), (3, False)]
+
+def test_failed_migration_stops_and_is_not_recorded(bd):
+    bd['falla'] = 'UP 2'
+    with pytest.raises(Error):
+        bd['migrador'].migrate()
+    assert bd['aplicadas'] == {1}
+    assert bd['commits'] == 1 and bd['rollbacks'] == 1
+
+class CursorPlan:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def execute(self, query, params=None):
+        assert query.startswith('EXPLAIN ')
+
+    def fetchall(self):
+        return self.plan
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def plan(monkeypatch):
+    """EXPLAIN falso: índices existentes, filas estimadas y filas del plan"""
+    estado = {'indices': {'idx_cita_fecha_hora'}, 'filas': 5000, 'plan': []}
+
+    def execute_query(query, params=None):
+        if query.startswith('SHOW INDEX'):
+            return [(1,)] if params[0] in estado['indices'] else []
+        return [(estado['filas'],)]
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+    monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: CursorPlan(estado['plan']))
+    return estado
+
+CONSULTA = ConsultaFrecuente('citas', 'SELECT * FROM cita c ORDER BY c.fecha', (), 'cita', 'c', 'idx_cita_fecha_hora')
+
+def test_query_plan_using_index_passes(plan):
+    plan['plan'] = [{'table': 'c', 'type': 'index', 'key': 'idx_cita_fecha_hora', 'rows': 20, 'Extra': None}]
+    assert check_query_plan(CONSULTA) == []
+
+def test_query_plan_reports_full_scan_and_filesort(plan):
+    plan['plan'] = [{'table': 'c', 'type': 'ALL', 'key': None, 'rows': 5000, 'Extra': 'Using filesort'}]
+    problemas = check_query_plan(CONSULTA)
+    assert len(problemas) == 2 and 'filesort' in problemas[1]
+
+def test_query_plan_on_small_table_only_checks_index(plan):
+    plan['filas'] = models.planes_consulta.MIN_FILAS_PLAN - 1
+    plan['plan'] = [{'table': 'c', 'type': 'ALL', 'key': None, 'rows': 10, 'Extra': 'Using filesort'}]
+    assert check_query_plan(CONSULTA) == []
+    plan['indices'].clear()
+    assert check_query_plan(CONSULTA) == ['no existe el índice idx_cita_fecha_hora en cita']
@@ -0,0 +1,89 @@
+"""Pruebas de la paginación por llave (models/paginacion.py)"""
+from datetime import date, datetime
+
+from models.database import db
+from models.expediente import Expediente
+from models.exploracion import Exploracion
+from models.paginacion import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor,
+                               keyset_condition, normalize_page_size, nullable_keyset_condition, split_page)
+
+def test_cursor_round_trip():
+    token = encode_cursor(['Pérez', 42])
+    assert '=' not in token
+    assert decode_cursor(token, 2) == ['Pérez', 42]
+
+def test_cursor_serializes_dates_as_text():
+    assert decode_cursor(encode_cursor((date(2024, 3, 1), 7)), 2) == ['2024-03-01', 7]
+
+def test_decode_cursor_rejects_invalid_tokens():
+    assert decode_cursor(None, 2) is None
+    assert decode_cursor('', 2) is None
+    assert decode_cursor('no es base64!', 2) is None
+    assert decode_cursor(encode_cursor([1, 2, 3]), 2) is None
+    # JSON válido que no es una lista
+    assert decode_cursor('eyJhIjoxfQ', 1) is None
+
+def test_keyset_condition():
+    assert keyset_condition(('c.fecha', 'c.id_cita')) == "(c.fecha, c.id_cita) > (%s, %s)"
+    assert keyset_condition(('e.fecha', 'e.id_exploracion'), descending=True) == \
+        "(e.fecha, e.id_exploracion) < (%s, %s)"
+
+def test_normalize_page_size():
+    assert normalize_page_size(None) == DEFAULT_PAGE_SIZE
+    assert normalize_page_size('abc') == DEFAULT_PAGE_SIZE
+    assert normalize_page_size('0') == 1
+    assert normalize_page_size(10 ** 6) == MAX_PAGE_SIZE
+    assert normalize_page_size('25') == 25
+
+def test_split_page_returns_cursor_of_last_row():
+    rows = [(i, f"fila{i}") for i in range(4)]
+    page, cursor = split_page(rows, 3, lambda row: (row[0],))
+    assert page == rows[:3]
+    assert decode_cursor(cursor, 1) == [2]
+
+def test_split_page_last_page_has_no_cursor():
+    assert split_page([(1,), (2,)], 3, lambda row: row) == ([(1,), (2,)], None)
+    assert split_page(None, 3, lambda row: row) == ([], None)
+
+def test_nullable_keyset_condition_descending():
+    assert nullable_keyset_condition('exp.fecha', 'exp.id', ['2024-03-01 10:00:00', 7], descending=True) == \
+        ("((exp.fecha, exp.id) < (%s, %s) OR exp.fecha IS NULL)", ['2024-03-01 10:00:00', 7])
+    # Tras un NULL solo quedan los demás NULL con id menor
+    assert nullable_keyset_condition('exp.fecha', 'exp.id', [None, 7], descending=True) == \
+        ("(exp.fecha IS NULL AND exp.id < %s)", [7])
+
+def test_nullable_keyset_condition_ascending():
+    assert nullable_keyset_condition('f', 'id', [None, 7]) == ("((f IS NULL AND id > %s) OR f IS NOT NULL)", [7])
+    assert nullable_keyset_condition('f', 'id', ['2024-03-01', 7]) == ("(f, id) > (%s, %s)", ['2024-03-01', 7])
+
+def expediente(id, fecha):
+    return (id, 3, 'Gripe', fecha, 0, 'Ana', 'López')
+
+def test_expediente_pages_walk_past_null_dates(monkeypatch):
+    consultas = []
+    paginas = [[expediente(9, datetime(2024, 3, 1)), expediente(4, None), expediente(2, None)],
+               [expediente(2, None)]]
+
+    def execute_query(query, params=None):
+        consultas.append((' '.join(query.split()), params))
+        return paginas[len(consultas) - 1]
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+
+    primera, cursor = Expediente.get_page(limit=2)
+    assert [e['id'] for e in primera] == [9, 4]
+    assert decode_cursor(cursor, 2) == [None, 4]
+    segunda, cursor = Expediente.get_page(cursor, limit=2)
+    assert [e['id'] for e in segunda] == [2] and cursor is None
+    query, params = consultas[1]
+    assert 'AND (exp.fecha IS NULL AND exp.id < %s) ORDER BY exp.fecha DESC, exp.id DESC' in query
+    assert params == (4, 3)
+
+def test_exploracion_page_rows_match_list_query(monkeypatch):
+    fila = (7, 2, 3, 5, date(2024, 3, 1), 70.5, 170, 36.5, 80, 98, 90, 'Tos', 'Gripe', 'Reposo', None,
+            'Ana', 'López', 'Luis', None, 'Pérez', 'Gómez', 'Cardiología')
+    monkeypatch.setattr(db, 'execute_query', lambda query, params=None: [fila, fila])
+    exploraciones, cursor = Exploracion.get_page(limit=1)
+    assert exploraciones[0]['fecha'] == date(2024, 3, 1) and exploraciones[0]['id_cita'] == 2
+    assert exploraciones[0]['paciente_nombre_completo'] == 'Ana López'
+    assert exploraciones[0]['medico_nombre_completo'].split() == ['Luis', 'Pérez', 'Gómez']
+    assert decode_cursor(cursor, 2) == ['2024-03-01', 7]
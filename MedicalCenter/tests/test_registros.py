@@ -0,0 +1,76 @@
+"""Pruebas de los registros compactos de filas (models/registros.py)"""
+import json
+
+import pytest
+
+from models.registros import Registro, definir_registro
+from models.medico import RegistroMedico, RegistroMedicoDisponible
+
+Persona = definir_registro('Persona', ('id', 'nombre', '_apellido'),
+                           completo=lambda p: f"{p.nombre} {p._apellido}")
+
+def test_record_supports_attribute_and_key_access():
+    persona = Persona((1, 'Ana', 'López'))
+    assert persona.nombre == persona['nombre'] == persona.get('nombre') == 'Ana'
+    assert persona.completo == persona['completo'] == 'Ana López'
+    assert 'nombre' in persona and 'completo' in persona
+    assert persona.get('no_existe', 'x') == 'x'
+    with pytest.raises(KeyError):
+        persona['no_existe']
+
+def test_underscore_fields_are_stored_but_not_exposed():
+    persona = Persona((1, 'Ana', 'López'))
+    assert persona._apellido == 'López'
+    assert '_apellido' not in persona
+    assert list(persona) == ['id', 'nombre', 'completo']
+    assert persona.to_dict() == {'id': 1, 'nombre': 'Ana', 'completo': 'Ana López'}
+    with pytest.raises(KeyError):
+        persona['_apellido']
+
+def test_record_uses_slots():
+    persona = Persona((1, 'Ana', 'López'))
+    assert not hasattr(persona, '__dict__')
+    with pytest.raises(AttributeError):
+        persona.otro = 1
+
+def test_derived_field_is_computed_once():
+    llamadas = []
+    Contador = definir_registro('Contador', ('valor',), doble=lambda r: llamadas.append(1) or r.valor * 2)
+    registro = Contador((4,))
+    assert llamadas == []
+    assert registro.doble == 8 and registro['doble'] == 8
+    assert len(llamadas) == 1
+
+def test_only_stored_fields_can_be_assigned():
+    persona = Persona((1, 'Ana', 'López'))
+    persona['nombre'] = 'Eva'
+    assert persona.nombre == 'Eva'
+    with pytest.raises(KeyError):
+        persona['completo'] = 'otro'
+
+def test_extra_columns_are_ignored_and_records_compare_to_dicts():
+    persona = Persona((1, 'Ana', 'López', 'columna extra'))
+    assert persona == {'id': 1, 'nombre': 'Ana', 'completo': 'Ana López'}
+    assert Persona.from_rows(None) == []
+    assert [p.id for p in Persona.from_rows([(1, 'a', 'b'), (2, 'c', 'd')])] == [1, 2]
+
+def test_invalid_field_names_are_rejected():
+    with pytest.raises(ValueError):
+        definir_registro('Malo', ('id', 'class'))
+    with pytest.raises(ValueError):
+        definir_registro('Malo', ('id', 'dos palabras'))
+
+def test_medico_records_build_full_name():
+    fila = (3, 'Luis', None, 'Pérez', 'Gómez', '123', 'Cardiología', 'l@x.com', 'RFC', '555', 'Centro', 1, 'hash')
+    medico = RegistroMedico(fila)
+    assert medico['nombre_completo'] == 'Luis  Pérez Gómez'
+    assert medico['especialidad'] == 'Cardiología'
+    disponible = RegistroMedicoDisponible((3, 'Luis', None, 'Pérez', None, 'Cardiología'))
+    assert disponible.to_dict() == {'id_medico': 3, 'especialidad': 'Cardiología', 'nombre_completo': 'Luis  Pérez'}
+
+def test_app_serializes_records_as_json_objects():
+    from app import app
+    with app.test_request_context():
+        respuesta = app.json.response([Persona((1, 'Ana', 'López'))])
+    assert json.loads(respuesta.get_data()) == [{'id': 1, 'nombre': 'Ana', 'completo': 'Ana López'}]
+    assert isinstance(Persona((1, 'Ana', 'López')), Registro)
@@ -0,0 +1,64 @@
+"""Pruebas de las consultas de registros relacionados (models/relaciones.py)"""
+import pytest
+
+from models.cita import Cita
+from models.database import db
+from models.relaciones import count, count_related, exists, load_related
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """Registra las consultas y responde con las filas indicadas (None simula un error)"""
+    estado = {'consultas': [], 'respuestas': []}
+
+    def execute_query(query, params=None):
+        estado['consultas'].append((' '.join(query.split()), params))
+        return estado['respuestas'].pop(0) if estado['respuestas'] else []
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+    return estado
+
+def test_exists_wraps_query(consultas):
+    consultas['respuestas'] = [[(1,)], [(0,)]]
+    assert exists("SELECT 1 FROM cita WHERE id_paciente = %s", (5,)) is True
+    assert exists("SELECT 1 FROM cita WHERE id_paciente = %s", (6,)) is False
+    assert consultas['consultas'][0] == ("SELECT EXISTS(SELECT 1 FROM cita WHERE id_paciente = %s)", (5,))
+
+def test_count_wraps_query(consultas):
+    consultas['respuestas'] = [[(3,)]]
+    assert count("SELECT 1 FROM cita WHERE id_medico = %s", (2,)) == 3
+
+def test_database_errors_are_not_read_as_empty(consultas):
+    consultas['respuestas'] = [None, None, None, None]
+    with pytest.raises(RuntimeError):
+        exists("SELECT 1 FROM cita")
+    with pytest.raises(RuntimeError):
+        count("SELECT 1 FROM cita")
+    with pytest.raises(RuntimeError):
+        count_related("SELECT id, COUNT(*) FROM cita WHERE id IN ({ids}) GROUP BY id", [1])
+    with pytest.raises(RuntimeError):
+        load_related("SELECT id FROM cita WHERE id IN ({ids})", [1], 0)
+
+def test_load_related_batches_ids_and_keeps_empty_parents(consultas):
+    consultas['respuestas'] = [[(1, 'a'), (2, 'b'), (1, 'c')], [(4, 'd')]]
+    relacionados = load_related("SELECT id, x FROM t WHERE id IN ({ids})", [1, 2, 3, 2, 4], 0,
+                                factory=lambda row: row[1], batch_size=3)
+    assert relacionados == {1: ['a', 'c'], 2: ['b'], 3: [], 4: ['d']}
+    # Los ids repetidos se piden una sola vez
+    assert consultas['consultas'] == [("SELECT id, x FROM t WHERE id IN (%s, %s, %s)", (1, 2, 3)),
+                                      ("SELECT id, x FROM t WHERE id IN (%s)", (4,))]
+
+def test_count_related_defaults_to_zero(consultas):
+    consultas['respuestas'] = [[(1, 4)]]
+    assert count_related("SELECT id, COUNT(*) FROM t WHERE id IN ({ids}) GROUP BY id", [1, 2]) == {1: 4, 2: 0}
+
+def test_get_by_patient_returns_dicts(consultas):
+    consultas['respuestas'] = [[(9, 5, 3, '2024-01-01', '10:00', 'Control', 'programada', 1,
+                                 'Luis', None, 'Pérez', None, 'Cardiología')]]
+    citas = Cita.get_by_patient(5)
+    assert citas[0]['id_cita'] == 9
+    assert citas[0]['medico_nombre_completo'] == 'Luis  Pérez'
+    assert Cita.get_by_patient(6) == []
+
+def test_patient_has_citas_uses_exists(consultas):
+    consultas['respuestas'] = [[(1,)]]
+    assert Cita.patient_has_citas(5) is True
+    assert consultas['consultas'][0][0].startswith('SELECT EXISTS(')
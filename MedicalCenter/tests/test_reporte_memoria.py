@@ -0,0 +1,51 @@
+"""Pruebas de los reportes PDF generados en memoria (Exploracion.render_medical_report, /generar_pdf)"""
+import pytest
+from flask import Flask
+
+from controllers.exploracion_controller import exploracion_bp
+from models.database import db
+from models.exploracion import Exploracion
+import models.exploracion
+
+
+def test_render_returns_pdf_bytes(exploracion):
+    contenido = Exploracion.render_medical_report(8, exploracion)
+    assert contenido.startswith(b'%PDF') and contenido.rstrip().endswith(b'%%EOF')
+
+def test_render_missing_exploration(monkeypatch):
+    monkeypatch.setattr(Exploracion, 'get_by_id', staticmethod(lambda exploracion_id: None))
+    assert Exploracion.render_medical_report(8) is None
+
+@pytest.fixture
+def cliente(monkeypatch, tmp_path, exploracion):
+    monkeypatch.setattr(db, 'connect', lambda: True)
+    monkeypatch.setattr(db, 'disconnect', lambda: None)
+    monkeypatch.setattr(Exploracion, 'get_by_id', staticmethod(lambda exploracion_id: dict(exploracion)))
+    # La caché en disco no debe usarse en modo memoria
+    monkeypatch.setattr(models.exploracion.cache_reportes, 'directory', str(tmp_path / 'reportes'))
+
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.config['REPORTES_EN_MEMORIA'] = True
+    app.register_blueprint(exploracion_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    cliente.ruta_reportes = tmp_path / 'reportes'
+    return cliente
+
+def test_generar_pdf_streams_from_memory(cliente, exploracion):
+    respuesta = cliente.get('/generar_pdf/8')
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'application/pdf'
+    assert respuesta.headers['Content-Disposition'] == 'attachment; filename=exploracion_8.pdf'
+    assert int(respuesta.headers['Content-Length']) == len(respuesta.get_data())
+    assert respuesta.get_data().startswith(b'%PDF')
+    assert respuesta.get_etag()[0] == Exploracion.report_version(exploracion)
+    assert not cliente.ruta_reportes.exists()
+
+def test_generar_pdf_answers_304_for_current_version(cliente, exploracion):
+    version = Exploracion.report_version(exploracion)
+    respuesta = cliente.get('/generar_pdf/8', headers={'If-None-Match': f'"{version}"'})
+    assert respuesta.status_code == 304
+    assert respuesta.get_data() == b''
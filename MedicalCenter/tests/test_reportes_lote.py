@@ -0,0 +1,84 @@
+"""Pruebas de la exportación masiva de reportes (models/reportes_lote.py, /exportar_reportes)"""
+import io
+import zipfile
+
+import pytest
+from flask import Flask
+
+from controllers.exploracion_controller import exploracion_bp
+from models.database import db
+from models.exploracion import Exploracion
+from models.reportes_lote import ExportadorReportes
+import controllers.exploracion_controller as exploracion_controller
+
+@pytest.fixture
+def exploraciones(exploracion):
+    return [dict(exploracion, id_exploracion=i, diagnostico=f'Diagnóstico {i}') for i in (4, 2, 9)]
+
+def test_zip_has_one_report_per_exploration_in_order(exploraciones):
+    exportador = ExportadorReportes(max_workers=2)
+    try:
+        contenido = b''.join(exportador.zip_stream(exploraciones))
+    finally:
+        exportador.shutdown()
+    with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+        assert archivo.namelist() == ['exploracion_4.pdf', 'exploracion_2.pdf', 'exploracion_9.pdf']
+        assert all(archivo.read(nombre).startswith(b'%PDF') for nombre in archivo.namelist())
+
+def test_single_report_is_rendered_in_process(exploracion):
+    exportador = ExportadorReportes()
+    assert [i for i, _ in exportador.render_all([exploracion])] == [exploracion['id_exploracion']]
+    # No se creó el pool de procesos
+    assert exportador._executor is None
+
+def test_merged_pdf_has_a_page_per_exploration(exploraciones):
+    contenido = ExportadorReportes().merged_pdf(exploraciones)
+    assert contenido.startswith(b'%PDF')
+    assert contenido.count(b'/Type /Page\n') + contenido.count(b'/Type /Page ') >= len(exploraciones)
+
+def test_export_query_applies_filters_in_one_query(monkeypatch):
+    consultas = []
+    monkeypatch.setattr(db, 'execute_query', lambda query, params=None: consultas.append((query, params)) or [])
+    assert Exploracion.get_for_export('2024-01-01', '2024-01-31', medico_id=3, limit=10) == []
+    query, params = consultas[0]
+    assert len(consultas) == 1
+    assert 'e.fecha >= %s' in query and 'e.fecha <= %s' in query and 'e.id_medico = %s' in query
+    assert 'e.id_paciente = %s' not in query
+    assert params == ('2024-01-01', '2024-01-31', 3, 10)
+
+@pytest.fixture
+def cliente(monkeypatch, exploraciones):
+    monkeypatch.setattr(db, 'connect', lambda: True)
+    monkeypatch.setattr(db, 'disconnect', lambda: None)
+    monkeypatch.setattr(Exploracion, 'get_for_export', staticmethod(lambda *args: list(exploraciones)))
+    # Los reportes se generan en el mismo proceso para no crear un pool en la prueba
+    exportador = ExportadorReportes()
+    monkeypatch.setattr(exportador, 'render_all', lambda exploraciones: map(
+        lambda e: (e['id_exploracion'], b'%PDF-' + str(e['id_exploracion']).encode()), exploraciones))
+    monkeypatch.setattr(exploracion_controller, 'exportador_reportes', exportador)
+
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(exploracion_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    return cliente
+
+def test_export_requires_a_filter(cliente):
+    respuesta = cliente.get('/exportar_reportes')
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/exploraciones')
+
+def test_export_zip_is_streamed(cliente):
+    respuesta = cliente.get('/exportar_reportes?id_medico=1&formato=zip')
+    assert respuesta.is_streamed
+    assert respuesta.headers['Content-Disposition'] == 'attachment; filename=reportes_exploraciones.zip'
+    with zipfile.ZipFile(io.BytesIO(respuesta.get_data())) as archivo:
+        assert archivo.read('exploracion_2.pdf') == b'%PDF-2'
+
+def test_export_merged_pdf(cliente):
+    respuesta = cliente.get('/exportar_reportes?id_paciente=2')
+    assert respuesta.mimetype == 'application/pdf'
+    assert respuesta.headers['Content-Disposition'] == 'attachment; filename=reportes_exploraciones.pdf'
+    assert respuesta.get_data().startswith(b'%PDF')
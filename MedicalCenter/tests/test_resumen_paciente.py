@@ -0,0 +1,135 @@
+"""Pruebas de la vista completa de un paciente (models/resumen_paciente.py)"""
+from datetime import date, timedelta
+
+import pytest
+from flask import Flask
+from mysql.connector import Error
+
+from app import MedicalCenterJSONProvider
+from controllers.paciente_controller import paciente_bp
+from models.cache_datos import BackendLocal, CacheDatos, patient_namespace
+from models.database import db
+from models.paciente import RegistroPaciente
+from models.resumen_paciente import CAMPOS_RESUMEN, ResumenPaciente, parse_campos
+from models.signos_vitales import SignosVitales
+import models.resumen_paciente
+
+PACIENTE = (5, 'Ana', 'López', date(1990, 5, 1), 'Femenino', 'O+', None, 1)
+
+class CursorFalso:
+    """Responde cada consulta del resumen según la tabla que lee"""
+
+    def __init__(self, estado):
+        self.estado = estado
+        self._resultado = []
+
+    def execute(self, query, params=None):
+        self.estado['consultas'].append(query)
+        if self.estado['falla']:
+            raise Error(msg='sin conexión')
+        if 'FROM pacientes' in query:
+            self.estado['cargas'] += 1
+            self._resultado = [self.estado['paciente']] if self.estado['paciente'] else []
+        elif query.startswith('SELECT (SELECT COUNT(*)'):
+            self._resultado = [(1, 1, 1)]
+        elif 'FROM cita c' in query:
+            self._resultado = [(1, 3, date(2024, 1, 2), timedelta(hours=9), 'Control', 'programada',
+                                'Luis', 'Pérez', 'Cardiología')]
+        elif 'FROM exploracion e' in query:
+            self._resultado = [(7, 1, date(2024, 1, 2), 'Gripe', 'Reposo', 'Luis', 'Pérez', 'Cardiología')]
+        elif 'FROM expedientes' in query:
+            self._resultado = [(4, 'Gripe', date(2024, 1, 2))]
+
+    def fetchall(self):
+        return self._resultado
+
+    def fetchone(self):
+        return self._resultado[0] if self._resultado else None
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def bd(monkeypatch):
+    estado = {'consultas': [], 'falla': False, 'paciente': PACIENTE, 'cargas': 0,
+              'tendencias': {'ids': [], 'fechas': [], 'series': {}}}
+    monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: CursorFalso(estado))
+    monkeypatch.setattr(SignosVitales, 'get_summary', lambda paciente_id: None)
+    monkeypatch.setattr(SignosVitales, 'patient_trends', lambda paciente_id: estado['tendencias'])
+    monkeypatch.setattr(models.resumen_paciente, 'cache_datos', CacheDatos(BackendLocal(), check_interval=0))
+    return estado
+
+def test_parse_campos():
+    assert parse_campos(None) == CAMPOS_RESUMEN
+    assert parse_campos('totales, citas') == ('citas', 'totales')
+    with pytest.raises(ValueError):
+        parse_campos('citas,contrasena')
+
+def test_load_builds_every_section(bd):
+    resumen = ResumenPaciente.load(5)
+    assert resumen['paciente'] == RegistroPaciente(PACIENTE)
+    assert resumen['citas'][0]['hora'] == '09:00'
+    assert resumen['citas'][0]['medico_nombre_completo'] == 'Luis Pérez'
+    assert resumen['exploraciones'][0]['diagnostico'] == 'Gripe'
+    assert resumen['expedientes'][0]['id'] == 4
+    assert resumen['totales'] == {'citas': 1, 'exploraciones': 1, 'expedientes': 1}
+    assert 'signos' in resumen
+
+def test_only_requested_sections_are_queried(bd):
+    resumen = ResumenPaciente.load(5, ('citas',), 3)
+    assert set(resumen) == {'paciente', 'citas'}
+    assert len(bd['consultas']) == 2
+
+def test_missing_patient_returns_none(bd):
+    bd['paciente'] = None
+    assert ResumenPaciente.load(5) is None
+    assert len(bd['consultas']) == 1
+
+def test_database_errors_are_raised_not_reported_as_missing(bd):
+    bd['falla'] = True
+    with pytest.raises(Error):
+        ResumenPaciente.load(5)
+    bd['falla'] = False
+    bd['tendencias'] = None
+    with pytest.raises(Error):
+        ResumenPaciente.get(5)
+    # El resumen incompleto no queda en la caché
+    bd['tendencias'] = {'ids': [], 'fechas': [], 'series': {}}
+    assert ResumenPaciente.get(5)['tendencias'] == bd['tendencias']
+
+def test_get_is_cached_until_patient_namespace_is_invalidated(bd):
+    assert ResumenPaciente.get(5, limite=500) is ResumenPaciente.get(5, limite=500)
+    assert bd['cargas'] == 1
+    models.resumen_paciente.cache_datos.invalidate(patient_namespace(5))
+    ResumenPaciente.get(5)
+    assert bd['cargas'] == 2
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(db, 'connect', lambda: True)
+    monkeypatch.setattr(db, 'disconnect', lambda: None)
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.json = MedicalCenterJSONProvider(app)
+    app.register_blueprint(paciente_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    return cliente
+
+def test_api_resumen(cliente, bd):
+    respuesta = cliente.get('/api/pacientes/5/resumen?campos=totales')
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()
+    assert set(datos) == {'paciente', 'totales'}
+    assert datos['paciente']['nombre_completo'] == 'Ana López'
+    assert datos['totales'] == {'citas': 1, 'exploraciones': 1, 'expedientes': 1}
+    assert cliente.get('/api/pacientes/5/resumen?campos=otro').status_code == 400
+
+def test_api_reports_database_errors_as_500(cliente, bd):
+    bd['falla'] = True
+    assert cliente.get('/api/pacientes/5/resumen').status_code == 500
+    assert cliente.get('/api/pacientes/5/signos_vitales').status_code == 500
+    bd['falla'] = False
+    bd['paciente'] = None
+    assert cliente.get('/api/pacientes/5/resumen').status_code == 404
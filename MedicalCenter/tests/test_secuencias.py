@@ -0,0 +1,118 @@
+"""Pruebas del asignador de números consecutivos (models/secuencias.py)"""
+import threading
+from datetime import datetime
+
+import pytest
+
+from models.database import db
+from models.expediente import Expediente
+from models.secuencias import RESERVE_QUERY, AsignadorSecuencias
+import models.expediente
+
+class TablaFalsa:
+    """Sustituye la fila de la tabla secuencias: un contador protegido por candado"""
+
+    def __init__(self):
+        self.valores = {}
+        self.reservas = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, nombre, anio, cantidad):
+        with self._lock:
+            self.reservas += 1
+            ultimo = self.valores.get((nombre, anio), 0) + cantidad
+            self.valores[(nombre, anio)] = ultimo
+        return ultimo - cantidad + 1, ultimo
+
+def asignador(monkeypatch, bloque):
+    tabla = TablaFalsa()
+    secuencias = AsignadorSecuencias(bloque=bloque)
+    monkeypatch.setattr(secuencias, 'reserve', tabla.reserve)
+    return secuencias, tabla
+
+@pytest.mark.parametrize('bloque', [1, 7])
+def test_next_from_many_threads_has_no_duplicates(monkeypatch, bloque):
+    secuencias, tabla = asignador(monkeypatch, bloque)
+    hilos, por_hilo = 16, 50
+    inicio = threading.Barrier(hilos)
+    numeros = [[] for _ in range(hilos)]
+
+    def trabajar(i):
+        inicio.wait()
+        for _ in range(por_hilo):
+            numeros[i].append(secuencias.next('expediente', 2024))
+
+    threads = [threading.Thread(target=trabajar, args=(i,)) for i in range(hilos)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    todos = sorted(numero for lista in numeros for numero in lista)
+    # Con un solo proceso tampoco quedan huecos: se usan todos los números reservados
+    assert todos == list(range(1, hilos * por_hilo + 1))
+    assert tabla.reservas == -(-hilos * por_hilo // bloque)
+    # Cada hilo recibe sus números en orden creciente
+    assert all(lista == sorted(lista) for lista in numeros)
+
+def test_sequences_are_independent_per_name_and_year(monkeypatch):
+    secuencias, _ = asignador(monkeypatch, 1)
+    assert [secuencias.next('expediente', 2024) for _ in range(2)] == [1, 2]
+    assert secuencias.next('expediente', 2025) == 1
+    assert secuencias.next('factura', 2024) == 1
+
+def test_discard_leaves_a_gap(monkeypatch):
+    secuencias, tabla = asignador(monkeypatch, 5)
+    assert secuencias.next('expediente', 2024) == 1
+    secuencias.discard()
+    assert secuencias.next('expediente', 2024) == 6
+    assert tabla.reservas == 2
+
+class CursorFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, query, params=None):
+        self.conexion.sentencias.append((query, params))
+
+    def fetchone(self):
+        return (12,)
+
+    def close(self):
+        pass
+
+class ConexionFalsa:
+    def __init__(self):
+        self.sentencias = []
+        self.commits = 0
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        self.commits += 1
+
+class PoolFalso:
+    def __init__(self):
+        self.conexion = ConexionFalsa()
+        self.devueltas = 0
+
+    def acquire(self):
+        return self.conexion
+
+    def release(self, conexion):
+        self.devueltas += 1
+
+def test_reserve_uses_its_own_connection(monkeypatch):
+    pool = PoolFalso()
+    monkeypatch.setattr(db, '_pool', pool)
+    assert AsignadorSecuencias().reserve('expediente', 2024, 3) == (10, 12)
+    assert pool.conexion.sentencias[0] == (RESERVE_QUERY, ('expediente', 2024, 3, 3))
+    assert pool.conexion.commits == 1 and pool.devueltas == 1
+
+def test_expediente_number_format(monkeypatch):
+    secuencias, _ = asignador(monkeypatch, 1)
+    monkeypatch.setattr(models.expediente, 'secuencias', secuencias)
+    year = datetime.now().year
+    assert Expediente.generate_expediente_number() == f"{year}-0001"
+    assert Expediente.generate_expediente_number() == f"{year}-0002"
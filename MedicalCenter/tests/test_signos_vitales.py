@@ -0,0 +1,98 @@
+"""Pruebas de las tendencias y del resumen de signos vitales (models/signos_vitales.py)"""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from models.database import db
+from models.signos_vitales import (COLUMNAS_RESUMEN, SERIES, UPSERT_COMPLETO, UPSERT_INCREMENTAL, SerieSignos,
+                                   SignosVitales, body_mass_index, out_of_range, rolling_mean)
+
+def fila(id_exploracion, id_paciente, dia, peso=70.0, altura=170.0, temperatura=36.5, latidos=80,
+         saturacion=98, glucosa=90):
+    return (id_exploracion, id_paciente, date(2024, 1, dia), peso, altura, temperatura, latidos, saturacion, glucosa)
+
+def columna(serie):
+    return SERIES.index(serie)
+
+def test_body_mass_index_accepts_meters_and_centimeters():
+    imc = body_mass_index(np.array([80.0, 80.0, 80.0, np.nan]), np.array([200.0, 2.0, 0.0, 170.0]))
+    assert imc[:2].tolist() == [20.0, 20.0]
+    assert np.isnan(imc[2]) and np.isnan(imc[3])
+
+def test_rolling_mean_does_not_cross_patients():
+    serie = SerieSignos([fila(1, 1, 1, peso=60), fila(2, 1, 2, peso=70), fila(3, 1, 3, peso=80),
+                         fila(4, 1, 4, peso=None), fila(5, 2, 1, peso=100)])
+    promedio = rolling_mean(serie.valores, serie.inicio_grupo)[:, columna('peso')]
+    assert promedio.tolist() == [60.0, 65.0, 70.0, 75.0, 100.0]
+
+def test_analyze_deltas_and_range_flags():
+    serie = SerieSignos([fila(1, 1, 1, temperatura=36.5), fila(2, 1, 2, temperatura=38.0),
+                         fila(3, 2, 1, temperatura=35.0)])
+    analisis = SignosVitales.analyze(serie)
+    delta = analisis['delta'][:, columna('temperatura')]
+    assert np.isnan(delta[0]) and delta[1] == 1.5 and np.isnan(delta[2])
+    assert analisis['fuera_de_rango'][:, columna('temperatura')].tolist() == [0, 1, -1]
+    # Las series sin rango nunca se marcan
+    assert not out_of_range(serie.valores)[:, columna('peso')].any()
+
+def test_trends_are_grouped_by_patient():
+    serie = SerieSignos([fila(1, 1, 1), fila(2, 1, 5, glucosa=None), fila(3, 2, 3)])
+    tendencias = SignosVitales.trends(serie)
+    assert set(tendencias) == {1, 2}
+    assert tendencias[1]['ids'] == [1, 2]
+    assert tendencias[1]['fechas'] == ['2024-01-01', '2024-01-05']
+    assert tendencias[1]['series']['glucosa']['valores'] == [90.0, None]
+    assert tendencias[2]['series']['imc']['valores'] == [24.22]
+
+def test_summarize_returns_one_row_per_patient():
+    serie = SerieSignos([fila(1, 1, 1, peso=60), fila(2, 1, 2, peso=None), fila(3, 2, 3, glucosa=200)])
+    filas = [dict(zip(COLUMNAS_RESUMEN, f)) for f in SignosVitales.summarize(serie)]
+    assert [f['id_paciente'] for f in filas] == [1, 2]
+    assert filas[0]['total_exploraciones'] == 2 and filas[0]['ultima_exploracion'] == 2
+    assert filas[0]['primera_fecha'] == date(2024, 1, 1) and filas[0]['ultima_fecha'] == date(2024, 1, 2)
+    assert filas[0]['ultimo_peso'] is None and filas[0]['suma_peso'] == 60.0 and filas[0]['n_peso'] == 1
+    assert filas[1]['alertas'] == 1
+    assert SignosVitales.summarize(SerieSignos([])) == []
+
+class CursorFalso:
+    def __init__(self, escrituras):
+        self.escrituras = escrituras
+
+    def executemany(self, query, filas):
+        self.escrituras.append((query, list(filas)))
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def escrituras(monkeypatch):
+    escrituras = []
+    monkeypatch.setattr(db, 'get_cursor', lambda dictionary=False: CursorFalso(escrituras))
+    monkeypatch.setattr(db, 'commit', lambda: None)
+    monkeypatch.setattr(db, 'rollback', lambda: None)
+    return escrituras
+
+def test_record_exploracion_adds_to_summary_incrementally(escrituras, monkeypatch):
+    monkeypatch.setattr(db, 'execute_query', lambda *args: pytest.fail('no debe releer el historial'))
+    assert SignosVitales.record_exploracion(7, 1, date(2024, 1, 1), peso=70, altura=170) is True
+    assert len(escrituras) == 1
+    query, filas = escrituras[0]
+    assert query == UPSERT_INCREMENTAL
+    assert dict(zip(COLUMNAS_RESUMEN, filas[0]))['n_temperatura'] == 0
+
+def test_rebuild_keeps_patients_split_between_blocks_together(escrituras, monkeypatch):
+    monkeypatch.setattr(db, 'execute_update', lambda query, params=None: 0)
+    bloques = [[fila(1, 1, 1), fila(2, 1, 2)], [fila(3, 1, 3), fila(4, 2, 1)], [fila(5, 3, 1)]]
+    monkeypatch.setattr(db, 'stream_query', lambda query, params=None, size=1000: iter(bloques))
+    assert SignosVitales.rebuild(lote=2) == 3
+    filas = [dict(zip(COLUMNAS_RESUMEN, f)) for _, lote in escrituras for f in lote]
+    assert all(query == UPSERT_COMPLETO for query, _ in escrituras)
+    assert [(f['id_paciente'], f['total_exploraciones']) for f in filas] == [(1, 3), (2, 1), (3, 1)]
+
+def test_summarize_sums_height_in_centimeters():
+    serie = SerieSignos([fila(1, 1, 1, altura=1.70), fila(2, 1, 2, altura=172.0), fila(3, 1, 3, altura=None)])
+    resumen = dict(zip(COLUMNAS_RESUMEN, SignosVitales.summarize(serie)[0]))
+    assert resumen['suma_altura'] == 342.0 and resumen['n_altura'] == 2
+    assert resumen['ultimo_altura'] is None
+    assert SignosVitales.trends(serie)[1]['series']['altura']['valores'] == [170.0, 172.0, None]
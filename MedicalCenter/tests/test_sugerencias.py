@@ -0,0 +1,68 @@
+"""Pruebas de las rutas de sugerencias del formulario de citas (/api/pacientes/sugerencias, /api/medicos/sugerencias)"""
+from datetime import date
+
+import pytest
+from flask import Flask
+
+from controllers.medico_controller import medico_bp
+from controllers.paciente_controller import paciente_bp
+from models.database import db
+from models.medico import Medico, RegistroMedico
+from models.paciente import Paciente, RegistroPaciente
+import models.paciente
+
+PACIENTES = [RegistroPaciente((n, f"Ana{'a' * n}", 'López', date(1990, 1, n), 'Femenino', 'O+', None, 1))
+             for n in range(1, 4)]
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(db, 'connect', lambda: True)
+    monkeypatch.setattr(db, 'disconnect', lambda: None)
+    app = Flask(__name__)
+    app.secret_key = 'pruebas'
+    app.register_blueprint(paciente_bp)
+    app.register_blueprint(medico_bp)
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    return cliente
+
+def test_patient_suggestions_are_paged(cliente, monkeypatch):
+    llamadas = []
+
+    def search(term, limit=50, offset=0):
+        llamadas.append((term, limit, offset))
+        return PACIENTES[offset:offset + limit]
+    monkeypatch.setattr(Paciente, 'search', search)
+
+    datos = cliente.get('/api/pacientes/sugerencias?q=ana&limit=2').get_json()
+    assert datos == {'resultados': [{'id': 1, 'texto': 'Anaa López', 'detalle': '1990-01-01'},
+                                    {'id': 2, 'texto': 'Anaaa López', 'detalle': '1990-01-02'}],
+                     'siguiente': 2}
+    datos = cliente.get('/api/pacientes/sugerencias?q=ana&limit=2&offset=2').get_json()
+    assert [r['id'] for r in datos['resultados']] == [3] and datos['siguiente'] is None
+    # Se pide un resultado de más para saber si hay otra página
+    assert llamadas == [('ana', 3, 0), ('ana', 3, 2)]
+
+def test_empty_query_does_not_search(cliente, monkeypatch):
+    monkeypatch.setattr(Paciente, 'search', lambda *args: pytest.fail('no debe buscar'))
+    assert cliente.get('/api/pacientes/sugerencias?q=%20').get_json() == {'resultados': [], 'siguiente': None}
+
+def test_doctor_suggestions_expose_only_display_fields(cliente, monkeypatch):
+    medico = RegistroMedico((3, 'Luis', None, 'Pérez', 'Gómez', '123', 'Cardiología', 'l@x.com', 'RFC', '555',
+                             'Centro', 1, 'hash'))
+    monkeypatch.setattr(Medico, 'search', lambda term, limit=50, offset=0: [medico])
+    datos = cliente.get('/api/medicos/sugerencias?q=luis').get_json()
+    assert datos == {'resultados': [{'id': 3, 'texto': 'Luis  Pérez Gómez', 'detalle': 'Cardiología'}],
+                     'siguiente': None}
+
+def test_patient_search_applies_offset_to_ranked_ids(monkeypatch):
+    monkeypatch.setattr(models.paciente.search_index, 'search', lambda term, limit: [3, 1, 2][:limit])
+    consultas = []
+
+    def execute_query(query, params=None):
+        consultas.append(params)
+        return [(id_, 'Ana', 'López', None, 'Femenino', 'O+', None, 1) for id_ in params]
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+    assert [p['id_paciente'] for p in Paciente.search('ana', limit=2, offset=1)] == [1, 2]
+    assert consultas == [(1, 2)]